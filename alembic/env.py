@@ -10,8 +10,9 @@ from app.core.config import settings
 
 # Import all models so they are registered with Base.metadata
 from app.models.user import User, PasswordResetToken, EmailVerificationToken, EmailChangeRequest
-from app.models.credit import UserCredit, CreditTransaction
+from app.models.credit import UserCredit, CreditTransaction, CreditReservation, UserCreditShard
 from app.models.plan import Plan, Subscription
+from app.models.idempotency import IdempotencyKey
 # Ensure all models linked to Base.metadata are imported here
 
 # this is the Alembic Config object, which provides
@@ -0,0 +1,58 @@
+"""add_credit_reservations
+
+Revision ID: 4e8a2c6f1d93
+Revises: 9c4e1a7b2d58
+Create Date: 2026-10-18 19:12:44.108357
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4e8a2c6f1d93'
+down_revision: Union[str, None] = '9c4e1a7b2d58'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Constant server default: no table rewrite on Postgres 11+
+    op.add_column(
+        'user_credits',
+        sa.Column('reserved_balance', sa.Numeric(10, 2), server_default='0', nullable=False)
+    )
+    op.create_table(
+        'credit_reservations',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('user_credit_id', sa.Integer(), nullable=False),
+        sa.Column('amount', sa.Numeric(10, 2), nullable=False),
+        sa.Column('captured_amount', sa.Numeric(10, 2), nullable=True),
+        sa.Column('status', sa.String(length=20), server_default='held', nullable=False),
+        sa.Column('reference_id', sa.String(length=100), nullable=True),
+        sa.Column('description', sa.Text(), nullable=True),
+        sa.Column('expires_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('settled_at', sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(['user_credit_id'], ['user_credits.id'], ),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(
+        'ix_credit_reservations_held_expires_at', 'credit_reservations', ['expires_at'],
+        unique=False, postgresql_where=sa.text("status = 'held'"), sqlite_where=sa.text("status = 'held'")
+    )
+    op.create_index(
+        'ix_credit_reservations_user_id_created_at', 'credit_reservations',
+        ['user_id', sa.text('created_at DESC')], unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_credit_reservations_user_id_created_at', table_name='credit_reservations')
+    op.drop_index('ix_credit_reservations_held_expires_at', table_name='credit_reservations')
+    op.drop_table('credit_reservations')
+    op.drop_column('user_credits', 'reserved_balance')
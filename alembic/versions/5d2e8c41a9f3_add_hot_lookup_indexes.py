@@ -0,0 +1,66 @@
+"""add_hot_lookup_indexes
+
+Revision ID: 5d2e8c41a9f3
+Revises: 910d6692dbb9
+Create Date: 2026-10-18 10:12:41.218305
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d2e8c41a9f3'
+down_revision: Union[str, None] = '910d6692dbb9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (index name, table, columns)
+INDEXES = [
+    ('ix_users_stripe_customer_id', 'users', ['stripe_customer_id']),
+    ('ix_credit_transactions_user_id_created_at', 'credit_transactions', ['user_id', sa.text('created_at DESC')]),
+    ('ix_credit_transactions_reference_id', 'credit_transactions', ['reference_id']),
+    ('ix_subscriptions_user_id_status', 'subscriptions', ['user_id', 'status']),
+    ('ix_subscriptions_stripe_subscription_id', 'subscriptions', ['stripe_subscription_id']),
+]
+
+
+def _drop_invalid_index(name: str) -> None:
+    # An interrupted CREATE INDEX CONCURRENTLY leaves an INVALID index behind that
+    # IF NOT EXISTS would keep; drop it so the build is retried.
+    if op.get_context().as_sql:
+        return
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql':
+        return
+    invalid = bind.execute(
+        sa.text(
+            "SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+            "WHERE c.relname = :name AND NOT i.indisvalid"
+        ),
+        {'name': name},
+    ).scalar()
+    if invalid:
+        op.drop_index(name, postgresql_concurrently=True, if_exists=True)
+
+
+def upgrade() -> None:
+    # CONCURRENTLY builds without blocking writes, but cannot run inside a transaction
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            _drop_invalid_index(name)
+            op.create_index(
+                name, table, columns, unique=False,
+                postgresql_concurrently=True, if_not_exists=True,
+            )
+        for table in dict.fromkeys(table for _, table, _ in INDEXES):
+            op.execute(f'ANALYZE {table}')
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,54 @@
+"""add_transaction_count_and_keyset_index
+
+Revision ID: 7b3f0d9e6c12
+Revises: 5d2e8c41a9f3
+Create Date: 2026-10-18 14:03:27.540918
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7b3f0d9e6c12'
+down_revision: Union[str, None] = '5d2e8c41a9f3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Maintained by the CreditTransaction insert/delete listeners from now on
+    op.add_column('user_credits', sa.Column('transaction_count', sa.Integer(), server_default='0', nullable=False))
+    op.execute(
+        "UPDATE user_credits SET transaction_count = ("
+        " SELECT count(*) FROM credit_transactions"
+        " WHERE credit_transactions.user_id = user_credits.user_id)"
+    )
+
+    # Keyset pages order by (created_at, id); include id so no sort step is needed
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_credit_transactions_user_id_created_at_id', 'credit_transactions',
+            ['user_id', sa.text('created_at DESC'), sa.text('id DESC')],
+            unique=False, postgresql_concurrently=True, if_not_exists=True,
+        )
+        op.drop_index(
+            'ix_credit_transactions_user_id_created_at', table_name='credit_transactions',
+            postgresql_concurrently=True, if_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_credit_transactions_user_id_created_at', 'credit_transactions',
+            ['user_id', sa.text('created_at DESC')],
+            unique=False, postgresql_concurrently=True, if_not_exists=True,
+        )
+        op.drop_index(
+            'ix_credit_transactions_user_id_created_at_id', table_name='credit_transactions',
+            postgresql_concurrently=True, if_exists=True,
+        )
+    op.drop_column('user_credits', 'transaction_count')
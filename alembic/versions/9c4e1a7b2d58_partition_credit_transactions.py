@@ -0,0 +1,140 @@
+"""partition_credit_transactions
+
+Revision ID: 9c4e1a7b2d58
+Revises: 7b3f0d9e6c12
+Create Date: 2026-10-18 16:41:09.372215
+
+"""
+from datetime import datetime, UTC
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9c4e1a7b2d58'
+down_revision: Union[str, None] = '7b3f0d9e6c12'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Monthly partitions created up front; app.core.partitions keeps creating them afterwards
+MONTHS_AHEAD = 3
+# Leave at least this long between the migration and the first monthly boundary
+MIN_DAYS_BEFORE_BOUNDARY = 7
+
+# Indexes of credit_transactions (name, definition), recreated on the partitioned parent
+INDEXES = [
+    ('ix_credit_transactions_id', '(id)'),
+    ('ix_credit_transactions_user_id_created_at_id', '(user_id, created_at DESC, id DESC)'),
+    ('ix_credit_transactions_reference_id', '(reference_id)'),
+]
+
+# Foreign keys of credit_transactions (name, column, referenced table, ON DELETE clause)
+FOREIGN_KEYS = [
+    ('fk_credit_transactions_user_id_users_explicit', 'user_id', 'users', ' ON DELETE CASCADE'),
+    ('fk_credit_transactions_user_credit', 'user_credit_id', 'user_credits', ''),
+    ('fk_credit_transactions_plan_id', 'plan_id', 'plans', ''),
+    ('fk_credit_transactions_subscription_id', 'subscription_id', 'subscriptions', ''),
+]
+
+
+def _add_months(month: datetime, months: int) -> datetime:
+    index = month.year * 12 + month.month - 1 + months
+    return month.replace(year=index // 12, month=index % 12 + 1)
+
+
+def _first_boundary(now: datetime) -> datetime:
+    # Everything before the boundary stays in the existing table, which becomes the first partition
+    this_month = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    boundary = _add_months(this_month, 1)
+    if (boundary - now).days < MIN_DAYS_BEFORE_BOUNDARY:
+        boundary = _add_months(boundary, 1)
+    return boundary
+
+
+def upgrade() -> None:
+    # Declarative partitioning is Postgres-only; other databases keep the plain table
+    if op.get_context().dialect.name != 'postgresql':
+        return
+
+    boundary = _first_boundary(datetime.now(UTC))
+
+    # Prepare the existing table without blocking writes:
+    # - a unique (id, created_at) index to become its primary key as a partition
+    # - a validated CHECK matching its partition bound, so ATTACH skips the full scan
+    with op.get_context().autocommit_block():
+        op.execute(
+            'CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS credit_transactions_id_created_at_key'
+            ' ON credit_transactions (id, created_at)'
+        )
+        op.execute(
+            'ALTER TABLE credit_transactions ADD CONSTRAINT credit_transactions_partition_bound'
+            f" CHECK (created_at < '{boundary.isoformat()}') NOT VALID"
+        )
+        op.execute('ALTER TABLE credit_transactions VALIDATE CONSTRAINT credit_transactions_partition_bound')
+
+    # The swap itself only touches the catalog: every step is instant, but takes
+    # an exclusive lock, so give up rather than queue behind long-running queries.
+    op.execute("SET LOCAL lock_timeout = '5s'")
+    op.execute('ALTER TABLE credit_transactions RENAME TO credit_transactions_legacy')
+    op.execute('ALTER TABLE credit_transactions_legacy DROP CONSTRAINT credit_transactions_pkey')
+    op.execute(
+        'ALTER TABLE credit_transactions_legacy ADD CONSTRAINT credit_transactions_legacy_pkey'
+        ' PRIMARY KEY USING INDEX credit_transactions_id_created_at_key'
+    )
+    for name, _ in INDEXES:
+        op.execute(f'ALTER INDEX IF EXISTS {name} RENAME TO {name}_legacy')
+
+    op.execute(
+        'CREATE TABLE credit_transactions (LIKE credit_transactions_legacy INCLUDING DEFAULTS)'
+        ' PARTITION BY RANGE (created_at)'
+    )
+    op.execute('ALTER SEQUENCE credit_transactions_id_seq OWNED BY credit_transactions.id')
+    # Partition keys must be part of the primary key; ids stay unique through the sequence
+    op.execute('ALTER TABLE credit_transactions ADD CONSTRAINT credit_transactions_pkey PRIMARY KEY (id, created_at)')
+    for name, definition in INDEXES:
+        op.execute(f'CREATE INDEX {name} ON credit_transactions {definition}')
+    for name, column, referenced, on_delete in FOREIGN_KEYS:
+        op.execute(
+            f'ALTER TABLE credit_transactions ADD CONSTRAINT {name}'
+            f' FOREIGN KEY ({column}) REFERENCES {referenced} (id){on_delete}'
+        )
+
+    # Matching indexes and foreign keys on the old table are adopted, not rebuilt
+    op.execute(
+        'ALTER TABLE credit_transactions ATTACH PARTITION credit_transactions_legacy'
+        f" FOR VALUES FROM (MINVALUE) TO ('{boundary.isoformat()}')"
+    )
+    op.execute('ALTER TABLE credit_transactions_legacy DROP CONSTRAINT credit_transactions_partition_bound')
+
+    for offset in range(MONTHS_AHEAD):
+        start = _add_months(boundary, offset)
+        end = _add_months(start, 1)
+        op.execute(
+            f'CREATE TABLE credit_transactions_p{start.year:04d}_{start.month:02d}'
+            f" PARTITION OF credit_transactions FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+        )
+
+
+def downgrade() -> None:
+    if op.get_context().dialect.name != 'postgresql':
+        return
+
+    # Copies every attached row into a plain table and blocks writes while doing so;
+    # partitions already detached by the retention policy are not brought back.
+    op.execute('LOCK TABLE credit_transactions IN EXCLUSIVE MODE')
+    op.execute('CREATE TABLE credit_transactions_unpartitioned (LIKE credit_transactions INCLUDING DEFAULTS)')
+    op.execute('INSERT INTO credit_transactions_unpartitioned SELECT * FROM credit_transactions')
+    op.execute('ALTER SEQUENCE credit_transactions_id_seq OWNED BY credit_transactions_unpartitioned.id')
+    op.execute('DROP TABLE credit_transactions')
+    op.execute('ALTER TABLE credit_transactions_unpartitioned RENAME TO credit_transactions')
+    op.execute('ALTER TABLE credit_transactions ADD CONSTRAINT credit_transactions_pkey PRIMARY KEY (id)')
+    for name, definition in INDEXES:
+        op.execute(f'CREATE INDEX {name} ON credit_transactions {definition}')
+    for name, column, referenced, on_delete in FOREIGN_KEYS:
+        op.execute(
+            f'ALTER TABLE credit_transactions ADD CONSTRAINT {name}'
+            f' FOREIGN KEY ({column}) REFERENCES {referenced} (id){on_delete}'
+        )
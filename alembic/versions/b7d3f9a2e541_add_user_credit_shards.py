@@ -0,0 +1,50 @@
+"""add_user_credit_shards
+
+Revision ID: b7d3f9a2e541
+Revises: 4e8a2c6f1d93
+Create Date: 2026-10-18 21:37:05.664120
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7d3f9a2e541'
+down_revision: Union[str, None] = '4e8a2c6f1d93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('user_credits', sa.Column('shard_count', sa.Integer(), server_default='0', nullable=False))
+    op.create_table(
+        'user_credit_shards',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('user_credit_id', sa.Integer(), nullable=False),
+        sa.Column('shard_no', sa.Integer(), nullable=False),
+        sa.Column('balance', sa.Numeric(10, 2), server_default='0', nullable=False),
+        sa.Column('transaction_count', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(['user_credit_id'], ['user_credits.id'], ),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('user_id', 'shard_no', name='uq_user_credit_shards_user_id_shard_no')
+    )
+
+
+def downgrade() -> None:
+    # Fold any sharded balances back before dropping the shards
+    op.execute(
+        "UPDATE user_credits SET"
+        " balance = balance + s.balance,"
+        " transaction_count = transaction_count + s.transaction_count"
+        " FROM (SELECT user_credit_id, sum(balance) AS balance, sum(transaction_count) AS transaction_count"
+        " FROM user_credit_shards GROUP BY user_credit_id) AS s"
+        " WHERE user_credits.id = s.user_credit_id"
+    )
+    op.drop_table('user_credit_shards')
+    op.drop_column('user_credits', 'shard_count')
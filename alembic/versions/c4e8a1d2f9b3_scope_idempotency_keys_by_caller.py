@@ -0,0 +1,33 @@
+"""scope_idempotency_keys_by_caller
+
+Revision ID: c4e8a1d2f9b3
+Revises: 5a1c8e3f7b20
+Create Date: 2026-10-19 10:12:47.913204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4e8a1d2f9b3'
+down_revision: Union[str, None] = '5a1c8e3f7b20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Stored responses are only a retry cache; dropping them lets rows without a caller go
+    op.execute('DELETE FROM idempotency_keys')
+    op.add_column('idempotency_keys', sa.Column('caller', sa.String(length=64), nullable=False))
+    op.drop_constraint('idempotency_keys_pkey', 'idempotency_keys', type_='primary')
+    op.create_primary_key('idempotency_keys_pkey', 'idempotency_keys', ['key', 'endpoint', 'caller'])
+
+
+def downgrade() -> None:
+    op.execute('DELETE FROM idempotency_keys')
+    op.drop_constraint('idempotency_keys_pkey', 'idempotency_keys', type_='primary')
+    op.create_primary_key('idempotency_keys_pkey', 'idempotency_keys', ['key', 'endpoint'])
+    op.drop_column('idempotency_keys', 'caller')
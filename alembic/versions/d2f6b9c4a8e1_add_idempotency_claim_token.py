@@ -0,0 +1,28 @@
+"""add_idempotency_claim_token
+
+Revision ID: d2f6b9c4a8e1
+Revises: c4e8a1d2f9b3
+Create Date: 2026-10-19 14:03:26.551870
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd2f6b9c4a8e1'
+down_revision: Union[str, None] = 'c4e8a1d2f9b3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Stored responses are only a retry cache; dropping them lets rows without a token go
+    op.execute('DELETE FROM idempotency_keys')
+    op.add_column('idempotency_keys', sa.Column('claim_token', sa.String(length=32), nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column('idempotency_keys', 'claim_token')
@@ -8,7 +8,7 @@ from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.database import get_db
+from app.core.database import get_db, set_request_user
 from app.core.exceptions import AuthException
 from app.models.user import User
 from app.services.user_service import UserService
@@ -74,7 +74,9 @@ async def get_current_user(
     
     if user is None:
         raise credentials_exception
-        
+
+    # Lets read-intent sessions keep this user's reads on the primary after their writes
+    set_request_user(user.id)
     return user
 
 async def get_current_active_user(
@@ -1,3 +1,28 @@
+from sqlalchemy import event, inspect
 from sqlalchemy.orm import declarative_base
+from sqlalchemy.orm.attributes import set_committed_value
 
-Base = declarative_base()
\ No newline at end of file
+
+class _ModelBase:
+    # Server-generated values come back with the INSERT/UPDATE (RETURNING)
+    # instead of being expired and fetched by a later SELECT
+    __mapper_args__ = {"eager_defaults": True}
+
+
+Base = declarative_base(cls=_ModelBase)
+
+
+@event.listens_for(Base, "after_insert", propagate=True)
+def _load_unset_columns(mapper, connection, target) -> None:
+    """
+    Record columns left unset on a new row as NULL instead of leaving them unloaded.
+
+    The INSERT wrote NULL for them, but the ORM would otherwise load them
+    with a SELECT on first access (which fails outside a greenlet under
+    asyncio), so callers used to ``refresh()`` after every commit.
+    """
+    unloaded = inspect(target).unloaded
+    for prop in mapper.column_attrs:
+        column = prop.columns[0]
+        if prop.key in unloaded and getattr(column, "server_default", None) is None:
+            set_committed_value(target, prop.key, None)
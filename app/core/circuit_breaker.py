@@ -0,0 +1,207 @@
+"""Circuit breaker for database access.
+
+Replaces per-request retry loops: while the database is unreachable,
+requests fail immediately with a 503 instead of each one sleeping through
+its own retries while holding a worker slot.
+
+States:
+
+* ``closed``: connections are checked out normally. Consecutive checkout
+  failures (connect errors, failed pre-pings, dropped connections) are
+  counted; reaching ``failure_threshold`` opens the circuit.
+* ``open``: callers are rejected with ``DatabaseUnavailableError`` without
+  touching the pool, until ``recovery_timeout`` has passed.
+* ``half_open``: exactly one caller is let through as a probe. A successful
+  checkout closes the circuit; a failure opens it again for another
+  ``recovery_timeout``.
+
+Pool timeouts (all connections busy) are saturation, not an outage, and are
+not counted. State is per worker process.
+"""
+
+import math
+import time
+from typing import Any, Callable, Dict, Optional
+
+from sqlalchemy import event
+
+from app.core.db_exceptions import DatabaseUnavailableError
+from app.core.metrics import registry
+from app.log.logging import logger
+
+
+class CircuitState:
+    """Circuit breaker states."""
+
+    CLOSED = "closed"
+    HALF_OPEN = "half_open"
+    OPEN = "open"
+
+
+_STATE_VALUES = {CircuitState.CLOSED: 0, CircuitState.HALF_OPEN: 1, CircuitState.OPEN: 2}
+
+CIRCUIT_BREAKER_STATE = registry.gauge(
+    "circuit_breaker_state",
+    "Circuit breaker state (0 closed, 1 half-open, 2 open).",
+    ("breaker",),
+    multiprocess_mode="max",
+)
+CIRCUIT_BREAKER_TRANSITIONS = registry.counter(
+    "circuit_breaker_transitions_total",
+    "Circuit breaker state changes by target state.",
+    ("breaker", "state"),
+)
+CIRCUIT_BREAKER_REJECTIONS = registry.counter(
+    "circuit_breaker_rejections_total",
+    "Calls rejected without trying the dependency because the circuit was open.",
+    ("breaker",),
+)
+
+
+class CircuitBreaker:
+    """
+    Closed / open / half-open breaker with single-probe recovery.
+
+    All methods are synchronous and cheap; they run on the event loop (or
+    in SQLAlchemy's greenlet) without locking.
+
+    Args:
+        name: Breaker name, used as the metrics label.
+        failure_threshold: Consecutive failures that open the circuit.
+        recovery_timeout: Seconds to stay open before letting a probe through.
+        clock: Monotonic time source (overridable in tests).
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        recovery_timeout: float = 10.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self._clock = clock
+        self._state = CircuitState.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._last_error: Optional[str] = None
+        CIRCUIT_BREAKER_STATE.labels(name).set(_STATE_VALUES[self._state])
+
+    @property
+    def state(self) -> str:
+        """Current state, moving from open to half-open once the timeout has passed."""
+        if self._state == CircuitState.OPEN and self._clock() - self._opened_at >= self.recovery_timeout:
+            self._transition(CircuitState.HALF_OPEN)
+        return self._state
+
+    def allow(self) -> bool:
+        """
+        Admit or reject a caller.
+
+        Returns:
+            bool: True if the caller is the half-open probe and must report
+            its outcome (via the pool, or ``end_probe``).
+
+        Raises:
+            DatabaseUnavailableError: If the circuit is open, or half-open
+                with a probe already in flight.
+        """
+        state = self.state
+        if state == CircuitState.CLOSED:
+            return False
+        if state == CircuitState.HALF_OPEN and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return True
+        CIRCUIT_BREAKER_REJECTIONS.labels(self.name).inc()
+        raise DatabaseUnavailableError(
+            retry_after=self.retry_after(),
+            error_details={"circuit_breaker": self.name, "state": state}
+        )
+
+    def record_success(self) -> None:
+        """Report a successful checkout."""
+        self._failures = 0
+        if self._state == CircuitState.HALF_OPEN:
+            self._probe_in_flight = False
+            self._transition(CircuitState.CLOSED)
+
+    def record_failure(self, error: Optional[BaseException] = None) -> None:
+        """Report a failed checkout or a dropped connection."""
+        if error is not None:
+            self._last_error = f"{type(error).__name__}: {error}"[:300]
+        if self._state == CircuitState.HALF_OPEN:
+            self._probe_in_flight = False
+            self._open()
+        elif self._state == CircuitState.CLOSED:
+            self._failures += 1
+            if self._failures >= self.failure_threshold:
+                self._open()
+
+    def end_probe(self) -> None:
+        """Release a probe that finished without reporting; the circuit opens again."""
+        if self._state == CircuitState.HALF_OPEN and self._probe_in_flight:
+            self._probe_in_flight = False
+            self._open()
+
+    def retry_after(self) -> int:
+        """Whole seconds until a probe will be allowed (at least 1)."""
+        remaining = self.recovery_timeout - (self._clock() - self._opened_at)
+        return max(1, math.ceil(remaining))
+
+    def snapshot(self) -> Dict[str, Any]:
+        """State summary for health checks."""
+        state = self.state
+        return {
+            "name": self.name,
+            "state": state,
+            "consecutive_failures": self._failures,
+            "failure_threshold": self.failure_threshold,
+            "retry_after_seconds": self.retry_after() if state == CircuitState.OPEN else 0,
+            "last_error": self._last_error,
+        }
+
+    def _open(self) -> None:
+        self._opened_at = self._clock()
+        self._failures = 0
+        self._transition(CircuitState.OPEN)
+
+    def _transition(self, state: str) -> None:
+        if state == self._state:
+            return
+        previous, self._state = self._state, state
+        CIRCUIT_BREAKER_STATE.labels(self.name).set(_STATE_VALUES[state])
+        CIRCUIT_BREAKER_TRANSITIONS.labels(self.name, state).inc()
+        log = logger.warning if state == CircuitState.OPEN else logger.info
+        log(
+            "Circuit breaker state changed",
+            event_type="circuit_breaker_transition",
+            breaker=self.name,
+            previous_state=previous,
+            state=state,
+            recovery_timeout=self.recovery_timeout,
+            last_error=self._last_error
+        )
+
+
+def instrument_circuit_breaker(async_engine, breaker: CircuitBreaker) -> None:
+    """
+    Report connections dropped mid-statement to ``breaker``.
+
+    Checkout outcomes are reported by the pool itself (see
+    ``InstrumentedAsyncQueuePool.connect``); this covers connections that
+    die after checkout.
+
+    Args:
+        async_engine: An ``AsyncEngine`` or sync ``Engine``.
+        breaker: The breaker guarding that engine's pool.
+    """
+    sync_engine = getattr(async_engine, "sync_engine", async_engine)
+
+    def on_error(context) -> None:
+        if context.is_disconnect and not context.is_pre_ping and context.connection is not None:
+            breaker.record_failure(context.original_exception)
+
+    event.listen(sync_engine, "handle_error", on_error)
@@ -36,6 +36,8 @@ class Settings(BaseSettings):
     # Database settings
     database_url: str = os.getenv("DATABASE_URL", "")
     test_database_url: str = os.getenv("TEST_DATABASE_URL", "")
+    # Comma-separated read replica URLs (empty = all reads on the primary)
+    DATABASE_REPLICA_URLS: str = os.getenv("DATABASE_REPLICA_URLS", "")
 
     # Authentication settings
     secret_key: str = os.getenv("SECRET_KEY", "your-secret-key-here")
@@ -99,6 +101,94 @@ class Settings(BaseSettings):
     DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", "1800"))
     DB_POOL_PRE_PING: bool = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
     DB_ECHO: bool = os.getenv("DB_ECHO", "false").lower() == "true"
+    DB_RELEASE_BEFORE_OUTBOUND: bool = os.getenv("DB_RELEASE_BEFORE_OUTBOUND", "true").lower() == "true"
+    DB_CIRCUIT_FAILURE_THRESHOLD: int = int(os.getenv("DB_CIRCUIT_FAILURE_THRESHOLD", "5"))
+    DB_CIRCUIT_RECOVERY_SECONDS: float = float(os.getenv("DB_CIRCUIT_RECOVERY_SECONDS", "10"))
+    DB_REPLICA_MAX_LAG_SECONDS: float = float(os.getenv("DB_REPLICA_MAX_LAG_SECONDS", "5"))
+    DB_REPLICA_CHECK_INTERVAL_SECONDS: float = float(os.getenv("DB_REPLICA_CHECK_INTERVAL_SECONDS", "5"))
+    DB_READ_YOUR_WRITES_SECONDS: float = float(os.getenv("DB_READ_YOUR_WRITES_SECONDS", "10"))
+    DB_QUERY_CACHE_SIZE: int = int(os.getenv("DB_QUERY_CACHE_SIZE", "1000"))
+    DB_PREPARED_STATEMENT_CACHE_SIZE: int = int(os.getenv("DB_PREPARED_STATEMENT_CACHE_SIZE", "500"))
+    # PgBouncer (transaction pooling) compatibility: no prepared-statement caching;
+    # DB_PGBOUNCER_POOL is "null" (no local pool) or "queue" (keep the DB_POOL_* pools)
+    DB_PGBOUNCER_MODE: bool = os.getenv("DB_PGBOUNCER_MODE", "false").lower() == "true"
+    DB_PGBOUNCER_POOL: str = os.getenv("DB_PGBOUNCER_POOL", "null").lower()
+    # Bulkhead pools per traffic class (DB_POOL_* sizes the interactive/primary pool; size 0 shares it)
+    DB_WEBHOOKS_POOL_SIZE: int = int(os.getenv("DB_WEBHOOKS_POOL_SIZE", "5"))
+    DB_WEBHOOKS_MAX_OVERFLOW: int = int(os.getenv("DB_WEBHOOKS_MAX_OVERFLOW", "5"))
+    DB_WEBHOOKS_POOL_TIMEOUT: float = float(os.getenv("DB_WEBHOOKS_POOL_TIMEOUT", "10"))
+    DB_INTERNAL_POOL_SIZE: int = int(os.getenv("DB_INTERNAL_POOL_SIZE", "5"))
+    DB_INTERNAL_MAX_OVERFLOW: int = int(os.getenv("DB_INTERNAL_MAX_OVERFLOW", "5"))
+    DB_INTERNAL_POOL_TIMEOUT: float = float(os.getenv("DB_INTERNAL_POOL_TIMEOUT", "30"))
+    DB_HEALTH_POOL_SIZE: int = int(os.getenv("DB_HEALTH_POOL_SIZE", "1"))
+    DB_HEALTH_MAX_OVERFLOW: int = int(os.getenv("DB_HEALTH_MAX_OVERFLOW", "1"))
+    DB_HEALTH_POOL_TIMEOUT: float = float(os.getenv("DB_HEALTH_POOL_TIMEOUT", "2"))
+
+    # credit_transactions partitioning (Postgres) settings
+    CREDIT_PARTITION_MONTHS_AHEAD: int = int(os.getenv("CREDIT_PARTITION_MONTHS_AHEAD", "3"))
+    CREDIT_PARTITION_MAINTENANCE_INTERVAL_SECONDS: float = float(
+        os.getenv("CREDIT_PARTITION_MAINTENANCE_INTERVAL_SECONDS", "3600")
+    )
+    CREDIT_TRANSACTIONS_RETENTION_MONTHS: int = int(os.getenv("CREDIT_TRANSACTIONS_RETENTION_MONTHS", "0"))
+    CREDIT_PARTITION_ARCHIVE_SCHEMA: str = os.getenv("CREDIT_PARTITION_ARCHIVE_SCHEMA", "archive")
+
+    # Credit reservation (hold / capture / release) settings
+    CREDIT_RESERVATION_DEFAULT_TTL_SECONDS: int = int(os.getenv("CREDIT_RESERVATION_DEFAULT_TTL_SECONDS", "300"))
+    CREDIT_RESERVATION_MAX_TTL_SECONDS: int = int(os.getenv("CREDIT_RESERVATION_MAX_TTL_SECONDS", "86400"))
+    CREDIT_RESERVATION_SWEEP_INTERVAL_SECONDS: float = float(
+        os.getenv("CREDIT_RESERVATION_SWEEP_INTERVAL_SECONDS", "30")
+    )
+    CREDIT_RESERVATION_SWEEP_BATCH_SIZE: int = int(os.getenv("CREDIT_RESERVATION_SWEEP_BATCH_SIZE", "1000"))
+
+    # Sharded balance settings
+    CREDIT_MAX_SHARDS: int = int(os.getenv("CREDIT_MAX_SHARDS", "64"))
+    CREDIT_SHARD_REBALANCE_INTERVAL_SECONDS: float = float(
+        os.getenv("CREDIT_SHARD_REBALANCE_INTERVAL_SECONDS", "60")
+    )
+
+    # Batch usage ingestion (POST /credits/usage/batch)
+    CREDIT_USAGE_BATCH_MAX_RECORDS: int = int(os.getenv("CREDIT_USAGE_BATCH_MAX_RECORDS", "10000"))
+
+    # Idempotency-Key settings (credit mutation endpoints)
+    IDEMPOTENCY_KEY_TTL_SECONDS: int = int(os.getenv("IDEMPOTENCY_KEY_TTL_SECONDS", "86400"))
+    IDEMPOTENCY_IN_FLIGHT_TIMEOUT_SECONDS: int = int(os.getenv("IDEMPOTENCY_IN_FLIGHT_TIMEOUT_SECONDS", "60"))
+    IDEMPOTENCY_WAIT_SECONDS: float = float(os.getenv("IDEMPOTENCY_WAIT_SECONDS", "10"))
+    IDEMPOTENCY_PURGE_INTERVAL_SECONDS: float = float(os.getenv("IDEMPOTENCY_PURGE_INTERVAL_SECONDS", "300"))
+    IDEMPOTENCY_PURGE_BATCH_SIZE: int = int(os.getenv("IDEMPOTENCY_PURGE_BATCH_SIZE", "1000"))
+
+    # Metrics settings
+    METRICS_ENABLED: bool = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+    METRICS_MULTIPROCESS_DIR: str = os.getenv("METRICS_MULTIPROCESS_DIR", "")
+    METRICS_FLUSH_INTERVAL_SECONDS: float = float(os.getenv("METRICS_FLUSH_INTERVAL_SECONDS", "10"))
+
+    # Per-request SQL instrumentation settings
+    SQL_INSTRUMENTATION_ENABLED: bool = os.getenv("SQL_INSTRUMENTATION_ENABLED", "true").lower() == "true"
+    SQL_N_PLUS_ONE_THRESHOLD: int = int(os.getenv("SQL_N_PLUS_ONE_THRESHOLD", "5"))
+    SERVER_TIMING_ENABLED: bool = os.getenv("SERVER_TIMING_ENABLED", "false").lower() == "true"
+    SLOW_REQUEST_THRESHOLD_MS: float = float(os.getenv("SLOW_REQUEST_THRESHOLD_MS", "500"))
+    SLOW_REQUEST_BUFFER_SIZE: int = int(os.getenv("SLOW_REQUEST_BUFFER_SIZE", "100"))
+    SLOW_QUERY_THRESHOLD_MS: float = float(os.getenv("SLOW_QUERY_THRESHOLD_MS", "200"))
+    SLOW_QUERY_LOG_SIZE: int = int(os.getenv("SLOW_QUERY_LOG_SIZE", "200"))
+    SLOW_QUERY_EXPLAIN_ENABLED: bool = os.getenv("SLOW_QUERY_EXPLAIN_ENABLED", "true").lower() == "true"
+    SLOW_QUERY_EXPLAIN_ANALYZE: bool = os.getenv("SLOW_QUERY_EXPLAIN_ANALYZE", "false").lower() == "true"
+
+    # Event-loop monitoring settings
+    EVENT_LOOP_MONITOR_ENABLED: bool = os.getenv("EVENT_LOOP_MONITOR_ENABLED", "true").lower() == "true"
+    EVENT_LOOP_LAG_INTERVAL_SECONDS: float = float(os.getenv("EVENT_LOOP_LAG_INTERVAL_SECONDS", "0.25"))
+    EVENT_LOOP_BLOCK_THRESHOLD_SECONDS: float = float(os.getenv("EVENT_LOOP_BLOCK_THRESHOLD_SECONDS", "0.5"))
+    EVENT_LOOP_DEBUG: bool = os.getenv("EVENT_LOOP_DEBUG", "false").lower() == "true"
+
+    # Memory sampling settings (0 disables the periodic RSS / object-count sampler)
+    MEMORY_SAMPLE_INTERVAL_SECONDS: float = float(os.getenv("MEMORY_SAMPLE_INTERVAL_SECONDS", "60"))
+
+    # Distributed tracing settings
+    TRACING_ENABLED: bool = os.getenv("TRACING_ENABLED", "false").lower() == "true"
+    TRACING_SERVICE_NAME: str = os.getenv("TRACING_SERVICE_NAME", "auth-service")
+    TRACING_SAMPLE_RATIO: float = float(os.getenv("TRACING_SAMPLE_RATIO", "1.0"))
+    TRACING_EXPORTER: str = os.getenv("TRACING_EXPORTER", "file")  # file, otlp or none
+    TRACING_FILE_PATH: str = os.getenv("TRACING_FILE_PATH", "traces.jsonl")
+    TRACING_OTLP_ENDPOINT: str = os.getenv("TRACING_OTLP_ENDPOINT", "http://localhost:4318/v1/traces")
+    TRACING_EXPORT_INTERVAL_SECONDS: float = float(os.getenv("TRACING_EXPORT_INTERVAL_SECONDS", "5"))
 
     @property
     def allowed_redirect_domains_list(self) -> List[str]:
@@ -107,6 +197,11 @@ class Settings(BaseSettings):
             return []
         return [d.strip() for d in self.ALLOWED_REDIRECT_DOMAINS.split(",") if d.strip()]
 
+    @property
+    def database_replica_urls_list(self) -> List[str]:
+        """Get read replica URLs as a list."""
+        return [url.strip() for url in self.DATABASE_REPLICA_URLS.split(",") if url.strip()]
+
     @property
     def cors_origins_list(self) -> List[str]:
         """Get CORS origins as a list."""
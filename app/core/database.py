@@ -1,26 +1,90 @@
 import os
-import asyncio
 import time
-import random
-from typing import AsyncGenerator, Optional, Dict, Any
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from enum import Enum
+from typing import AsyncGenerator, Callable, Iterator, Optional, Dict, Any, Set
+
+from fastapi import Depends, Request
 
 from app.core.config import settings
-from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
-from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine, async_sessionmaker
+from sqlalchemy.orm import Session
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool
 
 from app.log.logging import logger
-from app.core.db_utils import (
-    with_exponential_backoff,
-    retry_exceptions,
-    classify_exception,
-    healthcheck_database,
-    PG_ERROR_CODE_MAP
-)
-from app.core.db_exceptions import (
-    ConnectionRefusedError,
-    ConnectionLostError,
-    ConnectionTimeoutError
-)
+from app.core.circuit_breaker import CircuitBreaker, instrument_circuit_breaker
+from app.core.db_utils import classify_exception, healthcheck_database
+from app.core.db_exceptions import DatabaseUnavailableError
+from app.core.read_replicas import DB_READ_ROUTING, RecentWrites, Replica, ReplicaSet
+from app.core.metrics import DB_POOL_WAIT, DB_POOL_TIMEOUTS, register_pool_metrics
+from app.core.sql_instrumentation import instrument_engine
+
+
+class _CircuitBreakerPoolMixin:
+    """Reports checkout outcomes to the pool's circuit breaker and keeps them across dispose()."""
+
+    metrics_name = "primary"
+    circuit_breaker: Optional[CircuitBreaker] = None
+
+    def connect(self):
+        # Covers every way a checkout can fail: new connections, pre-ping and reconnects
+        try:
+            connection = super().connect()
+        except PoolTimeoutError:
+            # All connections busy: saturation, not an outage
+            raise
+        except Exception as e:
+            if self.circuit_breaker is not None:
+                self.circuit_breaker.record_failure(e)
+            raise
+        if self.circuit_breaker is not None:
+            self.circuit_breaker.record_success()
+        return connection
+
+    def recreate(self):
+        # engine.dispose() swaps in a new pool; keep its label and breaker
+        pool = super().recreate()
+        pool.metrics_name = self.metrics_name
+        pool.circuit_breaker = self.circuit_breaker
+        return pool
+
+
+class InstrumentedAsyncQueuePool(_CircuitBreakerPoolMixin, AsyncAdaptedQueuePool):
+    """
+    Async queue pool that records how long checkouts wait for a connection
+    and reports checkout outcomes to its circuit breaker.
+    """
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            DB_POOL_TIMEOUTS.labels(self.metrics_name).inc()
+            raise
+        finally:
+            DB_POOL_WAIT.labels(self.metrics_name).observe(time.perf_counter() - start)
+
+
+class InstrumentedNullPool(_CircuitBreakerPoolMixin, NullPool):
+    """
+    Pool that opens a connection per checkout and closes it on return.
+
+    Used in PgBouncer mode, where PgBouncer does the pooling; checkout
+    outcomes still feed the circuit breaker.
+    """
+
+
+def _unique_statement_name() -> str:
+    # PgBouncer in transaction mode hands each transaction a different server
+    # connection, so asyncpg's per-connection statement names would collide
+    return f"__asyncpg_{uuid.uuid4().hex}__"
+
 
 # Get the appropriate database URL based on environment
 database_url = settings.test_database_url if os.getenv(
@@ -39,161 +103,524 @@ logger.info(
     pool_pre_ping=settings.DB_POOL_PRE_PING
 )
 
+# Every consumer (request sessions, health checks, diagnostics) goes through
+# these engines; nothing else in the app should create its own pool.
+_engines: Dict[str, AsyncEngine] = {}
+
+
+def register_engine(name: str, async_engine: AsyncEngine) -> AsyncEngine:
+    """
+    Register an additional shared engine so it is disposed with the others.
+
+    Args:
+        name: Registry key (also used as the pool metrics label)
+        async_engine: The engine to register
+
+    Returns:
+        AsyncEngine: The registered engine
+    """
+    _engines[name] = async_engine
+    return async_engine
+
+
+def get_engine(name: str = InstrumentedAsyncQueuePool.metrics_name) -> AsyncEngine:
+    """Return a shared engine from the registry (the primary one by default)."""
+    return _engines[name]
+
+
+def create_pooled_engine(
+    url: str,
+    name: str,
+    pool_size: Optional[int] = None,
+    max_overflow: Optional[int] = None,
+    pool_timeout: Optional[float] = None,
+    circuit_breaker: Optional[CircuitBreaker] = None
+) -> AsyncEngine:
+    """
+    Create and register an engine on an instrumented pool.
+
+    The pool gets its own metrics label and circuit breaker (both named
+    ``name``) unless ``circuit_breaker`` is given, and statements are
+    instrumented like on the primary. Pool sizing defaults to the
+    ``DB_POOL_*`` settings.
+
+    With ``DB_PGBOUNCER_MODE`` (asyncpg behind PgBouncer in transaction
+    mode), prepared statements are not cached, every statement gets a
+    unique name, and connections are not kept locally (``NullPool``) unless
+    ``DB_PGBOUNCER_POOL=queue`` keeps a small local pool.
+
+    Args:
+        url: Database URL
+        name: Registry key, pool metrics label and circuit breaker name
+        pool_size: Persistent connections kept by the pool
+        max_overflow: Extra connections opened under load
+        pool_timeout: Seconds a checkout waits for a free connection
+        circuit_breaker: Breaker to share with other pools on the same database
+
+    Returns:
+        AsyncEngine: The registered engine
+    """
+    connect_args = {}
+    pool_args = {
+        "pool_size": settings.DB_POOL_SIZE if pool_size is None else pool_size,
+        "max_overflow": settings.DB_MAX_OVERFLOW if max_overflow is None else max_overflow,
+        "pool_timeout": settings.DB_POOL_TIMEOUT if pool_timeout is None else pool_timeout,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "poolclass": InstrumentedAsyncQueuePool,
+    }
+    if make_url(url).get_driver_name() == "asyncpg":
+        if settings.DB_PGBOUNCER_MODE:
+            # Prepared statements live on one server connection, which the next
+            # transaction may not get: never cache them, and name each one uniquely
+            connect_args["statement_cache_size"] = 0
+            connect_args["prepared_statement_cache_size"] = 0
+            connect_args["prepared_statement_name_func"] = _unique_statement_name
+            if settings.DB_PGBOUNCER_POOL == "null":
+                # No idle local connections to pre-ping or recycle; PgBouncer pools
+                pool_args = {"poolclass": InstrumentedNullPool}
+        else:
+            # Per-connection LRU of prepared statements; the hot queries stay prepared
+            connect_args["prepared_statement_cache_size"] = settings.DB_PREPARED_STATEMENT_CACHE_SIZE
+    pooled_engine = create_async_engine(
+        url,
+        echo=settings.DB_ECHO,
+        query_cache_size=settings.DB_QUERY_CACHE_SIZE,
+        connect_args=connect_args,
+        **pool_args
+    )
+    pooled_engine.pool.metrics_name = name
+    register_pool_metrics(name, pooled_engine.pool)
+
+    # Fail fast with 503s instead of queueing requests on a database that is down
+    breaker = circuit_breaker or CircuitBreaker(
+        name,
+        failure_threshold=settings.DB_CIRCUIT_FAILURE_THRESHOLD,
+        recovery_timeout=settings.DB_CIRCUIT_RECOVERY_SECONDS
+    )
+    pooled_engine.pool.circuit_breaker = breaker
+    instrument_circuit_breaker(pooled_engine, breaker)
+    if settings.SQL_INSTRUMENTATION_ENABLED:
+        instrument_engine(pooled_engine)
+    return register_engine(name, pooled_engine)
+
+
 # Create engine with connection pool settings from centralized config
-engine = create_async_engine(
-    database_url,
-    echo=settings.DB_ECHO,
-    pool_size=settings.DB_POOL_SIZE,
-    max_overflow=settings.DB_MAX_OVERFLOW,
-    pool_timeout=settings.DB_POOL_TIMEOUT,
-    pool_recycle=settings.DB_POOL_RECYCLE,
-    pool_pre_ping=settings.DB_POOL_PRE_PING
-)
+engine = create_pooled_engine(database_url, InstrumentedAsyncQueuePool.metrics_name)
+db_circuit_breaker: CircuitBreaker = engine.pool.circuit_breaker
 
 # Create session factory
 AsyncSessionLocal = async_sessionmaker(
     bind=engine, expire_on_commit=False, autoflush=False
 )
 
-# Track connection status for service degradation decisions
-_last_connection_error: Optional[float] = None
-_connection_error_count: int = 0
-_in_degraded_mode: bool = False
-MAX_ERROR_COUNT_BEFORE_DEGRADATION = 3
-ERROR_RESET_PERIOD = 300  # 5 minutes
-
-
-def _handle_db_error(e: Exception, attempts: int):
-    """Handle database errors with proper logging and degradation tracking."""
-    global _in_degraded_mode, _connection_error_count, _last_connection_error
-    
-    # Track connection errors for service degradation
-    current_time = time.time()
-    _last_connection_error = current_time
-    
-    # Check if we should enter degraded mode
-    if (not _in_degraded_mode and 
-        _connection_error_count >= MAX_ERROR_COUNT_BEFORE_DEGRADATION):
-        _in_degraded_mode = True
+
+class TrafficClass(str, Enum):
+    """Kinds of database traffic that get their own connection pool (bulkhead)."""
+    INTERACTIVE = "interactive"  # User-facing requests (login, tokens, profile): the primary pool
+    WEBHOOKS = "webhooks"  # Stripe webhook deliveries
+    INTERNAL = "internal"  # Service-to-service API calls, batches and background jobs
+    HEALTH = "health"  # Health and readiness probes
+
+
+def _create_bulkheads() -> Dict[TrafficClass, AsyncEngine]:
+    # A burst in one class waits on its own pool instead of starving the others.
+    # Every pool talks to the same database, so they share the primary's breaker.
+    pools = {
+        TrafficClass.WEBHOOKS: (
+            settings.DB_WEBHOOKS_POOL_SIZE, settings.DB_WEBHOOKS_MAX_OVERFLOW, settings.DB_WEBHOOKS_POOL_TIMEOUT
+        ),
+        TrafficClass.INTERNAL: (
+            settings.DB_INTERNAL_POOL_SIZE, settings.DB_INTERNAL_MAX_OVERFLOW, settings.DB_INTERNAL_POOL_TIMEOUT
+        ),
+        TrafficClass.HEALTH: (
+            settings.DB_HEALTH_POOL_SIZE, settings.DB_HEALTH_MAX_OVERFLOW, settings.DB_HEALTH_POOL_TIMEOUT
+        ),
+    }
+    engines = {TrafficClass.INTERACTIVE: engine}
+    for traffic_class, (pool_size, max_overflow, pool_timeout) in pools.items():
+        if pool_size <= 0:
+            # Disabled: this class shares the primary pool
+            engines[traffic_class] = engine
+            continue
+        engines[traffic_class] = create_pooled_engine(
+            database_url,
+            traffic_class.value,
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+            pool_timeout=pool_timeout,
+            circuit_breaker=db_circuit_breaker
+        )
+    return engines
+
+
+_bulkhead_engines = _create_bulkheads()
+_bulkhead_sessionmakers = {
+    traffic_class: async_sessionmaker(bind=pooled, expire_on_commit=False, autoflush=False)
+    for traffic_class, pooled in _bulkhead_engines.items()
+}
+_bulkhead_sessionmakers[TrafficClass.INTERACTIVE] = AsyncSessionLocal
+
+
+def engine_for(traffic_class: TrafficClass) -> AsyncEngine:
+    """Return the engine whose pool serves ``traffic_class``."""
+    return _bulkhead_engines[traffic_class]
+
+
+def session_factory(traffic_class: TrafficClass) -> async_sessionmaker:
+    """Return the session factory bound to the pool serving ``traffic_class``."""
+    return _bulkhead_sessionmakers[traffic_class]
+
+
+# Optional read replicas, used only by read-intent sessions (get_read_db)
+replica_set = ReplicaSet(
+    (
+        Replica(f"replica{index}", create_pooled_engine(url, f"replica{index}"))
+        for index, url in enumerate(settings.database_replica_urls_list, start=1)
+    ),
+    max_lag=settings.DB_REPLICA_MAX_LAG_SECONDS
+)
+recent_writes = RecentWrites(window=settings.DB_READ_YOUR_WRITES_SECONDS)
+
+# Session.info keys of read-intent sessions
+_READ_INTENT_KEY = "read_intent"
+_READ_SUBJECTS_KEY = "read_subjects"
+_READ_TARGET_KEY = "read_target"
+
+
+class RoutingSession(Session):
+    """
+    Session that sends plain SELECTs to a read replica when opened with read intent.
+
+    The target is chosen once per session: a replica that is up and caught
+    up, unless one of the users the request is about wrote within the
+    read-your-writes window. Flushes, DML, ``FOR UPDATE`` selects and
+    anything after the session's own first write go to the primary.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if (
+            self.info.get(_READ_INTENT_KEY)
+            and not self._flushing
+            and getattr(clause, "is_select", False)
+            and getattr(clause, "_for_update_arg", None) is None
+        ):
+            if self.info.get(_WRITES_KEY):
+                self.info[_READ_TARGET_KEY] = None
+            elif _READ_TARGET_KEY not in self.info:
+                self.info[_READ_TARGET_KEY] = _choose_read_target(self)
+            replica = self.info[_READ_TARGET_KEY]
+            if replica is not None:
+                return replica.engine.sync_engine
+        return super().get_bind(mapper=mapper, clause=clause, **kw)
+
+
+def _choose_read_target(session: Session) -> Optional[Replica]:
+    user_ids = set(session.info.get(_READ_SUBJECTS_KEY, ()))
+    user_ids.add(_request_user_id.get())
+    if any(recent_writes.wrote_recently(user_id) for user_id in user_ids if user_id is not None):
+        DB_READ_ROUTING.labels("primary", "recent_write").inc()
+        return None
+    replica = replica_set.choose()
+    if replica is None:
+        DB_READ_ROUTING.labels("primary", "no_replica_available").inc()
+        return None
+    DB_READ_ROUTING.labels(replica.name, "replica").inc()
+    return replica
+
+
+AsyncReadSessionLocal = async_sessionmaker(
+    bind=engine, sync_session_class=RoutingSession, expire_on_commit=False, autoflush=False
+)
+
+
+async def dispose_engines() -> None:
+    """Close every pooled connection; called from the application lifespan on shutdown."""
+    for name, registered in list(_engines.items()):
+        try:
+            await registered.dispose()
+            logger.info("Database engine disposed", event_type="db_engine_disposed", engine=name)
+        except Exception as e:
+            logger.error(
+                f"Failed to dispose database engine: {str(e)}",
+                event_type="db_engine_dispose_error",
+                engine=name,
+                error=str(e)
+            )
+
+# Session of the current request, so outbound-call helpers can release its connection
+_current_session: ContextVar[Optional[AsyncSession]] = ContextVar("current_db_session", default=None)
+
+# Authenticated user of the current request (set by get_current_user)
+_request_user_id: ContextVar[Optional[int]] = ContextVar("request_user_id", default=None)
+
+# Traffic class of the current request or job; selects the pool used by get_db
+_traffic_class: ContextVar[TrafficClass] = ContextVar("traffic_class", default=TrafficClass.INTERACTIVE)
+
+# Set in Session.info once the current transaction has written anything
+_WRITES_KEY = "has_writes"
+# Users whose rows the current transaction wrote; marked in recent_writes on commit
+_WRITTEN_USERS_KEY = "written_user_ids"
+
+
+def _written_user_id(instance) -> Optional[int]:
+    if getattr(instance, "__tablename__", None) == "users":
+        return getattr(instance, "id", None)
+    return getattr(instance, "user_id", None)
+
+
+@event.listens_for(Session, "after_flush")
+def _mark_flushed_writes(session, flush_context):
+    session.info[_WRITES_KEY] = True
+    written = session.info.setdefault(_WRITTEN_USERS_KEY, set())
+    for instance in (*session.new, *session.dirty, *session.deleted):
+        user_id = _written_user_id(instance)
+        if user_id is not None:
+            written.add(user_id)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _mark_statement_writes(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info[_WRITES_KEY] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _mark_recent_writes(session):
+    # Keep these users' reads on the primary until replicas have caught up
+    if not session.info.get(_WRITES_KEY):
+        return
+    for user_id in session.info.get(_WRITTEN_USERS_KEY, ()):
+        recent_writes.mark(user_id)
+    recent_writes.mark(_request_user_id.get())
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _clear_writes(session, transaction):
+    if transaction.parent is None:
+        session.info.pop(_WRITES_KEY, None)
+        session.info.pop(_WRITTEN_USERS_KEY, None)
+
+
+def set_request_user(user_id: Optional[int]) -> None:
+    """Record the authenticated user, for read-your-writes routing."""
+    _request_user_id.set(user_id)
+
+
+def traffic_class(declared: TrafficClass) -> Callable:
+    """
+    Build a dependency that declares the traffic class of a route or router.
+
+    Use it in ``dependencies=[...]`` on the route or router: those run before
+    the endpoint's own parameters, so ``get_db`` then opens its session on the
+    class's pool. Undeclared routes are ``INTERACTIVE``.
+
+    Args:
+        declared: Traffic class of the route's requests
+
+    Returns:
+        Callable: FastAPI dependency
+    """
+    async def declare_traffic_class() -> None:
+        _traffic_class.set(declared)
+
+    return declare_traffic_class
+
+
+@contextmanager
+def use_traffic_class(declared: TrafficClass) -> Iterator[None]:
+    """Run a background job or script under ``declared``, so its sessions use that pool."""
+    token = _traffic_class.set(declared)
+    try:
+        yield
+    finally:
+        _traffic_class.reset(token)
+
+
+def current_traffic_class() -> TrafficClass:
+    """Return the traffic class of the current request or job."""
+    return _traffic_class.get()
+
+
+def get_current_session() -> Optional[AsyncSession]:
+    """Return the session yielded by ``get_db`` for the current request, if any."""
+    return _current_session.get()
+
+
+def has_pending_writes(session: AsyncSession) -> bool:
+    """Whether the session's open transaction has written, or is about to write, anything."""
+    return bool(session.new or session.dirty or session.deleted or session.info.get(_WRITES_KEY))
+
+
+async def release_connection(session: Optional[AsyncSession] = None, commit_writes: bool = False) -> bool:
+    """
+    End the session's transaction so its pooled connection goes back to the pool.
+
+    Sessions check a connection out lazily on their first statement and keep
+    it until the transaction ends. Call this before slow outbound I/O (Stripe,
+    email) so the request does not hold a connection while it waits; the
+    session stays usable and checks out a new connection on its next
+    statement. Loaded objects stay populated (``expire_on_commit=False``).
+
+    Transactions that have written are left open unless ``commit_writes`` is
+    set, so a half-done unit of work is never committed implicitly. Nothing
+    is released when ``DB_RELEASE_BEFORE_OUTBOUND`` is off. Savepoints
+    (``begin_nested``) are owned by the caller and are never ended here.
+
+    Args:
+        session: The session to release (defaults to the current request's session)
+        commit_writes: Commit the transaction even if it contains writes
+
+    Returns:
+        bool: True if a connection was released
+    """
+    if not settings.DB_RELEASE_BEFORE_OUTBOUND:
+        return False
+    session = session if session is not None else _current_session.get()
+    if session is None or not session.in_transaction() or session.in_nested_transaction():
+        return False
+
+    if has_pending_writes(session) and not commit_writes:
         logger.warning(
-            "Entering database degraded mode after multiple connection failures",
-            event_type="db_degraded_mode_enter",
-            error_count=_connection_error_count
+            "Transaction with writes held open across an outbound call",
+            event_type="db_transaction_held_open"
         )
-    
-    # Classify the exception and get error details
+        return False
+
+    # Read-only transactions commit as cheaply as they roll back, and a commit
+    # keeps loaded objects intact where a rollback would expire them
+    await session.commit()
+    logger.debug("Database connection released", event_type="db_connection_released")
+    return True
+
+
+def _log_db_error(e: Exception, operation: str) -> None:
+    """Log a database error with its classification."""
     exception_class, error_details = classify_exception(e)
-    
-    logger.error(f"Database operation failed after {attempts} attempts: get_db",
+    logger.error(f"Database operation failed: {operation}",
         event_type="db_session_error",
-        operation="get_db",
-        attempts=attempts,
-        in_degraded_mode=_in_degraded_mode,
-        error_count=_connection_error_count,
+        operation=operation,
+        circuit_state=db_circuit_breaker.state,
         **error_details
     )
 
 
+async def _probe_connection(session: AsyncSession) -> None:
+    """Check a connection out eagerly so the half-open probe reports an outcome."""
+    try:
+        await session.connection()
+    except Exception as e:
+        _log_db_error(e, "circuit_breaker_probe")
+        raise DatabaseUnavailableError(
+            retry_after=db_circuit_breaker.retry_after(),
+            error_details={"circuit_breaker": db_circuit_breaker.name, "state": db_circuit_breaker.state}
+        ) from e
+    finally:
+        # No-op once the checkout has reported success or failure
+        db_circuit_breaker.end_probe()
+
+
 async def get_db() -> AsyncGenerator:
-    """Dependency to obtain a new database session for each request."""
-    global _last_connection_error, _connection_error_count, _in_degraded_mode    
-    # Retry parameters
-    max_retries = 3
-    initial_delay = 0.5
-    max_delay = 5.0
-    backoff_factor = 2.0
-    jitter = True
-    
-    last_exception = None
-    delay = initial_delay
-    
-    for attempt in range(max_retries + 1):
+    """
+    Dependency to obtain a new database session for each request.
+
+    The session checks a connection out lazily, on its first statement, from
+    the pool of the request's traffic class (see ``traffic_class``).
+    While the database circuit breaker is open, this fails fast with a 503
+    (``DatabaseUnavailableError``) instead of waiting on the database.
+    """
+    probe = db_circuit_breaker.allow()
+    async with session_factory(_traffic_class.get())() as session:
+        if probe:
+            await _probe_connection(session)
+        logger.debug(
+            "Database session created",
+            event_type="db_session_created"
+        )
+        token = _current_session.set(session)
         try:
-            async with AsyncSessionLocal() as session:
-                # Session created successfully, reset error counters
-                if _last_connection_error is not None:
-                    # Check if we should reset error count based on time
-                    current_time = time.time()
-                    if current_time - _last_connection_error > ERROR_RESET_PERIOD:
-                        _connection_error_count = 0
-                        _last_connection_error = None
-                        if _in_degraded_mode:
-                            _in_degraded_mode = False
-                            logger.info(
-                                "Exiting database degraded mode after successful connection",
-                                event_type="db_degraded_mode_exit"
-                            )
-                
-                logger.debug(
-                    "Database session created",
-                    event_type="db_session_created"
-                )
-                yield session
-                logger.debug("Database session closed", event_type="db_session_closed")
-                return  # Important: exit the generator after yield
-                
-        except SQLAlchemyError as e:
-            # Store last exception for potential re-raise
-            last_exception = e
-            
-            # Track connection errors for service degradation
-            current_time = time.time()
-            _last_connection_error = current_time
-            _connection_error_count += 1
-            
-            # Classify the exception and get error details
-            exception_class, error_details = classify_exception(e)
-            
-            # Check if we should retry this exception
-            should_retry = False
-            for retry_exc in retry_exceptions:
-                if isinstance(e, retry_exc) or exception_class == retry_exc:
-                    should_retry = True
-                    break
-                    
-            # Check if this is the last attempt or we shouldn't retry
-            if not should_retry or attempt >= max_retries:
-                # We've exhausted retries or this isn't a retriable error
-                _handle_db_error(e, attempt + 1)
-                # We must raise here to signal database unavailability
-                raise
-                
-            # Calculate next delay with exponential backoff
-            jitter_value = random.uniform(0.8, 1.2) if jitter else 1.0
-            next_delay = min(delay * backoff_factor * jitter_value, max_delay)
-            
-            logger.warning(
-                f"Database session attempt {attempt + 1}/{max_retries} failed, retrying in {next_delay:.2f}s",
-                event_type="db_operation_retry",
-                operation="get_db",
-                attempt=attempt + 1,
-                max_retries=max_retries,
-                delay=next_delay,
-                error_type=type(e).__name__,
-                error_details=error_details
-            )
-            
-            await asyncio.sleep(next_delay)
-            delay = next_delay
-    
-    # This should never happen, but added as a fallback
-    if last_exception:
-        _handle_db_error(last_exception, max_retries)
-        raise last_exception
+            yield session
+        finally:
+            try:
+                _current_session.reset(token)
+            except ValueError:
+                # Dependency teardown ran in a different context
+                _current_session.set(None)
+        logger.debug("Database session closed", event_type="db_session_closed")
+
+
+def _request_subjects(request: Request) -> Set[int]:
+    """User ids a request is about (``user_id`` path or query parameter)."""
+    subjects = set()
+    for params in (request.path_params, request.query_params):
+        value = params.get("user_id")
+        if value is not None and str(value).isdigit():
+            subjects.add(int(value))
+    return subjects
+
+
+async def get_read_db(request: Request, primary: AsyncSession = Depends(get_db)) -> AsyncGenerator:
+    """
+    Dependency for read-only endpoints: a session whose SELECTs may go to a replica.
+
+    Without replicas configured this is the request's primary session. The
+    primary session also backs the dependency graph (authentication), and
+    costs nothing until used since connections are checked out lazily.
+
+    Args:
+        request: Incoming request (its ``user_id`` parameter is a read-your-writes subject)
+        primary: The request's primary session
+    """
+    if not replica_set:
+        yield primary
+        return
+
+    # Statements that stay on the primary use the request's bulkhead
+    async with AsyncReadSessionLocal(bind=engine_for(_traffic_class.get())) as session:
+        session.info[_READ_INTENT_KEY] = True
+        session.info[_READ_SUBJECTS_KEY] = _request_subjects(request)
+        token = _current_session.set(session)
+        try:
+            yield session
+        finally:
+            try:
+                _current_session.reset(token)
+            except ValueError:
+                _current_session.set(None)
 
 
 async def check_db_health() -> Dict[str, Any]:
-    """Check database health and return status information."""
+    """
+    Check database health and return status information.
+
+    Goes through the circuit breaker like request sessions do: while it is
+    open the database is not contacted, and once it is half-open this check
+    can be the probe that closes it again.
+    """
+    try:
+        probe = db_circuit_breaker.allow()
+    except DatabaseUnavailableError:
+        return {
+            "status": "unhealthy",
+            "error": "Database circuit breaker is open",
+            "error_type": DatabaseUnavailableError.__name__,
+            "circuit_breaker": db_circuit_breaker.snapshot()
+        }
+
     try:
-        async with AsyncSessionLocal() as session:
-            return await healthcheck_database(session)
+        async with session_factory(TrafficClass.HEALTH)() as session:
+            result = await healthcheck_database(session)
+        result["circuit_breaker"] = db_circuit_breaker.snapshot()
+        return result
     except Exception as e:
         exception_class, error_details = classify_exception(e)
         return {
             "status": "unhealthy",
             "error": str(e),
             "error_type": exception_class.__name__,
-            "in_degraded_mode": _in_degraded_mode,
-            "error_count": _connection_error_count,
+            "circuit_breaker": db_circuit_breaker.snapshot(),
             "error_details": error_details
         }
+    finally:
+        if probe:
+            db_circuit_breaker.end_probe()
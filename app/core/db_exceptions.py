@@ -32,6 +32,9 @@ class DatabaseErrorCode(Enum):
     
     # System Errors
     SYSTEM_ERROR = auto()        # Server system error
+
+    # Availability
+    CIRCUIT_OPEN = auto()        # Rejected by the circuit breaker without trying the database
     
     # Unknown/Other
     UNKNOWN_ERROR = auto()       # Unclassified database error
@@ -125,6 +128,24 @@ class ConnectionTimeoutError(DatabaseException):
         )
 
 
+class DatabaseUnavailableError(DatabaseException):
+    """Raised without contacting the database while its circuit breaker is open."""
+    
+    def __init__(
+        self,
+        detail: str = "Database temporarily unavailable",
+        retry_after: Optional[int] = 10,
+        error_details: Optional[Dict[str, Any]] = None
+    ):
+        super().__init__(
+            detail=detail,
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            error_code=DatabaseErrorCode.CIRCUIT_OPEN,
+            retry_after=retry_after,
+            error_details=error_details
+        )
+
+
 class DatabaseAuthError(DatabaseException):
     """Raised when database authentication fails."""
     
@@ -1,10 +1,13 @@
 """Email service using SendGrid via Azure."""
 
 import json
+import time
 import httpx
 import asyncio
 from typing import List, Dict, Any, Optional
 from app.core.config import settings
+from app.core.metrics import record_outbound_call
+from app.core.tracing import SpanKind, StatusCode, tracer
 from app.log.logging import logger
 
 
@@ -96,7 +99,16 @@ async def send_email(subject: str, recipients: List[str], body: str):
         )
         
         async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.post(url, json=payload, headers=headers)
+            start = time.perf_counter()
+            try:
+                with tracer.span("sendgrid mail.send", kind=SpanKind.CLIENT) as span:
+                    response = await client.post(url, json=payload, headers=headers)
+                    span.set_attribute("http.response.status_code", response.status_code)
+                    if response.status_code >= 400:
+                        span.status_code = StatusCode.ERROR
+            except httpx.RequestError as e:
+                record_outbound_call("sendgrid", "mail.send", time.perf_counter() - start, error_type=type(e).__name__)
+                raise
             
             # Log the raw response for debugging
             logger.debug(
@@ -111,6 +123,10 @@ async def send_email(subject: str, recipients: List[str], body: str):
             
             if response.status_code >= 400:
                 error_message = f"Failed to send email: {response.status_code} - {response.text}"
+                record_outbound_call(
+                    "sendgrid", "mail.send", time.perf_counter() - start,
+                    error_type=f"HTTP{response.status_code}"
+                )
                 logger.error(
                     error_message,
                     event_type="email_send_error",
@@ -119,6 +135,7 @@ async def send_email(subject: str, recipients: List[str], body: str):
                 )
                 raise RuntimeError(error_message)
             
+            record_outbound_call("sendgrid", "mail.send", time.perf_counter() - start)
             logger.info(
                 "Email sent successfully",
                 event_type="email_sent",
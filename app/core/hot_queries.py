@@ -0,0 +1,223 @@
+"""Prebuilt Core statements for the most frequent read-only lookups.
+
+Each statement is built once at import time with bound parameters, so the
+per-call work is binding values and a lookup in the engine's compiled-
+statement cache (``DB_QUERY_CACHE_SIZE``); on asyncpg the SQL text is also
+identical every time, so it stays in the connection's prepared-statement
+cache (``DB_PREPARED_STATEMENT_CACHE_SIZE``).
+
+The statements select table columns rather than ORM entities. Results come
+back as plain named tuples: nothing is added to the session's identity map,
+no attribute instrumentation runs, and nothing is expired on commit. Use
+these helpers only where the caller reads the values; code that modifies
+the row needs the ORM entity.
+"""
+
+from datetime import datetime
+from decimal import Decimal
+from typing import NamedTuple, Optional
+
+from sqlalchemy import bindparam, case, desc, exists, func, select, true
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.credit import UserCredit, UserCreditShard
+from app.models.plan import Subscription
+from app.models.processed_event import ProcessedStripeEvent
+from app.models.user import User
+
+_users = User.__table__
+_credits = UserCredit.__table__
+_shards = UserCreditShard.__table__
+_subscriptions = Subscription.__table__
+_processed_events = ProcessedStripeEvent.__table__
+
+
+class UserRow(NamedTuple):
+    """Read-only view of a ``users`` row (no credentials)."""
+
+    id: int
+    email: str
+    is_verified: bool
+    is_admin: bool
+    account_status: str
+    auth_type: str
+    stripe_customer_id: Optional[str]
+
+
+class CreditBalanceRow(NamedTuple):
+    """A user's balance, held amount and ledger size from ``user_credits``.
+
+    ``balance``, ``updated_at`` and ``transaction_count`` include the user's
+    balance shards, if any.
+    """
+
+    user_id: int
+    balance: Decimal
+    updated_at: datetime
+    transaction_count: int
+    reserved_balance: Decimal
+    shard_count: int
+
+
+class SubscriptionRow(NamedTuple):
+    """Read-only view of a ``subscriptions`` row."""
+
+    id: int
+    user_id: int
+    plan_id: int
+    status: str
+    renewal_date: datetime
+    stripe_subscription_id: Optional[str]
+    cancel_at_period_end: bool
+
+
+_USER_COLUMNS = (
+    _users.c.id,
+    _users.c.email,
+    _users.c.is_verified,
+    _users.c.is_admin,
+    _users.c.account_status,
+    _users.c.auth_type,
+    _users.c.stripe_customer_id,
+)
+
+USER_BY_EMAIL = select(*_USER_COLUMNS).where(_users.c.email == bindparam("email"))
+USER_BY_ID = select(*_USER_COLUMNS).where(_users.c.id == bindparam("user_id"))
+USER_ID_BY_STRIPE_CUSTOMER = (
+    select(_users.c.id)
+    .where(_users.c.stripe_customer_id == bindparam("stripe_customer_id"))
+    .limit(1)
+)
+_shards_updated_at = func.max(_shards.c.updated_at)
+# Unsharded users have no shard rows; the outer join then adds nothing
+CREDIT_BALANCE = (
+    select(
+        _credits.c.user_id,
+        (_credits.c.balance + func.coalesce(func.sum(_shards.c.balance), 0)).label("balance"),
+        case(
+            (_shards_updated_at > _credits.c.updated_at, _shards_updated_at), else_=_credits.c.updated_at
+        ).label("updated_at"),
+        (_credits.c.transaction_count + func.coalesce(func.sum(_shards.c.transaction_count), 0)).label(
+            "transaction_count"
+        ),
+        _credits.c.reserved_balance,
+        _credits.c.shard_count,
+    )
+    .select_from(_credits.outerjoin(_shards, _shards.c.user_id == _credits.c.user_id))
+    .where(_credits.c.user_id == bindparam("user_id"))
+    .group_by(_credits.c.id)
+)
+# Same filter and ordering as PlanService.get_active_subscription
+ACTIVE_SUBSCRIPTION = (
+    select(
+        _subscriptions.c.id,
+        _subscriptions.c.user_id,
+        _subscriptions.c.plan_id,
+        _subscriptions.c.status,
+        _subscriptions.c.renewal_date,
+        _subscriptions.c.stripe_subscription_id,
+        _subscriptions.c.cancel_at_period_end,
+    )
+    .where(_subscriptions.c.user_id == bindparam("user_id"), _subscriptions.c.is_active == true())
+    .order_by(desc(_subscriptions.c.renewal_date))
+    .limit(1)
+)
+STRIPE_EVENT_PROCESSED = select(
+    exists().where(_processed_events.c.stripe_event_id == bindparam("event_id"))
+)
+
+
+async def _execute(db: AsyncSession, statement, params):
+    # Core statements skip the ORM's autoflush; flush pending changes so reads see them
+    if db.new or db.dirty or db.deleted:
+        await db.flush()
+    return await db.execute(statement, params)
+
+
+async def get_user_row_by_email(db: AsyncSession, email: str) -> Optional[UserRow]:
+    """
+    Look up a user by email without loading an ORM entity.
+
+    Args:
+        db: Database session
+        email: Email to look up
+
+    Returns:
+        Optional[UserRow]: The user if found, None otherwise
+    """
+    row = (await _execute(db, USER_BY_EMAIL, {"email": email})).first()
+    return UserRow(*row) if row is not None else None
+
+
+async def get_user_row_by_id(db: AsyncSession, user_id: int) -> Optional[UserRow]:
+    """
+    Look up a user by ID without loading an ORM entity.
+
+    Args:
+        db: Database session
+        user_id: The ID of the user
+
+    Returns:
+        Optional[UserRow]: The user if found, None otherwise
+    """
+    row = (await _execute(db, USER_BY_ID, {"user_id": user_id})).first()
+    return UserRow(*row) if row is not None else None
+
+
+async def get_user_id_by_stripe_customer_id(db: AsyncSession, stripe_customer_id: str) -> Optional[int]:
+    """
+    Map a Stripe customer ID to the local user ID.
+
+    Args:
+        db: Database session
+        stripe_customer_id: Stripe customer ID
+
+    Returns:
+        Optional[int]: The user ID if a user has that customer ID, None otherwise
+    """
+    result = await _execute(db, USER_ID_BY_STRIPE_CUSTOMER, {"stripe_customer_id": stripe_customer_id})
+    return result.scalar()
+
+
+async def get_credit_balance_row(db: AsyncSession, user_id: int) -> Optional[CreditBalanceRow]:
+    """
+    Read a user's credit balance.
+
+    Args:
+        db: Database session
+        user_id: The ID of the user
+
+    Returns:
+        Optional[CreditBalanceRow]: The balance, or None if the user has no credit record yet
+    """
+    row = (await _execute(db, CREDIT_BALANCE, {"user_id": user_id})).first()
+    return CreditBalanceRow(*row) if row is not None else None
+
+
+async def get_active_subscription_row(db: AsyncSession, user_id: int) -> Optional[SubscriptionRow]:
+    """
+    Read a user's active subscription (the one renewing last).
+
+    Args:
+        db: Database session
+        user_id: The ID of the user
+
+    Returns:
+        Optional[SubscriptionRow]: The active subscription if found, None otherwise
+    """
+    row = (await _execute(db, ACTIVE_SUBSCRIPTION, {"user_id": user_id})).first()
+    return SubscriptionRow(*row) if row is not None else None
+
+
+async def is_stripe_event_processed(db: AsyncSession, event_id: str) -> bool:
+    """
+    Check whether a Stripe event has already been recorded as processed.
+
+    Args:
+        db: Database session
+        event_id: Stripe event ID
+
+    Returns:
+        bool: True if the event was processed
+    """
+    return bool((await _execute(db, STRIPE_EVENT_PROCESSED, {"event_id": event_id})).scalar())
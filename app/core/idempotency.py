@@ -0,0 +1,262 @@
+"""Storage for ``Idempotency-Key`` requests.
+
+Keys are scoped to the endpoint and the caller, so two callers that pick the
+same key never see each other's responses. The first request with a key
+claims it by inserting an ``idempotency_keys`` row with no status. When it
+finishes, its response (status, content type and body) is written to that
+row and kept for ``IDEMPOTENCY_KEY_TTL_SECONDS``, so a retry is answered
+with one primary-key lookup. A claim whose request fails (5xx, an auth or
+validation rejection, or an exception) is deleted, so the retry runs again.
+
+A claim expires after ``IDEMPOTENCY_IN_FLIGHT_TIMEOUT_SECONDS``. That way a
+key whose worker died mid-request does not block retries for the whole TTL.
+Each claim carries its own token, and only that token can complete or
+release it. A request that outlives its claim therefore cannot overwrite
+the response of the retry that took the key over.
+Concurrent duplicates wait for the claim to settle, woken by an in-process
+event when the first request runs in the same worker and polling otherwise.
+``purge_expired_idempotency_keys`` deletes expired rows in batches every
+``IDEMPOTENCY_PURGE_INTERVAL_SECONDS``.
+"""
+
+import asyncio
+from datetime import datetime, timedelta, UTC
+from typing import Dict, NamedTuple, Optional, Tuple
+
+from sqlalchemy import bindparam, delete, insert, select, tuple_, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.core.config import settings
+from app.log.logging import logger
+from app.models.idempotency import IdempotencyKey
+
+_keys = IdempotencyKey.__table__
+# Parameter names differ from the column names, which insert()/update() reserve for themselves
+_this_key = (
+    (_keys.c.key == bindparam("idem_key"))
+    & (_keys.c.endpoint == bindparam("idem_endpoint"))
+    & (_keys.c.caller == bindparam("idem_caller"))
+)
+
+CLAIM_KEY = insert(_keys).values(
+    key=bindparam("idem_key"),
+    endpoint=bindparam("idem_endpoint"),
+    caller=bindparam("idem_caller"),
+    request_hash=bindparam("fingerprint"),
+    claim_token=bindparam("idem_token"),
+    created_at=bindparam("now"),
+    expires_at=bindparam("claim_expires_at"),
+)
+# Only the claim's own request may settle it, never one whose claim expired and was taken over
+_this_claim = _this_key & _keys.c.status_code.is_(None) & (_keys.c.claim_token == bindparam("idem_token"))
+KEY_BY_ID = select(
+    _keys.c.request_hash, _keys.c.status_code, _keys.c.content_type, _keys.c.response_body
+).where(_this_key)
+DELETE_EXPIRED_KEY = delete(_keys).where(_this_key, _keys.c.expires_at <= bindparam("now"))
+COMPLETE_KEY = update(_keys).where(_this_claim).values(
+    status_code=bindparam("response_status"),
+    content_type=bindparam("response_type"),
+    response_body=bindparam("response_content"),
+    expires_at=bindparam("keep_until"),
+)
+RELEASE_KEY = delete(_keys).where(_this_claim)
+
+
+class StoredResponse(NamedTuple):
+    """An ``idempotency_keys`` row; ``status_code`` is None while the first request runs."""
+
+    request_hash: str
+    status_code: Optional[int]
+    content_type: Optional[str]
+    response_body: Optional[bytes]
+
+
+class IdempotencyStore:
+    """Claims, completes and looks up idempotency keys."""
+
+    def __init__(self, engine: Optional[AsyncEngine] = None):
+        self._engine = engine
+        # Claims held by this worker, with their token: set when they complete or are released
+        self._in_flight: Dict[Tuple[str, str, str], Tuple[str, asyncio.Event]] = {}
+
+    @property
+    def engine(self) -> AsyncEngine:
+        if self._engine is None:
+            from app.core.database import TrafficClass, engine_for
+            self._engine = engine_for(TrafficClass.INTERNAL)
+        return self._engine
+
+    async def claim(
+        self, endpoint: str, caller: str, key: str, request_hash: str, token: str
+    ) -> Optional[StoredResponse]:
+        """
+        Claim ``key`` for a new request to ``endpoint``.
+
+        Args:
+            endpoint: Endpoint the key is scoped to
+            caller: Digest of the caller's identity the key is scoped to
+            key: The client's Idempotency-Key
+            request_hash: Fingerprint of the request (query and body)
+            token: Unique id of this request's claim, needed to complete or release it
+
+        Returns:
+            Optional[StoredResponse]: None if the key is now claimed by the
+            caller, otherwise the live row that holds it
+        """
+        now = datetime.now(UTC)
+        params = {
+            "idem_key": key,
+            "idem_endpoint": endpoint,
+            "idem_caller": caller,
+            "fingerprint": request_hash,
+            "idem_token": token,
+            "now": now,
+            "claim_expires_at": now + timedelta(seconds=settings.IDEMPOTENCY_IN_FLIGHT_TIMEOUT_SECONDS),
+        }
+        for _ in range(2):
+            try:
+                async with self.engine.begin() as conn:
+                    await conn.execute(CLAIM_KEY, params)
+            except IntegrityError:
+                async with self.engine.begin() as conn:
+                    # An expired row (a finished TTL or an abandoned claim) no longer holds the key
+                    if (await conn.execute(DELETE_EXPIRED_KEY, params)).rowcount:
+                        continue
+                    row = (await conn.execute(KEY_BY_ID, params)).first()
+                if row is not None:
+                    return StoredResponse(*row)
+                continue
+            self._in_flight[(endpoint, caller, key)] = (token, asyncio.Event())
+            return None
+        # Lost every race for the key; report it as still in flight
+        return StoredResponse(request_hash, None, None, None)
+
+    async def complete(
+        self,
+        endpoint: str,
+        caller: str,
+        key: str,
+        token: str,
+        status_code: int,
+        content_type: Optional[str],
+        body: bytes,
+    ) -> None:
+        """Store the response to a claimed key and keep it for ``IDEMPOTENCY_KEY_TTL_SECONDS``."""
+        try:
+            async with self.engine.begin() as conn:
+                stored = (await conn.execute(COMPLETE_KEY, {
+                    "idem_key": key,
+                    "idem_endpoint": endpoint,
+                    "idem_caller": caller,
+                    "idem_token": token,
+                    "response_status": status_code,
+                    "response_type": content_type,
+                    "response_content": body,
+                    "keep_until": datetime.now(UTC) + timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL_SECONDS),
+                })).rowcount
+            if not stored:
+                logger.warning("Idempotency claim expired before its request finished; response not stored",
+                             event_type="idempotency_claim_lost",
+                             endpoint=endpoint)
+        finally:
+            self._settle(endpoint, caller, key, token)
+
+    async def release(self, endpoint: str, caller: str, key: str, token: str) -> None:
+        """Drop a claim whose request failed, so that a retry runs again."""
+        try:
+            async with self.engine.begin() as conn:
+                await conn.execute(RELEASE_KEY, {
+                    "idem_key": key, "idem_endpoint": endpoint, "idem_caller": caller, "idem_token": token
+                })
+        finally:
+            self._settle(endpoint, caller, key, token)
+
+    async def wait(self, endpoint: str, caller: str, key: str, timeout: float) -> Optional[StoredResponse]:
+        """
+        Wait up to ``timeout`` seconds for a claimed key to settle.
+
+        Returns:
+            Optional[StoredResponse]: The row (with a status unless the
+            timeout passed first), or None if the claim was released
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        delay = 0.05
+        while True:
+            remaining = deadline - loop.time()
+            held = self._in_flight.get((endpoint, caller, key))
+            if held is not None:
+                try:
+                    await asyncio.wait_for(held[1].wait(), max(remaining, 0))
+                except asyncio.TimeoutError:
+                    pass
+            else:
+                await asyncio.sleep(max(min(delay, remaining), 0))
+                delay = min(delay * 2, 0.5)
+            async with self.engine.connect() as conn:
+                row = (await conn.execute(
+                    KEY_BY_ID, {"idem_key": key, "idem_endpoint": endpoint, "idem_caller": caller}
+                )).first()
+            if row is None or row.status_code is not None or loop.time() >= deadline:
+                return StoredResponse(*row) if row is not None else None
+
+    def _settle(self, endpoint: str, caller: str, key: str, token: str) -> None:
+        held = self._in_flight.get((endpoint, caller, key))
+        if held is not None and held[0] == token:
+            del self._in_flight[(endpoint, caller, key)]
+            held[1].set()
+
+
+idempotency_store = IdempotencyStore()
+
+
+async def purge_expired_idempotency_keys(
+    engine: AsyncEngine, batch_size: int = 1000, now: Optional[datetime] = None
+) -> int:
+    """
+    Delete expired idempotency keys, ``batch_size`` per transaction.
+
+    Args:
+        engine: Engine to run the purge on
+        batch_size: Keys deleted per transaction
+        now: Expiry cut-off (default: the current time)
+
+    Returns:
+        int: Number of keys deleted
+    """
+    now = now or datetime.now(UTC)
+    expired = (
+        select(_keys.c.key, _keys.c.endpoint, _keys.c.caller)
+        .where(_keys.c.expires_at <= now)
+        .order_by(_keys.c.expires_at)
+        .limit(batch_size)
+    )
+    statement = delete(_keys).where(tuple_(_keys.c.key, _keys.c.endpoint, _keys.c.caller).in_(expired))
+    total = 0
+    while True:
+        async with engine.begin() as conn:
+            deleted = (await conn.execute(statement)).rowcount
+        total += deleted
+        if deleted < batch_size:
+            break
+
+    if total:
+        logger.info(f"Purged {total} expired idempotency keys",
+                  event_type="idempotency_keys_purged",
+                  count=total)
+    return total
+
+
+async def purge_idempotency_keys_periodically(engine: AsyncEngine, interval_seconds: float, batch_size: int) -> None:
+    """Purge expired idempotency keys every ``interval_seconds`` until cancelled."""
+    while True:
+        try:
+            await purge_expired_idempotency_keys(engine, batch_size)
+        except Exception as e:
+            logger.warning(
+                f"Idempotency key purge failed: {str(e)}",
+                event_type="idempotency_purge_error",
+                error=str(e)
+            )
+        await asyncio.sleep(interval_seconds)
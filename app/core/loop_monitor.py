@@ -0,0 +1,139 @@
+"""Event-loop lag monitor and blocking-call detector.
+
+Two cooperating pieces:
+
+* A lag probe task on the event loop sleeps for a fixed interval and measures
+  how late it wakes up. The overshoot is the loop lag, exported as a gauge and
+  a histogram. Every wake-up also refreshes a heartbeat timestamp.
+* A watchdog thread checks the heartbeat. If the loop has not ticked for
+  longer than the block threshold, some callback is hogging the loop. The
+  watchdog then captures the loop thread's current stack, which points at
+  the blocking call, and logs it.
+
+The watchdog reports each stall once, and the probe's lag sample records
+its total duration when the loop recovers.
+"""
+
+import asyncio
+import sys
+import threading
+import time
+import traceback
+from typing import Optional
+
+from app.core.metrics import registry
+from app.log.logging import logger
+
+EVENT_LOOP_LAG = registry.gauge(
+    "event_loop_lag_seconds",
+    "Most recent event-loop lag measured by the lag probe.",
+)
+EVENT_LOOP_LAG_HISTOGRAM = registry.histogram(
+    "event_loop_lag_distribution_seconds",
+    "Distribution of event-loop lag measured by the lag probe.",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+EVENT_LOOP_BLOCKED = registry.counter(
+    "event_loop_blocked_total",
+    "Times the event loop was blocked for longer than the block threshold.",
+)
+
+_MAX_STACK_FRAMES = 30
+
+
+class LoopMonitor:
+    """
+    Measures event-loop lag and reports callbacks that block the loop.
+
+    Args:
+        interval: Seconds between lag probes.
+        block_threshold: Seconds without a loop tick after which the loop is
+            considered blocked and the loop thread's stack is captured.
+    """
+
+    def __init__(self, interval: float = 0.25, block_threshold: float = 0.5) -> None:
+        self.interval = interval
+        self.block_threshold = block_threshold
+        self._heartbeat = time.monotonic()
+        self._loop_thread_id: Optional[int] = None
+        self._probe_task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    @property
+    def running(self) -> bool:
+        """Whether the monitor has been started and not stopped."""
+        return self._probe_task is not None and not self._stopped.is_set()
+
+    def start(self) -> None:
+        """Start the lag probe on the running loop and the watchdog thread."""
+        if self.running:
+            return
+        self._stopped.clear()
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._probe_task = asyncio.get_running_loop().create_task(self._probe())
+        self._watchdog = threading.Thread(target=self._watch, name="event-loop-watchdog", daemon=True)
+        self._watchdog.start()
+
+    async def stop(self) -> None:
+        """Stop the probe task and the watchdog thread."""
+        self._stopped.set()
+        if self._probe_task is not None:
+            self._probe_task.cancel()
+            try:
+                await self._probe_task
+            except asyncio.CancelledError:
+                pass
+            self._probe_task = None
+        if self._watchdog is not None:
+            self._watchdog.join(timeout=self.block_threshold)
+            self._watchdog = None
+
+    async def _probe(self) -> None:
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            lag = max(0.0, now - expected)
+            self._heartbeat = now
+            EVENT_LOOP_LAG.set(lag)
+            EVENT_LOOP_LAG_HISTOGRAM.observe(lag)
+
+    def _watch(self) -> None:
+        # Wake up often enough to catch a stall shortly after it crosses the threshold
+        check_every = max(self.block_threshold / 4, 0.01)
+        reported_heartbeat = None
+        while not self._stopped.wait(check_every):
+            heartbeat = self._heartbeat
+            # The probe sleeps for `interval` between ticks, so only time beyond that is lag
+            blocked_for = time.monotonic() - heartbeat - self.interval
+            if blocked_for < self.block_threshold or heartbeat == reported_heartbeat:
+                continue
+            reported_heartbeat = heartbeat
+            self._report_block(blocked_for)
+
+    def _report_block(self, blocked_for: float) -> None:
+        EVENT_LOOP_BLOCKED.inc()
+        frame = sys._current_frames().get(self._loop_thread_id)
+        stack = traceback.format_stack(frame, limit=_MAX_STACK_FRAMES) if frame is not None else []
+        logger.warning(
+            "Event loop blocked",
+            event_type="event_loop_blocked",
+            blocked_for_seconds=round(blocked_for, 3),
+            threshold_seconds=self.block_threshold,
+            stack="".join(stack)
+        )
+
+
+def configure_slow_callback_logging(threshold: float) -> None:
+    """
+    Enable asyncio debug mode on the running loop.
+
+    asyncio then logs every callback or task step that runs longer than
+    ``threshold`` seconds, naming the offending handle. Debug mode adds
+    overhead to every callback, so this is meant for staging only.
+    """
+    loop = asyncio.get_running_loop()
+    loop.set_debug(True)
+    loop.slow_callback_duration = threshold
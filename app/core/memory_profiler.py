@@ -0,0 +1,233 @@
+"""Memory-growth diagnostics: process gauges and tracemalloc snapshots.
+
+* ``sample_memory`` reads the worker's RSS and the number of objects tracked
+  by the garbage collector into gauges. ``sample_memory_periodically`` runs it
+  on an interval from the application lifespan, so memory creep shows up in
+  the metrics surface next to traffic.
+* ``MemoryTracker`` wraps ``tracemalloc``. It takes a baseline snapshot when
+  tracing starts and later diffs the current heap against it. Allocation
+  sites are grouped either by line or by the route whose handler appears in
+  the allocation's traceback, so growth can be traced to a route and a line.
+
+tracemalloc slows allocation-heavy code down noticeably, so it only runs
+between an explicit start and stop.
+"""
+
+import asyncio
+import gc
+import os
+import resource
+import sys
+import time
+import tracemalloc
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.metrics import registry
+from app.log.logging import logger
+
+PROCESS_RESIDENT_MEMORY = registry.gauge(
+    "process_resident_memory_bytes",
+    "Resident set size of the worker process.",
+    multiprocess_mode="all",
+)
+PYTHON_GC_OBJECTS = registry.gauge(
+    "python_gc_objects_tracked",
+    "Number of objects tracked by the garbage collector.",
+    multiprocess_mode="all",
+)
+TRACEMALLOC_TRACED_BYTES = registry.gauge(
+    "tracemalloc_traced_bytes",
+    "Memory currently traced by tracemalloc (0 when tracing is off).",
+    multiprocess_mode="all",
+)
+TRACEMALLOC_TRACED_BYTES.set_callback(
+    lambda: [((), tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else 0)]
+)
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+# Allocations made by the profiler itself or by the import system are noise
+_SNAPSHOT_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+UNATTRIBUTED_ROUTE = "unattributed"
+
+
+def get_rss_bytes() -> int:
+    """
+    Return the current resident set size of this process.
+
+    Reads ``/proc/self/statm`` on Linux. Elsewhere it falls back to the peak
+    RSS reported by ``getrusage``, which only ever grows.
+    """
+    try:
+        with open("/proc/self/statm", "rb") as fh:
+            return int(fh.read().split()[1]) * _PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Reported in bytes on macOS, kilobytes elsewhere
+        return max_rss if sys.platform == "darwin" else max_rss * 1024
+
+
+def sample_memory() -> Dict[str, int]:
+    """Update the memory gauges and return the sampled values."""
+    rss = get_rss_bytes()
+    objects = len(gc.get_objects())
+    PROCESS_RESIDENT_MEMORY.set(rss)
+    PYTHON_GC_OBJECTS.set(objects)
+    return {"rss_bytes": rss, "gc_objects": objects}
+
+
+async def sample_memory_periodically(interval_seconds: float) -> None:
+    """Sample memory gauges every ``interval_seconds`` until cancelled."""
+    while True:
+        try:
+            sample_memory()
+        except Exception as e:
+            logger.warning(
+                f"Memory sampling failed: {str(e)}",
+                event_type="memory_sample_error",
+                error=str(e)
+            )
+        await asyncio.sleep(interval_seconds)
+
+
+class _RouteResolver:
+    """Map a traceback frame to the route whose handler contains it."""
+
+    def __init__(self, routes) -> None:
+        # filename -> [(first_line, last_line, route label)]
+        self._ranges: Dict[str, List[Tuple[int, int, str]]] = {}
+        for route in routes:
+            endpoint = getattr(route, "endpoint", None)
+            code = getattr(endpoint, "__code__", None)
+            if code is None:
+                continue
+            lines = [line for _, _, line in code.co_lines() if line is not None]
+            if not lines:
+                continue
+            methods = ",".join(sorted(getattr(route, "methods", None) or []))
+            label = f"{methods} {route.path}".strip()
+            self._ranges.setdefault(code.co_filename, []).append((min(lines), max(lines), label))
+
+    def resolve(self, traceback: tracemalloc.Traceback) -> str:
+        for frame in traceback:
+            for first, last, label in self._ranges.get(frame.filename, ()):
+                if first <= frame.lineno <= last:
+                    return label
+        return UNATTRIBUTED_ROUTE
+
+
+class MemoryTracker:
+    """Start/stop tracemalloc and diff the heap against a baseline snapshot."""
+
+    def __init__(self) -> None:
+        self._baseline: Optional[tracemalloc.Snapshot] = None
+        self._started_at: Optional[float] = None
+
+    @property
+    def tracing(self) -> bool:
+        """Whether a tracing session started by this tracker is active."""
+        return self._baseline is not None and tracemalloc.is_tracing()
+
+    def status(self) -> Dict[str, Any]:
+        """Return process memory and tracing state."""
+        info: Dict[str, Any] = {"rss_bytes": get_rss_bytes(), "gc_counts": list(gc.get_count())}
+        info["tracing"] = self.tracing
+        if self.tracing:
+            current, peak = tracemalloc.get_traced_memory()
+            info.update({
+                "traced_bytes": current,
+                "traced_peak_bytes": peak,
+                "traceback_frames": tracemalloc.get_traceback_limit(),
+                "tracing_seconds": round(time.monotonic() - self._started_at, 1),
+            })
+        return info
+
+    def start(self, frames: int = 25) -> None:
+        """
+        Start tracing and take the baseline snapshot.
+
+        Args:
+            frames: Frames kept per allocation. Route attribution needs enough
+                frames to reach the route handler from the allocation site.
+        """
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+        self._baseline = self._take_snapshot()
+        self._started_at = time.monotonic()
+
+    def stop(self) -> None:
+        """Stop tracing and drop the baseline."""
+        self._baseline = None
+        self._started_at = None
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    def reset_baseline(self) -> None:
+        """Diff future snapshots against the heap as it is now."""
+        self._baseline = self._take_snapshot()
+
+    def diff(self, limit: int = 20, group_by: str = "lineno", routes=()) -> List[Dict[str, Any]]:
+        """
+        Compare the current heap to the baseline.
+
+        Args:
+            limit: Number of allocation sites (or routes) to return.
+            group_by: ``lineno`` for the top growing lines, or ``route`` for
+                growth grouped by route with each route's top lines.
+            routes: Application routes, required for ``group_by="route"``.
+
+        Returns:
+            List[Dict[str, Any]]: Growth entries, largest first.
+        """
+        if not self.tracing:
+            raise RuntimeError("tracemalloc is not running; start tracing first")
+        current = self._take_snapshot()
+        if group_by == "route":
+            return self._diff_by_route(current, limit, routes)
+
+        stats = current.compare_to(self._baseline, "lineno")
+        return [_format_stat(stat) for stat in stats[:limit]]
+
+    def _diff_by_route(self, current: tracemalloc.Snapshot, limit: int, routes) -> List[Dict[str, Any]]:
+        resolver = _RouteResolver(routes)
+        grouped: Dict[str, Dict[str, Any]] = {}
+        for stat in current.compare_to(self._baseline, "traceback"):
+            if stat.size_diff <= 0:
+                continue
+            route = resolver.resolve(stat.traceback)
+            entry = grouped.setdefault(route, {"route": route, "size_diff": 0, "count_diff": 0, "sites": {}})
+            entry["size_diff"] += stat.size_diff
+            entry["count_diff"] += stat.count_diff
+            # Allocation site = innermost frame
+            site = f"{stat.traceback[-1].filename}:{stat.traceback[-1].lineno}" if len(stat.traceback) else "?"
+            entry["sites"][site] = entry["sites"].get(site, 0) + stat.size_diff
+
+        result = sorted(grouped.values(), key=lambda item: -item["size_diff"])[:limit]
+        for entry in result:
+            top_sites = sorted(entry["sites"].items(), key=lambda item: -item[1])[:10]
+            entry["sites"] = [{"site": site, "size_diff": size} for site, size in top_sites]
+        return result
+
+    @staticmethod
+    def _take_snapshot() -> tracemalloc.Snapshot:
+        return tracemalloc.take_snapshot().filter_traces(_SNAPSHOT_FILTERS)
+
+
+def _format_stat(stat: tracemalloc.StatisticDiff) -> Dict[str, Any]:
+    frame = stat.traceback[0] if len(stat.traceback) else None
+    return {
+        "site": f"{frame.filename}:{frame.lineno}" if frame else "?",
+        "size": stat.size,
+        "size_diff": stat.size_diff,
+        "count": stat.count,
+        "count_diff": stat.count_diff,
+    }
+
+
+memory_tracker = MemoryTracker()
@@ -0,0 +1,586 @@
+"""Prometheus-compatible metrics registry.
+
+This module provides a small, dependency-free metrics registry that renders
+the Prometheus text exposition format. It is designed for the hot path:
+
+- Metric children are cached per label tuple, so recording a sample is a
+  dictionary lookup plus a float addition.
+- Samples are kept per worker process without locks. All instrumentation
+  points record from the event loop thread, where the GIL already makes the
+  individual updates safe.
+- When ``METRICS_MULTIPROCESS_DIR`` is configured, every worker writes its
+  snapshot to that directory and ``/metrics`` returns the aggregate of all
+  workers instead of the answering worker only.
+"""
+
+import asyncio
+import glob
+import json
+import math
+import os
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from app.core.config import settings
+from app.core.request_stats import record_outbound_time
+from app.log.logging import logger
+
+# Default latency buckets (seconds), tuned for an API whose typical requests
+# complete in a few milliseconds but whose outbound calls can take seconds.
+DEFAULT_LATENCY_BUCKETS: Tuple[float, ...] = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+CONTENT_TYPE_LATEST = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape_label_value(value: str) -> str:
+    """Escape a label value for the text exposition format."""
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    """Render a label set as ``{name="value",...}``."""
+    pairs = [f'{name}="{_escape_label_value(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    """Render a sample value the way Prometheus expects."""
+    if value == math.inf:
+        return "+Inf"
+    if value == -math.inf:
+        return "-Inf"
+    if value != value:  # NaN
+        return "NaN"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _CounterChild:
+    """A single counter time series."""
+
+    __slots__ = ("value",)
+
+    def __init__(self) -> None:
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        """Increment the counter."""
+        self.value += amount
+
+
+class _GaugeChild:
+    """A single gauge time series."""
+
+    __slots__ = ("value",)
+
+    def __init__(self) -> None:
+        self.value = 0.0
+
+    def set(self, value: float) -> None:
+        """Set the gauge to an absolute value."""
+        self.value = float(value)
+
+    def inc(self, amount: float = 1.0) -> None:
+        """Increment the gauge."""
+        self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        """Decrement the gauge."""
+        self.value -= amount
+
+
+class _HistogramChild:
+    """A single histogram time series with fixed bucket bounds."""
+
+    __slots__ = ("_bounds", "counts", "sum")
+
+    def __init__(self, bounds: Tuple[float, ...]) -> None:
+        self._bounds = bounds
+        # One slot per bound plus the implicit +Inf bucket
+        self.counts: List[int] = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        """Record an observation."""
+        self.counts[bisect_left(self._bounds, value)] += 1
+        self.sum += value
+
+
+class _Metric:
+    """Base class for labelled metric families."""
+
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        if not self.labelnames:
+            self._children[()] = self._new_child()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values: str):
+        """Return (creating on first use) the child for the given label values."""
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(
+                    f"{self.name} expects labels {self.labelnames}, got {values}"
+                )
+            child = self._new_child()
+            self._children[values] = child
+        return child
+
+    def clear(self) -> None:
+        """Drop all children (used by tests)."""
+        self._children.clear()
+        if not self.labelnames:
+            self._children[()] = self._new_child()
+
+    def snapshot(self) -> Dict[str, object]:
+        """Return a JSON-serialisable view of the metric."""
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Monotonically increasing counter."""
+
+    type_name = "counter"
+
+    def _new_child(self) -> _CounterChild:
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0) -> None:
+        """Increment the unlabelled counter."""
+        self._children[()].inc(amount)
+
+    def snapshot(self) -> Dict[str, object]:
+        return {
+            "type": self.type_name,
+            "help": self.documentation,
+            "labelnames": list(self.labelnames),
+            "samples": [[list(k), c.value] for k, c in self._children.items()],
+        }
+
+
+class Gauge(_Metric):
+    """Gauge that can go up and down, optionally computed at collection time."""
+
+    type_name = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        callback: Optional[Callable[[], Iterable[Tuple[Tuple[str, ...], float]]]] = None,
+        multiprocess_mode: str = "sum",
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self._callback = callback
+        self.multiprocess_mode = multiprocess_mode
+
+    def _new_child(self) -> _GaugeChild:
+        return _GaugeChild()
+
+    def set(self, value: float) -> None:
+        """Set the unlabelled gauge."""
+        self._children[()].set(value)
+
+    def inc(self, amount: float = 1.0) -> None:
+        """Increment the unlabelled gauge."""
+        self._children[()].inc(amount)
+
+    def dec(self, amount: float = 1.0) -> None:
+        """Decrement the unlabelled gauge."""
+        self._children[()].dec(amount)
+
+    def set_callback(
+        self, callback: Optional[Callable[[], Iterable[Tuple[Tuple[str, ...], float]]]]
+    ) -> None:
+        """Compute the gauge's samples at collection time instead of storing them."""
+        self._callback = callback
+
+    def _samples(self) -> List[Tuple[Tuple[str, ...], float]]:
+        if self._callback is not None:
+            try:
+                return [(tuple(k), float(v)) for k, v in self._callback()]
+            except Exception as e:
+                logger.warning(
+                    f"Metric callback failed for {self.name}: {str(e)}",
+                    event_type="metrics_callback_error",
+                    metric=self.name,
+                    error=str(e)
+                )
+                return []
+        return [(k, c.value) for k, c in self._children.items()]
+
+    def snapshot(self) -> Dict[str, object]:
+        return {
+            "type": self.type_name,
+            "help": self.documentation,
+            "labelnames": list(self.labelnames),
+            "multiprocess_mode": self.multiprocess_mode,
+            "samples": [[list(k), v] for k, v in self._samples()],
+        }
+
+
+class Histogram(_Metric):
+    """Histogram with fixed, cumulative-on-render buckets."""
+
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS,
+    ) -> None:
+        self.buckets = tuple(sorted(float(b) for b in buckets if b != math.inf))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self) -> _HistogramChild:
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float) -> None:
+        """Record an observation on the unlabelled histogram."""
+        self._children[()].observe(value)
+
+    def snapshot(self) -> Dict[str, object]:
+        return {
+            "type": self.type_name,
+            "help": self.documentation,
+            "labelnames": list(self.labelnames),
+            "buckets": list(self.buckets),
+            "samples": [[list(k), list(c.counts), c.sum] for k, c in self._children.items()],
+        }
+
+
+class MetricsRegistry:
+    """Collection of metric families for one worker process."""
+
+    def __init__(self) -> None:
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        """Register a metric family, returning the existing one on re-registration."""
+        existing = self._metrics.get(metric.name)
+        if existing is not None:
+            return existing
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        """Create or fetch a counter."""
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = (), **kwargs) -> Gauge:
+        """Create or fetch a gauge."""
+        return self.register(Gauge(name, documentation, labelnames, **kwargs))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS,
+    ) -> Histogram:
+        """Create or fetch a histogram."""
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def get(self, name: str) -> Optional[_Metric]:
+        """Return a registered metric by name."""
+        return self._metrics.get(name)
+
+    def snapshot(self) -> Dict[str, Dict[str, object]]:
+        """Return a JSON-serialisable snapshot of every metric."""
+        return {name: metric.snapshot() for name, metric in self._metrics.items()}
+
+    def render(self) -> str:
+        """Render this worker's metrics in Prometheus text format."""
+        return render_snapshot(self.snapshot())
+
+
+def render_snapshot(snapshot: Dict[str, Dict[str, object]]) -> str:
+    """Render a (possibly aggregated) snapshot in Prometheus text format."""
+    lines: List[str] = []
+    for name in sorted(snapshot):
+        family = snapshot[name]
+        labelnames = family["labelnames"]
+        lines.append(f"# HELP {name} {family['help']}")
+        lines.append(f"# TYPE {name} {family['type']}")
+        if family["type"] == "histogram":
+            bounds = family["buckets"]
+            for labels, counts, total in family["samples"]:
+                cumulative = 0
+                for bound, count in zip(list(bounds) + [math.inf], counts):
+                    cumulative += count
+                    le = 'le="' + _format_value(bound) + '"'
+                    lines.append(f"{name}_bucket{_format_labels(labelnames, labels, le)} {cumulative}")
+                lines.append(f"{name}_sum{_format_labels(labelnames, labels)} {_format_value(total)}")
+                lines.append(f"{name}_count{_format_labels(labelnames, labels)} {cumulative}")
+        else:
+            for labels, value in family["samples"]:
+                lines.append(f"{name}{_format_labels(labelnames, labels)} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+def _pid_alive(pid: int) -> bool:
+    """Return True if a process with this pid is still running."""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def merge_snapshots(snapshots: Dict[int, Dict[str, Dict[str, object]]]) -> Dict[str, Dict[str, object]]:
+    """
+    Aggregate per-worker snapshots into a single snapshot.
+
+    Counters and histograms are summed across every worker that ever wrote a
+    snapshot. Gauges are combined according to their ``multiprocess_mode``
+    (``sum``, ``max``, ``min``) over live workers only, or kept per worker
+    with a ``pid`` label when the mode is ``all``.
+    """
+    merged: Dict[str, Dict[str, object]] = {}
+    for pid, snapshot in snapshots.items():
+        alive = _pid_alive(pid)
+        for name, family in snapshot.items():
+            target = merged.get(name)
+            if target is None:
+                target = {key: value for key, value in family.items() if key != "samples"}
+                if family["type"] == "gauge" and family.get("multiprocess_mode") == "all":
+                    target["labelnames"] = list(family["labelnames"]) + ["pid"]
+                target["_acc"] = {}
+                merged[name] = target
+            acc = target["_acc"]
+            if family["type"] == "histogram":
+                for labels, counts, total in family["samples"]:
+                    key = tuple(labels)
+                    current = acc.setdefault(key, [[0] * len(counts), 0.0])
+                    current[0] = [a + b for a, b in zip(current[0], counts)]
+                    current[1] += total
+            elif family["type"] == "counter":
+                for labels, value in family["samples"]:
+                    acc[tuple(labels)] = acc.get(tuple(labels), 0.0) + value
+            else:
+                if not alive:
+                    continue
+                mode = family.get("multiprocess_mode", "sum")
+                for labels, value in family["samples"]:
+                    if mode == "all":
+                        acc[tuple(labels) + (str(pid),)] = value
+                        continue
+                    key = tuple(labels)
+                    if key not in acc:
+                        acc[key] = value
+                    elif mode == "max":
+                        acc[key] = max(acc[key], value)
+                    elif mode == "min":
+                        acc[key] = min(acc[key], value)
+                    else:
+                        acc[key] = acc[key] + value
+
+    for family in merged.values():
+        acc = family.pop("_acc")
+        if family["type"] == "histogram":
+            family["samples"] = [[list(k), v[0], v[1]] for k, v in acc.items()]
+        else:
+            family["samples"] = [[list(k), v] for k, v in acc.items()]
+    return merged
+
+
+class MultiprocessCollector:
+    """Writes this worker's snapshot to a shared directory and aggregates all workers."""
+
+    def __init__(self, registry: MetricsRegistry, directory: str) -> None:
+        self.registry = registry
+        self.directory = directory
+
+    @property
+    def path(self) -> str:
+        return os.path.join(self.directory, f"metrics_{os.getpid()}.json")
+
+    def flush(self) -> None:
+        """Persist this worker's snapshot atomically."""
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as fh:
+            json.dump({"pid": os.getpid(), "written_at": time.time(), "metrics": self.registry.snapshot()}, fh)
+        os.replace(tmp_path, self.path)
+
+    def collect(self) -> Dict[str, Dict[str, object]]:
+        """Flush this worker and return the aggregate of every worker's snapshot."""
+        self.flush()
+        snapshots: Dict[int, Dict[str, Dict[str, object]]] = {}
+        for path in glob.glob(os.path.join(self.directory, "metrics_*.json")):
+            try:
+                with open(path, encoding="utf-8") as fh:
+                    data = json.load(fh)
+                snapshots[int(data["pid"])] = data["metrics"]
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning(
+                    f"Skipping unreadable metrics snapshot {path}: {str(e)}",
+                    event_type="metrics_snapshot_unreadable",
+                    path=path
+                )
+        return merge_snapshots(snapshots)
+
+
+# Process-wide registry used by all instrumentation points
+registry = MetricsRegistry()
+
+multiprocess_collector: Optional[MultiprocessCollector] = (
+    MultiprocessCollector(registry, settings.METRICS_MULTIPROCESS_DIR)
+    if settings.METRICS_MULTIPROCESS_DIR else None
+)
+
+
+def generate_latest() -> str:
+    """Render the metrics exposed by ``/metrics``."""
+    if multiprocess_collector is not None:
+        return render_snapshot(multiprocess_collector.collect())
+    return registry.render()
+
+
+# ---------------------------------------------------------------------------
+# Metric families shared across the service
+# ---------------------------------------------------------------------------
+
+HTTP_REQUESTS_TOTAL = registry.counter(
+    "http_requests_total",
+    "Total HTTP requests by method, route template and status code.",
+    ("method", "route", "status"),
+)
+HTTP_REQUEST_DURATION = registry.histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by method and route template.",
+    ("method", "route"),
+)
+HTTP_REQUESTS_IN_PROGRESS = registry.gauge(
+    "http_requests_in_progress",
+    "HTTP requests currently being processed.",
+)
+
+DB_POOL_CHECKED_OUT = registry.gauge(
+    "db_pool_checked_out_connections",
+    "Connections currently checked out of the pool.",
+    ("pool",),
+)
+DB_POOL_CHECKED_IN = registry.gauge(
+    "db_pool_checked_in_connections",
+    "Idle connections currently held by the pool.",
+    ("pool",),
+)
+DB_POOL_OVERFLOW = registry.gauge(
+    "db_pool_overflow_connections",
+    "Connections opened beyond pool_size (negative while the pool is filling).",
+    ("pool",),
+)
+DB_POOL_SIZE = registry.gauge(
+    "db_pool_size",
+    "Configured pool size.",
+    ("pool",),
+    multiprocess_mode="max",
+)
+DB_POOL_WAIT = registry.histogram(
+    "db_pool_wait_seconds",
+    "Time spent waiting to check a connection out of the pool.",
+    ("pool",),
+)
+DB_POOL_TIMEOUTS = registry.counter(
+    "db_pool_timeouts_total",
+    "Checkouts that gave up waiting for a pooled connection.",
+    ("pool",),
+)
+
+OUTBOUND_REQUEST_DURATION = registry.histogram(
+    "outbound_request_duration_seconds",
+    "Latency of calls to external services (Stripe, SendGrid).",
+    ("service", "operation"),
+)
+OUTBOUND_REQUEST_ERRORS = registry.counter(
+    "outbound_request_errors_total",
+    "Failed calls to external services by error type.",
+    ("service", "operation", "error_type"),
+)
+
+RATE_LIMIT_REJECTIONS = registry.counter(
+    "rate_limit_rejections_total",
+    "Requests rejected by the rate limiter.",
+    ("route",),
+)
+
+CACHE_REQUESTS = registry.counter(
+    "cache_requests_total",
+    "Cache lookups by cache name and result (hit or miss).",
+    ("cache", "result"),
+)
+
+
+def record_cache_lookup(cache: str, hit: bool) -> None:
+    """Count a cache lookup; the hit ratio is hit / (hit + miss)."""
+    CACHE_REQUESTS.labels(cache, "hit" if hit else "miss").inc()
+
+
+def record_outbound_call(service: str, operation: str, duration: float, error_type: Optional[str] = None) -> None:
+    """Record the latency and, if it failed, the error type of one external call."""
+    OUTBOUND_REQUEST_DURATION.labels(service, operation).observe(duration)
+    record_outbound_time(service, duration)
+    if error_type is not None:
+        OUTBOUND_REQUEST_ERRORS.labels(service, operation, error_type).inc()
+
+
+def register_pool_metrics(pool_name: str, pool) -> None:
+    """
+    Expose the gauges of a SQLAlchemy ``QueuePool`` under ``pool=<pool_name>``.
+
+    The values are read from the pool when ``/metrics`` is scraped, so there
+    is no cost on the request path.
+    """
+    _pools[pool_name] = pool
+    DB_POOL_CHECKED_OUT.set_callback(lambda: _pool_samples("checkedout"))
+    DB_POOL_CHECKED_IN.set_callback(lambda: _pool_samples("checkedin"))
+    DB_POOL_OVERFLOW.set_callback(lambda: _pool_samples("overflow"))
+    DB_POOL_SIZE.set_callback(lambda: _pool_samples("size"))
+
+
+_pools: Dict[str, object] = {}
+
+
+def _pool_samples(attribute: str) -> List[Tuple[Tuple[str, ...], float]]:
+    samples = []
+    for name, pool in _pools.items():
+        getter = getattr(pool, attribute, None)
+        if getter is not None:
+            samples.append(((name,), float(getter())))
+    return samples
+
+
+async def flush_metrics_periodically(interval_seconds: float) -> None:
+    """Keep this worker's multiprocess snapshot fresh until cancelled."""
+    if multiprocess_collector is None:
+        return
+    while True:
+        try:
+            multiprocess_collector.flush()
+        except OSError as e:
+            logger.warning(
+                f"Failed to flush metrics snapshot: {str(e)}",
+                event_type="metrics_flush_error",
+                error=str(e)
+            )
+        await asyncio.sleep(interval_seconds)
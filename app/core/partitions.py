@@ -0,0 +1,249 @@
+"""Monthly range partitions for append-only tables (``credit_transactions``).
+
+On Postgres the ``credit_transactions`` table is partitioned by month on
+``created_at`` (see the ``partition_credit_transactions`` migration). This
+module keeps that layout healthy:
+
+* ``ensure_future_partitions`` creates the partitions for the current month
+  and the next ``months_ahead`` months. It runs at startup and periodically
+  (``maintain_partitions_periodically``) and is idempotent; workers serialise
+  on an advisory lock.
+* ``archive_expired_partitions`` applies the retention policy: partitions
+  whose range ended more than ``retention_months`` ago are detached
+  (``CONCURRENTLY``, without blocking inserts) and moved to an archive schema
+  or dropped. Per-user ``transaction_count`` counters are reduced by the rows
+  that left. Destructive, so it is only run from
+  ``app/scripts/partition_maintenance.py``.
+
+On other databases, or when the table is not partitioned, everything is a
+no-op, so development and test databases built with ``create_all`` work
+unchanged.
+"""
+
+import asyncio
+import re
+from datetime import datetime, UTC
+from typing import List, NamedTuple, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+from app.log.logging import logger
+
+CREDIT_TRANSACTIONS = "credit_transactions"
+
+_BOUND_RE = re.compile(r"FROM \((.+?)\) TO \((.+?)\)")
+_LIST_PARTITIONS_SQL = text(
+    "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid)"
+    " FROM pg_inherits i"
+    " JOIN pg_class c ON c.oid = i.inhrelid"
+    " JOIN pg_class p ON p.oid = i.inhparent"
+    " WHERE p.relname = :table AND p.relnamespace = to_regnamespace(current_schema())"
+    " ORDER BY c.relname"
+)
+_IS_PARTITIONED_SQL = text(
+    "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table pt"
+    " JOIN pg_class c ON c.oid = pt.partrelid"
+    " WHERE c.relname = :table AND c.relnamespace = to_regnamespace(current_schema()))"
+)
+
+
+class Partition(NamedTuple):
+    """One range partition; ``None`` bounds stand for MINVALUE / MAXVALUE."""
+
+    name: str
+    lower: Optional[datetime]
+    upper: Optional[datetime]
+
+    def overlaps(self, start: datetime, end: datetime) -> bool:
+        return (self.lower is None or self.lower < end) and (self.upper is None or self.upper > start)
+
+
+def month_start(moment: datetime) -> datetime:
+    """First instant (UTC) of the month containing ``moment``."""
+    moment = moment.astimezone(UTC) if moment.tzinfo else moment.replace(tzinfo=UTC)
+    return moment.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def add_months(month: datetime, months: int) -> datetime:
+    """Shift a month start by ``months`` (may be negative)."""
+    index = month.year * 12 + month.month - 1 + months
+    return month.replace(year=index // 12, month=index % 12 + 1)
+
+
+def partition_name(table: str, month: datetime) -> str:
+    """Partition table name for ``month``, e.g. ``credit_transactions_p2026_11``."""
+    return f"{table}_p{month.year:04d}_{month.month:02d}"
+
+
+def _parse_bound(value: str) -> Optional[datetime]:
+    value = value.strip()
+    if value.upper() in ("MINVALUE", "MAXVALUE"):
+        return None
+    return datetime.fromisoformat(value.strip("'"))
+
+
+def parse_partition_bound(expression: str) -> tuple:
+    """
+    Parse ``pg_get_expr(relpartbound)`` output for a range partition.
+
+    Args:
+        expression: e.g. ``FOR VALUES FROM ('2026-11-01 00:00:00+00') TO ('2026-12-01 00:00:00+00')``
+
+    Returns:
+        tuple: ``(lower, upper)`` datetimes, ``None`` for MINVALUE / MAXVALUE
+    """
+    match = _BOUND_RE.search(expression)
+    if match is None:
+        # DEFAULT partition: catches everything not covered by a range
+        return None, None
+    return _parse_bound(match.group(1)), _parse_bound(match.group(2))
+
+
+async def is_partitioned(conn: AsyncConnection, table: str = CREDIT_TRANSACTIONS) -> bool:
+    """Whether ``table`` is a partitioned table on this (Postgres) connection."""
+    if conn.dialect.name != "postgresql":
+        return False
+    return bool((await conn.execute(_IS_PARTITIONED_SQL, {"table": table})).scalar())
+
+
+async def list_partitions(conn: AsyncConnection, table: str = CREDIT_TRANSACTIONS) -> List[Partition]:
+    """Attached partitions of ``table`` with their bounds."""
+    rows = (await conn.execute(_LIST_PARTITIONS_SQL, {"table": table})).all()
+    return [Partition(name, *parse_partition_bound(bound)) for name, bound in rows]
+
+
+async def ensure_future_partitions(
+    conn: AsyncConnection,
+    table: str = CREDIT_TRANSACTIONS,
+    months_ahead: int = 3,
+    now: Optional[datetime] = None,
+) -> List[str]:
+    """
+    Create missing monthly partitions from the current month to ``months_ahead`` months out.
+
+    Months already covered by an existing partition (including the
+    pre-partitioning legacy one) are skipped. Must run inside a transaction;
+    an advisory lock serialises concurrent callers.
+
+    Args:
+        conn: Connection in a transaction
+        table: Partitioned table
+        months_ahead: Months after the current one to prepare
+        now: Current time (overridable in tests)
+
+    Returns:
+        List[str]: Names of the partitions created
+    """
+    if not await is_partitioned(conn, table):
+        return []
+    await conn.execute(text("SELECT pg_advisory_xact_lock(hashtext(:key))"), {"key": f"partitions:{table}"})
+
+    existing = await list_partitions(conn, table)
+    current = month_start(now or datetime.now(UTC))
+    created = []
+    for offset in range(months_ahead + 1):
+        start = add_months(current, offset)
+        end = add_months(start, 1)
+        if any(partition.overlaps(start, end) for partition in existing):
+            continue
+        name = partition_name(table, start)
+        await conn.execute(text(
+            f'CREATE TABLE IF NOT EXISTS "{name}" PARTITION OF "{table}"'
+            f" FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+        ))
+        existing.append(Partition(name, start, end))
+        created.append(name)
+
+    if created:
+        logger.info(
+            "Created table partitions",
+            event_type="partitions_created",
+            table=table,
+            partitions=created
+        )
+    return created
+
+
+async def archive_expired_partitions(
+    engine: AsyncEngine,
+    retention_months: int,
+    table: str = CREDIT_TRANSACTIONS,
+    archive_schema: str = "archive",
+    drop: bool = False,
+    now: Optional[datetime] = None,
+) -> List[str]:
+    """
+    Detach partitions that ended more than ``retention_months`` ago and archive or drop them.
+
+    Each partition is detached ``CONCURRENTLY`` (inserts keep flowing), then,
+    in one transaction, the owners' ``user_credits.transaction_count`` is
+    reduced by the detached rows and the table is moved to ``archive_schema``
+    (from where it can be dumped) or dropped.
+
+    Args:
+        engine: Engine for the primary database
+        retention_months: Full months of history to keep attached (must be positive)
+        table: Partitioned table
+        archive_schema: Schema that receives detached partitions
+        drop: Drop detached partitions instead of archiving them
+        now: Current time (overridable in tests)
+
+    Returns:
+        List[str]: Names of the partitions detached
+    """
+    if retention_months <= 0:
+        raise ValueError("retention_months must be positive")
+    cutoff = add_months(month_start(now or datetime.now(UTC)), -retention_months)
+
+    async with engine.connect() as conn:
+        if not await is_partitioned(conn, table):
+            return []
+        expired = [
+            partition for partition in await list_partitions(conn, table)
+            if partition.upper is not None and partition.upper <= cutoff
+        ]
+
+    detached = []
+    for partition in expired:
+        # DETACH ... CONCURRENTLY cannot run inside a transaction block
+        async with engine.connect() as conn:
+            conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+            await conn.execute(text(f'ALTER TABLE "{table}" DETACH PARTITION "{partition.name}" CONCURRENTLY'))
+
+        async with engine.begin() as conn:
+            await conn.execute(text(
+                "UPDATE user_credits SET transaction_count = GREATEST(user_credits.transaction_count - detached.n, 0)"
+                f' FROM (SELECT user_id, count(*) AS n FROM "{partition.name}" GROUP BY user_id) AS detached'
+                " WHERE user_credits.user_id = detached.user_id"
+            ))
+            if drop:
+                await conn.execute(text(f'DROP TABLE "{partition.name}"'))
+            else:
+                await conn.execute(text(f'CREATE SCHEMA IF NOT EXISTS "{archive_schema}"'))
+                await conn.execute(text(f'ALTER TABLE "{partition.name}" SET SCHEMA "{archive_schema}"'))
+        detached.append(partition.name)
+        logger.info(
+            "Detached expired partition",
+            event_type="partition_detached",
+            table=table,
+            partition=partition.name,
+            upper_bound=partition.upper.isoformat(),
+            action="dropped" if drop else f"moved to {archive_schema}"
+        )
+    return detached
+
+
+async def maintain_partitions_periodically(engine: AsyncEngine, months_ahead: int, interval_seconds: float) -> None:
+    """Create upcoming partitions every ``interval_seconds`` until cancelled."""
+    while True:
+        try:
+            async with engine.begin() as conn:
+                await ensure_future_partitions(conn, months_ahead=months_ahead)
+        except Exception as e:
+            logger.warning(
+                f"Partition maintenance failed: {str(e)}",
+                event_type="partition_maintenance_error",
+                error=str(e)
+            )
+        await asyncio.sleep(interval_seconds)
@@ -0,0 +1,212 @@
+"""Low-overhead statistical profiler for a live worker.
+
+Two sampling modes are supported:
+
+* ``cpu``: a background thread periodically reads the event-loop thread's
+  current frame via ``sys._current_frames()``. This shows where the loop
+  spends CPU time, including the coroutine frames of whichever request task
+  is running. Nothing is installed on the loop itself, so the cost is one
+  stack walk per sample.
+* ``tasks``: a coroutine on the loop periodically records the await chain
+  of every suspended asyncio task. This shows where
+  requests are *waiting* (database, Stripe, SendGrid, locks) rather than
+  where they burn CPU.
+
+Samples are aggregated into stack counts, which can be rendered as
+collapsed stacks (flamegraph.pl / speedscope text format) or as speedscope
+JSON.
+"""
+
+import asyncio
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+# One frame of a sampled stack: (function, filename, line)
+FrameKey = Tuple[str, str, int]
+StackKey = Tuple[FrameKey, ...]
+
+PROFILE_MODES = ("cpu", "tasks")
+MAX_STACK_DEPTH = 128
+
+# Leaf frame of an idle loop thread waiting for I/O in the selector
+_IDLE_LEAF = ("select", "selectors.py")
+
+
+def _frame_key(frame) -> FrameKey:
+    code = frame.f_code
+    return (code.co_name, code.co_filename, frame.f_lineno)
+
+
+def _walk_frames(frame) -> StackKey:
+    """Return the stack ending at ``frame``, outermost frame first."""
+    frames: List[FrameKey] = []
+    while frame is not None and len(frames) < MAX_STACK_DEPTH:
+        frames.append(_frame_key(frame))
+        frame = frame.f_back
+    frames.reverse()
+    return tuple(frames)
+
+
+def _coroutine_stack(task: asyncio.Task) -> StackKey:
+    """
+    Return the await chain of a suspended task, outermost coroutine first.
+
+    ``Task.get_stack()`` only reports the task's top-level coroutine, so the
+    chain is followed through ``cr_await`` to the innermost awaited coroutine.
+    """
+    frames: List[FrameKey] = []
+    coro = task.get_coro()
+    while coro is not None and len(frames) < MAX_STACK_DEPTH:
+        frame = getattr(coro, "cr_frame", None) or getattr(coro, "gi_frame", None)
+        if frame is None:
+            break
+        frames.append(_frame_key(frame))
+        coro = getattr(coro, "cr_await", None) or getattr(coro, "gi_yieldfrom", None)
+    return tuple(frames)
+
+
+class ProfileResult:
+    """Aggregated samples from one profiling run."""
+
+    def __init__(self, mode: str, interval: float, duration: float, stacks: Counter, idle_samples: int = 0) -> None:
+        self.mode = mode
+        self.interval = interval
+        self.duration = duration
+        self.stacks = stacks
+        self.idle_samples = idle_samples
+
+    @property
+    def sample_count(self) -> int:
+        """Total number of samples taken."""
+        return sum(self.stacks.values())
+
+    def filter(self, match: Optional[str]) -> "ProfileResult":
+        """
+        Keep only stacks with a frame whose function or file contains ``match``.
+
+        Useful to focus on one route handler, e.g. ``match="use_credits"``.
+        """
+        if not match:
+            return self
+        stacks = Counter({
+            stack: count for stack, count in self.stacks.items()
+            if any(match in function or match in filename for function, filename, _ in stack)
+        })
+        return ProfileResult(self.mode, self.interval, self.duration, stacks, self.idle_samples)
+
+    def to_collapsed(self) -> str:
+        """Render as collapsed stacks: ``frame;frame;frame count`` per line."""
+        lines = []
+        for stack, count in self.stacks.most_common():
+            names = ";".join(f"{function} ({filename}:{line})" for function, filename, line in stack)
+            lines.append(f"{names} {count}")
+        return "\n".join(lines) + ("\n" if lines else "")
+
+    def to_speedscope(self, name: str = "auth-service") -> Dict:
+        """Render as a speedscope "sampled" profile."""
+        frame_index: Dict[FrameKey, int] = {}
+        frames: List[Dict] = []
+        samples: List[List[int]] = []
+        weights: List[float] = []
+        for stack, count in self.stacks.most_common():
+            indexes = []
+            for frame in stack:
+                if frame not in frame_index:
+                    frame_index[frame] = len(frames)
+                    function, filename, line = frame
+                    frames.append({"name": function, "file": filename, "line": line})
+                indexes.append(frame_index[frame])
+            samples.append(indexes)
+            weights.append(count * self.interval)
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name,
+            "exporter": "auth-service sampling profiler",
+            "activeProfileIndex": 0,
+            "shared": {"frames": frames},
+            "profiles": [{
+                "type": "sampled",
+                "name": f"{name} ({self.mode})",
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": sum(weights),
+                "samples": samples,
+                "weights": weights,
+            }],
+        }
+
+
+class SamplingProfiler:
+    """
+    Statistical profiler for the event loop this instance is started from.
+
+    Args:
+        interval: Seconds between samples.
+        mode: ``"cpu"`` to sample the loop thread, ``"tasks"`` to sample
+            the suspended stacks of all asyncio tasks.
+    """
+
+    def __init__(self, interval: float = 0.005, mode: str = "cpu") -> None:
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Unknown profile mode: {mode}")
+        self.interval = interval
+        self.mode = mode
+        self._stacks: Counter = Counter()
+        self._idle_samples = 0
+
+    async def profile(self, seconds: float) -> ProfileResult:
+        """Sample for ``seconds`` and return the aggregated result."""
+        self._stacks = Counter()
+        self._idle_samples = 0
+        started = time.perf_counter()
+        if self.mode == "cpu":
+            await self._profile_loop_thread(seconds)
+        else:
+            await self._profile_tasks(seconds)
+        return ProfileResult(
+            self.mode, self.interval, time.perf_counter() - started, self._stacks, self._idle_samples
+        )
+
+    async def _profile_loop_thread(self, seconds: float) -> None:
+        loop_thread_id = threading.get_ident()
+        stop = threading.Event()
+        sampler = threading.Thread(
+            target=self._sample_thread, args=(loop_thread_id, stop), name="sampling-profiler", daemon=True
+        )
+        sampler.start()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            stop.set()
+            await asyncio.to_thread(sampler.join)
+
+    def _sample_thread(self, thread_id: int, stop: threading.Event) -> None:
+        stacks = self._stacks
+        while not stop.wait(self.interval):
+            frame = sys._current_frames().get(thread_id)
+            if frame is None:
+                continue
+            stack = _walk_frames(frame)
+            del frame
+            # An idle loop is parked in the selector; count it but keep it out of the stacks
+            leaf_function, leaf_file, _ = stack[-1]
+            if leaf_function == _IDLE_LEAF[0] and leaf_file.endswith(_IDLE_LEAF[1]):
+                self._idle_samples += 1
+            else:
+                stacks[stack] += 1
+
+    async def _profile_tasks(self, seconds: float) -> None:
+        current = asyncio.current_task()
+        deadline = time.monotonic() + seconds
+        stacks = self._stacks
+        while time.monotonic() < deadline:
+            for task in asyncio.all_tasks():
+                if task is current or task.done():
+                    continue
+                stack = _coroutine_stack(task)
+                if stack:
+                    stacks[stack] += 1
+            await asyncio.sleep(self.interval)
@@ -0,0 +1,190 @@
+"""Read-replica selection with lag checks and a read-your-writes window.
+
+Replicas are only used for sessions opened with read intent (see
+``app.core.database.get_read_db``). A replica is eligible while its circuit
+breaker is closed and its last measured replication lag is within
+``max_lag``; otherwise reads fall back to the primary.
+
+After a user's own write commits, a marker keeps that user's reads on the
+primary for ``DB_READ_YOUR_WRITES_SECONDS`` so they never see their data
+go back in time. Markers are kept per worker process.
+"""
+
+import asyncio
+import itertools
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional
+
+from sqlalchemy import text
+
+from app.core.circuit_breaker import CircuitState
+from app.core.metrics import registry
+from app.log.logging import logger
+
+DB_REPLICA_LAG = registry.gauge(
+    "db_replica_lag_seconds",
+    "Replication lag last measured on each read replica.",
+    ("replica",),
+    multiprocess_mode="max",
+)
+DB_READ_ROUTING = registry.counter(
+    "db_read_routing_total",
+    "Read-intent sessions by chosen target and reason.",
+    ("target", "reason"),
+)
+
+# Zero when caught up (nothing left to replay), even if the primary is idle
+_PG_LAG_SQL = text(
+    "SELECT CASE"
+    " WHEN NOT pg_is_in_recovery() THEN 0"
+    " WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0"
+    " ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 1e9)"
+    " END"
+)
+_ZERO_LAG_SQL = text("SELECT 0")
+
+
+class RecentWrites:
+    """
+    Users whose writes committed within the last ``window`` seconds.
+
+    Args:
+        window: Seconds a marker stays active.
+        max_entries: Bound on tracked users; the oldest markers go first.
+        clock: Monotonic time source (overridable in tests).
+    """
+
+    def __init__(self, window: float = 10.0, max_entries: int = 100_000, clock: Callable[[], float] = time.monotonic) -> None:
+        self.window = window
+        self.max_entries = max_entries
+        self._clock = clock
+        self._expiry: "OrderedDict[Hashable, float]" = OrderedDict()
+
+    def mark(self, user_id: Hashable) -> None:
+        """Record a committed write by ``user_id``."""
+        if self.window <= 0 or user_id is None:
+            return
+        now = self._clock()
+        self._expiry[user_id] = now + self.window
+        self._expiry.move_to_end(user_id)
+        # Markers are appended in expiry order, so expired ones sit at the front
+        while self._expiry and (len(self._expiry) > self.max_entries or next(iter(self._expiry.values())) <= now):
+            self._expiry.popitem(last=False)
+
+    def wrote_recently(self, user_id: Hashable) -> bool:
+        """Whether ``user_id`` has a write inside the window."""
+        expiry = self._expiry.get(user_id)
+        return expiry is not None and expiry > self._clock()
+
+    def __len__(self) -> int:
+        return len(self._expiry)
+
+
+class Replica:
+    """One read replica engine and its last lag measurement."""
+
+    def __init__(self, name: str, engine) -> None:
+        self.name = name
+        self.engine = engine
+        self.lag: Optional[float] = None
+        self.last_checked: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+    @property
+    def breaker(self):
+        return getattr(self.engine.pool, "circuit_breaker", None)
+
+    def available(self, max_lag: float) -> bool:
+        """Closed circuit and a lag measurement within ``max_lag``."""
+        breaker = self.breaker
+        if breaker is not None and breaker.state != CircuitState.CLOSED:
+            return False
+        return self.lag is not None and self.lag <= max_lag
+
+    def to_dict(self) -> Dict[str, Any]:
+        """State summary for health checks."""
+        breaker = self.breaker
+        return {
+            "name": self.name,
+            "lag_seconds": self.lag,
+            "last_checked": self.last_checked,
+            "last_error": self.last_error,
+            "circuit_state": breaker.state if breaker is not None else None,
+        }
+
+
+class ReplicaSet:
+    """
+    Round-robin choice among replicas that are up and caught up.
+
+    Lag is measured by ``check_lag`` (run periodically by ``monitor``), never
+    on the request path; a replica is not used until it has been measured.
+
+    Args:
+        replicas: Replica engines.
+        max_lag: Maximum acceptable replication lag in seconds.
+    """
+
+    def __init__(self, replicas: Iterable[Replica], max_lag: float = 5.0) -> None:
+        self.replicas: List[Replica] = list(replicas)
+        self.max_lag = max_lag
+        self._cycle = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self.replicas)
+
+    def choose(self) -> Optional[Replica]:
+        """Next available replica, or None to use the primary."""
+        count = len(self.replicas)
+        start = next(self._cycle)
+        for offset in range(count):
+            replica = self.replicas[(start + offset) % count]
+            if replica.available(self.max_lag):
+                return replica
+        return None
+
+    async def check_lag(self) -> None:
+        """Measure replication lag on every replica."""
+        await asyncio.gather(*(self._check(replica) for replica in self.replicas))
+
+    async def _check(self, replica: Replica) -> None:
+        breaker = replica.breaker
+        # Reading the state moves an open breaker to half-open once its timeout has passed,
+        # so this check doubles as the probe that closes it again
+        if breaker is not None and breaker.state == CircuitState.OPEN:
+            return
+        query = _PG_LAG_SQL if replica.engine.dialect.name == "postgresql" else _ZERO_LAG_SQL
+        try:
+            async with replica.engine.connect() as conn:
+                replica.lag = float((await conn.execute(query)).scalar() or 0.0)
+            replica.last_error = None
+            DB_REPLICA_LAG.labels(replica.name).set(replica.lag)
+        except Exception as e:
+            replica.lag = None
+            replica.last_error = f"{type(e).__name__}: {e}"[:300]
+            logger.warning(
+                f"Replica lag check failed: {str(e)}",
+                event_type="db_replica_check_failed",
+                replica=replica.name,
+                error=str(e)
+            )
+        replica.last_checked = time.time()
+        if replica.lag is not None and replica.lag > self.max_lag:
+            logger.warning(
+                "Replica lag above threshold; reads fall back to the primary",
+                event_type="db_replica_lagging",
+                replica=replica.name,
+                lag_seconds=round(replica.lag, 3),
+                max_lag_seconds=self.max_lag
+            )
+
+    async def monitor(self, interval: float) -> None:
+        """Check lag every ``interval`` seconds until cancelled."""
+        while True:
+            await self.check_lag()
+            await asyncio.sleep(interval)
+
+    def status(self) -> List[Dict[str, Any]]:
+        """Per-replica state for health checks."""
+        return [replica.to_dict() for replica in self.replicas]
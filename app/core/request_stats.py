@@ -0,0 +1,88 @@
+"""Per-request accounting of database and outbound time.
+
+A ``RequestStats`` object is bound to a context variable for the lifetime of
+each HTTP request (see ``app.middleware.server_timing``). Instrumentation
+points (SQL event hooks, Stripe and SendGrid wrappers) add to it, and the
+middleware turns it into a ``Server-Timing`` header and N+1 warnings.
+"""
+
+import time
+from collections import Counter
+from contextvars import ContextVar, Token
+from typing import Dict, Optional
+
+
+class RequestStats:
+    """Timings and statement fingerprints collected while serving one request."""
+
+    __slots__ = (
+        "started_at", "db_time", "db_statements", "fingerprints",
+        "fingerprint_sql", "outbound_time", "outbound_calls", "warned_fingerprints",
+    )
+
+    def __init__(self) -> None:
+        self.started_at = time.perf_counter()
+        self.db_time = 0.0
+        self.db_statements = 0
+        # fingerprint -> number of executions in this request
+        self.fingerprints: Counter = Counter()
+        # fingerprint -> normalized SQL (kept once, for warnings)
+        self.fingerprint_sql: Dict[str, str] = {}
+        # service name (stripe, sendgrid, ...) -> seconds spent waiting on it
+        self.outbound_time: Dict[str, float] = {}
+        self.outbound_calls: Dict[str, int] = {}
+        self.warned_fingerprints: set = set()
+
+    def record_statement(self, fingerprint: str, normalized_sql: str, duration: float) -> int:
+        """Record one executed statement and return how often it ran in this request."""
+        self.db_time += duration
+        self.db_statements += 1
+        count = self.fingerprints[fingerprint] + 1
+        self.fingerprints[fingerprint] = count
+        if count == 1:
+            self.fingerprint_sql[fingerprint] = normalized_sql
+        return count
+
+    def record_outbound(self, service: str, duration: float) -> None:
+        """Record time spent waiting on an external service."""
+        self.outbound_time[service] = self.outbound_time.get(service, 0.0) + duration
+        self.outbound_calls[service] = self.outbound_calls.get(service, 0) + 1
+
+    @property
+    def elapsed(self) -> float:
+        """Seconds since the request started."""
+        return time.perf_counter() - self.started_at
+
+    @property
+    def total_outbound_time(self) -> float:
+        """Seconds spent on all external services."""
+        return sum(self.outbound_time.values())
+
+    def repeated_fingerprints(self, threshold: int) -> Dict[str, int]:
+        """Return fingerprints executed at least ``threshold`` times."""
+        return {fp: count for fp, count in self.fingerprints.items() if count >= threshold}
+
+
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+def start_request_stats() -> Token:
+    """Bind a fresh ``RequestStats`` to the current context."""
+    return _request_stats.set(RequestStats())
+
+
+def reset_request_stats(token: Token) -> None:
+    """Restore the context to what it was before ``start_request_stats``."""
+    _request_stats.reset(token)
+
+
+def get_request_stats() -> Optional[RequestStats]:
+    """Return the stats of the current request, or None outside a request."""
+    return _request_stats.get()
+
+
+def record_outbound_time(service: str, duration: float) -> None:
+    """Add outbound time to the current request, if there is one."""
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.record_outbound(service, duration)
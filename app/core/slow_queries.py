@@ -0,0 +1,277 @@
+"""Slow-query log with one-off EXPLAIN capture per statement fingerprint.
+
+Statements slower than ``SLOW_QUERY_THRESHOLD_MS`` are aggregated by
+normalized fingerprint (see ``app.core.sql_instrumentation``) into a bounded
+LRU store. Each entry keeps timings, the shapes of the bind parameters
+(types only, never values) and the application call site that issued the
+query.
+
+The first time a fingerprint turns up slow, an ``EXPLAIN`` of the statement
+is run in the background on a separate connection with the parameters of
+that execution, and the plan is kept with the entry. ``EXPLAIN ANALYZE`` is
+opt-in and only used for plain SELECTs, because it executes the statement.
+"""
+
+import asyncio
+import os
+import sys
+import time
+from collections import OrderedDict
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, Set
+
+import greenlet
+
+from app.core.config import settings
+from app.core.metrics import registry
+from app.log.logging import logger
+
+DB_SLOW_QUERIES = registry.counter(
+    "db_slow_queries_total",
+    "Statements slower than SLOW_QUERY_THRESHOLD_MS.",
+)
+
+_APP_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__))) + os.sep
+# Instrumentation modules sit between the caller and the driver; skip them
+_SKIPPED_FILES = {
+    os.path.join(_APP_ROOT, "core", name)
+    for name in ("sql_instrumentation.py", "slow_queries.py", "database.py")
+}
+_EXPLAINABLE_VERBS = {"SELECT", "WITH", "INSERT", "UPDATE", "DELETE"}
+
+# Set while running our own EXPLAIN so it is never recorded or explained itself
+_capturing_explain: ContextVar[bool] = ContextVar("capturing_explain", default=False)
+
+
+def parameter_shape(parameters: Any) -> Any:
+    """Describe bind parameters by type only, so no values are retained."""
+    if isinstance(parameters, dict):
+        return {key: type(value).__name__ for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        if parameters and isinstance(parameters[0], (dict, list, tuple)):
+            return {"executemany": len(parameters), "shape": parameter_shape(parameters[0])}
+        return [type(value).__name__ for value in parameters]
+    return type(parameters).__name__
+
+
+def _is_app_frame(filename: str) -> bool:
+    return filename.startswith(_APP_ROOT) and filename not in _SKIPPED_FILES
+
+
+def find_call_site() -> Optional[str]:
+    """
+    Return ``file:line (function)`` of the innermost application frame.
+
+    With the async engine, statements run in a greenlet whose stack does not
+    link back to the caller. In that case the walk continues on the parent
+    greenlet, which is suspended inside ``greenlet_spawn`` and holds the
+    awaiting application coroutines.
+    """
+    frame = sys._getframe(1)
+    current = greenlet.getcurrent()
+    while True:
+        while frame is not None:
+            if _is_app_frame(frame.f_code.co_filename):
+                return _describe(frame)
+            frame = frame.f_back
+        current = current.parent
+        if current is None:
+            return None
+        frame = current.gr_frame
+
+
+def _describe(frame) -> str:
+    relative = os.path.relpath(frame.f_code.co_filename, os.path.dirname(_APP_ROOT.rstrip(os.sep)))
+    return f"{relative}:{frame.f_lineno} ({frame.f_code.co_name})"
+
+
+def _explain_prefix(dialect: str, statement: str, analyze: bool) -> Optional[str]:
+    verb = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else ""
+    if verb not in _EXPLAINABLE_VERBS:
+        return None
+    if dialect == "postgresql":
+        if analyze and verb == "SELECT":
+            return "EXPLAIN (ANALYZE, BUFFERS) "
+        return "EXPLAIN "
+    if dialect == "sqlite":
+        return "EXPLAIN QUERY PLAN "
+    return "EXPLAIN "
+
+
+class SlowQueryEntry:
+    """Aggregated slow executions of one statement fingerprint."""
+
+    __slots__ = (
+        "fingerprint", "sql", "count", "total_time", "max_time", "last_time",
+        "first_seen", "last_seen", "parameter_shape", "call_sites", "explain", "explain_error",
+    )
+
+    def __init__(self, fingerprint: str, sql: str) -> None:
+        self.fingerprint = fingerprint
+        self.sql = sql
+        self.count = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.last_time = 0.0
+        self.first_seen = time.time()
+        self.last_seen = self.first_seen
+        self.parameter_shape: Any = None
+        self.call_sites: Dict[str, int] = {}
+        self.explain: Optional[str] = None
+        self.explain_error: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize for the diagnostics endpoint (times in milliseconds)."""
+        return {
+            "fingerprint": self.fingerprint,
+            "sql": self.sql,
+            "count": self.count,
+            "total_ms": round(self.total_time * 1000, 1),
+            "mean_ms": round(self.total_time / self.count * 1000, 1) if self.count else 0.0,
+            "max_ms": round(self.max_time * 1000, 1),
+            "last_ms": round(self.last_time * 1000, 1),
+            "first_seen": self.first_seen,
+            "last_seen": self.last_seen,
+            "parameter_shape": self.parameter_shape,
+            "call_sites": self.call_sites,
+            "explain": self.explain,
+            "explain_error": self.explain_error,
+        }
+
+
+class SlowQueryLog:
+    """
+    Bounded store of slow statements, keyed by fingerprint (LRU eviction).
+
+    Args:
+        threshold: Minimum statement duration in seconds to be recorded.
+        capacity: Maximum number of fingerprints kept.
+        explain: Capture an EXPLAIN once per fingerprint.
+        explain_analyze: Use EXPLAIN ANALYZE for SELECTs (executes them).
+    """
+
+    MAX_CALL_SITES = 10
+
+    def __init__(
+        self,
+        threshold: float = 0.2,
+        capacity: int = 200,
+        explain: bool = True,
+        explain_analyze: bool = False,
+    ) -> None:
+        self.threshold = threshold
+        self.capacity = capacity
+        self.explain = explain
+        self.explain_analyze = explain_analyze
+        self._entries: "OrderedDict[str, SlowQueryEntry]" = OrderedDict()
+        self._explain_pending: Set[str] = set()
+        self._tasks: Set[asyncio.Task] = set()
+
+    def record(
+        self,
+        fingerprint: str,
+        normalized_sql: str,
+        statement: str,
+        parameters: Any,
+        duration: float,
+        dialect: str,
+        async_engine=None,
+    ) -> Optional[SlowQueryEntry]:
+        """Record one slow execution and schedule an EXPLAIN if needed."""
+        if _capturing_explain.get():
+            return None
+        DB_SLOW_QUERIES.inc()
+
+        entry = self._entries.get(fingerprint)
+        if entry is None:
+            entry = SlowQueryEntry(fingerprint, normalized_sql)
+            self._entries[fingerprint] = entry
+            if len(self._entries) > self.capacity:
+                evicted, _ = self._entries.popitem(last=False)
+                self._explain_pending.discard(evicted)
+        else:
+            self._entries.move_to_end(fingerprint)
+
+        entry.count += 1
+        entry.total_time += duration
+        entry.max_time = max(entry.max_time, duration)
+        entry.last_time = duration
+        entry.last_seen = time.time()
+        entry.parameter_shape = parameter_shape(parameters)
+        call_site = find_call_site() or "unknown"
+        if call_site in entry.call_sites or len(entry.call_sites) < self.MAX_CALL_SITES:
+            entry.call_sites[call_site] = entry.call_sites.get(call_site, 0) + 1
+
+        logger.warning(
+            "Slow query",
+            event_type="slow_query",
+            fingerprint=fingerprint,
+            duration_ms=round(duration * 1000, 1),
+            call_site=call_site,
+            sql=normalized_sql[:500]
+        )
+
+        if self.explain and async_engine is not None and fingerprint not in self._explain_pending:
+            self._schedule_explain(entry, statement, parameters, dialect, async_engine)
+        return entry
+
+    def _schedule_explain(self, entry: SlowQueryEntry, statement: str, parameters: Any, dialect: str, async_engine) -> None:
+        prefix = _explain_prefix(dialect, statement, self.explain_analyze)
+        if prefix is None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self._explain_pending.add(entry.fingerprint)
+        if isinstance(parameters, list) and parameters and isinstance(parameters[0], (dict, list, tuple)):
+            parameters = parameters[0]
+        task = loop.create_task(self._capture_explain(entry, prefix + statement, parameters, async_engine))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _capture_explain(self, entry: SlowQueryEntry, explain_sql: str, parameters: Any, async_engine) -> None:
+        _capturing_explain.set(True)
+        try:
+            async with async_engine.connect() as conn:
+                result = await conn.exec_driver_sql(explain_sql, parameters or ())
+                rows = result.fetchall()
+                # ANALYZE runs the statement; never keep its effects
+                await conn.rollback()
+            entry.explain = "\n".join(" | ".join(str(column) for column in row) for row in rows)
+        except Exception as e:
+            entry.explain_error = f"{type(e).__name__}: {e}"[:500]
+            logger.warning(
+                f"EXPLAIN capture failed: {str(e)}",
+                event_type="slow_query_explain_error",
+                fingerprint=entry.fingerprint,
+                error=str(e)
+            )
+
+    async def wait_for_explains(self) -> None:
+        """Wait for in-flight EXPLAIN captures (used by tests and shutdown)."""
+        if self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+
+    def entries(self, order_by: str = "total") -> List[SlowQueryEntry]:
+        """Entries sorted by ``total``, ``max``, ``count`` or ``recent``."""
+        keys = {
+            "total": lambda entry: entry.total_time,
+            "max": lambda entry: entry.max_time,
+            "count": lambda entry: entry.count,
+            "recent": lambda entry: entry.last_seen,
+        }
+        return sorted(self._entries.values(), key=keys[order_by], reverse=True)
+
+    def clear(self) -> None:
+        """Drop all entries; fingerprints will be explained again."""
+        self._entries.clear()
+        self._explain_pending.clear()
+
+
+slow_query_log = SlowQueryLog(
+    threshold=settings.SLOW_QUERY_THRESHOLD_MS / 1000,
+    capacity=settings.SLOW_QUERY_LOG_SIZE,
+    explain=settings.SLOW_QUERY_EXPLAIN_ENABLED,
+    explain_analyze=settings.SLOW_QUERY_EXPLAIN_ANALYZE,
+)
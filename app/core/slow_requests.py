@@ -0,0 +1,131 @@
+"""Per-worker in-memory log of slow requests.
+
+Keeps two fixed-size views of requests slower than a threshold:
+
+* ``recent``: a preallocated ring buffer of the last N slow requests.
+* ``slowest``: a bounded min-heap of the N slowest requests since startup
+  (or since the last ``clear``).
+
+Requests under the threshold cost one comparison. Entries are filled from
+the per-request stats collected by the server timing middleware, so each
+one carries the breakdown (db, outbound, query count) alongside the
+request and trace ids.
+"""
+
+import heapq
+import itertools
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.core.request_stats import RequestStats
+
+
+class SlowRequestEntry:
+    """Timings of one slow request."""
+
+    __slots__ = (
+        "timestamp", "method", "route", "status", "duration", "db_time",
+        "db_statements", "outbound_time", "request_id", "trace_id",
+    )
+
+    def __init__(
+        self,
+        method: str,
+        route: str,
+        status: int,
+        duration: float,
+        stats: RequestStats,
+        request_id: Optional[str] = None,
+        trace_id: Optional[str] = None,
+    ) -> None:
+        self.timestamp = time.time()
+        self.method = method
+        self.route = route
+        self.status = status
+        self.duration = duration
+        self.db_time = stats.db_time
+        self.db_statements = stats.db_statements
+        self.outbound_time = dict(stats.outbound_time)
+        self.request_id = request_id
+        self.trace_id = trace_id
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize for the diagnostics endpoint (times in milliseconds)."""
+        return {
+            "timestamp": self.timestamp,
+            "method": self.method,
+            "route": self.route,
+            "status": self.status,
+            "duration_ms": round(self.duration * 1000, 1),
+            "db_ms": round(self.db_time * 1000, 1),
+            "db_statements": self.db_statements,
+            "outbound_ms": {service: round(seconds * 1000, 1) for service, seconds in self.outbound_time.items()},
+            "request_id": self.request_id,
+            "trace_id": self.trace_id,
+        }
+
+
+class SlowRequestLog:
+    """
+    Fixed-size ring of recent slow requests plus the slowest ones seen.
+
+    Args:
+        capacity: Entries kept in each view.
+        threshold: Minimum duration in seconds for a request to be kept.
+    """
+
+    def __init__(self, capacity: int = 100, threshold: float = 0.5) -> None:
+        self.capacity = capacity
+        self.threshold = threshold
+        self._ring: List[Optional[SlowRequestEntry]] = [None] * capacity
+        self._next = 0
+        # (duration, sequence, entry); the sequence breaks ties without comparing entries
+        self._slowest: List[Tuple[float, int, SlowRequestEntry]] = []
+        self._sequence = itertools.count()
+
+    def record(
+        self,
+        method: str,
+        route: str,
+        status: int,
+        duration: float,
+        stats: RequestStats,
+        request_id: Optional[str] = None,
+        trace_id: Optional[str] = None,
+    ) -> Optional[SlowRequestEntry]:
+        """Keep the request if it is slower than the threshold."""
+        if duration < self.threshold or self.capacity <= 0:
+            return None
+        entry = SlowRequestEntry(method, route, status, duration, stats, request_id, trace_id)
+
+        self._ring[self._next] = entry
+        self._next = (self._next + 1) % self.capacity
+
+        item = (duration, next(self._sequence), entry)
+        if len(self._slowest) < self.capacity:
+            heapq.heappush(self._slowest, item)
+        elif duration > self._slowest[0][0]:
+            heapq.heapreplace(self._slowest, item)
+        return entry
+
+    def recent(self) -> List[SlowRequestEntry]:
+        """Slow requests, newest first."""
+        ordered = self._ring[self._next:] + self._ring[:self._next]
+        return [entry for entry in reversed(ordered) if entry is not None]
+
+    def slowest(self) -> List[SlowRequestEntry]:
+        """Slowest requests, slowest first."""
+        return [entry for _, _, entry in sorted(self._slowest, reverse=True)]
+
+    def clear(self) -> None:
+        """Drop all entries."""
+        self._ring = [None] * self.capacity
+        self._next = 0
+        self._slowest = []
+
+
+slow_request_log = SlowRequestLog(
+    capacity=settings.SLOW_REQUEST_BUFFER_SIZE,
+    threshold=settings.SLOW_REQUEST_THRESHOLD_MS / 1000,
+)
@@ -0,0 +1,214 @@
+"""SQLAlchemy event hooks that time and fingerprint every statement.
+
+Statements executed while serving a request are added to the request's
+``RequestStats`` (see ``app.core.request_stats``), which lets the
+server-timing middleware report database time and flag N+1 patterns: the
+same statement fingerprint executed many times within one request.
+
+The module also provides ``count_queries`` / ``assert_max_queries`` so tests
+can pin a query budget for an endpoint or service call.
+"""
+
+import hashlib
+import re
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Tuple, Union
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.core.metrics import registry
+from app.core.request_stats import get_request_stats
+from app.core.slow_queries import slow_query_log
+from app.core.tracing import SpanKind, current_span, tracer
+
+DB_STATEMENT_DURATION = registry.histogram(
+    "db_statement_duration_seconds",
+    "Execution time of individual SQL statements.",
+)
+
+_START_ATTR = "_instrumentation_start"
+_SPAN_ATTR = "_instrumentation_span"
+_START_STACK_KEY = "instrumentation_start_stack"
+
+# Normalization patterns, applied in order
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_PLACEHOLDER = re.compile(r"\$\d+|%\(\w+\)s|%s|(?<![:\w]):\w+|\?")
+_NUMBER = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?(?![\w.])")
+_POSTCOMPILE = re.compile(r"\(?__\[POSTCOMPILE_\w+\]\)?")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_VALUES_LIST = re.compile(r"(VALUES\s*\(\?[^)]*\))(?:\s*,\s*\(\?[^)]*\))+", re.IGNORECASE)
+_WHITESPACE = re.compile(r"\s+")
+
+_fingerprint_cache: Dict[str, Tuple[str, str]] = {}
+# sync engine -> AsyncEngine wrapping it, so slow statements can be EXPLAINed asynchronously
+_async_engines: Dict[Engine, AsyncEngine] = {}
+_FINGERPRINT_CACHE_SIZE = 2048
+
+
+def normalize_statement(statement: str) -> str:
+    """
+    Reduce a SQL statement to its shape.
+
+    Literals and bind placeholders become ``?``, ``IN``/``VALUES`` lists of any
+    length collapse to a single form, and whitespace is normalized, so that
+    the same query issued with different parameters maps to the same text.
+    """
+    normalized = _STRING_LITERAL.sub("?", statement)
+    normalized = _POSTCOMPILE.sub("(?)", normalized)
+    normalized = _PLACEHOLDER.sub("?", normalized)
+    normalized = _NUMBER.sub("?", normalized)
+    normalized = _IN_LIST.sub("(...)", normalized)
+    normalized = _VALUES_LIST.sub(r"\1, ...", normalized)
+    return _WHITESPACE.sub(" ", normalized).strip()
+
+
+def fingerprint_statement(statement: str) -> Tuple[str, str]:
+    """
+    Return ``(fingerprint, normalized_sql)`` for a statement.
+
+    SQLAlchemy reuses the same compiled SQL string for a given query shape,
+    so results are memoized per raw statement to keep the hot path cheap.
+    """
+    cached = _fingerprint_cache.get(statement)
+    if cached is not None:
+        return cached
+    normalized = normalize_statement(statement)
+    fingerprint = hashlib.sha1(normalized.encode("utf-8")).hexdigest()[:16]
+    if len(_fingerprint_cache) >= _FINGERPRINT_CACHE_SIZE:
+        _fingerprint_cache.clear()
+    _fingerprint_cache[statement] = (fingerprint, normalized)
+    return fingerprint, normalized
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = time.perf_counter()
+    if context is not None:
+        setattr(context, _START_ATTR, start)
+        parent = current_span()
+        # Only trace statements that belong to a sampled request trace
+        if parent is not None and parent.sampled:
+            _, normalized = fingerprint_statement(statement)
+            setattr(context, _SPAN_ATTR, tracer.start_span(
+                f"db {normalized.split(' ', 1)[0].upper()}",
+                kind=SpanKind.CLIENT,
+                attributes={
+                    "db.system": conn.dialect.name,
+                    "db.statement": normalized[:2000],
+                    "db.executemany": executemany,
+                },
+                parent=parent,
+            ))
+    else:
+        conn.info.setdefault(_START_STACK_KEY, []).append(start)
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    end = time.perf_counter()
+    if context is not None:
+        start = getattr(context, _START_ATTR, end)
+        span = getattr(context, _SPAN_ATTR, None)
+        if span is not None:
+            span.set_attribute("db.rowcount", cursor.rowcount)
+            span.end()
+    else:
+        stack = conn.info.get(_START_STACK_KEY)
+        start = stack.pop() if stack else end
+    duration = end - start
+
+    DB_STATEMENT_DURATION.observe(duration)
+
+    stats = get_request_stats()
+    if stats is not None:
+        fingerprint, normalized = fingerprint_statement(statement)
+        stats.record_statement(fingerprint, normalized, duration)
+
+    if duration >= slow_query_log.threshold:
+        fingerprint, normalized = fingerprint_statement(statement)
+        slow_query_log.record(
+            fingerprint, normalized, statement, parameters, duration,
+            conn.dialect.name, _async_engines.get(conn.engine)
+        )
+
+
+def _handle_error(exception_context):
+    span = getattr(exception_context.execution_context, _SPAN_ATTR, None)
+    if span is not None:
+        span.record_exception(exception_context.original_exception)
+        span.end()
+
+
+def _sync_engine(engine: Union[Engine, AsyncEngine]) -> Engine:
+    return engine.sync_engine if isinstance(engine, AsyncEngine) else engine
+
+
+def instrument_engine(engine: Union[Engine, AsyncEngine]) -> None:
+    """Attach the timing, fingerprinting and tracing hooks to an engine (idempotent)."""
+    target = _sync_engine(engine)
+    if isinstance(engine, AsyncEngine):
+        _async_engines[target] = engine
+    if not event.contains(target, "before_cursor_execute", _before_cursor_execute):
+        event.listen(target, "before_cursor_execute", _before_cursor_execute)
+        event.listen(target, "after_cursor_execute", _after_cursor_execute)
+        event.listen(target, "handle_error", _handle_error)
+
+
+class QueryCounter:
+    """Statements captured by ``count_queries``."""
+
+    def __init__(self) -> None:
+        self.statements: List[str] = []
+
+    @property
+    def count(self) -> int:
+        """Number of statements executed."""
+        return len(self.statements)
+
+    def fingerprints(self) -> Dict[str, int]:
+        """Normalized SQL -> number of executions."""
+        counts: Dict[str, int] = {}
+        for statement in self.statements:
+            _, normalized = fingerprint_statement(statement)
+            counts[normalized] = counts.get(normalized, 0) + 1
+        return counts
+
+
+@contextmanager
+def count_queries(engine: Union[Engine, AsyncEngine]) -> Iterator[QueryCounter]:
+    """
+    Capture every statement executed on ``engine`` inside the block.
+
+    Example:
+        with count_queries(engine) as queries:
+            await client.get("/credits/transactions", ...)
+        assert queries.count <= 4
+    """
+    counter = QueryCounter()
+    target = _sync_engine(engine)
+
+    def _capture(conn, cursor, statement, parameters, context, executemany):
+        counter.statements.append(statement)
+
+    event.listen(target, "after_cursor_execute", _capture)
+    try:
+        yield counter
+    finally:
+        event.remove(target, "after_cursor_execute", _capture)
+
+
+@contextmanager
+def assert_max_queries(engine: Union[Engine, AsyncEngine], budget: int) -> Iterator[QueryCounter]:
+    """Fail if the block executes more than ``budget`` statements on ``engine``."""
+    with count_queries(engine) as counter:
+        yield counter
+    if counter.count > budget:
+        details = "\n".join(
+            f"  {count}x {sql}" for sql, count in sorted(
+                counter.fingerprints().items(), key=lambda item: -item[1]
+            )
+        )
+        raise AssertionError(
+            f"Query budget exceeded: {counter.count} statements executed, budget is {budget}\n{details}"
+        )
@@ -0,0 +1,462 @@
+"""Lightweight distributed tracing with W3C Trace Context propagation.
+
+Spans follow the OpenTelemetry data model closely enough to be exported as
+OTLP/JSON, without pulling the OpenTelemetry SDK into the request path:
+
+* ``TracingMiddleware`` (``app.middleware.tracing``) continues the trace from
+  an incoming ``traceparent`` header, or starts a new one, and opens the
+  server span for the request.
+* ``tracer.span()`` opens a child span of whatever span is current. The
+  current span lives in a context variable, so it follows ``await`` chains
+  and ``asyncio.to_thread`` calls.
+* ``traced_service`` wraps the public coroutine methods of a service class
+  in spans. The SQL event hooks, ``run_stripe_async`` and ``send_email`` open
+  client spans.
+* Finished spans are queued in memory and shipped in batches by
+  ``BatchSpanProcessor``. It runs as a background task and writes to a JSON
+  lines file or POSTs OTLP/JSON to a collector.
+
+Sampling is parent-based: an incoming sampled flag is honoured, and new
+traces are sampled deterministically from the trace id with
+``TRACING_SAMPLE_RATIO``. Unsampled spans still propagate ids but are
+never recorded.
+"""
+
+import asyncio
+import functools
+import inspect
+import json
+import random
+import re
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+
+import httpx
+
+from app.core.config import settings
+from app.core.metrics import registry
+from app.log.logging import logger
+
+TRACEPARENT_HEADER = "traceparent"
+TRACERESPONSE_HEADER = "traceresponse"
+
+_TRACEPARENT_RE = re.compile(r"^([0-9a-f]{2})-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})(?:-.*)?$")
+_INVALID_TRACE_ID = "0" * 32
+_INVALID_SPAN_ID = "0" * 16
+
+TRACING_SPANS_EXPORTED = registry.counter(
+    "tracing_spans_exported_total",
+    "Spans handed to the trace exporter.",
+)
+TRACING_SPANS_DROPPED = registry.counter(
+    "tracing_spans_dropped_total",
+    "Spans dropped because the export queue was full or the export failed.",
+    ("reason",),
+)
+
+
+class SpanKind:
+    """OTLP span kinds."""
+
+    INTERNAL = 1
+    SERVER = 2
+    CLIENT = 3
+
+
+class StatusCode:
+    """OTLP status codes."""
+
+    UNSET = 0
+    OK = 1
+    ERROR = 2
+
+
+class SpanContext:
+    """Identifiers carried across process boundaries in ``traceparent``."""
+
+    __slots__ = ("trace_id", "span_id", "sampled")
+
+    def __init__(self, trace_id: str, span_id: str, sampled: bool) -> None:
+        self.trace_id = trace_id
+        self.span_id = span_id
+        self.sampled = sampled
+
+
+def parse_traceparent(header: Optional[str]) -> Optional[SpanContext]:
+    """
+    Parse a W3C ``traceparent`` header.
+
+    Returns:
+        Optional[SpanContext]: The remote parent, or None if the header is
+        missing or invalid (in which case a new trace is started).
+    """
+    if not header:
+        return None
+    match = _TRACEPARENT_RE.match(header.strip().lower())
+    if not match:
+        return None
+    version, trace_id, span_id, flags = match.groups()
+    if version == "ff" or trace_id == _INVALID_TRACE_ID or span_id == _INVALID_SPAN_ID:
+        return None
+    return SpanContext(trace_id, span_id, bool(int(flags, 16) & 0x01))
+
+
+def format_traceparent(trace_id: str, span_id: str, sampled: bool) -> str:
+    """Render a version 00 ``traceparent`` value."""
+    return f"00-{trace_id}-{span_id}-{'01' if sampled else '00'}"
+
+
+class Span:
+    """A timed operation within a trace."""
+
+    __slots__ = (
+        "name", "kind", "trace_id", "span_id", "parent_span_id", "sampled",
+        "start_time_ns", "end_time_ns", "attributes", "status_code", "status_message", "_tracer",
+    )
+
+    def __init__(
+        self,
+        tracer: Optional["Tracer"],
+        name: str,
+        kind: int,
+        trace_id: str,
+        span_id: str,
+        parent_span_id: Optional[str],
+        sampled: bool,
+        attributes: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        self._tracer = tracer
+        self.name = name
+        self.kind = kind
+        self.trace_id = trace_id
+        self.span_id = span_id
+        self.parent_span_id = parent_span_id
+        self.sampled = sampled
+        self.start_time_ns = time.time_ns()
+        self.end_time_ns: Optional[int] = None
+        self.attributes: Dict[str, Any] = dict(attributes) if attributes and sampled else {}
+        self.status_code = StatusCode.UNSET
+        self.status_message = ""
+
+    @property
+    def traceparent(self) -> str:
+        """``traceparent`` value for propagating this span to a downstream call."""
+        return format_traceparent(self.trace_id, self.span_id, self.sampled)
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        """Attach an attribute (ignored for unsampled spans)."""
+        if self.sampled:
+            self.attributes[key] = value
+
+    def record_exception(self, exc: BaseException) -> None:
+        """Mark the span as failed with the exception type and message."""
+        self.status_code = StatusCode.ERROR
+        self.status_message = f"{type(exc).__name__}: {exc}"[:500]
+        self.set_attribute("exception.type", type(exc).__name__)
+
+    def end(self) -> None:
+        """Finish the span and hand it to the exporter (once)."""
+        if self.end_time_ns is not None:
+            return
+        self.end_time_ns = time.time_ns()
+        if self.sampled and self._tracer is not None:
+            self._tracer._on_end(self)
+
+    @property
+    def duration(self) -> float:
+        """Span duration in seconds (0 while open)."""
+        if self.end_time_ns is None:
+            return 0.0
+        return (self.end_time_ns - self.start_time_ns) / 1e9
+
+
+# Returned when tracing is disabled so call sites never need to check
+_NOOP_SPAN = Span(None, "noop", SpanKind.INTERNAL, _INVALID_TRACE_ID, _INVALID_SPAN_ID, None, False)
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+def current_span() -> Optional[Span]:
+    """Return the active span, or None outside a trace."""
+    return _current_span.get()
+
+
+def current_trace_id() -> Optional[str]:
+    """Return the active trace id, or None outside a trace."""
+    span = _current_span.get()
+    return span.trace_id if span is not None else None
+
+
+class Tracer:
+    """
+    Creates spans and forwards finished, sampled spans to a processor.
+
+    Args:
+        service_name: ``service.name`` resource attribute of exported spans.
+        sample_ratio: Fraction of new (root) traces to record.
+        processor: Receives finished spans; None disables recording.
+        enabled: When False, spans are no-ops and nothing is propagated.
+    """
+
+    def __init__(
+        self,
+        service_name: str = "auth-service",
+        sample_ratio: float = 1.0,
+        processor: Optional["BatchSpanProcessor"] = None,
+        enabled: bool = True,
+    ) -> None:
+        self.service_name = service_name
+        self.sample_ratio = sample_ratio
+        self.processor = processor
+        self.enabled = enabled
+        self._sample_bound = int(max(0.0, min(1.0, sample_ratio)) * (1 << 64))
+
+    def _should_sample(self, trace_id: str) -> bool:
+        # Deterministic on the low 64 bits so every service samples the same traces
+        return int(trace_id[16:], 16) < self._sample_bound
+
+    def start_span(
+        self,
+        name: str,
+        kind: int = SpanKind.INTERNAL,
+        attributes: Optional[Dict[str, Any]] = None,
+        parent: Optional[Any] = None,
+    ) -> Span:
+        """
+        Create a span without making it current.
+
+        Args:
+            name: Span name.
+            kind: One of ``SpanKind``.
+            attributes: Initial attributes.
+            parent: A ``Span`` or remote ``SpanContext``; defaults to the
+                current span. Without one, a new trace is started.
+        """
+        if not self.enabled:
+            return _NOOP_SPAN
+        if parent is None:
+            parent = _current_span.get()
+        span_id = f"{random.getrandbits(64):016x}"
+        if parent is not None and parent.trace_id != _INVALID_TRACE_ID:
+            return Span(self, name, kind, parent.trace_id, span_id, parent.span_id, parent.sampled, attributes)
+        trace_id = f"{random.getrandbits(128):032x}"
+        return Span(self, name, kind, trace_id, span_id, None, self._should_sample(trace_id), attributes)
+
+    @contextmanager
+    def span(
+        self,
+        name: str,
+        kind: int = SpanKind.INTERNAL,
+        attributes: Optional[Dict[str, Any]] = None,
+        parent: Optional[Any] = None,
+    ) -> Iterator[Span]:
+        """Open a span, make it current for the block, and end it afterwards."""
+        span = self.start_span(name, kind, attributes, parent)
+        if span is _NOOP_SPAN:
+            yield span
+            return
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.record_exception(e)
+            raise
+        finally:
+            _current_span.reset(token)
+            span.end()
+
+    def _on_end(self, span: Span) -> None:
+        if self.processor is not None:
+            self.processor.on_end(span)
+
+
+def traced_service(service_name: str):
+    """
+    Class decorator wrapping each public coroutine method in a span.
+
+    Spans are named ``<service_name>.<method>``.
+
+    Example:
+        @traced_service("CreditService")
+        class CreditService: ...
+    """
+    def decorator(cls):
+        for attr, value in list(vars(cls).items()):
+            if attr.startswith("_") or not inspect.iscoroutinefunction(value):
+                continue
+            setattr(cls, attr, _traced_method(f"{service_name}.{attr}", value))
+        return cls
+    return decorator
+
+
+def _traced_method(span_name: str, func):
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        if not tracer.enabled or _current_span.get() is None:
+            return await func(*args, **kwargs)
+        with tracer.span(span_name):
+            return await func(*args, **kwargs)
+    return wrapper
+
+
+def _attribute_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def encode_otlp(spans: List[Span], service_name: str) -> Dict[str, Any]:
+    """Encode spans as an OTLP/JSON ``ExportTraceServiceRequest``."""
+    encoded = []
+    for span in spans:
+        item = {
+            "traceId": span.trace_id,
+            "spanId": span.span_id,
+            "name": span.name,
+            "kind": span.kind,
+            "startTimeUnixNano": str(span.start_time_ns),
+            "endTimeUnixNano": str(span.end_time_ns),
+            "attributes": [{"key": k, "value": _attribute_value(v)} for k, v in span.attributes.items()],
+            "status": {"code": span.status_code, "message": span.status_message},
+        }
+        if span.parent_span_id:
+            item["parentSpanId"] = span.parent_span_id
+        encoded.append(item)
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": service_name}}]},
+            "scopeSpans": [{"scope": {"name": "app.core.tracing"}, "spans": encoded}],
+        }]
+    }
+
+
+class FileSpanExporter:
+    """Append each batch as one OTLP/JSON document per line."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+
+    async def export(self, payload: Dict[str, Any]) -> None:
+        line = json.dumps(payload, separators=(",", ":")) + "\n"
+        await asyncio.to_thread(self._append, line)
+
+    def _append(self, line: str) -> None:
+        with open(self.path, "a", encoding="utf-8") as fh:
+            fh.write(line)
+
+
+class OTLPHttpSpanExporter:
+    """POST batches as OTLP/JSON to a collector's ``/v1/traces`` endpoint."""
+
+    def __init__(self, endpoint: str, timeout: float = 5.0) -> None:
+        self.endpoint = endpoint
+        self.timeout = timeout
+
+    async def export(self, payload: Dict[str, Any]) -> None:
+        async with httpx.AsyncClient(timeout=self.timeout) as client:
+            response = await client.post(self.endpoint, json=payload)
+            response.raise_for_status()
+
+
+class BatchSpanProcessor:
+    """
+    Buffers finished spans and exports them in batches off the request path.
+
+    ``on_end`` only appends to a bounded deque. ``run`` drains it every
+    ``schedule_delay`` seconds (or sooner once a batch is full) until
+    cancelled, and ``flush`` drains whatever is left on shutdown.
+    """
+
+    def __init__(
+        self,
+        exporter,
+        service_name: str,
+        max_queue_size: int = 2048,
+        max_batch_size: int = 512,
+        schedule_delay: float = 5.0,
+    ) -> None:
+        self.exporter = exporter
+        self.service_name = service_name
+        self.max_queue_size = max_queue_size
+        self.max_batch_size = max_batch_size
+        self.schedule_delay = schedule_delay
+        self._queue: Deque[Span] = deque()
+        self._batch_ready = asyncio.Event()
+
+    def on_end(self, span: Span) -> None:
+        """Queue a finished span, dropping it if the queue is full."""
+        if len(self._queue) >= self.max_queue_size:
+            TRACING_SPANS_DROPPED.labels("queue_full").inc()
+            return
+        self._queue.append(span)
+        if len(self._queue) >= self.max_batch_size:
+            self._batch_ready.set()
+
+    async def run(self) -> None:
+        """Export batches until cancelled."""
+        while True:
+            try:
+                await asyncio.wait_for(self._batch_ready.wait(), timeout=self.schedule_delay)
+            except asyncio.TimeoutError:
+                pass
+            self._batch_ready.clear()
+            await self.flush()
+
+    async def flush(self) -> None:
+        """Export everything queued so far."""
+        while self._queue:
+            batch = self._next_batch()
+            try:
+                await self.exporter.export(encode_otlp(batch, self.service_name))
+                TRACING_SPANS_EXPORTED.inc(len(batch))
+            except Exception as e:
+                TRACING_SPANS_DROPPED.labels("export_error").inc(len(batch))
+                logger.warning(
+                    f"Trace export failed: {str(e)}",
+                    event_type="trace_export_error",
+                    spans=len(batch),
+                    error=str(e)
+                )
+                return
+
+    def _next_batch(self) -> List[Span]:
+        batch = []
+        while self._queue and len(batch) < self.max_batch_size:
+            batch.append(self._queue.popleft())
+        return batch
+
+
+def _build_exporter():
+    if settings.TRACING_EXPORTER == "file":
+        return FileSpanExporter(settings.TRACING_FILE_PATH)
+    if settings.TRACING_EXPORTER == "otlp":
+        return OTLPHttpSpanExporter(settings.TRACING_OTLP_ENDPOINT)
+    return None
+
+
+def _build_tracer() -> Tuple[Tracer, Optional[BatchSpanProcessor]]:
+    exporter = _build_exporter() if settings.TRACING_ENABLED else None
+    processor = None
+    if exporter is not None:
+        processor = BatchSpanProcessor(
+            exporter,
+            settings.TRACING_SERVICE_NAME,
+            schedule_delay=settings.TRACING_EXPORT_INTERVAL_SECONDS,
+        )
+    tracer = Tracer(
+        service_name=settings.TRACING_SERVICE_NAME,
+        sample_ratio=settings.TRACING_SAMPLE_RATIO,
+        processor=processor,
+        enabled=settings.TRACING_ENABLED,
+    )
+    return tracer, processor
+
+
+tracer, span_processor = _build_tracer()
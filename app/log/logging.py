@@ -143,7 +143,9 @@ def init_logging():
 
         if dd_api_key and isinstance(dd_api_key, str) and len(dd_api_key) > 1:
             # Aggiungi un handler per datadog
-            loguru_logger.add(DatadogHandler(), level=logconfig.loglevel_dd)
+            # enqueue=True ships logs from a background thread so the synchronous
+            # Datadog HTTP call never runs on the event loop
+            loguru_logger.add(DatadogHandler(), level=logconfig.loglevel_dd, enqueue=True)
         else:
             loguru_logger.warning("Datadog API key is not set or environment variable is invalid. Logging to console only.")
         
@@ -7,7 +7,6 @@ from fastapi import FastAPI, Request, HTTPException
 from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
-from fastapi_sqlalchemy import DBSessionMiddleware
 from sqlalchemy.exc import SQLAlchemyError
 
 from app.core.config import settings, validate_email_config, validate_internal_api_key, validate_oauth_config
@@ -18,15 +17,30 @@ from app.core.error_handlers import (validation_exception_handler, auth_exceptio
                                    database_exception_handler, sqlalchemy_exception_handler)
 from app.log.logging import logger, InterceptHandler
 from app.core.db_exceptions import DatabaseException
+from app.core.database import TrafficClass, dispose_engines, engine_for, replica_set
+from app.middleware.idempotency import setup_idempotency_middleware
 from app.middleware.rate_limit import setup_rate_limiting, limiter
 from app.middleware.request_id import setup_request_id_middleware
 from app.middleware.security_headers import setup_security_headers
 from app.middleware.timeout import setup_timeout_middleware
+from app.middleware.metrics import setup_metrics_middleware
+from app.middleware.server_timing import setup_server_timing_middleware
+from app.middleware.tracing import setup_tracing_middleware
+from app.core.metrics import flush_metrics_periodically, multiprocess_collector
+from app.core.loop_monitor import LoopMonitor, configure_slow_callback_logging
+from app.core.memory_profiler import sample_memory_periodically
+from app.core.partitions import maintain_partitions_periodically
+from app.services.credit.reservations import sweep_reservations_periodically
+from app.services.credit.shards import rebalance_shards_periodically
+from app.core.idempotency import purge_idempotency_keys_periodically
+from app.core.tracing import span_processor
 from app.core.versioning import APIVersion, include_versioned_router
 from app.routers.auth import router as auth_router
 from app.routers.healthcheck_router import router as healthcheck_router, set_shutdown_state
 from app.routers.credit_router import router as credit_router
 from app.routers.webhooks.stripe_webhooks import router as stripe_webhooks_router # Corrected import
+from app.routers.metrics_router import router as metrics_router
+from app.routers.diagnostics_router import router as diagnostics_router
 import logging
 
 #try to intercept standard messages toward your Loguru
@@ -111,10 +125,115 @@ async def lifespan(app: FastAPI):
             warnings=oauth_validation_details.get("warnings", [])
         )
 
+    # Keep this worker's metrics snapshot fresh for multiprocess aggregation
+    metrics_flush_task = None
+    if settings.METRICS_ENABLED and multiprocess_collector is not None:
+        metrics_flush_task = asyncio.create_task(
+            flush_metrics_periodically(settings.METRICS_FLUSH_INTERVAL_SECONDS)
+        )
+
+    # Watch for event-loop lag and callbacks that block the loop
+    loop_monitor = None
+    if settings.EVENT_LOOP_MONITOR_ENABLED:
+        loop_monitor = LoopMonitor(
+            interval=settings.EVENT_LOOP_LAG_INTERVAL_SECONDS,
+            block_threshold=settings.EVENT_LOOP_BLOCK_THRESHOLD_SECONDS
+        )
+        loop_monitor.start()
+    if settings.EVENT_LOOP_DEBUG:
+        configure_slow_callback_logging(settings.EVENT_LOOP_BLOCK_THRESHOLD_SECONDS)
+        logger.warning(
+            "asyncio debug mode enabled; slow callbacks will be logged",
+            event_type="startup_warning",
+            component="event_loop"
+        )
+
+    # Feed RSS and GC object counts into the metrics surface
+    memory_sample_task = None
+    if settings.METRICS_ENABLED and settings.MEMORY_SAMPLE_INTERVAL_SECONDS > 0:
+        memory_sample_task = asyncio.create_task(
+            sample_memory_periodically(settings.MEMORY_SAMPLE_INTERVAL_SECONDS)
+        )
+
+    # Ship finished spans in batches off the request path
+    span_export_task = None
+    if span_processor is not None:
+        span_export_task = asyncio.create_task(span_processor.run())
+
+    # Measure replica lag off the request path; replicas are used once measured
+    replica_monitor_task = None
+    if replica_set:
+        replica_monitor_task = asyncio.create_task(
+            replica_set.monitor(settings.DB_REPLICA_CHECK_INTERVAL_SECONDS)
+        )
+
+    # Keep monthly credit_transactions partitions created ahead of time (no-op unless partitioned)
+    partition_maintenance_task = None
+    if settings.CREDIT_PARTITION_MAINTENANCE_INTERVAL_SECONDS > 0:
+        partition_maintenance_task = asyncio.create_task(
+            maintain_partitions_periodically(
+                engine_for(TrafficClass.INTERNAL),
+                settings.CREDIT_PARTITION_MONTHS_AHEAD,
+                settings.CREDIT_PARTITION_MAINTENANCE_INTERVAL_SECONDS
+            )
+        )
+
+    # Give expired credit holds back to their users' spendable balance
+    reservation_sweep_task = None
+    if settings.CREDIT_RESERVATION_SWEEP_INTERVAL_SECONDS > 0:
+        reservation_sweep_task = asyncio.create_task(
+            sweep_reservations_periodically(
+                engine_for(TrafficClass.INTERNAL),
+                settings.CREDIT_RESERVATION_SWEEP_INTERVAL_SECONDS,
+                settings.CREDIT_RESERVATION_SWEEP_BATCH_SIZE
+            )
+        )
+
+    # Keep the shards of hot sharded accounts level
+    shard_rebalance_task = None
+    if settings.CREDIT_SHARD_REBALANCE_INTERVAL_SECONDS > 0:
+        shard_rebalance_task = asyncio.create_task(
+            rebalance_shards_periodically(
+                engine_for(TrafficClass.INTERNAL),
+                settings.CREDIT_SHARD_REBALANCE_INTERVAL_SECONDS
+            )
+        )
+
+    # Drop expired Idempotency-Key responses
+    idempotency_purge_task = None
+    if settings.IDEMPOTENCY_PURGE_INTERVAL_SECONDS > 0:
+        idempotency_purge_task = asyncio.create_task(
+            purge_idempotency_keys_periodically(
+                engine_for(TrafficClass.INTERNAL),
+                settings.IDEMPOTENCY_PURGE_INTERVAL_SECONDS,
+                settings.IDEMPOTENCY_PURGE_BATCH_SIZE
+            )
+        )
+
     logger.info("Application startup complete", status="running", event="service_ready")
 
     yield
 
+    if metrics_flush_task is not None:
+        metrics_flush_task.cancel()
+    if loop_monitor is not None:
+        await loop_monitor.stop()
+    if memory_sample_task is not None:
+        memory_sample_task.cancel()
+    if span_export_task is not None:
+        span_export_task.cancel()
+        await span_processor.flush()
+    if replica_monitor_task is not None:
+        replica_monitor_task.cancel()
+    if partition_maintenance_task is not None:
+        partition_maintenance_task.cancel()
+    if reservation_sweep_task is not None:
+        reservation_sweep_task.cancel()
+    if shard_rebalance_task is not None:
+        shard_rebalance_task.cancel()
+    if idempotency_purge_task is not None:
+        idempotency_purge_task.cancel()
+
     # Graceful shutdown
     logger.info("Initiating graceful shutdown", status="stopping", event="service_shutdown_start")
 
@@ -150,6 +269,9 @@ async def lifespan(app: FastAPI):
             active_requests=_active_requests
         )
 
+    # Release the shared connection pool only once requests have drained
+    await dispose_engines()
+
     logger.info("Application shutdown complete", status="stopped", event="service_shutdown_complete")
 
 
@@ -258,6 +380,10 @@ logger.info(
     "Initializing application"
 )
 
+# Setup Idempotency-Key handling for credit mutations (inside the request ID middleware, so
+# replayed responses get a request ID too)
+setup_idempotency_middleware(app)
+
 # Setup request ID middleware (must be early in the chain to track all requests)
 setup_request_id_middleware(app)
 
@@ -277,7 +403,7 @@ app.add_middleware(
     allow_methods=settings.cors_methods_list,
     allow_headers=settings.cors_headers_list,
     max_age=settings.CORS_MAX_AGE,
-    expose_headers=["X-Request-ID"],  # Expose request ID header to clients
+    expose_headers=["X-Request-ID", "Server-Timing", "traceresponse"],  # Expose request ID, timing and trace headers to clients
 )
 
 # Log CORS configuration at startup
@@ -288,12 +414,36 @@ logger.info(
     credentials=settings.CORS_ALLOW_CREDENTIALS
 )
 
-# Add DB session middleware
-app.add_middleware(DBSessionMiddleware, db_url=settings.database_url)
-
 # Setup rate limiting
 setup_rate_limiting(app)
 
+# Setup request metrics (outermost, so rate-limited and failed requests are counted too)
+if settings.METRICS_ENABLED:
+    setup_metrics_middleware(app)
+    logger.info("Metrics middleware configured", event="middleware_setup", middleware="metrics")
+
+# Setup per-request SQL/outbound accounting (Server-Timing header, N+1 warnings)
+if settings.SQL_INSTRUMENTATION_ENABLED:
+    setup_server_timing_middleware(app)
+    logger.info(
+        "Server timing middleware configured",
+        event="middleware_setup",
+        middleware="server_timing",
+        header_enabled=settings.SERVER_TIMING_ENABLED,
+        n_plus_one_threshold=settings.SQL_N_PLUS_ONE_THRESHOLD
+    )
+
+# Setup tracing (outermost of the instrumentation so its span covers the others)
+if settings.TRACING_ENABLED:
+    setup_tracing_middleware(app)
+    logger.info(
+        "Tracing middleware configured",
+        event="middleware_setup",
+        middleware="tracing",
+        exporter=settings.TRACING_EXPORTER,
+        sample_ratio=settings.TRACING_SAMPLE_RATIO
+    )
+
 # Register exception handlers
 app.add_exception_handler(RequestValidationError, validation_exception_handler)
 app.add_exception_handler(AuthException, auth_exception_handler)
@@ -343,6 +493,9 @@ app.include_router(stripe_webhooks_router, prefix="/webhooks", tags=["Webhooks"]
 
 # Non-versioned routes (health checks should be version-agnostic)
 app.include_router(healthcheck_router)
+app.include_router(diagnostics_router)
+if settings.METRICS_ENABLED:
+    app.include_router(metrics_router)
 
 logger.info(
     "API routes registered",
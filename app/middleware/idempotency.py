@@ -0,0 +1,227 @@
+"""Idempotency-Key middleware for credit mutations.
+
+A client that times out on ``/credits/use``, ``/credits/add`` or
+``/credits/stripe/add`` can retry with the same ``Idempotency-Key`` header.
+The endpoint runs once; every retry gets the first response replayed (with
+``Idempotent-Replayed: true``), whether it arrives after the first request
+finished or while it is still running. Keys are scoped to the caller (the
+user of a valid bearer token, otherwise the API key), so two callers that
+pick the same key run independently. The versioned and legacy paths share
+keys. Requests without the header are passed through untouched.
+
+Responses with a 5xx status are not stored, so those retries run again.
+Neither are rejections a retry can fix: a 400 or 422 for the request
+itself, a 401 or 403 from authentication and a 429 from rate limiting. So a
+client that refreshes an expired token retries with the same key and gets
+its result.
+Reusing a key with a different body is rejected with 422, and a
+duplicate still waiting after ``IDEMPOTENCY_WAIT_SECONDS`` gets 409 with
+``Retry-After``.
+"""
+
+import hashlib
+import json
+import uuid
+from typing import List, Optional
+
+from jose import JWTError
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+from app.core.idempotency import IdempotencyStore, StoredResponse, idempotency_store
+from app.core.security import verify_jwt_token
+from app.log.logging import logger
+
+IDEMPOTENCY_HEADER = b"idempotency-key"
+REPLAYED_HEADER = b"idempotent-replayed"
+MAX_KEY_LENGTH = 255
+
+# Endpoints accepting Idempotency-Key, matched on the path suffix so /v1 and legacy routes share keys
+IDEMPOTENT_ENDPOINTS = ("/credits/use", "/credits/add", "/credits/stripe/add")
+
+# Failures that leave nothing to replay: the retry runs again instead of getting these for the whole TTL
+_UNSTORED_STATUSES = frozenset({400, 401, 403, 422, 429})
+
+
+
+def _endpoint(scope: Scope) -> Optional[str]:
+    if scope["method"] != "POST":
+        return None
+    path = scope["path"].rstrip("/")
+    for endpoint in IDEMPOTENT_ENDPOINTS:
+        if path.endswith(endpoint):
+            return endpoint
+    return None
+
+
+def _caller(headers: dict) -> str:
+    # The user, not the token, so a retry with a refreshed token still finds its key
+    scheme, _, token = headers.get(b"authorization", b"").decode("latin-1").partition(" ")
+    token = token.strip()
+    if scheme.lower() == "bearer" and token:
+        try:
+            subject = verify_jwt_token(token).get("sub")
+        except JWTError:
+            subject = None
+        # A token that does not verify is refused by the endpoint, and that releases the claim
+        identity = f"user:{subject}" if subject else f"token:{token}"
+    elif b"api-key" in headers:
+        identity = "service:" + headers[b"api-key"].decode("latin-1")
+    else:
+        identity = "anonymous"
+    return hashlib.sha256(identity.encode()).hexdigest()
+
+
+def _request_hash(scope: Scope, body: bytes) -> str:
+    digest = hashlib.sha256(scope.get("query_string", b""))
+    digest.update(b"\0" + body)
+    return digest.hexdigest()
+
+
+async def _send_json(send: Send, status_code: int, detail: str, headers: List[tuple] = ()) -> None:
+    body = json.dumps({"detail": detail}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status_code,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode()), *headers],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+async def _replay(send: Send, stored: StoredResponse) -> None:
+    body = stored.response_body or b""
+    headers = [(b"content-length", str(len(body)).encode()), (REPLAYED_HEADER, b"true")]
+    if stored.content_type:
+        headers.append((b"content-type", stored.content_type.encode("latin-1")))
+    await send({"type": "http.response.start", "status": stored.status_code, "headers": headers})
+    await send({"type": "http.response.body", "body": body})
+
+
+class IdempotencyMiddleware:
+    """
+    Pure ASGI middleware that runs each ``Idempotency-Key`` request once.
+
+    The request body is buffered to fingerprint it and then handed on
+    unchanged. The response body is collected while it is streamed, and
+    stored when the endpoint finishes.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        store: IdempotencyStore = idempotency_store,
+        wait_seconds: float = 10.0,
+    ) -> None:
+        self.app = app
+        self.store = store
+        self.wait_seconds = wait_seconds
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        endpoint = _endpoint(scope) if scope["type"] == "http" else None
+        headers = dict(scope["headers"]) if endpoint else {}
+        key = headers.get(IDEMPOTENCY_HEADER)
+        if key is None:
+            await self.app(scope, receive, send)
+            return
+
+        key = key.decode("latin-1").strip()
+        if not key or len(key) > MAX_KEY_LENGTH:
+            await _send_json(send, 400, f"Idempotency-Key must be 1 to {MAX_KEY_LENGTH} characters")
+            return
+
+        chunks = []
+        more_body = True
+        while more_body:
+            message = await receive()
+            if message["type"] != "http.request":
+                # Client went away before sending the body
+                return
+            chunks.append(message.get("body", b""))
+            more_body = message.get("more_body", False)
+        body = b"".join(chunks)
+        request_hash = _request_hash(scope, body)
+        caller = _caller(headers)
+        token = uuid.uuid4().hex
+
+        stored = await self.store.claim(endpoint, caller, key, request_hash, token)
+        if stored is not None and stored.status_code is None and stored.request_hash == request_hash:
+            stored = await self.store.wait(endpoint, caller, key, self.wait_seconds)
+            if stored is None:
+                # The first request failed and gave the key up: run this one
+                stored = await self.store.claim(endpoint, caller, key, request_hash, token)
+
+        if stored is not None:
+            if stored.request_hash != request_hash:
+                logger.warning("Idempotency-Key reused with a different request",
+                             event_type="idempotency_key_mismatch",
+                             endpoint=endpoint)
+                await _send_json(send, 422, "Idempotency-Key was already used with a different request")
+            elif stored.status_code is None:
+                await _send_json(
+                    send, 409, "A request with this Idempotency-Key is still in progress",
+                    [(b"retry-after", b"1")]
+                )
+            else:
+                logger.info(f"Replayed response to Idempotency-Key on {endpoint}",
+                          event_type="idempotency_replay",
+                          endpoint=endpoint,
+                          status_code=stored.status_code)
+                await _replay(send, stored)
+            return
+
+        await self._run(scope, receive, send, endpoint, caller, key, token, body)
+
+    async def _run(
+        self,
+        scope: Scope,
+        receive: Receive,
+        send: Send,
+        endpoint: str,
+        caller: str,
+        key: str,
+        token: str,
+        body: bytes,
+    ) -> None:
+        body_sent = False
+
+        async def replay_body() -> Message:
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        response = {"status": 500, "content_type": None, "body": []}
+
+        async def capture(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                for name, value in message.get("headers", ()):
+                    if name == b"content-type":
+                        response["content_type"] = value.decode("latin-1")
+            elif message["type"] == "http.response.body":
+                response["body"].append(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, replay_body, capture)
+        except BaseException:
+            await self.store.release(endpoint, caller, key, token)
+            raise
+
+        if response["status"] >= 500 or response["status"] in _UNSTORED_STATUSES:
+            await self.store.release(endpoint, caller, key, token)
+        else:
+            await self.store.complete(
+                endpoint, caller, key, token, response["status"], response["content_type"], b"".join(response["body"])
+            )
+
+
+def setup_idempotency_middleware(app) -> None:
+    """
+    Setup the idempotency middleware on the FastAPI app.
+
+    Args:
+        app: The FastAPI application instance.
+    """
+    app.add_middleware(IdempotencyMiddleware, wait_seconds=settings.IDEMPOTENCY_WAIT_SECONDS)
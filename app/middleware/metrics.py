@@ -0,0 +1,90 @@
+"""Request metrics middleware feeding the Prometheus registry."""
+
+import time
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.metrics import (
+    HTTP_REQUESTS_TOTAL,
+    HTTP_REQUEST_DURATION,
+    HTTP_REQUESTS_IN_PROGRESS,
+)
+
+# Label used for requests that did not match any route (404s, scanners),
+# so that arbitrary paths cannot blow up label cardinality.
+UNMATCHED_ROUTE = "unmatched"
+
+
+def get_route_template(scope: Scope) -> str:
+    """
+    Return the route template (e.g. ``/credits/balance``) for a request scope.
+
+    FastAPI stores the matched route in ``scope["route"]`` while routing, so
+    this is only meaningful once the request has been handled.
+    """
+    route = scope.get("route")
+    path = getattr(route, "path", None)
+    return path if path else UNMATCHED_ROUTE
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware recording per-route latency and status counters.
+
+    Implemented without ``BaseHTTPMiddleware`` to keep the per-request
+    overhead to a couple of microseconds: one clock read on entry, one on
+    exit, and two cached metric child lookups.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+        # (method, route) -> histogram child; (method, route, status) -> counter child
+        self._duration_children = {}
+        self._count_children = {}
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        HTTP_REQUESTS_IN_PROGRESS.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration = time.perf_counter() - start
+            HTTP_REQUESTS_IN_PROGRESS.dec()
+            self._record(scope["method"], get_route_template(scope), status_code, duration)
+
+    def _record(self, method: str, route: str, status_code: int, duration: float) -> None:
+        key = (method, route)
+        histogram = self._duration_children.get(key)
+        if histogram is None:
+            histogram = self._duration_children[key] = HTTP_REQUEST_DURATION.labels(method, route)
+        histogram.observe(duration)
+
+        count_key = (method, route, status_code)
+        counter = self._count_children.get(count_key)
+        if counter is None:
+            counter = self._count_children[count_key] = HTTP_REQUESTS_TOTAL.labels(
+                method, route, str(status_code)
+            )
+        counter.inc()
+
+
+def setup_metrics_middleware(app) -> None:
+    """
+    Setup the metrics middleware on the FastAPI app.
+
+    Args:
+        app: The FastAPI application instance.
+    """
+    app.add_middleware(MetricsMiddleware)
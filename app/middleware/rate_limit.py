@@ -6,9 +6,12 @@ from slowapi.errors import RateLimitExceeded
 from slowapi.middleware import SlowAPIMiddleware
 from fastapi import Request, FastAPI
 from starlette.responses import JSONResponse
+from starlette.routing import Match
 
 from app.core.config import settings
+from app.core.metrics import RATE_LIMIT_REJECTIONS, registry
 from app.log.logging import logger
+from app.middleware.metrics import UNMATCHED_ROUTE
 
 
 def get_request_identifier(request: Request) -> str:
@@ -37,8 +40,40 @@ limiter = Limiter(
 )
 
 
+def _memory_storage_keys():
+    # Only the in-process memory:// backend grows with the worker's heap
+    storage = getattr(limiter._storage, "storage", None)
+    return [((), len(storage))] if isinstance(storage, dict) else []
+
+
+RATE_LIMIT_STORAGE_KEYS = registry.gauge(
+    "rate_limit_memory_storage_keys",
+    "Keys held by the in-memory rate limit storage of this worker.",
+    callback=_memory_storage_keys,
+    multiprocess_mode="all",
+)
+
+
+def _get_route_template(request: Request) -> str:
+    """
+    Resolve the route template for a rejected request.
+
+    Default limits are enforced by ``SlowAPIMiddleware`` before routing, so
+    ``scope["route"]`` is not populated yet and the routes are matched here.
+    """
+    route = request.scope.get("route")
+    if route is not None:
+        return route.path
+    for candidate in getattr(request.app, "routes", []):
+        match, _ = candidate.matches(request.scope)
+        if match == Match.FULL:
+            return getattr(candidate, "path", UNMATCHED_ROUTE)
+    return UNMATCHED_ROUTE
+
+
 async def rate_limit_exceeded_handler(request: Request, exc: RateLimitExceeded) -> JSONResponse:
     """Custom handler for rate limit exceeded errors."""
+    RATE_LIMIT_REJECTIONS.labels(_get_route_template(request)).inc()
     logger.warning(
         "Rate limit exceeded",
         event_type="rate_limit_exceeded",
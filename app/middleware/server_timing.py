@@ -0,0 +1,129 @@
+"""Per-request stats middleware: Server-Timing header and N+1 detection."""
+
+from typing import List
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+from app.core.metrics import registry
+from app.core.request_stats import RequestStats, reset_request_stats, start_request_stats, get_request_stats
+from app.core.slow_requests import SlowRequestLog, slow_request_log
+from app.core.tracing import current_trace_id
+from app.log.logging import logger
+from app.middleware.metrics import get_route_template
+
+_REQUEST_ID_HEADER = b"x-request-id"
+
+SQL_REPEATED_STATEMENT_WARNINGS = registry.counter(
+    "sql_repeated_statement_warnings_total",
+    "Requests that executed the same statement fingerprint at least SQL_N_PLUS_ONE_THRESHOLD times.",
+    ("route",),
+)
+
+
+def build_server_timing(stats: RequestStats) -> str:
+    """
+    Render a ``Server-Timing`` header value for the collected stats.
+
+    Example: ``db;dur=12.4;desc="7 queries", stripe;dur=210.0, total;dur=231.9``
+    """
+    parts: List[str] = [
+        f'db;dur={stats.db_time * 1000:.1f};desc="{stats.db_statements} queries"'
+    ]
+    for service, seconds in stats.outbound_time.items():
+        parts.append(f"{service};dur={seconds * 1000:.1f}")
+    parts.append(f"total;dur={stats.elapsed * 1000:.1f}")
+    return ", ".join(parts)
+
+
+class ServerTimingMiddleware:
+    """
+    Pure ASGI middleware that binds a ``RequestStats`` to every request.
+
+    On response start it optionally adds a ``Server-Timing`` header (when
+    ``SERVER_TIMING_ENABLED`` is set). When the request finishes, it logs a
+    warning for every statement fingerprint repeated at least
+    ``SQL_N_PLUS_ONE_THRESHOLD`` times, which usually indicates an N+1 loop,
+    and offers the request to the slow-request log.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        emit_header: bool = False,
+        n_plus_one_threshold: int = 5,
+        slow_requests: SlowRequestLog = slow_request_log,
+    ) -> None:
+        self.app = app
+        self.emit_header = emit_header
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self.slow_requests = slow_requests
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        token = start_request_stats()
+        stats = get_request_stats()
+        response = {"status": 500, "request_id": None}
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                for name, value in message.get("headers", ()):
+                    if name == _REQUEST_ID_HEADER:
+                        response["request_id"] = value.decode("latin-1")
+                        break
+                if self.emit_header:
+                    headers = MutableHeaders(scope=message)
+                    headers.append("Server-Timing", build_server_timing(stats))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            reset_request_stats(token)
+            self._check_repeated_statements(scope, stats)
+            duration = stats.elapsed
+            if duration >= self.slow_requests.threshold:
+                self.slow_requests.record(
+                    scope["method"], get_route_template(scope), response["status"], duration, stats,
+                    request_id=response["request_id"], trace_id=current_trace_id()
+                )
+
+    def _check_repeated_statements(self, scope: Scope, stats: RequestStats) -> None:
+        if self.n_plus_one_threshold <= 0:
+            return
+        repeated = stats.repeated_fingerprints(self.n_plus_one_threshold)
+        if not repeated:
+            return
+        route = get_route_template(scope)
+        SQL_REPEATED_STATEMENT_WARNINGS.labels(route).inc()
+        logger.warning(
+            # Route templates contain braces, so keep them out of the (formatted) message
+            "Possible N+1 query pattern detected",
+            event_type="sql_n_plus_one_suspected",
+            route=route,
+            method=scope["method"],
+            total_statements=stats.db_statements,
+            repeated={
+                fingerprint: {"count": count, "sql": stats.fingerprint_sql[fingerprint][:500]}
+                for fingerprint, count in repeated.items()
+            }
+        )
+
+
+def setup_server_timing_middleware(app) -> None:
+    """
+    Setup the server timing middleware on the FastAPI app.
+
+    Args:
+        app: The FastAPI application instance.
+    """
+    app.add_middleware(
+        ServerTimingMiddleware,
+        emit_header=settings.SERVER_TIMING_ENABLED,
+        n_plus_one_threshold=settings.SQL_N_PLUS_ONE_THRESHOLD,
+    )
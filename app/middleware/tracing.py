@@ -0,0 +1,75 @@
+"""Tracing middleware: continues W3C trace context and opens the server span."""
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.tracing import (
+    TRACEPARENT_HEADER,
+    TRACERESPONSE_HEADER,
+    SpanKind,
+    StatusCode,
+    Tracer,
+    parse_traceparent,
+    tracer as default_tracer,
+)
+from app.middleware.metrics import get_route_template
+
+_TRACEPARENT_HEADER_BYTES = TRACEPARENT_HEADER.encode("latin-1")
+
+
+class TracingMiddleware:
+    """
+    Pure ASGI middleware opening a ``SERVER`` span around each HTTP request.
+
+    The span continues the caller's trace when a valid ``traceparent``
+    header is present. It is renamed to ``<METHOD> <route template>`` once
+    routing has happened. The response carries a ``traceresponse`` header
+    so callers can look the trace up.
+    """
+
+    def __init__(self, app: ASGIApp, tracer: Tracer = default_tracer) -> None:
+        self.app = app
+        self.tracer = tracer
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self.tracer.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        parent = None
+        for name, value in scope["headers"]:
+            if name == _TRACEPARENT_HEADER_BYTES:
+                parent = parse_traceparent(value.decode("latin-1"))
+                break
+
+        method = scope["method"]
+        with self.tracer.span(f"{method} {scope['path']}", kind=SpanKind.SERVER, parent=parent) as span:
+            span.set_attribute("http.request.method", method)
+            span.set_attribute("url.path", scope["path"])
+
+            async def send_wrapper(message: Message) -> None:
+                if message["type"] == "http.response.start":
+                    status_code = message["status"]
+                    span.set_attribute("http.response.status_code", status_code)
+                    if status_code >= 500:
+                        span.status_code = StatusCode.ERROR
+                    headers = MutableHeaders(scope=message)
+                    headers.append(TRACERESPONSE_HEADER, span.traceparent)
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                route = get_route_template(scope)
+                span.name = f"{method} {route}"
+                span.set_attribute("http.route", route)
+
+
+def setup_tracing_middleware(app) -> None:
+    """
+    Setup the tracing middleware on the FastAPI app.
+
+    Args:
+        app: The FastAPI application instance.
+    """
+    app.add_middleware(TracingMiddleware)
@@ -1,8 +1,9 @@
 # app/models/__init__.py
 from app.models.user import User
 from app.models.plan import Plan, Subscription, UsedTrialCardFingerprint
-from app.models.credit import UserCredit, CreditTransaction, TransactionType
+from app.models.credit import UserCredit, CreditTransaction, TransactionType, CreditReservation, ReservationStatus, UserCreditShard
 from app.models.processed_event import ProcessedStripeEvent # New import
+from app.models.idempotency import IdempotencyKey
 
 __all__ = [
     'User',
@@ -12,5 +13,9 @@ __all__ = [
     'UserCredit',
     'CreditTransaction',
     'TransactionType',
-    'ProcessedStripeEvent' # New export
+    'CreditReservation',
+    'ReservationStatus',
+    'UserCreditShard',
+    'ProcessedStripeEvent', # New export
+    'IdempotencyKey'
     ]
\ No newline at end of file
@@ -3,7 +3,7 @@
 from datetime import datetime, UTC
 from decimal import Decimal
 from enum import Enum
-from sqlalchemy import Column, Integer, String, Numeric, ForeignKey, DateTime, Text
+from sqlalchemy import Column, Integer, String, Numeric, ForeignKey, DateTime, Text, Index, UniqueConstraint, event
 from sqlalchemy.orm import relationship
 
 from app.core.base_model import Base # Import from new location
@@ -20,6 +20,14 @@ class TransactionType(str, Enum):
     TRIAL_CREDIT_GRANT = "trial_credit_grant" # For the initial 10 free trial credits (FR-3)
 
 
+class ReservationStatus(str, Enum):
+    """Lifecycle of a credit reservation; only HELD counts against the balance."""
+    HELD = "held"
+    CAPTURED = "captured"
+    RELEASED = "released"
+    EXPIRED = "expired"
+
+
 class UserCredit(Base):
     """User credit balance model."""
     __tablename__ = "user_credits"
@@ -27,6 +35,12 @@ class UserCredit(Base):
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), unique=True, nullable=False)
     balance = Column(Numeric(10, 2), nullable=False, default=Decimal('0.00'))
+    # Number of the user's credit_transactions rows, maintained on insert/delete (see below)
+    transaction_count = Column(Integer, nullable=False, default=0, server_default='0')
+    # Sum of the user's held reservations; the spendable balance is balance - reserved_balance
+    reserved_balance = Column(Numeric(10, 2), nullable=False, default=Decimal('0.00'), server_default='0')
+    # Number of user_credit_shards rows debits are spread over; 0 keeps everything on this row
+    shard_count = Column(Integer, nullable=False, default=0, server_default='0')
     created_at = Column(DateTime(timezone=True), nullable=False, default=lambda: datetime.now(UTC))
     updated_at = Column(DateTime(timezone=True), nullable=False, default=lambda: datetime.now(UTC))
 
@@ -35,8 +49,40 @@ class UserCredit(Base):
     transactions = relationship("CreditTransaction", back_populates="user_credit", cascade="all, delete-orphan")
 
 
+class UserCreditShard(Base):
+    """One slice of a hot account's balance (see ``app.services.credit.shards``).
+
+    With ``UserCredit.shard_count`` above 0, debits go to a random shard, so
+    concurrent debits of one user lock different rows. The user's balance is
+    ``UserCredit.balance`` plus every shard's ``balance``; the same goes for
+    ``transaction_count``. Rebalancing folds shards back into the
+    ``UserCredit`` row and splits the spendable part evenly again.
+    """
+    __tablename__ = "user_credit_shards"
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    user_credit_id = Column(Integer, ForeignKey("user_credits.id"), nullable=False)
+    shard_no = Column(Integer, nullable=False)
+    balance = Column(Numeric(10, 2), nullable=False, default=Decimal('0.00'), server_default='0')
+    # Ledger rows written against this shard since the last fold
+    transaction_count = Column(Integer, nullable=False, default=0, server_default='0')
+    updated_at = Column(DateTime(timezone=True), nullable=False, default=lambda: datetime.now(UTC))
+
+    __table_args__ = (
+        UniqueConstraint('user_id', 'shard_no', name='uq_user_credit_shards_user_id_shard_no'),
+    )
+
+
 class CreditTransaction(Base):
-    """Credit transaction model."""
+    """Credit transaction model.
+
+    On Postgres the table is range-partitioned by month on ``created_at``
+    (migration ``9c4e1a7b2d58``, maintained by ``app.core.partitions``), with
+    primary key ``(id, created_at)``. The mapping keeps ``id`` alone as the
+    identity since ids stay unique through the sequence; ``create_all`` builds
+    a plain table, which behaves the same.
+    """
     __tablename__ = "credit_transactions"
 
     id = Column(Integer, primary_key=True, index=True)
@@ -44,7 +90,7 @@ class CreditTransaction(Base):
     user_credit_id = Column(Integer, ForeignKey("user_credits.id"), nullable=False)
     amount = Column(Numeric(10, 2), nullable=False)
     transaction_type = Column(String(20), nullable=False)
-    reference_id = Column(String(100))
+    reference_id = Column(String(100), index=True)  # Duplicate-payment checks
     description = Column(Text)
     created_at = Column(DateTime(timezone=True), nullable=False, default=lambda: datetime.now(UTC))
     
@@ -52,8 +98,66 @@ class CreditTransaction(Base):
     plan_id = Column(Integer, ForeignKey("plans.id"), nullable=True)
     subscription_id = Column(Integer, ForeignKey("subscriptions.id"), nullable=True)
 
+    __table_args__ = (
+        # History pages (keyset on created_at, id) and trial-eligibility checks: a user's transactions, newest first
+        Index('ix_credit_transactions_user_id_created_at_id', user_id, created_at.desc(), id.desc()),
+    )
+
     # Relationships
     user = relationship("User", back_populates="credit_transactions")
     user_credit = relationship("UserCredit", back_populates="transactions")
     plan = relationship("Plan", foreign_keys=[plan_id])
-    subscription = relationship("Subscription", foreign_keys=[subscription_id])
\ No newline at end of file
+    subscription = relationship("Subscription", foreign_keys=[subscription_id])
+
+
+class CreditReservation(Base):
+    """A hold on part of a user's balance, captured or released later.
+
+    While ``status`` is ``held`` the amount is counted in
+    ``UserCredit.reserved_balance``; capturing writes the ledger entry for the
+    captured part. Holds past ``expires_at`` are released in bulk by
+    ``app.services.credit.reservations.sweep_expired_reservations``.
+    """
+    __tablename__ = "credit_reservations"
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    user_credit_id = Column(Integer, ForeignKey("user_credits.id"), nullable=False)
+    amount = Column(Numeric(10, 2), nullable=False)
+    captured_amount = Column(Numeric(10, 2), nullable=True)
+    status = Column(String(20), nullable=False, default=ReservationStatus.HELD, server_default=ReservationStatus.HELD.value)
+    reference_id = Column(String(100), nullable=True)
+    description = Column(Text, nullable=True)
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+    created_at = Column(DateTime(timezone=True), nullable=False, default=lambda: datetime.now(UTC))
+    settled_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        # The expiry sweep only looks at open holds
+        Index(
+            'ix_credit_reservations_held_expires_at', expires_at,
+            postgresql_where=status == ReservationStatus.HELD.value,
+            sqlite_where=status == ReservationStatus.HELD.value,
+        ),
+        Index('ix_credit_reservations_user_id_created_at', user_id, created_at.desc()),
+    )
+
+
+def _adjust_transaction_count(connection, user_id: int, delta: int) -> None:
+    user_credits = UserCredit.__table__
+    connection.execute(
+        user_credits.update()
+        .where(user_credits.c.user_id == user_id)
+        .values(transaction_count=user_credits.c.transaction_count + delta)
+    )
+
+
+@event.listens_for(CreditTransaction, "after_insert")
+def _count_inserted_transaction(mapper, connection, target) -> None:
+    """Keep UserCredit.transaction_count in step with the ledger, in the same transaction."""
+    _adjust_transaction_count(connection, target.user_id, 1)
+
+
+@event.listens_for(CreditTransaction, "after_delete")
+def _count_deleted_transaction(mapper, connection, target) -> None:
+    _adjust_transaction_count(connection, target.user_id, -1)
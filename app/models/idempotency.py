@@ -0,0 +1,30 @@
+from sqlalchemy import Column, DateTime, Integer, LargeBinary, String
+
+from app.core.base_model import Base
+
+
+class IdempotencyKey(Base):
+    """
+    A caller's ``Idempotency-Key`` for one endpoint and the response it got.
+
+    ``caller`` is a digest of the caller's identity, so two callers that
+    pick the same key never share it.
+
+    ``status_code`` is NULL while the first request with the key is still
+    running; ``claim_token`` identifies that request's claim. The row is purged after ``expires_at``.
+    """
+    __tablename__ = "idempotency_keys"
+
+    key = Column(String(255), primary_key=True)
+    endpoint = Column(String(100), primary_key=True)
+    caller = Column(String(64), primary_key=True)
+    request_hash = Column(String(64), nullable=False)
+    claim_token = Column(String(32), nullable=False)
+    status_code = Column(Integer, nullable=True)
+    content_type = Column(String(100), nullable=True)
+    response_body = Column(LargeBinary, nullable=True)
+    created_at = Column(DateTime(timezone=True), nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+
+    def __repr__(self):
+        return f"<IdempotencyKey(endpoint='{self.endpoint}', key='{self.key}', status_code={self.status_code})>"
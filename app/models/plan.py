@@ -79,7 +79,7 @@ class Subscription(Base):
     updated_at = Column(DateTime(timezone=True), nullable=False, default=lambda: datetime.now(UTC), onupdate=lambda: datetime.now(UTC))
     
     # Stripe integration
-    stripe_subscription_id = Column(String(100), nullable=True)
+    stripe_subscription_id = Column(String(100), nullable=True, index=True)  # Webhook lookups
     stripe_customer_id = Column(String(100), nullable=True)
     stripe_price_id = Column(String(100), nullable=True)
     
@@ -90,6 +90,10 @@ class Subscription(Base):
     cancel_at_period_end = Column(Boolean, default=False, nullable=False)
     canceled_at = Column(DateTime(timezone=True), nullable=True)
     
+    __table_args__ = (
+        Index('ix_subscriptions_user_id_status', 'user_id', 'status'),  # A user's subscriptions by status
+    )
+
     # Relationships
     user = relationship("User", back_populates="subscriptions")
     plan = relationship("Plan", back_populates="subscriptions")
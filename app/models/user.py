@@ -34,7 +34,7 @@ class User(Base):
     is_verified = Column(Boolean, default=False, nullable=False)
     verification_token = Column(String(255), nullable=True)
     verification_token_expires_at = Column(DateTime(timezone=True), nullable=True)
-    stripe_customer_id = Column(String(100), nullable=True)
+    stripe_customer_id = Column(String(100), nullable=True, index=True)  # Webhooks map customers to users
     created_at = Column(DateTime(timezone=True), nullable=False, default=lambda: datetime.now(UTC))
     updated_at = Column(DateTime(timezone=True), nullable=False, default=lambda: datetime.now(UTC), onupdate=lambda: datetime.now(UTC)) # Also adding updated_at for good practice
 
@@ -6,16 +6,15 @@ from typing import Dict, Any, Optional
 from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks, Request
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
 
-from app.core.database import get_db
+from app.core.database import get_db, get_read_db
 from app.core.config import settings
 from app.core.exceptions import UserAlreadyExistsError, UserNotFoundError, InvalidCredentialsError
 from app.core.security import create_access_token
 from app.core.auth import get_internal_service
+from app.core.hot_queries import get_user_row_by_email, get_user_row_by_id
 from app.schemas.auth_schemas import LoginRequest, Token, UserCreate, UserResponse, RegistrationResponse
 from app.services.user_service import UserService
-from app.models.user import User
 from app.log.logging import logger
 from app.middleware.rate_limit import limiter
 
@@ -163,7 +162,7 @@ async def register_user(
 async def get_user_details(
         email: str,
         service_id: str = Depends(get_internal_service),
-        db: AsyncSession = Depends(get_db)
+        db: AsyncSession = Depends(get_read_db)
 ) -> UserResponse:
     """
     Retrieve user details by email.
@@ -172,8 +171,7 @@ async def get_user_details(
     Requires a valid INTERNAL_API_KEY header.
     """
     try:
-        user_service = UserService(db)
-        user = await user_service.get_user_by_email(email)
+        user = await get_user_row_by_email(db, email)
         logger.info(
             "User details retrieved",
             event_type="internal_endpoint_access",
@@ -218,7 +216,7 @@ async def get_user_details(
 async def get_email_by_user_id(
     user_id: int,
     service_id: str = Depends(get_internal_service),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ) -> Dict[str, str]:
     """
     Get user's email by user ID.
@@ -228,8 +226,7 @@ async def get_email_by_user_id(
     """
     logger.info("Starting email retrieval by user_id")
     try:
-        result = await db.execute(select(User).where(User.id == user_id))
-        user = result.scalar_one_or_none()
+        user = await get_user_row_by_id(db, user_id)
         if not user:
             logger.warning(
                 "Email retrieval failed - user not found",
@@ -6,7 +6,7 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import timedelta, datetime, timezone
 
-from app.core.database import get_db
+from app.core.database import get_db, get_read_db
 from app.core.security import create_access_token
 from app.schemas.auth_schemas import (
     RefreshToken,
@@ -75,7 +75,7 @@ async def get_current_user_profile(
 )
 async def get_user_status(
     current_user: User = Depends(get_current_active_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ) -> UserStatusResponse:
     """
     Fetches the current authenticated user's account status, 
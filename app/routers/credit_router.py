@@ -1,5 +1,6 @@
 """Router for credit-related endpoints."""
 
+import json
 from decimal import Decimal
 from datetime import datetime, UTC
 from typing import Optional, List, Dict, Any
@@ -7,7 +8,8 @@ from typing import Optional, List, Dict, Any
 from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks, Request, Header
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.database import get_db
+from app.core.config import settings
+from app.core.database import TrafficClass, get_db, get_read_db, traffic_class
 from app.core.auth import get_internal_service, get_current_user
 from app.models.user import User
 from app.schemas.credit_schemas import (
@@ -15,7 +17,12 @@ from app.schemas.credit_schemas import (
     TransactionHistoryResponse,
     CreditBalanceResponse,
     UseCreditRequest as CreditsUseRequest,
-    AddCreditRequest as CreditsAddRequest
+    AddCreditRequest as CreditsAddRequest,
+    ReservationCreateRequest,
+    ReservationCaptureRequest,
+    ReservationResponse,
+    ShardCountRequest,
+    UsageBatchResponse
 )
 from app.schemas.stripe_schemas import (
     StripeTransactionRequest,
@@ -30,17 +37,20 @@ from app.log.logging import logger
 
 router = APIRouter(prefix="/credits", tags=["credits"])
 
+# Internal API-key endpoints run on the internal pool, away from user-facing traffic
+_internal_traffic = [Depends(traffic_class(TrafficClass.INTERNAL))]
+
 # Import schemas needed for subscription cancellation
 from app.schemas.credit_schemas import (
     SubscriptionCancellationRequest,
     SubscriptionCancellationResponse
 )
 
-@router.get("/balance", response_model=CreditBalanceResponse)
+@router.get("/balance", response_model=CreditBalanceResponse, dependencies=_internal_traffic)
 async def get_credit_balance(
     user_id: int,
     _: str = Depends(get_internal_service),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     Get user's credit balance.
@@ -60,7 +70,32 @@ async def get_credit_balance(
 
 
 
-@router.post("/use", response_model=TransactionResponse)
+@router.put("/shards", response_model=CreditBalanceResponse, dependencies=_internal_traffic)
+async def set_credit_shards(
+    user_id: int,
+    request: ShardCountRequest,
+    _: str = Depends(get_internal_service),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Spread a user's spendable balance over shard rows, so concurrent debits
+    of a hot shared account do not queue on one row lock.
+
+    This endpoint is restricted to internal service access only.
+
+    Args:
+        user_id: ID of the user
+        request: Number of shards (0 turns sharding off)
+        _: Internal service identifier (from API key auth)
+        db: Database session
+
+    Returns:
+        CreditBalanceResponse: The balance after rebalancing
+    """
+    return await CreditService(db).set_shard_count(user_id=user_id, shard_count=request.shard_count)
+
+
+@router.post("/use", response_model=TransactionResponse, dependencies=_internal_traffic)
 async def use_credits(
     request: CreditsUseRequest,
     user_id: int,
@@ -99,7 +134,217 @@ async def use_credits(
         )
 
 
-@router.post("/add", response_model=TransactionResponse)
+_NDJSON_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl", "application/x-jsonlines")
+
+
+def _too_many_records() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"A usage batch holds at most {settings.CREDIT_USAGE_BATCH_MAX_RECORDS} records"
+    )
+
+
+def _parse_usage_line(line: bytes) -> Any:
+    # An unparsable line stays in the batch as a string, to be reported as invalid
+    try:
+        return json.loads(line, parse_float=Decimal)
+    except ValueError:
+        return line.decode("utf-8", "replace")
+
+
+async def _read_usage_records(request: Request) -> List[Any]:
+    """Read a usage batch: a JSON array, or one JSON object per line for NDJSON content types."""
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if content_type not in _NDJSON_TYPES:
+        try:
+            records = json.loads(await request.body(), parse_float=Decimal)
+        except ValueError:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Body is not valid JSON")
+        if not isinstance(records, list):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Body must be a JSON array")
+        if len(records) > settings.CREDIT_USAGE_BATCH_MAX_RECORDS:
+            raise _too_many_records()
+        return records
+
+    # NDJSON is parsed as it arrives, and refused as soon as it exceeds the limit
+    records = []
+    pending = b""
+    async for chunk in request.stream():
+        *lines, pending = (pending + chunk).split(b"\n")
+        records.extend(_parse_usage_line(line) for line in lines if line.strip())
+        if len(records) > settings.CREDIT_USAGE_BATCH_MAX_RECORDS:
+            raise _too_many_records()
+    if pending.strip():
+        records.append(_parse_usage_line(pending))
+    if len(records) > settings.CREDIT_USAGE_BATCH_MAX_RECORDS:
+        raise _too_many_records()
+    return records
+
+
+@router.post("/usage/batch", response_model=UsageBatchResponse, dependencies=_internal_traffic)
+async def ingest_usage_batch(
+    request: Request,
+    _: str = Depends(get_internal_service),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Debit a batch of metered usage records in one transaction.
+
+    The body is a JSON array of ``{"user_id", "amount", "reference_id",
+    "description"}`` records, or the same records as NDJSON (one per line,
+    ``Content-Type: application/x-ndjson``). Records are applied in order
+    while each user's spendable balance covers them. Records over the
+    balance, with a reference already used by that user, or that do not
+    validate are rejected individually; the rest of the batch still applies.
+
+    This endpoint is restricted to internal service access only.
+
+    Args:
+        request: The request carrying the batch
+        _: Internal service identifier (from API key auth)
+        db: Database session
+
+    Returns:
+        UsageBatchResponse: Per-record results in request order and the new balances
+
+    Raises:
+        HTTPException: 400 if the body is not a JSON array or NDJSON, 413 if it
+            holds more than CREDIT_USAGE_BATCH_MAX_RECORDS records
+    """
+    records = await _read_usage_records(request)
+    return await CreditService(db).ingest_usage(records)
+
+
+async def _hold_credits(db: AsyncSession, user_id: int, request: ReservationCreateRequest) -> ReservationResponse:
+    try:
+        return await CreditService(db).hold_credits(
+            user_id=user_id,
+            amount=request.amount,
+            ttl_seconds=request.ttl_seconds,
+            reference_id=request.reference_id,
+            description=request.description
+        )
+    except InsufficientCreditsError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+
+@router.post("/reservations", response_model=ReservationResponse, status_code=status.HTTP_201_CREATED,
+             dependencies=_internal_traffic)
+async def hold_credits(
+    request: ReservationCreateRequest,
+    user_id: int,
+    _: str = Depends(get_internal_service),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Hold credits for work that has not finished yet.
+
+    The held amount stops counting as spendable right away, so concurrent jobs
+    cannot overspend; capture it when the work is done or release it if the
+    work is abandoned. Holds not settled within ``ttl_seconds`` are released
+    automatically.
+
+    This endpoint is restricted to internal service access only.
+
+    Args:
+        request: Amount, lifetime and reference of the hold
+        user_id: ID of the user to hold credits for
+        _: Internal service identifier (from API key auth)
+        db: Database session
+
+    Returns:
+        ReservationResponse: The reservation and the spendable balance left
+
+    Raises:
+        HTTPException: 400 if the spendable balance is insufficient
+    """
+    return await _hold_credits(db, user_id, request)
+
+
+@router.post("/reservations/{reservation_id}/capture", response_model=ReservationResponse,
+             dependencies=_internal_traffic)
+async def capture_reservation(
+    reservation_id: int,
+    user_id: int,
+    request: Optional[ReservationCaptureRequest] = None,
+    _: str = Depends(get_internal_service),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Spend all or part of a held reservation; the rest is released.
+
+    This endpoint is restricted to internal service access only.
+
+    Args:
+        reservation_id: ID of the reservation
+        user_id: ID of the user owning the reservation
+        request: Amount to spend (the whole hold if omitted)
+        _: Internal service identifier (from API key auth)
+        db: Database session
+
+    Returns:
+        ReservationResponse: The captured reservation and its transaction ID
+    """
+    return await CreditService(db).capture_reservation(
+        user_id=user_id,
+        reservation_id=reservation_id,
+        amount=request.amount if request else None
+    )
+
+
+@router.post("/reservations/{reservation_id}/release", response_model=ReservationResponse,
+             dependencies=_internal_traffic)
+async def release_reservation(
+    reservation_id: int,
+    user_id: int,
+    _: str = Depends(get_internal_service),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Release a held reservation back to the spendable balance.
+
+    This endpoint is restricted to internal service access only.
+
+    Args:
+        reservation_id: ID of the reservation
+        user_id: ID of the user owning the reservation
+        _: Internal service identifier (from API key auth)
+        db: Database session
+
+    Returns:
+        ReservationResponse: The released reservation
+    """
+    return await CreditService(db).release_reservation(user_id=user_id, reservation_id=reservation_id)
+
+
+@router.get("/reservations/{reservation_id}", response_model=ReservationResponse, dependencies=_internal_traffic)
+async def get_reservation(
+    reservation_id: int,
+    user_id: int,
+    _: str = Depends(get_internal_service),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Get a reservation.
+
+    This endpoint is restricted to internal service access only.
+
+    Args:
+        reservation_id: ID of the reservation
+        user_id: ID of the user owning the reservation
+        _: Internal service identifier (from API key auth)
+        db: Database session
+
+    Returns:
+        ReservationResponse: The reservation
+    """
+    return await CreditService(db).get_reservation(user_id=user_id, reservation_id=reservation_id)
+
+
+@router.post("/add", response_model=TransactionResponse, dependencies=_internal_traffic)
 async def add_credits(
     request: CreditsAddRequest,
     user_id: int,
@@ -214,13 +459,16 @@ async def add_credits(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error adding credits: {str(e)}"
         )
-@router.get("/transactions", response_model=TransactionHistoryResponse)
+@router.get("/transactions", response_model=TransactionHistoryResponse, dependencies=_internal_traffic)
 async def get_transaction_history(
     user_id: int,
     skip: int = 0,
     limit: int = 50,
+    cursor: Optional[str] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
     _: str = Depends(get_internal_service),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     Get user's transaction history.
@@ -229,8 +477,11 @@ async def get_transaction_history(
     
     Args:
         user_id: ID of the user to get transaction history for
-        skip: Number of records to skip
+        skip: Number of records to skip (offset paging; ignored with a cursor)
         limit: Maximum number of records to return
+        cursor: `next_cursor` from the previous page (keyset paging)
+        start_date: Only transactions created at or after this time
+        end_date: Only transactions created before this time
         _: Internal service identifier (from API key auth)
         db: Database session
         
@@ -241,22 +492,16 @@ async def get_transaction_history(
     response = await credit_service.get_transaction_history(
         user_id=user_id,
         skip=skip,
-        limit=limit
+        limit=limit,
+        cursor=cursor,
+        start_date=start_date,
+        end_date=end_date
     )
 
-    for tx in response.transactions:
-        if tx.subscription_id:
-            subscription = await credit_service.get_subscription_by_id(tx.subscription_id)
-            tx.is_subscription_active = subscription and (subscription.status == "active")
-        else:
-            tx.is_subscription_active = None
-
     logger.debug(
-        "Transaction history response payload for user_id {log_user_id}: {payload_json}",
-        log_user_id=user_id,
-        payload_json=response.model_dump_json(indent=2),
+        "Transaction history response built",
         event_type="transaction_history_response_payload",
-        user_id=user_id, # For structured logging
+        user_id=user_id,
         payload_length=len(response.transactions)
     )
 
@@ -266,8 +511,11 @@ async def get_transaction_history(
 async def get_user_transaction_history(
     skip: int = 0,
     limit: int = 50,
+    cursor: Optional[str] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     Get transaction history for the authenticated user.
@@ -275,8 +523,11 @@ async def get_user_transaction_history(
     This endpoint is accessible to authenticated users to view their own transaction history.
     
     Args:
-        skip: Number of records to skip
+        skip: Number of records to skip (offset paging; ignored with a cursor)
         limit: Maximum number of records to return
+        cursor: `next_cursor` from the previous page (keyset paging)
+        start_date: Only transactions created at or after this time
+        end_date: Only transactions created before this time
         current_user: Authenticated user (from JWT token)
         db: Database session
         
@@ -299,7 +550,10 @@ async def get_user_transaction_history(
     response = await credit_service.get_transaction_history(
         user_id=current_user.id,
         skip=skip,
-        limit=limit
+        limit=limit,
+        cursor=cursor,
+        start_date=start_date,
+        end_date=end_date
     )
     
     # Log response details for debugging
@@ -313,7 +567,93 @@ async def get_user_transaction_history(
     return response
 
 
-@router.post("/stripe/add", response_model=StripeTransactionResponse)
+@router.post("/user/reservations", response_model=ReservationResponse, status_code=status.HTTP_201_CREATED)
+async def hold_own_credits(
+    request: ReservationCreateRequest,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Hold credits of the authenticated user.
+
+    Args:
+        request: Amount, lifetime and reference of the hold
+        current_user: Authenticated user (from JWT token)
+        db: Database session
+
+    Returns:
+        ReservationResponse: The reservation and the spendable balance left
+    """
+    return await _hold_credits(db, current_user.id, request)
+
+
+@router.post("/user/reservations/{reservation_id}/capture", response_model=ReservationResponse)
+async def capture_own_reservation(
+    reservation_id: int,
+    request: Optional[ReservationCaptureRequest] = None,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Spend all or part of one of the authenticated user's reservations.
+
+    Args:
+        reservation_id: ID of the reservation
+        request: Amount to spend (the whole hold if omitted)
+        current_user: Authenticated user (from JWT token)
+        db: Database session
+
+    Returns:
+        ReservationResponse: The captured reservation and its transaction ID
+    """
+    return await CreditService(db).capture_reservation(
+        user_id=current_user.id,
+        reservation_id=reservation_id,
+        amount=request.amount if request else None
+    )
+
+
+@router.post("/user/reservations/{reservation_id}/release", response_model=ReservationResponse)
+async def release_own_reservation(
+    reservation_id: int,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Release one of the authenticated user's reservations.
+
+    Args:
+        reservation_id: ID of the reservation
+        current_user: Authenticated user (from JWT token)
+        db: Database session
+
+    Returns:
+        ReservationResponse: The released reservation
+    """
+    return await CreditService(db).release_reservation(user_id=current_user.id, reservation_id=reservation_id)
+
+
+@router.get("/user/reservations/{reservation_id}", response_model=ReservationResponse)
+async def get_own_reservation(
+    reservation_id: int,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Get one of the authenticated user's reservations.
+
+    Args:
+        reservation_id: ID of the reservation
+        current_user: Authenticated user (from JWT token)
+        db: Database session
+
+    Returns:
+        ReservationResponse: The reservation
+    """
+    return await CreditService(db).get_reservation(user_id=current_user.id, reservation_id=reservation_id)
+
+
+@router.post("/stripe/add", response_model=StripeTransactionResponse, dependencies=_internal_traffic)
 async def add_credits_from_stripe(
     request: StripeTransactionRequest,
     user_id: int,
@@ -0,0 +1,342 @@
+"""Internal diagnostics endpoints for live workers (CPU and memory profiling)."""
+
+import asyncio
+from typing import Any, Dict, List, Literal, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import JSONResponse, PlainTextResponse, Response
+
+from app.core.auth import get_internal_service
+from app.core.database import TrafficClass, traffic_class
+from app.core.memory_profiler import memory_tracker, sample_memory
+from app.core.profiler import SamplingProfiler
+from app.core.slow_requests import slow_request_log
+from app.core.slow_queries import slow_query_log
+from app.log.logging import logger
+from app.middleware.rate_limit import limiter
+
+router = APIRouter(
+    prefix="/internal/diagnostics",
+    tags=["Internal"],
+    dependencies=[Depends(traffic_class(TrafficClass.INTERNAL))]
+)
+
+# Requests are cut off by the timeout middleware after 30s
+MAX_PROFILE_SECONDS = 20.0
+
+# Only one profiling run per worker at a time
+_profile_lock = asyncio.Lock()
+
+
+@router.get(
+    "/profile",
+    include_in_schema=False,
+    description="Run a sampling profiler on this worker and return the aggregated stacks",
+)
+@limiter.exempt
+async def profile_worker(
+    request: Request,
+    seconds: float = Query(5.0, gt=0, le=MAX_PROFILE_SECONDS, description="How long to sample"),
+    interval_ms: float = Query(5.0, ge=1, le=100, description="Sampling interval in milliseconds"),
+    mode: Literal["cpu", "tasks"] = Query("cpu", description="cpu: loop thread stacks; tasks: await chains of all tasks"),
+    format: Literal["collapsed", "speedscope"] = Query("collapsed", description="Output format"),
+    match: Optional[str] = Query(None, description="Keep only stacks with a function or file containing this text"),
+    service_id: str = Depends(get_internal_service),
+) -> Response:
+    """
+    Profile the worker that serves this request.
+
+    The profile covers whatever the worker runs while sampling, so send load
+    (or wait for production traffic) to the routes of interest meanwhile and
+    use ``match`` to focus on a handler such as ``login`` or ``use_credits``.
+
+    Args:
+        request: FastAPI request object
+        seconds: Sampling duration
+        interval_ms: Sampling interval in milliseconds
+        mode: ``cpu`` or ``tasks``
+        format: ``collapsed`` (text) or ``speedscope`` (JSON)
+        match: Optional stack filter
+        service_id: Internal service identifier (from API key auth)
+
+    Returns:
+        Response: Collapsed stacks as text/plain, or speedscope JSON
+
+    Raises:
+        HTTPException: 409 if a profile is already running on this worker
+    """
+    if _profile_lock.locked():
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="A profile is already running on this worker"
+        )
+
+    async with _profile_lock:
+        logger.info(
+            "Starting sampling profiler",
+            event_type="profiler_started",
+            mode=mode,
+            seconds=seconds,
+            interval_ms=interval_ms,
+            service_id=service_id
+        )
+        profiler = SamplingProfiler(interval=interval_ms / 1000, mode=mode)
+        result = (await profiler.profile(seconds)).filter(match)
+
+    logger.info(
+        "Sampling profiler finished",
+        event_type="profiler_finished",
+        mode=mode,
+        samples=result.sample_count,
+        idle_samples=result.idle_samples,
+        duration=round(result.duration, 3)
+    )
+
+    headers = {
+        "X-Profile-Samples": str(result.sample_count),
+        "X-Profile-Idle-Samples": str(result.idle_samples),
+    }
+    if format == "speedscope":
+        return JSONResponse(content=result.to_speedscope(), headers=headers)
+    return PlainTextResponse(content=result.to_collapsed(), headers=headers)
+
+
+@router.get("/memory", include_in_schema=False, description="Worker memory and tracemalloc status")
+@limiter.exempt
+async def memory_status(
+    request: Request,
+    service_id: str = Depends(get_internal_service),
+) -> Dict[str, Any]:
+    """
+    Report RSS, GC state and whether tracemalloc is tracing on this worker.
+
+    Args:
+        request: FastAPI request object
+        service_id: Internal service identifier (from API key auth)
+
+    Returns:
+        Dict[str, Any]: Memory status
+    """
+    status_info = memory_tracker.status()
+    status_info["gc_objects"] = sample_memory()["gc_objects"]
+    return status_info
+
+
+@router.post("/memory/start", include_in_schema=False, description="Start tracemalloc and take a baseline")
+@limiter.exempt
+async def start_memory_tracing(
+    request: Request,
+    frames: int = Query(25, ge=1, le=100, description="Frames kept per allocation"),
+    service_id: str = Depends(get_internal_service),
+) -> Dict[str, Any]:
+    """
+    Start tracemalloc on this worker and snapshot the heap as the baseline.
+
+    Tracing slows allocations down; stop it once the diff has been taken.
+
+    Args:
+        request: FastAPI request object
+        frames: Traceback depth per allocation (route attribution needs ~20+)
+        service_id: Internal service identifier (from API key auth)
+
+    Returns:
+        Dict[str, Any]: Memory status after starting
+    """
+    await asyncio.to_thread(memory_tracker.start, frames)
+    logger.warning(
+        "tracemalloc tracing started",
+        event_type="tracemalloc_started",
+        frames=frames,
+        service_id=service_id
+    )
+    return memory_tracker.status()
+
+
+@router.post("/memory/baseline", include_in_schema=False, description="Re-take the tracemalloc baseline")
+@limiter.exempt
+async def reset_memory_baseline(
+    request: Request,
+    service_id: str = Depends(get_internal_service),
+) -> Dict[str, Any]:
+    """
+    Replace the baseline snapshot with the current heap.
+
+    Args:
+        request: FastAPI request object
+        service_id: Internal service identifier (from API key auth)
+
+    Returns:
+        Dict[str, Any]: Memory status
+
+    Raises:
+        HTTPException: 409 if tracing is not running
+    """
+    _require_tracing()
+    await asyncio.to_thread(memory_tracker.reset_baseline)
+    return memory_tracker.status()
+
+
+@router.get("/memory/diff", include_in_schema=False, description="Heap growth since the baseline")
+@limiter.exempt
+async def memory_diff(
+    request: Request,
+    limit: int = Query(20, ge=1, le=200, description="Entries to return"),
+    group_by: Literal["lineno", "route"] = Query("lineno", description="Group growth by line or by route"),
+    service_id: str = Depends(get_internal_service),
+) -> Dict[str, Any]:
+    """
+    Diff the current heap against the baseline.
+
+    ``group_by=route`` attributes each allocation to the route whose handler
+    is in its traceback and lists that route's top allocation lines.
+
+    Args:
+        request: FastAPI request object
+        limit: Number of entries to return
+        group_by: ``lineno`` or ``route``
+        service_id: Internal service identifier (from API key auth)
+
+    Returns:
+        Dict[str, Any]: Status plus the growth entries
+
+    Raises:
+        HTTPException: 409 if tracing is not running
+    """
+    _require_tracing()
+    entries: List[Dict[str, Any]] = await asyncio.to_thread(
+        memory_tracker.diff, limit, group_by, request.app.routes
+    )
+    return {"status": memory_tracker.status(), "group_by": group_by, "entries": entries}
+
+
+@router.post("/memory/stop", include_in_schema=False, description="Stop tracemalloc")
+@limiter.exempt
+async def stop_memory_tracing(
+    request: Request,
+    service_id: str = Depends(get_internal_service),
+) -> Dict[str, Any]:
+    """
+    Stop tracemalloc on this worker and drop the baseline.
+
+    Args:
+        request: FastAPI request object
+        service_id: Internal service identifier (from API key auth)
+
+    Returns:
+        Dict[str, Any]: Memory status after stopping
+    """
+    memory_tracker.stop()
+    logger.info("tracemalloc tracing stopped", event_type="tracemalloc_stopped", service_id=service_id)
+    return memory_tracker.status()
+
+
+@router.get("/slow-requests", include_in_schema=False, description="Recent and slowest slow requests")
+@limiter.exempt
+async def slow_requests(
+    request: Request,
+    view: Literal["recent", "slowest", "both"] = Query("both", description="Which view to return"),
+    limit: int = Query(50, ge=1, le=1000, description="Entries per view"),
+    service_id: str = Depends(get_internal_service),
+) -> Dict[str, Any]:
+    """
+    Return this worker's slow-request log.
+
+    Each entry has route, status, total/db/outbound time, query count,
+    request id and trace id.
+
+    Args:
+        request: FastAPI request object
+        view: ``recent``, ``slowest`` or ``both``
+        limit: Maximum entries per view
+        service_id: Internal service identifier (from API key auth)
+
+    Returns:
+        Dict[str, Any]: Threshold, capacity and the requested views
+    """
+    result: Dict[str, Any] = {
+        "threshold_ms": slow_request_log.threshold * 1000,
+        "capacity": slow_request_log.capacity,
+    }
+    if view in ("recent", "both"):
+        result["recent"] = [entry.to_dict() for entry in slow_request_log.recent()[:limit]]
+    if view in ("slowest", "both"):
+        result["slowest"] = [entry.to_dict() for entry in slow_request_log.slowest()[:limit]]
+    return result
+
+
+@router.delete("/slow-requests", include_in_schema=False, description="Clear the slow-request log")
+@limiter.exempt
+async def clear_slow_requests(
+    request: Request,
+    service_id: str = Depends(get_internal_service),
+) -> Dict[str, Any]:
+    """
+    Drop all entries from this worker's slow-request log.
+
+    Args:
+        request: FastAPI request object
+        service_id: Internal service identifier (from API key auth)
+
+    Returns:
+        Dict[str, Any]: Confirmation
+    """
+    slow_request_log.clear()
+    return {"cleared": True}
+
+
+@router.get("/slow-queries", include_in_schema=False, description="Slow statements by fingerprint, with EXPLAIN")
+@limiter.exempt
+async def slow_queries(
+    request: Request,
+    order_by: Literal["total", "max", "count", "recent"] = Query("total", description="Sort order"),
+    limit: int = Query(50, ge=1, le=1000, description="Entries to return"),
+    service_id: str = Depends(get_internal_service),
+) -> Dict[str, Any]:
+    """
+    Return this worker's slow-query log.
+
+    Each entry aggregates one statement fingerprint: timings, bind-parameter
+    shapes, call sites and the captured EXPLAIN plan.
+
+    Args:
+        request: FastAPI request object
+        order_by: ``total``, ``max``, ``count`` or ``recent``
+        limit: Maximum entries to return
+        service_id: Internal service identifier (from API key auth)
+
+    Returns:
+        Dict[str, Any]: Threshold and entries
+    """
+    return {
+        "threshold_ms": slow_query_log.threshold * 1000,
+        "capacity": slow_query_log.capacity,
+        "entries": [entry.to_dict() for entry in slow_query_log.entries(order_by)[:limit]],
+    }
+
+
+@router.delete("/slow-queries", include_in_schema=False, description="Clear the slow-query log")
+@limiter.exempt
+async def clear_slow_queries(
+    request: Request,
+    service_id: str = Depends(get_internal_service),
+) -> Dict[str, Any]:
+    """
+    Drop all entries from this worker's slow-query log.
+
+    Args:
+        request: FastAPI request object
+        service_id: Internal service identifier (from API key auth)
+
+    Returns:
+        Dict[str, Any]: Confirmation
+    """
+    slow_query_log.clear()
+    return {"cleared": True}
+
+
+def _require_tracing() -> None:
+    if not memory_tracker.tracing:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="tracemalloc is not running on this worker; POST /internal/diagnostics/memory/start first"
+        )
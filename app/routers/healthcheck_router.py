@@ -7,7 +7,10 @@ from app.routers.healthchecks.fastapi_healthcheck import HealthCheckFactory, hea
 from app.routers.healthchecks.fastapi_healthcheck_sqlalchemy import HealthCheckSQLAlchemy
 from app.core.config import settings
 from app.log.logging import logger
-from app.core.database import check_db_health, get_db, _in_degraded_mode, _connection_error_count
+from app.core.circuit_breaker import CircuitState
+from app.core.database import (
+    TrafficClass, check_db_health, db_circuit_breaker, engine_for, replica_set, traffic_class
+)
 from app.schemas.health_schemas import (
     HealthCheckResponse, HealthStatus, ComponentHealth, ServiceStatus,
     ReadinessResponse, LivenessResponse
@@ -22,7 +25,8 @@ def set_shutdown_state(shutting_down: bool):
     global _is_shutting_down
     _is_shutting_down = shutting_down
 
-router = APIRouter(tags=["Health"])
+# Probes keep a dedicated connection so saturated request pools do not fail them
+router = APIRouter(tags=["Health"], dependencies=[Depends(traffic_class(TrafficClass.HEALTH))])
 
 # Track service start time for uptime calculation
 _service_start_time = time.time()
@@ -46,7 +50,7 @@ async def health_check(withlog: bool = False):
     _healthChecks = HealthCheckFactory()
     _healthChecks.add(
         HealthCheckSQLAlchemy(
-            connection_uri=settings.database_url,
+            engine=engine_for(TrafficClass.HEALTH),
             alias='postgres db',
             tags=('postgres', 'db', 'sql01')
         )
@@ -70,7 +74,7 @@ async def db_health_check():
     """
     Enhanced database health check endpoint that provides detailed status
     information about the database connection, including connection time,
-    error states, and degraded mode status.
+    error states, and the circuit breaker state.
 
     Returns:
         Dict[str, Any]: Detailed database health information
@@ -88,9 +92,10 @@ async def db_health_check():
         response = {
             **db_health,
             "check_time_ms": check_time_ms,
-            "service_state": "degraded" if _in_degraded_mode else "normal",
-            "recent_connection_errors": _connection_error_count,
+            "service_state": "normal" if db_circuit_breaker.state == CircuitState.CLOSED else "degraded",
         }
+        if replica_set:
+            response["replicas"] = replica_set.status()
 
         # Set response status code based on health status
         if db_health.get("status") == "healthy":
@@ -143,12 +148,13 @@ async def readiness_probe():
             event_type="readiness_shutdown"
         )
 
-    # Check database connectivity
+    # Check database connectivity (not contacted while the circuit breaker is open)
     try:
         db_health = await check_db_health()
         checks["database"] = db_health.get("status") == "healthy"
     except Exception:
         checks["database"] = False
+    checks["database_circuit"] = db_circuit_breaker.state != CircuitState.OPEN
 
     # Check configuration is valid
     checks["configuration"] = bool(settings.secret_key and settings.database_url)
@@ -229,7 +235,7 @@ async def full_health_check():
             status=db_status,
             response_time_ms=db_time,
             message=db_health.get("error") if db_status != ServiceStatus.UP else "Connection successful",
-            details={"in_degraded_mode": _in_degraded_mode, "error_count": _connection_error_count}
+            details={"circuit_breaker": db_circuit_breaker.snapshot()}
         ))
     except Exception as e:
         components.append(ComponentHealth(
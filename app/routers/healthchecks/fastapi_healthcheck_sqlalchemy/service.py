@@ -2,20 +2,19 @@ from app.routers.healthchecks.fastapi_healthcheck.service import HealthCheckBase
 from app.routers.healthchecks.fastapi_healthcheck.enum import HealthCheckStatusEnum
 from app.routers.healthchecks.fastapi_healthcheck.domain import HealthCheckInterface
 from typing import List
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
 from sqlalchemy import text
 from app.log.logging import logger
-from app.core.config import settings
 
 class HealthCheckSQLAlchemy(HealthCheckBase, HealthCheckInterface):
-    _connection_uri: str
+    _engine: AsyncEngine
     _tags: List[str]
 
-    def __init__(self, connection_uri: str, alias: str, tags: List[str]) -> None:
-        self._connection_uri = connection_uri
+    def __init__(self, engine: AsyncEngine, alias: str, tags: List[str]) -> None:
+        # Borrow a connection from the app's shared pool instead of opening a new one
+        self._engine = engine
         self._alias = alias
         self._tags = tags
-        self._engine = create_async_engine(self._connection_uri, future=True)
 
     async def __checkHealth__(self) -> HealthCheckStatusEnum:
         res = HealthCheckStatusEnum.UNHEALTHY
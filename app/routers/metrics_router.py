@@ -0,0 +1,27 @@
+"""Router exposing Prometheus metrics."""
+
+from fastapi import APIRouter, Depends, Request
+from fastapi.responses import Response
+
+from app.core.auth import get_internal_service
+from app.core.metrics import CONTENT_TYPE_LATEST, generate_latest
+from app.middleware.rate_limit import limiter
+
+router = APIRouter(tags=["Internal"])
+
+
+@router.get(
+    "/metrics",
+    include_in_schema=False,
+    description="Prometheus metrics for this worker (or all workers in multiprocess mode)",
+)
+@limiter.exempt
+async def metrics(request: Request, _: str = Depends(get_internal_service)) -> Response:
+    """
+    Prometheus scrape endpoint.
+
+    Not part of the public API documentation. Like the other internal
+    diagnostics it requires the internal ``api-key`` header, so the scrape
+    job must send it.
+    """
+    return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
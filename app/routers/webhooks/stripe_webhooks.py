@@ -3,7 +3,7 @@ from fastapi import APIRouter, Request, HTTPException, Header, Depends
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.config import settings
-from app.core.database import get_db
+from app.core.database import TrafficClass, get_db, traffic_class
 from app.log.logging import logger
 from app.services.webhook_service import WebhookService
 from app.schemas.webhook_schemas import (
@@ -12,7 +12,8 @@ from app.schemas.webhook_schemas import (
 )
 from app.schemas.error_schemas import ErrorResponse
 
-router = APIRouter()
+# Webhook bursts wait on their own pool instead of the interactive one
+router = APIRouter(dependencies=[Depends(traffic_class(TrafficClass.WEBHOOKS))])
 
 # Ensure Stripe API key and webhook secret are set
 if not settings.STRIPE_SECRET_KEY:
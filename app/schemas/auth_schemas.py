@@ -35,7 +35,7 @@ def validate_password_complexity(password: str) -> List[str]:
     if not re.search(r'\d', password):
         errors.append("Password must contain at least one digit")
 
-    if not re.search(r'[!@#$%^&*(),.?":{}|<>_\-+=\[\]\\\/`~;\'']', password):
+    if not re.search(r'[!@#$%^&*(),.?":{}|<>_\-+=\[\]\\\/`~;\']', password):
         errors.append("Password must contain at least one special character (!@#$%^&*(),.?\":{}|<>_-+=[]\\/'`~;)")
 
     return errors
@@ -2,7 +2,8 @@
 
 from datetime import datetime
 from decimal import Decimal
-from typing import Optional
+from enum import Enum
+from typing import Dict, List, Optional
 
 from pydantic import BaseModel, Field, field_validator, ConfigDict
 
@@ -11,6 +12,8 @@ class CreditBalanceResponse(BaseModel):
     """Schema for credit balance response."""
     user_id: int
     balance: Decimal
+    reserved_balance: Decimal = Field(Decimal("0.00"), description="Part of the balance held by open reservations")
+    shard_count: int = Field(0, description="Number of shard rows the spendable balance is spread over")
     updated_at: datetime
 
     model_config = ConfigDict(from_attributes=True)
@@ -59,6 +62,79 @@ class TransactionHistoryResponse(BaseModel):
     """Schema for transaction history response."""
     transactions: list[TransactionResponse]
     total_count: int
+    next_cursor: Optional[str] = Field(None, description="Pass as `cursor` to fetch the next page; null on the last page")
+
+
+class ReservationCreateRequest(CreditTransactionBase):
+    """Schema for holding credits until the work they pay for is done."""
+    ttl_seconds: Optional[int] = Field(
+        None, gt=0, description="Seconds until the hold expires and is released; server default if omitted"
+    )
+
+
+class ReservationCaptureRequest(BaseModel):
+    """Schema for capturing a reservation."""
+    amount: Optional[Decimal] = Field(
+        None, gt=0, description="Amount to spend, at most the held amount; the whole hold if omitted"
+    )
+
+
+class ShardCountRequest(BaseModel):
+    """Schema for spreading a hot account's balance over shard rows."""
+    shard_count: int = Field(..., ge=0, description="Number of shards; 0 folds the balance back into one row")
+
+
+class ReservationResponse(BaseModel):
+    """Schema for a credit reservation."""
+    id: int
+    user_id: int
+    amount: Decimal
+    captured_amount: Optional[Decimal] = None
+    status: str
+    reference_id: Optional[str] = None
+    description: Optional[str] = None
+    expires_at: datetime
+    created_at: datetime
+    settled_at: Optional[datetime] = None
+    available_balance: Optional[Decimal] = Field(
+        None, description="Spendable balance right after this operation (not set on reads)"
+    )
+    transaction_id: Optional[int] = Field(None, description="Ledger entry written by a capture")
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class UsageRecord(CreditTransactionBase):
+    """Schema for one metered usage event in a batch."""
+    user_id: int
+
+
+class UsageStatus(str, Enum):
+    """Outcome of one usage record."""
+    APPLIED = "applied"
+    INSUFFICIENT_CREDITS = "insufficient_credits"
+    DUPLICATE_REFERENCE = "duplicate_reference"
+    INVALID = "invalid"
+
+
+class UsageRecordResult(BaseModel):
+    """Schema for the outcome of one usage record, in request order."""
+    index: int = Field(..., description="Position of the record in the batch")
+    user_id: Optional[int] = None
+    reference_id: Optional[str] = None
+    status: UsageStatus
+    transaction_id: Optional[int] = Field(None, description="Ledger entry of an applied record")
+    detail: Optional[str] = None
+
+
+class UsageBatchResponse(BaseModel):
+    """Schema for the result of a usage batch."""
+    applied: int
+    rejected: int
+    balances: Dict[int, Decimal] = Field(
+        default_factory=dict, description="New balance of every user with applied records"
+    )
+    results: List[UsageRecordResult]
 
 
 class SubscriptionCancellationRequest(BaseModel):
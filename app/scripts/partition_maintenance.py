@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""Create upcoming credit_transactions partitions and apply the retention policy.
+
+Run from cron (e.g. daily) against the primary database:
+
+    python -m app.scripts.partition_maintenance
+    python -m app.scripts.partition_maintenance --retention-months 24
+    python -m app.scripts.partition_maintenance --retention-months 24 --drop
+
+Without ``--retention-months`` (and with CREDIT_TRANSACTIONS_RETENTION_MONTHS
+unset or 0) only missing future partitions are created. Expired partitions
+are detached and moved to CREDIT_PARTITION_ARCHIVE_SCHEMA, from where they
+can be dumped with ``pg_dump -t`` and dropped, or dropped right away with
+``--drop``. Requires Postgres 14+ for ``DETACH PARTITION ... CONCURRENTLY``.
+"""
+
+import argparse
+import asyncio
+import sys
+
+from app.core.config import settings
+from app.core.database import TrafficClass, dispose_engines, engine_for
+from app.core.partitions import archive_expired_partitions, ensure_future_partitions
+
+
+async def run(months_ahead: int, retention_months: int, archive_schema: str, drop: bool) -> None:
+    engine = engine_for(TrafficClass.INTERNAL)
+    try:
+        async with engine.begin() as conn:
+            created = await ensure_future_partitions(conn, months_ahead=months_ahead)
+        print(f"Created partitions: {', '.join(created) or 'none'}")
+
+        if retention_months > 0:
+            detached = await archive_expired_partitions(
+                engine, retention_months, archive_schema=archive_schema, drop=drop
+            )
+            action = "Dropped" if drop else f"Moved to schema {archive_schema}"
+            print(f"{action}: {', '.join(detached) or 'none'}")
+    finally:
+        await dispose_engines()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--months-ahead", type=int, default=settings.CREDIT_PARTITION_MONTHS_AHEAD,
+                        help="Monthly partitions to prepare beyond the current month")
+    parser.add_argument("--retention-months", type=int, default=settings.CREDIT_TRANSACTIONS_RETENTION_MONTHS,
+                        help="Full months of history to keep attached (0 keeps everything)")
+    parser.add_argument("--archive-schema", default=settings.CREDIT_PARTITION_ARCHIVE_SCHEMA,
+                        help="Schema that receives detached partitions")
+    parser.add_argument("--drop", action="store_true", help="Drop expired partitions instead of archiving them")
+    args = parser.parse_args()
+
+    asyncio.run(run(args.months_ahead, args.retention_months, args.archive_schema, args.drop))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
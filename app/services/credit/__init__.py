@@ -5,10 +5,14 @@ from app.services.credit.plan import PlanService
 from app.services.credit.transaction import TransactionService
 from app.services.credit.subscription import SubscriptionService
 from app.services.credit.stripe_integration import StripeIntegrationService
+from app.services.credit.reservations import ReservationService
+from app.services.credit.usage import UsageService
 from app.services.credit.exceptions import InsufficientCreditsError
 from app.log.logging import logger
+from app.core.tracing import traced_service
 
 
+@traced_service("CreditService")
 class CreditService:
     """
     Comprehensive service for managing user credits, plans, and subscriptions.
@@ -19,6 +23,8 @@ class CreditService:
     - TransactionService: Transaction-related operations
     - SubscriptionService: Subscription-related operations
     - StripeIntegrationService: Stripe integration operations
+    - ReservationService: Credit holds (hold, capture, release)
+    - UsageService: Batch usage ingestion
     
     By delegating to these specialized services, CreditService provides
     a unified interface for all credit-related operations while maintaining
@@ -36,6 +42,8 @@ class CreditService:
         self.transaction_service = TransactionService()
         self.subscription_service = SubscriptionService()
         self.stripe_service = StripeIntegrationService()
+        self.reservation_service = ReservationService(db)
+        self.usage_service = UsageService(db)
         
         # Set db for all services
         self.plan_service.db = db
@@ -88,6 +96,49 @@ class CreditService:
                    user_id=user_id)
         return await self.base_service.get_transaction_history(**kwargs)
         
+    async def set_shard_count(self, **kwargs):
+        user_id = kwargs.get('user_id')
+        shard_count = kwargs.get('shard_count')
+        logger.debug(f"Setting shard count: User {user_id}, Shards {shard_count}",
+                   event_type="set_shard_count",
+                   user_id=user_id,
+                   shard_count=shard_count)
+        return await self.base_service.set_shard_count(**kwargs)
+
+    # Delegate ReservationService methods
+    async def hold_credits(self, **kwargs):
+        user_id = kwargs.get('user_id')
+        amount = kwargs.get('amount')
+        logger.debug(f"Holding credits: User {user_id}, Amount {amount}",
+                   event_type="hold_credits",
+                   user_id=user_id,
+                   amount=amount)
+        return await self.reservation_service.hold_credits(**kwargs)
+
+    async def capture_reservation(self, **kwargs):
+        reservation_id = kwargs.get('reservation_id')
+        logger.debug(f"Capturing reservation: {reservation_id}",
+                   event_type="capture_reservation",
+                   reservation_id=reservation_id)
+        return await self.reservation_service.capture_reservation(**kwargs)
+
+    async def release_reservation(self, **kwargs):
+        reservation_id = kwargs.get('reservation_id')
+        logger.debug(f"Releasing reservation: {reservation_id}",
+                   event_type="release_reservation",
+                   reservation_id=reservation_id)
+        return await self.reservation_service.release_reservation(**kwargs)
+
+    async def get_reservation(self, **kwargs):
+        return await self.reservation_service.get_reservation(**kwargs)
+
+    # Delegate UsageService methods
+    async def ingest_usage(self, records):
+        logger.debug(f"Ingesting usage batch: {len(records)} records",
+                   event_type="ingest_usage",
+                   records=len(records))
+        return await self.usage_service.ingest_usage(records)
+
     # Delegate PlanService methods
     async def get_plan_by_id(self, plan_id):
         logger.debug(f"Getting plan by ID: {plan_id}", event_type="get_plan_by_id", plan_id=plan_id)
@@ -6,19 +6,26 @@ from typing import Optional, List, Dict, Any, Tuple, Union
 import uuid
 
 from fastapi import HTTPException, status, BackgroundTasks
-from sqlalchemy import desc, select, and_, func
+from sqlalchemy import desc, func, select, and_, tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.credit import UserCredit, CreditTransaction, TransactionType
 from app.models.plan import Plan, Subscription
 from app.models.user import User
 from app.schemas import credit_schemas
+from app.core.config import settings
+from app.core.hot_queries import get_credit_balance_row
 from app.services.email_service import EmailService
 from app.log.logging import logger
 
 from app.services.credit.decorators import db_error_handler
 from app.services.credit.exceptions import InsufficientCreditsError
-from app.services.credit.utils import create_transaction_response
+from app.services.credit.ledger import apply_balance_change
+from app.services.credit.shards import set_shard_count
+from app.services.credit.utils import create_transaction_response, decode_history_cursor, encode_history_cursor
+
+
+_PLAN_TRANSACTION_TYPES = (TransactionType.PLAN_PURCHASE, TransactionType.PLAN_RENEWAL, TransactionType.PLAN_UPGRADE)
 
 
 class BaseCreditService:
@@ -47,7 +54,6 @@ class BaseCreditService:
             credit = UserCredit(user_id=user_id, balance=Decimal('0.00'))
             self.db.add(credit)
             await self.db.commit()
-            await self.db.refresh(credit)
             logger.info(f"Created new credit record for user {user_id}", 
                       event_type="credit_record_created", 
                       user_id=user_id)
@@ -131,47 +137,47 @@ class BaseCreditService:
         Returns:
             TransactionResponse: Details of the transaction
         """
-        credit = await self.get_user_credit(user_id)
-        
-        credit.balance += amount
-        credit.updated_at = datetime.now(UTC)
-
-        transaction = CreditTransaction(
-            user_id=user_id,
-            user_credit_id=credit.id,
-            amount=amount,
-            transaction_type=transaction_type,
+        entry = await apply_balance_change(
+            self.db,
+            user_id,
+            amount,
+            transaction_type,
             reference_id=reference_id,
             description=description,
             plan_id=plan_id,
             subscription_id=subscription_id
         )
-
-        logger.info(f"Adding transaction to database: User {user_id}, Amount {amount}, Type {transaction_type}",
-                  event_type="adding_transaction",
-                  user_id=user_id,
-                  amount=amount,
-                  transaction_type=transaction_type,
-                  reference_id=reference_id)
-
-        self.db.add(transaction)
+        if entry is None:
+            # First credit for this user: create the record, then apply the change
+            await self.get_user_credit(user_id)
+            entry = await apply_balance_change(
+                self.db,
+                user_id,
+                amount,
+                transaction_type,
+                reference_id=reference_id,
+                description=description,
+                plan_id=plan_id,
+                subscription_id=subscription_id
+            )
         await self.db.commit()
-        await self.db.refresh(transaction)
 
-        logger.info(f"Added {amount} credits to user {user_id}. New balance: {credit.balance}, Transaction ID: {transaction.id}",
+        logger.info(f"Added {amount} credits to user {user_id}. New balance: {entry.new_balance}, Transaction ID: {entry.id}",
                   event_type="credits_added",
                   user_id=user_id,
                   amount=amount,
                   transaction_type=transaction_type,
-                  new_balance=credit.balance,
-                  transaction_id=transaction.id)
+                  reference_id=reference_id,
+                  new_balance=entry.new_balance,
+                  transaction_id=entry.id)
 
         return create_transaction_response(
-            transaction,
-            credit.balance,
+            entry,
+            entry.new_balance,
             monetary_amount=monetary_amount,
             currency=currency
         )
+
     @db_error_handler()
     async def use_credits(
         self,
@@ -185,6 +191,10 @@ class BaseCreditService:
         """
         Use credits from user's balance.
 
+        The balance check, the debit and the ledger entry are one conditional
+        UPDATE (plus the INSERT, in the same statement on Postgres), so
+        concurrent requests cannot overdraw the balance.
+
         Args:
             user_id: The ID of the user
             amount: Amount to use
@@ -197,40 +207,36 @@ class BaseCreditService:
         Raises:
             InsufficientCreditsError: If user has insufficient credits
         """
-        credit = await self.get_user_credit(user_id)
-
-        if credit.balance < amount:
-            logger.warning(f"Insufficient credits for user {user_id}. Required: {amount}, Available: {credit.balance}", 
-                         event_type="insufficient_credits", 
-                         user_id=user_id, 
-                         required=amount, 
-                         available=credit.balance)
-            raise InsufficientCreditsError(f"Insufficient credits. Required: {amount}, Available: {credit.balance}")
-
-        credit.balance -= amount
-        credit.updated_at = datetime.now(UTC)
-        transaction = CreditTransaction(
-            user_id=user_id,
-            user_credit_id=credit.id,
-            amount=amount,
-            transaction_type=TransactionType.CREDIT_USED,
+        entry = await apply_balance_change(
+            self.db,
+            user_id,
+            amount,
+            TransactionType.CREDIT_USED,
+            debit=True,
             reference_id=reference_id,
             description=description
         )
-
-        self.db.add(transaction)
+        if entry is None:
+            # Only the failure path reads the balance (shards included), for the error message
+            credit = await get_credit_balance_row(self.db, user_id) or await self.get_user_credit(user_id)
+            available = credit.balance - credit.reserved_balance
+            logger.warning(f"Insufficient credits for user {user_id}. Required: {amount}, Available: {available}", 
+                         event_type="insufficient_credits", 
+                         user_id=user_id, 
+                         required=amount, 
+                         available=available)
+            raise InsufficientCreditsError(f"Insufficient credits. Required: {amount}, Available: {available}")
         await self.db.commit()
-        await self.db.refresh(transaction)
 
-        logger.info(f"Used {amount} credits from user {user_id}. New balance: {credit.balance}", 
+        logger.info(f"Used {amount} credits from user {user_id}. New balance: {entry.new_balance}", 
                   event_type="credits_used", 
                   user_id=user_id, 
                   amount=amount, 
-                  new_balance=credit.balance)
+                  new_balance=entry.new_balance)
 
         return create_transaction_response(
-            transaction,
-            credit.balance,
+            entry,
+            entry.new_balance,
             monetary_amount=monetary_amount,
             currency=currency
         )
@@ -245,111 +251,172 @@ class BaseCreditService:
         Returns:
             CreditBalanceResponse: Current balance and last update time
         """
-        credit = await self.get_user_credit(user_id)
+        credit = await get_credit_balance_row(self.db, user_id)
+        if credit is None:
+            # First read for this user: create the record through the ORM
+            credit = await self.get_user_credit(user_id)
         return credit_schemas.CreditBalanceResponse(
             user_id=user_id,
             balance=credit.balance,
+            reserved_balance=credit.reserved_balance,
+            shard_count=credit.shard_count,
             updated_at=credit.updated_at
         )
 
+    @db_error_handler()
+    async def set_shard_count(self, user_id: int, shard_count: int) -> credit_schemas.CreditBalanceResponse:
+        """
+        Spread a user's spendable balance over ``shard_count`` shard rows.
+
+        Meant for shared accounts that debit too often for one row lock;
+        0 folds the shards back into the user's credit record.
+
+        Args:
+            user_id: The ID of the user
+            shard_count: Number of shards (0 turns sharding off)
+
+        Returns:
+            CreditBalanceResponse: The balance after rebalancing
+
+        Raises:
+            HTTPException: 400 if shard_count exceeds CREDIT_MAX_SHARDS
+        """
+        if shard_count > settings.CREDIT_MAX_SHARDS:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"shard_count must be at most {settings.CREDIT_MAX_SHARDS}"
+            )
+
+        await self.get_user_credit(user_id)
+        await set_shard_count(self.db, user_id, shard_count)
+        await self.db.commit()
+
+        logger.info(f"Set {shard_count} balance shards for user {user_id}",
+                  event_type="credit_shard_count_set",
+                  user_id=user_id,
+                  shard_count=shard_count)
+
+        return await self.get_balance(user_id)
+
     @db_error_handler()
     async def get_transaction_history(
         self,
         user_id: int,
         skip: int = 0,
-        limit: int = 50
+        limit: int = 50,
+        cursor: Optional[str] = None,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None
     ) -> credit_schemas.TransactionHistoryResponse:
         """
-        Get user's transaction history.
+        Get user's transaction history, newest first.
+
+        Pages are read by keyset on ``(created_at, id)`` when ``cursor`` is
+        given, so deep pages cost the same as the first one; ``skip`` (OFFSET)
+        is kept for older clients and ignored with a cursor. The total comes
+        from the per-user counter on ``user_credits`` rather than a count.
+
+        ``start_date`` / ``end_date`` bound ``created_at``; on the partitioned
+        Postgres table they also let the planner skip the months outside the
+        range. With a range the total is counted over that range.
 
         Args:
             user_id: The ID of the user
-            skip: Number of records to skip
+            skip: Number of records to skip (ignored when ``cursor`` is given)
             limit: Maximum number of records to return
+            cursor: ``next_cursor`` from the previous page
+            start_date: Only transactions created at or after this time
+            end_date: Only transactions created before this time
 
         Returns:
-            TransactionHistoryResponse: List of transactions and total count
+            TransactionHistoryResponse: Transactions, total count and the next page's cursor
+
+        Raises:
+            HTTPException: 400 if the cursor is malformed or the date range is empty
         """
         logger.info(f"Getting transaction history for user {user_id}",
                   event_type="get_transaction_history_start",
                   user_id=user_id,
                   skip=skip,
-                  limit=limit)
-
-        # Get total count with a single query
-        count_result = await self.db.execute(
-            select(func.count()).select_from(CreditTransaction).where(
-                CreditTransaction.user_id == user_id
+                  limit=limit,
+                  has_cursor=cursor is not None,
+                  start_date=start_date,
+                  end_date=end_date)
+
+        if start_date is not None and end_date is not None and start_date >= end_date:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="start_date must be before end_date"
             )
+        date_filters = []
+        if start_date is not None:
+            date_filters.append(CreditTransaction.created_at >= start_date)
+        if end_date is not None:
+            date_filters.append(CreditTransaction.created_at < end_date)
+
+        # Plan price and subscription status come with the page instead of a lookup per row
+        query = (
+            select(CreditTransaction, Plan.price, Subscription.status)
+            .outerjoin(Plan, Plan.id == CreditTransaction.plan_id)
+            .outerjoin(Subscription, Subscription.id == CreditTransaction.subscription_id)
+            .where(CreditTransaction.user_id == user_id, *date_filters)
         )
-        total_count = count_result.scalar_one()
-
-        logger.info(f"Found {total_count} transactions for user {user_id}",
-                  event_type="transaction_count",
-                  user_id=user_id,
-                  total_count=total_count)
+        if cursor is not None:
+            try:
+                cursor_created_at, cursor_id = decode_history_cursor(cursor)
+            except ValueError as e:
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e)) from e
+            query = query.where(
+                tuple_(CreditTransaction.created_at, CreditTransaction.id) < tuple_(cursor_created_at, cursor_id)
+            )
+        elif skip:
+            query = query.offset(skip)
 
-        # Get transactions with pagination
+        # One extra row tells whether another page follows
         result = await self.db.execute(
-            select(CreditTransaction)
-            .where(CreditTransaction.user_id == user_id)
-            .order_by(desc(CreditTransaction.created_at))
-            .offset(skip)
-            .limit(limit)
+            query
+            .order_by(desc(CreditTransaction.created_at), desc(CreditTransaction.id))
+            .limit(limit + 1)
         )
-        transactions = result.scalars().all()
+        rows = result.all()
+        next_cursor = encode_history_cursor(rows[limit - 1][0]) if len(rows) > limit else None
+        rows = rows[:limit]
+
+        # Current balance and the maintained transaction count
+        credit = await get_credit_balance_row(self.db, user_id)
+        if credit is None:
+            credit = await self.get_user_credit(user_id)
+        total_count = credit.transaction_count
+        if date_filters:
+            total_count = await self.db.scalar(
+                select(func.count())
+                .select_from(CreditTransaction)
+                .where(CreditTransaction.user_id == user_id, *date_filters)
+            )
 
-        logger.info(f"Retrieved {len(transactions)} transactions for user {user_id}",
-                  event_type="transactions_retrieved",
-                  user_id=user_id,
-                  retrieved_count=len(transactions),
-                  transaction_ids=[tx.id for tx in transactions])
-                  
-        # Log transaction details for debugging
-        for tx in transactions:
-            logger.info(f"Transaction details: ID {tx.id}, Type {tx.transaction_type}, Amount {tx.amount}, Created {tx.created_at}",
-                      event_type="transaction_details",
-                      user_id=user_id,
-                      transaction_id=tx.id,
-                      transaction_type=tx.transaction_type,
-                      amount=tx.amount,
-                      created_at=tx.created_at,
-                      reference_id=tx.reference_id)
-
-        # Get current balance
-        credit = await self.get_user_credit(user_id)
-        
-        # Process transactions to include monetary amounts
         processed_transactions = []
-        for tx in transactions:
+        for tx, plan_price, subscription_status in rows:
             monetary_amount = None
-            
-            # Determine monetary amount based on transaction type
             if tx.transaction_type == TransactionType.ONE_TIME_PURCHASE:
                 # For one-time purchases, estimate based on credit amount
                 monetary_amount = tx.amount / Decimal('10')  # Default ratio
-            elif tx.transaction_type in [TransactionType.PLAN_PURCHASE, TransactionType.PLAN_RENEWAL, TransactionType.PLAN_UPGRADE]:
-                # For plan-related transactions, get the plan price if available
-                if tx.plan_id:
-                    from app.models.plan import Plan
-                    plan_result = await self.db.execute(
-                        select(Plan).where(Plan.id == tx.plan_id)
-                    )
-                    plan = plan_result.scalar_one_or_none()
-                    if plan:
-                        monetary_amount = plan.price
-            
-            # Create transaction response with monetary amount
+            elif tx.transaction_type in _PLAN_TRANSACTION_TYPES:
+                monetary_amount = plan_price
+
             processed_tx = create_transaction_response(
                 tx,
                 credit.balance,
                 monetary_amount=monetary_amount
             )
+            if tx.subscription_id:
+                # None when the subscription row no longer exists
+                processed_tx.is_subscription_active = subscription_status and subscription_status == "active"
             processed_transactions.append(processed_tx)
-        
+
         response = credit_schemas.TransactionHistoryResponse(
             transactions=processed_transactions,
-            total_count=total_count
+            total_count=total_count,
+            next_cursor=next_cursor
         )
 
         logger.info(f"Returning transaction history response for user {user_id}",
@@ -1,7 +1,7 @@
 """Decorators for the credit service module."""
 
 import functools
-from typing import Callable, TypeVar
+from typing import Callable, Tuple, Type, TypeVar
 
 from fastapi import HTTPException, status
 from sqlalchemy.exc import IntegrityError
@@ -12,12 +12,17 @@ from app.log.logging import logger
 T = TypeVar('T')
 
 
-def db_error_handler(status_code: int = status.HTTP_500_INTERNAL_SERVER_ERROR):
+def db_error_handler(
+    status_code: int = status.HTTP_500_INTERNAL_SERVER_ERROR,
+    passthrough: Tuple[Type[Exception], ...] = ()
+):
     """
     Decorator for handling database errors in service methods.
     
     Args:
         status_code: HTTP status code to use in the exception
+        passthrough: Domain exceptions re-raised unchanged (after a rollback)
+            for the caller to map, instead of being turned into an HTTPException
     """
     def decorator(func: Callable[..., T]) -> Callable[..., T]:
         @functools.wraps(func)
@@ -36,6 +41,9 @@ def db_error_handler(status_code: int = status.HTTP_500_INTERNAL_SERVER_ERROR):
             except HTTPException:
                 # Re-raise HTTP exceptions
                 raise
+            except passthrough:
+                await args[0].db.rollback()
+                raise
             except Exception as e:
                 # Get self (service instance) from args
                 self = args[0]
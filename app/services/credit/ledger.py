@@ -0,0 +1,308 @@
+"""Single-statement balance changes with their ledger entry.
+
+A debit is one conditional ``UPDATE user_credits ... WHERE balance >= :amount
+RETURNING`` and the ``credit_transactions`` insert goes with it, so the balance
+check and the write cannot interleave with another request and the hot row is
+locked only for the duration of one statement. On Postgres both happen in a
+single data-modifying CTE (one round trip); other backends run the UPDATE and
+the INSERT back to back, both with RETURNING.
+
+Balance held by open reservations (``UserCredit.reserved_balance``) is not
+spendable by a debit; capturing a reservation spends from the hold instead.
+
+A debit of a sharded account (``UserCredit.shard_count`` > 0, see
+``app.services.credit.shards``) updates one random ``user_credit_shards`` row
+instead, and falls back to a rebalance when that shard is short. Returned
+balances always include the shards.
+
+The statements are built once at import time, like those in
+``app.core.hot_queries``. Being Core statements they bypass the mapper events
+on ``CreditTransaction``, so the UPDATE bumps ``transaction_count`` itself.
+"""
+
+import random
+from datetime import datetime, UTC
+from decimal import Decimal
+from typing import NamedTuple, Optional
+
+from sqlalchemy import DateTime, Integer, Numeric, String, Text, bindparam, func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.orm.util import identity_key
+
+from app.core.hot_queries import get_credit_balance_row
+from app.models.credit import CreditTransaction, TransactionType, UserCredit, UserCreditShard
+from app.services.credit.shards import rebalance_shards
+
+_credits = UserCredit.__table__
+_shards = UserCreditShard.__table__
+_transactions = CreditTransaction.__table__
+
+
+class LedgerEntry(NamedTuple):
+    """A written ``credit_transactions`` row and the balance it left behind.
+
+    Carries the attributes ``create_transaction_response`` reads, so it can
+    stand in for a ``CreditTransaction``.
+    """
+
+    id: int
+    user_id: int
+    user_credit_id: int
+    amount: Decimal
+    transaction_type: str
+    reference_id: Optional[str]
+    description: Optional[str]
+    created_at: datetime
+    plan_id: Optional[int]
+    subscription_id: Optional[int]
+    new_balance: Decimal
+
+
+_ENTRY_PARAMS = {
+    "amount": bindparam("change", type_=Numeric(10, 2)),
+    "transaction_type": bindparam("entry_type", type_=String(20)),
+    "reference_id": bindparam("entry_reference_id", type_=String(100)),
+    "description": bindparam("entry_description", type_=Text),
+    "created_at": bindparam("now", type_=DateTime(timezone=True)),
+    "plan_id": bindparam("entry_plan_id", type_=Integer),
+    "subscription_id": bindparam("entry_subscription_id", type_=Integer),
+}
+
+
+def _owner_id():
+    return bindparam("owner_id", type_=Integer)
+
+
+def _picked_shard_no():
+    # :pick modulo shard_count; NULL (matching no shard) for an unsharded account
+    shard_count = select(func.nullif(_credits.c.shard_count, 0)).where(_credits.c.user_id == _owner_id())
+    return bindparam("pick", type_=Integer) % shard_count.scalar_subquery()
+
+
+def _shards_total(skip_picked: bool = False):
+    # Sum of the user's shards (0 when unsharded), optionally leaving out the picked one. Not
+    # correlated: SQLite renders RETURNING columns unqualified, so they would bind to the alias.
+    shards = _shards.alias("other_shards")
+    total = select(func.coalesce(func.sum(shards.c.balance), 0)).where(shards.c.user_id == _owner_id())
+    if skip_picked:
+        total = total.where(shards.c.shard_no != _picked_shard_no())
+    return total.scalar_subquery()
+
+
+def _balance_update(kind: str):
+    amount = bindparam("change", type_=Numeric(10, 2))
+    statement = update(_credits).where(_credits.c.user_id == _owner_id())
+    if kind in ("debit", "debit_rebalanced"):
+        # Held reservations are not spendable
+        statement = statement.where(_credits.c.balance - _credits.c.reserved_balance >= amount).values(
+            balance=_credits.c.balance - amount
+        )
+        if kind == "debit":
+            # Sharded accounts debit a shard first
+            statement = statement.where(_credits.c.shard_count == 0)
+    elif kind == "capture":
+        # Spend from a hold: the whole hold leaves reserved_balance, only the captured part leaves balance
+        statement = statement.values(
+            balance=_credits.c.balance - amount,
+            reserved_balance=_credits.c.reserved_balance - bindparam("held", type_=Numeric(10, 2)),
+        )
+    else:
+        statement = statement.values(balance=_credits.c.balance + amount)
+    return statement.values(
+        updated_at=bindparam("now", type_=DateTime(timezone=True)),
+        transaction_count=_credits.c.transaction_count + 1,
+    ).returning(
+        _credits.c.id.label("user_credit_id"),
+        _credits.c.balance,
+        (_credits.c.balance + _shards_total()).label("total_balance"),
+    )
+
+
+def _shard_debit():
+    amount = bindparam("change", type_=Numeric(10, 2))
+    canonical = select(_credits.c.balance).where(_credits.c.user_id == _owner_id())
+    return (
+        update(_shards)
+        .where(
+            _shards.c.user_id == _owner_id(),
+            _shards.c.shard_no == _picked_shard_no(),
+            _shards.c.balance >= amount,
+        )
+        .values(
+            balance=_shards.c.balance - amount,
+            transaction_count=_shards.c.transaction_count + 1,
+            updated_at=bindparam("now", type_=DateTime(timezone=True)),
+        )
+        .returning(
+            _shards.c.user_credit_id,
+            _shards.c.balance,
+            # Only this shard changes, so every backend reads the same values for the other rows
+            (_shards.c.balance + _shards_total(skip_picked=True) + canonical.scalar_subquery()).label(
+                "total_balance"
+            ),
+        )
+    )
+
+
+def _with_ledger_entry(balance_update):
+    # Postgres: UPDATE and INSERT in one statement; no row when the UPDATE matched none
+    changed = balance_update.cte("changed")
+    entry = (
+        insert(_transactions)
+        .from_select(
+            ["user_id", "user_credit_id", *_ENTRY_PARAMS],
+            select(_owner_id(), changed.c.user_credit_id, *_ENTRY_PARAMS.values()),
+        )
+        .returning(_transactions.c.id, _transactions.c.user_credit_id)
+        .cte("entry")
+    )
+    return select(entry.c.id, changed.c.user_credit_id, changed.c.balance, changed.c.total_balance).join_from(
+        changed, entry, entry.c.user_credit_id == changed.c.user_credit_id
+    )
+
+
+DEBIT_BALANCE = _balance_update("debit")
+DEBIT_REBALANCED_BALANCE = _balance_update("debit_rebalanced")
+CREDIT_BALANCE = _balance_update("credit")
+CAPTURE_BALANCE = _balance_update("capture")
+DEBIT_SHARD = _shard_debit()
+INSERT_ENTRY = (
+    insert(_transactions)
+    .values(user_id=_owner_id(), user_credit_id=bindparam("credit_id"), **_ENTRY_PARAMS)
+    .returning(_transactions.c.id)
+)
+DEBIT_WITH_ENTRY = _with_ledger_entry(DEBIT_BALANCE)
+DEBIT_REBALANCED_WITH_ENTRY = _with_ledger_entry(DEBIT_REBALANCED_BALANCE)
+CREDIT_WITH_ENTRY = _with_ledger_entry(CREDIT_BALANCE)
+CAPTURE_WITH_ENTRY = _with_ledger_entry(CAPTURE_BALANCE)
+DEBIT_SHARD_WITH_ENTRY = _with_ledger_entry(DEBIT_SHARD)
+
+# kind: (balance update, the same with the ledger insert)
+_STATEMENTS = {
+    "debit": (DEBIT_BALANCE, DEBIT_WITH_ENTRY),
+    "debit_shard": (DEBIT_SHARD, DEBIT_SHARD_WITH_ENTRY),
+    "debit_rebalanced": (DEBIT_REBALANCED_BALANCE, DEBIT_REBALANCED_WITH_ENTRY),
+    "credit": (CREDIT_BALANCE, CREDIT_WITH_ENTRY),
+    "capture": (CAPTURE_BALANCE, CAPTURE_WITH_ENTRY),
+}
+
+
+def _sync_loaded_credit(
+    db: AsyncSession, user_credit_id: int, balance: Decimal, now: datetime, released: Optional[Decimal]
+) -> None:
+    # A UserCredit already in the session would otherwise keep reporting the old balance
+    credit = db.identity_map.get(identity_key(UserCredit, user_credit_id))
+    if credit is not None:
+        set_committed_value(credit, "balance", balance)
+        set_committed_value(credit, "updated_at", now)
+        set_committed_value(credit, "transaction_count", credit.transaction_count + 1)
+        if released is not None:
+            set_committed_value(credit, "reserved_balance", credit.reserved_balance - released)
+
+
+async def _execute(db: AsyncSession, kind: str, params: dict):
+    # (entry id, user_credit_id, updated row's balance, user's total balance), or None
+    balance_update, with_entry = _STATEMENTS[kind]
+    if db.get_bind().dialect.name == "postgresql":
+        return (await db.execute(with_entry, params)).first()
+    changed = (await db.execute(balance_update, params)).first()
+    if changed is None:
+        return None
+    entry_id = (await db.execute(INSERT_ENTRY, {**params, "credit_id": changed.user_credit_id})).scalar_one()
+    return (entry_id, *changed)
+
+
+async def apply_balance_change(
+    db: AsyncSession,
+    user_id: int,
+    amount: Decimal,
+    transaction_type: TransactionType,
+    debit: bool = False,
+    reference_id: Optional[str] = None,
+    description: Optional[str] = None,
+    plan_id: Optional[int] = None,
+    subscription_id: Optional[int] = None,
+    held: Optional[Decimal] = None,
+) -> Optional[LedgerEntry]:
+    """
+    Change a user's balance by ``amount`` and record the ledger entry.
+
+    Nothing is committed; the caller commits (or rolls back) as usual.
+
+    Args:
+        db: Database session
+        user_id: The ID of the user
+        amount: Positive amount to add, or to remove when ``debit`` is set
+        transaction_type: Type recorded on the ledger entry
+        debit: Subtract instead of add, only if the balance not held by
+            reservations covers ``amount``
+        reference_id: Optional reference ID for the transaction
+        description: Optional description of the transaction
+        plan_id: Optional ID of the plan
+        subscription_id: Optional ID of the subscription
+        held: Spend ``amount`` out of a reservation holding this much instead;
+            the whole hold is released from ``reserved_balance``. The caller
+            settles the reservation row in the same transaction.
+
+    Returns:
+        Optional[LedgerEntry]: The entry and the user's new balance (shards
+        included), or None if the user has no credit record or (for a debit)
+        the balance is too low; in that case nothing was written
+    """
+    # Core statements skip the ORM's autoflush; pending rows (e.g. a new subscription) may be referenced
+    if db.new or db.dirty or db.deleted:
+        await db.flush()
+
+    now = datetime.now(UTC)
+    params = {
+        "owner_id": user_id,
+        "change": amount,
+        "entry_type": transaction_type,
+        "entry_reference_id": reference_id,
+        "entry_description": description,
+        "now": now,
+        "entry_plan_id": plan_id,
+        "entry_subscription_id": subscription_id,
+        "held": held,
+        "pick": random.randrange(1 << 30),
+    }
+
+    if held is not None:
+        kind = "capture"
+    elif debit:
+        kind = "debit"
+    else:
+        kind = "credit"
+    row = await _execute(db, kind, params)
+
+    if row is None and kind == "debit":
+        # Sharded, or short of credits
+        kind = "debit_shard"
+        row = await _execute(db, kind, params)
+        if row is None:
+            credit = await get_credit_balance_row(db, user_id)
+            if credit is not None and credit.shard_count and credit.balance - credit.reserved_balance >= amount:
+                # The picked shard is short but the account is not: take it from the folded balance
+                await rebalance_shards(db, user_id, keep=amount)
+                kind = "debit_rebalanced"
+                row = await _execute(db, kind, params)
+    if row is None:
+        return None
+
+    entry_id, user_credit_id, row_balance, total_balance = row
+    if kind != "debit_shard":
+        _sync_loaded_credit(db, user_credit_id, row_balance, now, held)
+    return LedgerEntry(
+        id=entry_id,
+        user_id=user_id,
+        user_credit_id=user_credit_id,
+        amount=amount,
+        transaction_type=transaction_type,
+        reference_id=reference_id,
+        description=description,
+        created_at=now,
+        plan_id=plan_id,
+        subscription_id=subscription_id,
+        new_balance=total_balance,
+    )
@@ -0,0 +1,438 @@
+"""Credit reservations: hold part of a balance, then capture or release it.
+
+A hold moves the amount into ``user_credits.reserved_balance`` with one
+conditional UPDATE (``balance - reserved_balance >= :amount``), so holds,
+debits and other holds cannot overcommit the balance however many run at
+once, and no lock is held between the check and the write. Capturing spends
+from the hold and writes the ledger entry (``app.services.credit.ledger``);
+releasing, or expiring, gives the hold back. The ledger therefore only ever
+records what was actually spent.
+
+Expired holds are released in bulk by ``sweep_expired_reservations``, which
+the application runs every ``CREDIT_RESERVATION_SWEEP_INTERVAL_SECONDS``. A
+hold past its expiry can no longer be captured even before the sweep gets
+to it.
+"""
+
+import asyncio
+from collections import defaultdict
+from datetime import datetime, timedelta, UTC
+from decimal import Decimal
+from typing import Optional
+
+from fastapi import HTTPException, status
+from sqlalchemy import DateTime, Integer, Numeric, String, Text, bindparam, func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from app.core.config import settings
+from app.core.hot_queries import get_credit_balance_row
+from app.log.logging import logger
+from app.models.credit import CreditReservation, ReservationStatus, TransactionType, UserCredit, UserCreditShard
+from app.schemas import credit_schemas
+from app.services.credit.decorators import db_error_handler
+from app.services.credit.exceptions import InsufficientCreditsError
+from app.services.credit.ledger import apply_balance_change
+from app.services.credit.shards import rebalance_shards
+
+_credits = UserCredit.__table__
+_shards = UserCreditShard.__table__
+_reservations = CreditReservation.__table__
+
+_HELD = ReservationStatus.HELD.value
+_amount = bindparam("change", type_=Numeric(10, 2))
+_now = bindparam("now", type_=DateTime(timezone=True))
+_owner_id = bindparam("owner_id", type_=Integer)
+_reservation_id = bindparam("reservation_id", type_=Integer)
+
+
+def _available(shard_owner):
+    # Spendable balance including the shards; the shard sum is filtered by a parameter, not
+    # correlated, because SQLite renders RETURNING columns unqualified
+    shards_total = select(func.coalesce(func.sum(_shards.c.balance), 0)).where(shard_owner).scalar_subquery()
+    return (_credits.c.balance - _credits.c.reserved_balance + shards_total).label("available_balance")
+
+
+_RESERVATION_PARAMS = {
+    "user_id": _owner_id,
+    "amount": _amount,
+    "status": bindparam("entry_status", type_=String(20)),
+    "reference_id": bindparam("entry_reference_id", type_=String(100)),
+    "description": bindparam("entry_description", type_=Text),
+    "expires_at": bindparam("expires_at", type_=DateTime(timezone=True)),
+    "created_at": _now,
+}
+
+# Move the amount from spendable to held, if it is spendable
+RESERVE_BALANCE = (
+    update(_credits)
+    .where(_credits.c.user_id == _owner_id, _credits.c.balance - _credits.c.reserved_balance >= _amount)
+    .values(reserved_balance=_credits.c.reserved_balance + _amount)
+    .returning(_credits.c.id.label("user_credit_id"), _available(_shards.c.user_id == _owner_id))
+)
+INSERT_RESERVATION = (
+    insert(_reservations)
+    .values(user_credit_id=bindparam("credit_id", type_=Integer), **_RESERVATION_PARAMS)
+    .returning(*_reservations.c)
+)
+
+
+def _hold_in_one_statement():
+    # Postgres: reserve and record the hold in one round trip
+    reserved = RESERVE_BALANCE.cte("reserved")
+    created = (
+        insert(_reservations)
+        .from_select(
+            ["user_credit_id", *_RESERVATION_PARAMS],
+            select(reserved.c.user_credit_id, *_RESERVATION_PARAMS.values()),
+        )
+        .returning(*_reservations.c)
+        .cte("created")
+    )
+    return select(created, reserved.c.available_balance).join_from(
+        reserved, created, created.c.user_credit_id == reserved.c.user_credit_id
+    )
+
+
+HOLD_WITH_RESERVATION = _hold_in_one_statement()
+
+# Settle an open hold; no row if it is missing, someone else's, already settled or
+# (for a capture) expired or smaller than the requested amount
+CAPTURE_RESERVATION = (
+    update(_reservations)
+    .where(
+        _reservations.c.id == _reservation_id,
+        _reservations.c.user_id == _owner_id,
+        _reservations.c.status == _HELD,
+        _reservations.c.expires_at > _now,
+        _reservations.c.amount >= func.coalesce(_amount, _reservations.c.amount),
+    )
+    .values(
+        status=ReservationStatus.CAPTURED.value,
+        captured_amount=func.coalesce(_amount, _reservations.c.amount),
+        settled_at=_now,
+    )
+    .returning(*_reservations.c)
+)
+RELEASE_RESERVATION = (
+    update(_reservations)
+    .where(
+        _reservations.c.id == _reservation_id,
+        _reservations.c.user_id == _owner_id,
+        _reservations.c.status == _HELD,
+    )
+    .values(status=ReservationStatus.RELEASED.value, settled_at=_now)
+    .returning(*_reservations.c)
+)
+UNRESERVE_BALANCE = (
+    update(_credits)
+    .where(_credits.c.id == bindparam("credit_id", type_=Integer))
+    .values(reserved_balance=_credits.c.reserved_balance - bindparam("released", type_=Numeric(10, 2)))
+)
+UNRESERVE_BALANCE_RETURNING_AVAILABLE = UNRESERVE_BALANCE.returning(
+    _available(_shards.c.user_credit_id == bindparam("credit_id", type_=Integer))
+)
+RESERVATION_BY_ID = select(*_reservations.c).where(
+    _reservations.c.id == _reservation_id, _reservations.c.user_id == _owner_id
+)
+
+
+def _expired_batch():
+    # SKIP LOCKED: concurrent sweepers (one per worker) take different rows
+    expired_ids = (
+        select(_reservations.c.id)
+        .where(_reservations.c.status == _HELD, _reservations.c.expires_at <= _now)
+        .order_by(_reservations.c.expires_at)
+        .limit(bindparam("batch_size", type_=Integer))
+        .with_for_update(skip_locked=True)
+    )
+    return (
+        update(_reservations)
+        .where(_reservations.c.id.in_(expired_ids.scalar_subquery()))
+        .values(status=ReservationStatus.EXPIRED.value, settled_at=_now)
+        .returning(_reservations.c.user_credit_id, _reservations.c.amount)
+    )
+
+
+EXPIRE_RESERVATIONS = _expired_batch()
+
+
+def _to_response(row, available_balance: Optional[Decimal] = None, transaction_id: Optional[int] = None):
+    values = {column.name: row._mapping[column.name] for column in _reservations.c}
+    return credit_schemas.ReservationResponse(
+        **values, available_balance=available_balance, transaction_id=transaction_id
+    )
+
+
+class ReservationService:
+    """Service class for credit reservations."""
+
+    def __init__(self, db: AsyncSession):
+        """Initialize with database session."""
+        self.db = db
+
+    @db_error_handler(passthrough=(InsufficientCreditsError,))
+    async def hold_credits(
+        self,
+        user_id: int,
+        amount: Decimal,
+        ttl_seconds: Optional[int] = None,
+        reference_id: Optional[str] = None,
+        description: Optional[str] = None
+    ) -> credit_schemas.ReservationResponse:
+        """
+        Hold credits so they cannot be spent elsewhere until captured or released.
+
+        Args:
+            user_id: The ID of the user
+            amount: Amount to hold
+            ttl_seconds: Seconds until the hold expires (default CREDIT_RESERVATION_DEFAULT_TTL_SECONDS)
+            reference_id: Optional reference ID, carried over to the captured transaction
+            description: Optional description, carried over to the captured transaction
+
+        Returns:
+            ReservationResponse: The reservation and the spendable balance left
+
+        Raises:
+            HTTPException: 400 if ttl_seconds exceeds CREDIT_RESERVATION_MAX_TTL_SECONDS
+            InsufficientCreditsError: If the spendable balance is below ``amount``
+        """
+        ttl_seconds = ttl_seconds or settings.CREDIT_RESERVATION_DEFAULT_TTL_SECONDS
+        if ttl_seconds > settings.CREDIT_RESERVATION_MAX_TTL_SECONDS:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"ttl_seconds must be at most {settings.CREDIT_RESERVATION_MAX_TTL_SECONDS}"
+            )
+
+        now = datetime.now(UTC)
+        params = {
+            "owner_id": user_id,
+            "change": amount,
+            "entry_status": _HELD,
+            "entry_reference_id": reference_id,
+            "entry_description": description,
+            "expires_at": now + timedelta(seconds=ttl_seconds),
+            "now": now,
+        }
+        row, available_balance = await self._reserve(params)
+        credit = None
+        if row is None:
+            credit = await get_credit_balance_row(self.db, user_id)
+            if credit is not None and credit.shard_count and credit.balance - credit.reserved_balance >= amount:
+                # Holds come out of user_credits; pull the amount back from the shards first
+                await rebalance_shards(self.db, user_id, keep=amount)
+                row, available_balance = await self._reserve(params)
+
+        if row is None:
+            available = credit.balance - credit.reserved_balance if credit is not None else Decimal("0.00")
+            logger.warning(f"Insufficient credits to hold for user {user_id}. Required: {amount}, Available: {available}",
+                         event_type="reservation_insufficient_credits",
+                         user_id=user_id,
+                         required=amount,
+                         available=available)
+            raise InsufficientCreditsError(f"Insufficient credits. Required: {amount}, Available: {available}")
+        await self.db.commit()
+
+        logger.info(f"Held {amount} credits for user {user_id} (reservation {row.id})",
+                  event_type="credits_held",
+                  user_id=user_id,
+                  reservation_id=row.id,
+                  amount=amount,
+                  expires_at=row.expires_at,
+                  available_balance=available_balance)
+        return _to_response(row, available_balance=available_balance)
+
+    async def _reserve(self, params: dict):
+        # (reservation row, spendable balance left), or (None, None) if the balance is too low
+        if self.db.get_bind().dialect.name == "postgresql":
+            row = (await self.db.execute(HOLD_WITH_RESERVATION, params)).first()
+            return row, row.available_balance if row is not None else None
+        reserved = (await self.db.execute(RESERVE_BALANCE, params)).first()
+        if reserved is None:
+            return None, None
+        row = (await self.db.execute(INSERT_RESERVATION, {**params, "credit_id": reserved.user_credit_id})).first()
+        return row, reserved.available_balance
+
+    @db_error_handler()
+    async def capture_reservation(
+        self,
+        user_id: int,
+        reservation_id: int,
+        amount: Optional[Decimal] = None
+    ) -> credit_schemas.ReservationResponse:
+        """
+        Spend all or part of a held reservation; any remainder is released.
+
+        Args:
+            user_id: The ID of the user owning the reservation
+            reservation_id: The ID of the reservation
+            amount: Amount to spend (default: the whole hold)
+
+        Returns:
+            ReservationResponse: The captured reservation, its ledger entry and the spendable balance
+
+        Raises:
+            HTTPException: 404 if the reservation does not exist, 409 if it is
+                no longer held or has expired, 400 if ``amount`` exceeds the hold
+        """
+        now = datetime.now(UTC)
+        params = {"reservation_id": reservation_id, "owner_id": user_id, "change": amount, "now": now}
+        row = (await self.db.execute(CAPTURE_RESERVATION, params)).first()
+        if row is None:
+            await self._raise_unsettleable(user_id, reservation_id, now, amount)
+
+        entry = await apply_balance_change(
+            self.db,
+            user_id,
+            row.captured_amount,
+            TransactionType.CREDIT_USED,
+            reference_id=row.reference_id,
+            description=row.description or f"Capture of reservation {reservation_id}",
+            held=row.amount
+        )
+        credit = await get_credit_balance_row(self.db, user_id)
+        await self.db.commit()
+
+        logger.info(f"Captured {row.captured_amount} of {row.amount} held credits for user {user_id} (reservation {reservation_id})",
+                  event_type="reservation_captured",
+                  user_id=user_id,
+                  reservation_id=reservation_id,
+                  held=row.amount,
+                  captured=row.captured_amount,
+                  transaction_id=entry.id,
+                  new_balance=entry.new_balance)
+        return _to_response(
+            row,
+            available_balance=credit.balance - credit.reserved_balance,
+            transaction_id=entry.id
+        )
+
+    @db_error_handler()
+    async def release_reservation(self, user_id: int, reservation_id: int) -> credit_schemas.ReservationResponse:
+        """
+        Give a held reservation back to the spendable balance.
+
+        Args:
+            user_id: The ID of the user owning the reservation
+            reservation_id: The ID of the reservation
+
+        Returns:
+            ReservationResponse: The released reservation and the spendable balance
+
+        Raises:
+            HTTPException: 404 if the reservation does not exist, 409 if it is no longer held
+        """
+        now = datetime.now(UTC)
+        params = {"reservation_id": reservation_id, "owner_id": user_id, "now": now}
+        row = (await self.db.execute(RELEASE_RESERVATION, params)).first()
+        if row is None:
+            await self._raise_unsettleable(user_id, reservation_id, now)
+
+        available_balance = (await self.db.execute(
+            UNRESERVE_BALANCE_RETURNING_AVAILABLE, {"credit_id": row.user_credit_id, "released": row.amount}
+        )).scalar_one()
+        await self.db.commit()
+
+        logger.info(f"Released {row.amount} held credits for user {user_id} (reservation {reservation_id})",
+                  event_type="reservation_released",
+                  user_id=user_id,
+                  reservation_id=reservation_id,
+                  amount=row.amount)
+        return _to_response(row, available_balance=available_balance)
+
+    @db_error_handler()
+    async def get_reservation(self, user_id: int, reservation_id: int) -> credit_schemas.ReservationResponse:
+        """
+        Get a reservation.
+
+        Args:
+            user_id: The ID of the user owning the reservation
+            reservation_id: The ID of the reservation
+
+        Returns:
+            ReservationResponse: The reservation
+
+        Raises:
+            HTTPException: 404 if the reservation does not exist
+        """
+        row = (await self.db.execute(
+            RESERVATION_BY_ID, {"reservation_id": reservation_id, "owner_id": user_id}
+        )).first()
+        if row is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Reservation not found")
+        return _to_response(row)
+
+    async def _raise_unsettleable(
+        self, user_id: int, reservation_id: int, now: datetime, amount: Optional[Decimal] = None
+    ) -> None:
+        # The conditional UPDATE matched nothing; read the row only to say why
+        row = (await self.db.execute(
+            RESERVATION_BY_ID, {"reservation_id": reservation_id, "owner_id": user_id}
+        )).first()
+        if row is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Reservation not found")
+        if row.status != _HELD:
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"Reservation is already {row.status}")
+        # SQLite hands back naive datetimes
+        expires_at = row.expires_at if row.expires_at.tzinfo else row.expires_at.replace(tzinfo=UTC)
+        if expires_at <= now:
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Reservation has expired")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Capture amount {amount} exceeds the held amount {row.amount}"
+        )
+
+
+async def sweep_expired_reservations(
+    engine: AsyncEngine, batch_size: int = 1000, now: Optional[datetime] = None
+) -> int:
+    """
+    Release every held reservation past its expiry, ``batch_size`` per transaction.
+
+    Each batch is one UPDATE of the reservations and one executemany UPDATE
+    of the affected users' ``reserved_balance``, applied in ``user_credits``
+    id order so concurrent sweeps and captures lock rows in the same order.
+
+    Args:
+        engine: Engine to run the sweep on
+        batch_size: Reservations expired per transaction
+        now: Expiry cut-off (default: the current time)
+
+    Returns:
+        int: Number of reservations expired
+    """
+    now = now or datetime.now(UTC)
+    total = 0
+    while True:
+        async with engine.begin() as conn:
+            expired = (await conn.execute(EXPIRE_RESERVATIONS, {"now": now, "batch_size": batch_size})).all()
+            released = defaultdict(Decimal)
+            for user_credit_id, amount in expired:
+                released[user_credit_id] += amount
+            if released:
+                await conn.execute(
+                    UNRESERVE_BALANCE,
+                    [{"credit_id": credit_id, "released": amount} for credit_id, amount in sorted(released.items())]
+                )
+        total += len(expired)
+        if len(expired) < batch_size:
+            break
+
+    if total:
+        logger.info(f"Expired {total} credit reservations",
+                  event_type="reservations_expired",
+                  count=total)
+    return total
+
+
+async def sweep_reservations_periodically(engine: AsyncEngine, interval_seconds: float, batch_size: int) -> None:
+    """Release expired reservations every ``interval_seconds`` until cancelled."""
+    while True:
+        try:
+            await sweep_expired_reservations(engine, batch_size=batch_size)
+        except Exception as e:
+            logger.warning(
+                f"Reservation sweep failed: {str(e)}",
+                event_type="reservation_sweep_error",
+                error=str(e)
+            )
+        await asyncio.sleep(interval_seconds)
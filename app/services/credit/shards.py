@@ -0,0 +1,194 @@
+"""Sharded balances for accounts that debit too often for one row.
+
+Every debit updates the user's ``user_credits`` row, so a shared account
+debiting hundreds of times per second serialises on that one row lock.
+Setting ``UserCredit.shard_count`` to N spreads the spendable balance over N
+``user_credit_shards`` rows; a debit then picks a shard at random and
+updates only that row (see ``app.services.credit.ledger``), so up to N
+debits proceed at once.
+
+The user's balance is always the ``user_credits`` row plus all shards.
+Credits, holds and captures keep using the ``user_credits`` row, which also
+keeps the held amount. A debit that finds its shard short falls back to
+``rebalance_shards``: with the user's rows locked, everything is folded
+into ``user_credits``, the debit is taken from there, and what is left is
+split evenly over the shards again. It therefore never fails while the
+total covers it, and never overdraws. ``rebalance_sharded_accounts`` does
+the same fold for every sharded account every
+``CREDIT_SHARD_REBALANCE_INTERVAL_SECONDS``, which keeps the shards level
+and ``user_credits.transaction_count`` current.
+"""
+
+import asyncio
+from decimal import Decimal, ROUND_DOWN
+
+from sqlalchemy import bindparam, delete, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.orm.util import identity_key
+
+from app.log.logging import logger
+from app.models.credit import UserCredit, UserCreditShard
+
+_credits = UserCredit.__table__
+_shards = UserCreditShard.__table__
+
+_CENT = Decimal("0.01")
+
+# FOR NO KEY UPDATE: does not block the key-share locks that ledger inserts take on user_credits
+LOCK_CREDIT = (
+    select(
+        _credits.c.id,
+        _credits.c.balance,
+        _credits.c.reserved_balance,
+        _credits.c.transaction_count,
+        _credits.c.shard_count,
+        _credits.c.updated_at,
+    )
+    .where(_credits.c.user_id == bindparam("owner_id"))
+    .with_for_update(key_share=True)
+)
+LOCK_SHARDS = (
+    select(_shards.c.shard_no, _shards.c.balance, _shards.c.transaction_count, _shards.c.updated_at)
+    .where(_shards.c.user_id == bindparam("owner_id"))
+    .order_by(_shards.c.shard_no)
+    .with_for_update(key_share=True)
+)
+
+
+async def rebalance_shards(db: AsyncSession, user_id: int, keep: Decimal = Decimal("0.00")) -> bool:
+    """
+    Fold a user's shards into ``user_credits`` and split the spendable balance evenly again.
+
+    Locks the ``user_credits`` row, then the shards in ``shard_no`` order.
+    Shards at or beyond ``shard_count`` are folded and deleted, missing ones
+    created. Nothing is committed.
+
+    Args:
+        db: Database session
+        user_id: The ID of the user
+        keep: Spendable amount to leave on the ``user_credits`` row (for a
+            debit about to be taken from there)
+
+    Returns:
+        bool: False if the user has no credit record
+    """
+    credit = (await db.execute(LOCK_CREDIT, {"owner_id": user_id})).first()
+    if credit is None:
+        return False
+    shards = (await db.execute(LOCK_SHARDS, {"owner_id": user_id})).all()
+
+    total = credit.balance + sum((shard.balance for shard in shards), Decimal("0.00"))
+    transaction_count = credit.transaction_count + sum(shard.transaction_count for shard in shards)
+    updated_at = max([credit.updated_at, *(shard.updated_at for shard in shards)])
+    spendable = total - credit.reserved_balance - keep
+    per_shard = Decimal("0.00")
+    if credit.shard_count and spendable > 0:
+        per_shard = (spendable / credit.shard_count).quantize(_CENT, rounding=ROUND_DOWN)
+
+    existing = {shard.shard_no for shard in shards}
+    if any(shard_no >= credit.shard_count for shard_no in existing):
+        await db.execute(
+            delete(_shards).where(_shards.c.user_id == user_id, _shards.c.shard_no >= credit.shard_count)
+        )
+    if credit.shard_count:
+        await db.execute(
+            update(_shards)
+            .where(_shards.c.user_id == user_id)
+            .values(balance=per_shard, transaction_count=0, updated_at=updated_at)
+        )
+        missing = [shard_no for shard_no in range(credit.shard_count) if shard_no not in existing]
+        if missing:
+            await db.execute(insert(_shards), [
+                {
+                    "user_id": user_id,
+                    "user_credit_id": credit.id,
+                    "shard_no": shard_no,
+                    "balance": per_shard,
+                    "transaction_count": 0,
+                    "updated_at": updated_at,
+                }
+                for shard_no in missing
+            ])
+
+    canonical_balance = total - per_shard * credit.shard_count
+    await db.execute(
+        update(_credits)
+        .where(_credits.c.id == credit.id)
+        .values(balance=canonical_balance, transaction_count=transaction_count, updated_at=updated_at)
+    )
+    loaded = db.identity_map.get(identity_key(UserCredit, credit.id))
+    if loaded is not None:
+        set_committed_value(loaded, "balance", canonical_balance)
+        set_committed_value(loaded, "transaction_count", transaction_count)
+        set_committed_value(loaded, "updated_at", updated_at)
+
+    logger.debug(f"Rebalanced {credit.shard_count} balance shards for user {user_id}",
+               event_type="credit_shards_rebalanced",
+               user_id=user_id,
+               shard_count=credit.shard_count,
+               per_shard=per_shard,
+               kept=canonical_balance)
+    return True
+
+
+async def set_shard_count(db: AsyncSession, user_id: int, shard_count: int) -> bool:
+    """
+    Change how many shards a user's balance is spread over (0 turns sharding off).
+
+    Nothing is committed.
+
+    Args:
+        db: Database session
+        user_id: The ID of the user
+        shard_count: New number of shards
+
+    Returns:
+        bool: False if the user has no credit record
+    """
+    changed = (await db.execute(
+        update(_credits).where(_credits.c.user_id == user_id).values(shard_count=shard_count)
+        .returning(_credits.c.id)
+    )).first()
+    if changed is None:
+        return False
+    loaded = db.identity_map.get(identity_key(UserCredit, changed.id))
+    if loaded is not None:
+        set_committed_value(loaded, "shard_count", shard_count)
+    return await rebalance_shards(db, user_id)
+
+
+async def rebalance_sharded_accounts(engine: AsyncEngine) -> int:
+    """
+    Rebalance every sharded account, one transaction per account.
+
+    Args:
+        engine: Engine to run on
+
+    Returns:
+        int: Number of accounts rebalanced
+    """
+    async with AsyncSession(engine) as db:
+        user_ids = (await db.execute(
+            select(_credits.c.user_id).where(_credits.c.shard_count > 0).order_by(_credits.c.user_id)
+        )).scalars().all()
+
+    for user_id in user_ids:
+        async with AsyncSession(engine) as db:
+            async with db.begin():
+                await rebalance_shards(db, user_id)
+    return len(user_ids)
+
+
+async def rebalance_shards_periodically(engine: AsyncEngine, interval_seconds: float) -> None:
+    """Rebalance sharded accounts every ``interval_seconds`` until cancelled."""
+    while True:
+        try:
+            await rebalance_sharded_accounts(engine)
+        except Exception as e:
+            logger.warning(
+                f"Shard rebalancing failed: {str(e)}",
+                event_type="credit_shard_rebalance_error",
+                error=str(e)
+            )
+        await asyncio.sleep(interval_seconds)
@@ -4,10 +4,11 @@ from typing import Optional, Dict, Any, List
 from datetime import datetime, UTC
 from decimal import Decimal
 
-from sqlalchemy import select
+from sqlalchemy import select, update
 from app.models.user import User
 from app.models.plan import Subscription
 from app.core.config import settings
+from app.core.hot_queries import get_active_subscription_row
 from app.log.logging import logger
 from app.services import stripe_async  # Async Stripe wrappers
 import stripe
@@ -230,14 +231,8 @@ class StripeIntegrationService:
                   user_id=user_id)
         
         try:
-            # Get user's active subscription from our database
-            result = await self.db.execute(
-                select(Subscription).where(
-                    (Subscription.user_id == user_id) & 
-                    (Subscription.is_active == True)  # noqa: E712
-                )
-            )
-            subscription = result.scalar_one_or_none()
+            # Get user's active subscription from our database (a plain row, nothing to track)
+            subscription = await get_active_subscription_row(self.db, user_id)
             
             if not subscription or not subscription.stripe_subscription_id:
                 logger.info(f"No active subscription found for user: {user_id}", 
@@ -269,8 +264,11 @@ class StripeIntegrationService:
                                  status=stripe_subscription.status)
                     
                     # Update our subscription status
-                    subscription.is_active = False
-                    subscription.status = stripe_subscription.status
+                    await self.db.execute(
+                        update(Subscription)
+                        .where(Subscription.id == subscription.id)
+                        .values(is_active=False, status=stripe_subscription.status)
+                    )
                     await self.db.commit()
                     
                     return None
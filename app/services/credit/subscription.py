@@ -96,7 +96,6 @@ class SubscriptionService:
         subscription.last_renewal_date = last_renewal_date
         subscription.renewal_date = calculate_renewal_date(last_renewal_date)
         await self.db.commit()
-        await self.db.refresh(subscription)
 
         # Add credits
         reference_id = str(uuid.uuid4())
@@ -192,7 +191,6 @@ class SubscriptionService:
             
         subscription.auto_renew = auto_renew
         await self.db.commit()
-        await self.db.refresh(subscription)
         
         logger.info(f"Subscription auto-renew updated: {subscription_id}, auto_renew={auto_renew}",
                   event_type="subscription_auto_renew_updated",
@@ -233,7 +231,6 @@ class SubscriptionService:
             subscription.is_active = False
         
         await self.db.commit()
-        await self.db.refresh(subscription)
         
         logger.info(f"Subscription status updated: {stripe_subscription_id}, status={status}",
                   event_type="subscription_status_updated",
@@ -14,6 +14,7 @@ from app.models.credit import TransactionType
 from app.models.user import User
 from app.models.plan import Plan, UsedTrialCardFingerprint # Import Plan and UsedTrialCardFingerprint (renamed)
 from app.schemas import credit_schemas
+from app.core.database import release_connection
 from app.log.logging import logger
 from app.services import stripe_async  # Async Stripe wrappers
 
@@ -109,7 +110,8 @@ class TransactionService:
                   transaction_id=transaction_id)
         
         try:
-            # Verify transaction with Stripe
+            # Verify transaction with Stripe, without holding a pooled connection meanwhile
+            await release_connection(self.db)
             verification_result = await self.stripe_service.verify_transaction_id(transaction_id)
             
             if not verification_result.get("verified", False):
@@ -777,7 +779,6 @@ class TransactionService:
             )
             self.db.add(subscription)
             await self.db.commit()
-            await self.db.refresh(subscription)
             
             logger.info(f"Created new subscription: User {user_id}, Plan {plan_id}, Subscription {subscription.id}",
                       event_type="subscription_created",
@@ -0,0 +1,250 @@
+"""Batch ingestion of metered usage records.
+
+Workers that used to call ``/credits/use`` once per operation send batches
+of ``(user_id, amount, reference_id)`` records instead. A batch is applied
+in one transaction:
+
+1. The ``user_credits`` rows of every user in the batch are locked in id
+   order (with their shards, for sharded accounts), so batches and single
+   debits for the same users serialise and cannot overdraw.
+2. References already in the ledger, or repeated earlier in the batch, are
+   rejected as duplicates.
+3. Records are allocated greedily, in request order, against each user's
+   spendable balance; what does not fit is rejected as insufficient.
+4. The accepted amounts are summed per user and debited with one set-based
+   UPDATE (``FROM unnest(...)`` on Postgres, an executemany UPDATE
+   elsewhere). The UPDATE also adds the number of ledger rows to
+   ``transaction_count``, since Core statements bypass the mapper events.
+5. The ledger rows are written with one executemany INSERT.
+
+Every record gets a result in request order.
+"""
+
+from collections import defaultdict
+from datetime import datetime, UTC
+from decimal import Decimal
+from typing import Any, Dict, List, Sequence
+
+from pydantic import ValidationError
+from sqlalchemy import ARRAY, Integer, Numeric, bindparam, func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.log.logging import logger
+from app.models.credit import CreditTransaction, TransactionType, UserCredit, UserCreditShard
+from app.schemas import credit_schemas
+from app.schemas.credit_schemas import UsageRecord, UsageRecordResult, UsageStatus
+from app.services.credit.decorators import db_error_handler
+from app.services.credit.shards import rebalance_shards
+
+_credits = UserCredit.__table__
+_shards = UserCreditShard.__table__
+_transactions = CreditTransaction.__table__
+
+_user_ids = bindparam("user_ids", expanding=True)
+
+LOCK_CREDITS = (
+    select(
+        _credits.c.id, _credits.c.user_id, _credits.c.balance, _credits.c.reserved_balance, _credits.c.shard_count
+    )
+    .where(_credits.c.user_id.in_(_user_ids))
+    .order_by(_credits.c.id)
+    .with_for_update(key_share=True)
+)
+LOCK_SHARDS = (
+    select(_shards.c.user_id, _shards.c.balance)
+    .where(_shards.c.user_id.in_(_user_ids))
+    .order_by(_shards.c.user_id, _shards.c.shard_no)
+    .with_for_update(key_share=True)
+)
+SPENT_REFERENCES = select(_transactions.c.user_id, _transactions.c.reference_id).where(
+    _transactions.c.reference_id.in_(bindparam("reference_ids", expanding=True)),
+    _transactions.c.user_id.in_(_user_ids),
+    _transactions.c.transaction_type == TransactionType.CREDIT_USED,
+)
+SHARD_TOTALS = (
+    select(_shards.c.user_id, func.sum(_shards.c.balance))
+    .where(_shards.c.user_id.in_(_user_ids))
+    .group_by(_shards.c.user_id)
+)
+
+
+def _debit_all_postgres():
+    # One statement per batch, whatever its size: the per-user totals arrive as three arrays
+    usage = func.unnest(
+        bindparam("credit_ids", type_=ARRAY(Integer)),
+        bindparam("spent", type_=ARRAY(Numeric(10, 2))),
+        bindparam("entries", type_=ARRAY(Integer)),
+    ).table_valued("credit_id", "spent", "entries").render_derived(name="usage")
+    return (
+        update(_credits)
+        .where(_credits.c.id == usage.c.credit_id)
+        .values(
+            balance=_credits.c.balance - usage.c.spent,
+            transaction_count=_credits.c.transaction_count + usage.c.entries,
+            updated_at=bindparam("now"),
+        )
+        .returning(_credits.c.user_id, _credits.c.balance)
+    )
+
+
+DEBIT_ALL = _debit_all_postgres()
+DEBIT_ONE = (
+    update(_credits)
+    .where(_credits.c.id == bindparam("credit_id"))
+    .values(
+        balance=_credits.c.balance - bindparam("spent", type_=Numeric(10, 2)),
+        transaction_count=_credits.c.transaction_count + bindparam("entries", type_=Integer),
+        updated_at=bindparam("now"),
+    )
+)
+CANONICAL_BALANCES = select(_credits.c.user_id, _credits.c.balance).where(_credits.c.user_id.in_(_user_ids))
+INSERT_ENTRIES = insert(_transactions).returning(_transactions.c.id, sort_by_parameter_order=True)
+
+
+class UsageService:
+    """Service class for batch usage ingestion."""
+
+    def __init__(self, db: AsyncSession):
+        """Initialize with database session."""
+        self.db = db
+
+    @db_error_handler()
+    async def ingest_usage(self, records: Sequence[Any]) -> credit_schemas.UsageBatchResponse:
+        """
+        Debit a batch of usage records in one transaction.
+
+        Args:
+            records: Raw usage records (dicts with ``user_id``, ``amount``
+                and optional ``reference_id``/``description``); anything
+                that does not validate is reported as invalid
+
+        Returns:
+            UsageBatchResponse: One result per record, in request order, and
+            the new balance of every user with applied records
+        """
+        results: List[UsageRecordResult] = []
+        valid: List[tuple] = []
+        for index, raw in enumerate(records):
+            try:
+                record = UsageRecord.model_validate(raw)
+            except ValidationError as e:
+                user_id = raw.get("user_id") if isinstance(raw, dict) else None
+                results.append(UsageRecordResult(
+                    index=index,
+                    user_id=user_id if isinstance(user_id, int) and not isinstance(user_id, bool) else None,
+                    status=UsageStatus.INVALID,
+                    detail="; ".join(f"{'.'.join(map(str, error['loc']))}: {error['msg']}" for error in e.errors())
+                ))
+                continue
+            result = UsageRecordResult(index=index, user_id=record.user_id, reference_id=record.reference_id,
+                                       status=UsageStatus.APPLIED)
+            results.append(result)
+            valid.append((record, result))
+
+        balances: Dict[int, Decimal] = {}
+        if valid:
+            balances = await self._apply(valid)
+
+        applied = sum(result.status == UsageStatus.APPLIED for result in results)
+        logger.info(f"Ingested usage batch: {applied} of {len(results)} records applied",
+                  event_type="usage_batch_ingested",
+                  records=len(results),
+                  applied=applied,
+                  users=len(balances))
+        return credit_schemas.UsageBatchResponse(
+            applied=applied,
+            rejected=len(results) - applied,
+            balances=balances,
+            results=results
+        )
+
+    async def _apply(self, valid: List[tuple]) -> Dict[int, Decimal]:
+        # Marks the rejected results in place; returns the new balance of every debited user
+        user_ids = sorted({record.user_id for record, _ in valid})
+        credits = {row.user_id: row for row in (await self.db.execute(LOCK_CREDITS, {"user_ids": user_ids}))}
+        shard_totals: Dict[int, Decimal] = defaultdict(Decimal)
+        sharded = [user_id for user_id, credit in credits.items() if credit.shard_count]
+        if sharded:
+            for user_id, balance in await self.db.execute(LOCK_SHARDS, {"user_ids": sharded}):
+                shard_totals[user_id] += balance
+
+        spent_references = set()
+        reference_ids = sorted({record.reference_id for record, _ in valid if record.reference_id})
+        if reference_ids:
+            spent_references = set((await self.db.execute(
+                SPENT_REFERENCES, {"reference_ids": reference_ids, "user_ids": user_ids}
+            )).all())
+
+        available = {
+            user_id: credit.balance - credit.reserved_balance + shard_totals[user_id]
+            for user_id, credit in credits.items()
+        }
+        spent: Dict[int, Decimal] = defaultdict(Decimal)
+        accepted: List[tuple] = []
+        for record, result in valid:
+            reference = (record.user_id, record.reference_id)
+            if record.reference_id and reference in spent_references:
+                result.status = UsageStatus.DUPLICATE_REFERENCE
+                result.detail = f"Reference {record.reference_id} was already used"
+                continue
+            if available.get(record.user_id, Decimal("0.00")) < record.amount:
+                result.status = UsageStatus.INSUFFICIENT_CREDITS
+                result.detail = (
+                    f"Insufficient credits. Required: {record.amount}, "
+                    f"Available: {available.get(record.user_id, Decimal('0.00'))}"
+                )
+                continue
+            available[record.user_id] -= record.amount
+            spent[record.user_id] += record.amount
+            if record.reference_id:
+                spent_references.add(reference)
+            accepted.append((record, result))
+
+        if not accepted:
+            await self.db.rollback()
+            return {}
+
+        for user_id in sharded:
+            credit = credits[user_id]
+            if spent[user_id] > credit.balance - credit.reserved_balance:
+                # Pull what the batch spends back from the shards onto user_credits
+                await rebalance_shards(self.db, user_id, keep=spent[user_id])
+
+        now = datetime.now(UTC)
+        entries = defaultdict(int)
+        for record, _ in accepted:
+            entries[record.user_id] += 1
+        debited = sorted(spent)
+        if self.db.get_bind().dialect.name == "postgresql":
+            balances = dict((await self.db.execute(DEBIT_ALL, {
+                "credit_ids": [credits[user_id].id for user_id in debited],
+                "spent": [spent[user_id] for user_id in debited],
+                "entries": [entries[user_id] for user_id in debited],
+                "now": now,
+            })).all())
+        else:
+            await self.db.execute(DEBIT_ONE, [
+                {"credit_id": credits[user_id].id, "spent": spent[user_id], "entries": entries[user_id], "now": now}
+                for user_id in debited
+            ])
+            balances = dict((await self.db.execute(CANONICAL_BALANCES, {"user_ids": debited})).all())
+        if sharded:
+            for user_id, total in await self.db.execute(SHARD_TOTALS, {"user_ids": debited}):
+                balances[user_id] += total
+
+        entry_ids = (await self.db.execute(INSERT_ENTRIES, [
+            {
+                "user_id": record.user_id,
+                "user_credit_id": credits[record.user_id].id,
+                "amount": record.amount,
+                "transaction_type": TransactionType.CREDIT_USED,
+                "reference_id": record.reference_id,
+                "description": record.description,
+                "created_at": now,
+            }
+            for record, _ in accepted
+        ])).scalars().all()
+        for (_, result), entry_id in zip(accepted, entry_ids):
+            result.transaction_id = entry_id
+        await self.db.commit()
+        return balances
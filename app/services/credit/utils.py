@@ -1,17 +1,19 @@
 """Utility functions for the credit service module."""
 
+import base64
 from datetime import datetime, UTC, timedelta
 from decimal import Decimal
 from calendar import monthrange
-from typing import Optional
+from typing import Optional, Tuple, Union
 
 from app.log.logging import logger
 from app.models.credit import CreditTransaction
+from app.services.credit.ledger import LedgerEntry
 from app.schemas import credit_schemas
 
 
 def create_transaction_response(
-    transaction: CreditTransaction,
+    transaction: Union[CreditTransaction, LedgerEntry],
     new_balance: Decimal,
     monetary_amount: Optional[Decimal] = None,
     currency: str = "USD"
@@ -20,7 +22,7 @@ def create_transaction_response(
     Create a transaction response object from a transaction.
     
     Args:
-        transaction: The transaction to create a response from
+        transaction: The transaction (or ledger entry just written) to create a response from
         new_balance: The new balance after the transaction
         monetary_amount: Optional monetary amount (price) of the transaction
         currency: Currency of the monetary amount (default: USD)
@@ -131,4 +133,40 @@ def calculate_credits_from_payment(payment_amount: Decimal, plans: list) -> Deci
               ratio=float(ratio),
               credit_amount=float(credit_amount))
               
-    return credit_amount
\ No newline at end of file
+    return credit_amount
+
+
+def encode_history_cursor(transaction: CreditTransaction) -> str:
+    """
+    Encode the position after ``transaction`` as an opaque history cursor.
+
+    Args:
+        transaction: Last transaction of the current page
+
+    Returns:
+        str: URL-safe cursor for the next page
+    """
+    raw = f"{transaction.created_at.isoformat()}|{transaction.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_history_cursor(cursor: str) -> Tuple[datetime, int]:
+    """
+    Decode a cursor produced by ``encode_history_cursor``.
+
+    Args:
+        cursor: Cursor from a previous history page
+
+    Returns:
+        Tuple[datetime, int]: ``created_at`` and ``id`` of the last transaction seen
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, transaction_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(created_at), int(transaction_id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"Invalid history cursor: {cursor!r}") from e
+
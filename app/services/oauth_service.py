@@ -365,7 +365,6 @@ class GoogleOAuthService:
                 
             update_start = time.time()
             await self.db.commit()
-            await self.db.refresh(user)
             update_time = time.time() - update_start
             
             elapsed_time = time.time() - start_time
@@ -397,7 +396,6 @@ class GoogleOAuthService:
         create_start = time.time()
         self.db.add(new_user)
         await self.db.commit()
-        await self.db.refresh(new_user)
         create_time = time.time() - create_start
         
         elapsed_time = time.time() - start_time
@@ -432,7 +430,6 @@ class GoogleOAuthService:
             user.is_verified = True
         
         await self.db.commit()
-        await self.db.refresh(user)
         
         logger.info(
             "Linked Google account to existing user",
@@ -468,7 +465,6 @@ class GoogleOAuthService:
         user.auth_type = 'password'
         
         await self.db.commit()
-        await self.db.refresh(user)
         
         logger.info(
             "Unlinked Google account from user",
@@ -1,12 +1,15 @@
 """Async wrappers for Stripe API calls to prevent blocking the event loop."""
 
 import asyncio
+import time
 from typing import Any, Optional, Dict
 from functools import wraps
 
 import stripe
 
 from app.core.config import settings
+from app.core.metrics import record_outbound_call
+from app.core.tracing import SpanKind, tracer
 from app.log.logging import logger
 
 # Initialize Stripe configuration
@@ -14,10 +17,23 @@ stripe.api_key = settings.STRIPE_SECRET_KEY
 stripe.api_version = settings.STRIPE_API_VERSION
 
 
+def _operation_name(func) -> str:
+    """Return a low-cardinality name such as ``Customer.create`` for a Stripe call."""
+    owner = getattr(func, "__self__", None)
+    if isinstance(owner, type):
+        return f"{owner.__name__}.{func.__name__}"
+    return getattr(func, "__qualname__", repr(func))
+
+
 async def run_stripe_async(func, *args, **kwargs) -> Any:
     """
     Run a synchronous Stripe API call in a thread pool to avoid blocking.
 
+    The caller's database session is left alone. Callers that want the
+    connection back in the pool during the call end their own read-only
+    transaction first with ``release_connection(self.db)``; only they know
+    whether it holds locks they still need.
+
     Args:
         func: The Stripe API function to call
         *args: Positional arguments to pass to the function
@@ -29,10 +45,15 @@ async def run_stripe_async(func, *args, **kwargs) -> Any:
     Raises:
         stripe.error.StripeError: If the Stripe API call fails
     """
+    operation = _operation_name(func)
+    start = time.perf_counter()
     try:
-        result = await asyncio.to_thread(func, *args, **kwargs)
+        with tracer.span(f"stripe {operation}", kind=SpanKind.CLIENT, attributes={"rpc.system": "stripe"}):
+            result = await asyncio.to_thread(func, *args, **kwargs)
+        record_outbound_call("stripe", operation, time.perf_counter() - start)
         return result
     except stripe.error.StripeError as e:
+        record_outbound_call("stripe", operation, time.perf_counter() - start, error_type=type(e).__name__)
         logger.error(
             "Stripe API error",
             event_type="stripe_api_error",
@@ -41,6 +62,9 @@ async def run_stripe_async(func, *args, **kwargs) -> Any:
             error_message=str(e),
         )
         raise
+    except Exception as e:
+        record_outbound_call("stripe", operation, time.perf_counter() - start, error_type=type(e).__name__)
+        raise
 
 
 class AsyncStripeCustomer:
@@ -8,6 +8,7 @@ from datetime import datetime, timezone
 from typing import Optional
 
 from app.core.config import settings
+from app.core.database import release_connection
 from app.models.user import User
 from app.models.plan import Subscription # Import Subscription from plan model
 from app.models.plan import Plan # Assuming Plan model exists
@@ -101,6 +102,9 @@ class StripeService:
 
 
         stripe_subscription_id = db_subscription.stripe_subscription_id
+        # The Stripe round-trips below can be slow; end the read transaction first
+        # so each local update runs in its own short transaction afterwards
+        await release_connection(self.db)
 
         try:
             logger.info(
@@ -123,7 +127,6 @@ class StripeService:
                     db_subscription.status = 'canceled'
                     db_subscription.updated_at = datetime.now(timezone.utc)
                     await self.db.commit()
-                    await self.db.refresh(db_subscription)
                 raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Subscription is already canceled.")
 
             if stripe_sub.cancel_at_period_end:
@@ -175,7 +178,6 @@ class StripeService:
             # db_subscription.cancel_at_period_end_flag = True # If you add such a field
             
             await self.db.commit()
-            await self.db.refresh(db_subscription)
 
             period_end_dt = datetime.fromtimestamp(updated_stripe_sub.current_period_end, tz=timezone.utc)
 
@@ -11,10 +11,11 @@ from sqlalchemy import select, update, text
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload # Added for eager loading
 from sqlalchemy.exc import IntegrityError
-import requests
+import httpx
 import stripe # Added for Stripe direct calls if needed
 
 from app.core.security import get_password_hash, verify_password
+from app.core.database import release_connection
 
 
 from app.models.user import User, EmailVerificationToken, EmailChangeRequest, PasswordResetToken
@@ -31,9 +32,11 @@ from app.services.email_service import EmailService
 from app.services.stripe_service import StripeService # Added
 from app.services import stripe_async  # Async Stripe wrappers
 from app.log.logging import logger
+from app.core.tracing import traced_service
 from app.core.config import settings # Added for Stripe API key
 
 
+@traced_service("UserService")
 class UserService:
     """Service class for user operations."""
 
@@ -105,7 +108,6 @@ class UserService:
             )
             self.db.add(user)
             await self.db.commit()
-            await self.db.refresh(user)
             return user
         except IntegrityError:
             await self.db.rollback()
@@ -198,6 +200,8 @@ class UserService:
 
             if stripe_sub_id_db:
                 try:
+                    # Everything needed from the DB is loaded; don't hold a connection during the Stripe call
+                    await release_connection(self.db)
                     stripe_sub = await stripe_async.Subscription.retrieve(stripe_sub_id_db)
                     if stripe_sub:
                         stripe_subscription_status = stripe_sub["status"]
@@ -223,7 +227,6 @@ class UserService:
                             if stripe_subscription_status not in [SubscriptionStatusEnum.ACTIVE.value, SubscriptionStatusEnum.TRIALING.value]:
                                 active_subscription.is_active = False
                             await self.db.commit()
-                            await self.db.refresh(active_subscription)
 
 
                 except stripe.error.StripeError as e:
@@ -310,7 +313,6 @@ class UserService:
             user.email = new_email
             user.is_verified = False
             await self.db.commit()
-            await self.db.refresh(user)
             return user
         except IntegrityError:
             await self.db.rollback()
@@ -482,7 +484,6 @@ class UserService:
             token_record.used = True
             
             await self.db.commit()
-            await self.db.refresh(user)
             
             logger.info(
                 f"Email verified for user {user.id}",
@@ -559,10 +560,11 @@ class UserService:
         zapier_webhook_url = "https://hooks.zapier.com/hooks/catch/123456/abcdef" # Replace with actual URL
         payload = {"email": email}
         try:
-            response = requests.post(zapier_webhook_url, json=payload, timeout=10)
-            response.raise_for_status() # Raise HTTPError for bad responses (4xx or 5xx)
+            async with httpx.AsyncClient(timeout=10) as client:
+                response = await client.post(zapier_webhook_url, json=payload)
+            response.raise_for_status() # Raise HTTPStatusError for bad responses (4xx or 5xx)
             logger.info(f"Email {email} sent to Zapier successfully.")
-        except requests.exceptions.RequestException as e:
+        except httpx.HTTPError as e:
             logger.error(f"Error sending email to Zapier: {e}")
             # Optionally, re-raise or handle more gracefully
 
@@ -596,7 +598,6 @@ class UserService:
 
         user.hashed_password = get_password_hash(new_password)
         await self.db.commit()
-        await self.db.refresh(user)
         return True
 
     async def send_password_change_confirmation(
@@ -800,7 +801,6 @@ class UserService:
             request_record.completed = True
             
             await self.db.commit()
-            await self.db.refresh(user)
             
             logger.info(
                 f"Email changed for user {user.id} from {old_email} to {user.email}",
@@ -1163,7 +1163,6 @@ async def create_password_reset_token(db: AsyncSession, email: str) -> str:
         user.password_reset_token_expires_at = expires_at
         
         await db.commit()
-        await db.refresh(user)
         
         logger.info(f"Password reset token created for user {user.id}", event_type="password_reset_token_created", user_id=user.id)
         return token
@@ -1209,6 +1208,5 @@ async def reset_password(db: AsyncSession, user_id: int, new_password: str) -> b
     user.password_reset_token = None # Invalidate token
     user.password_reset_token_expires_at = None
     await db.commit()
-    await db.refresh(user)
     logger.info(f"Password reset for user {user_id}", event_type="password_reset_success", user_id=user_id)
     return True
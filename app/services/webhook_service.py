@@ -3,15 +3,17 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.exc import IntegrityError, SQLAlchemyError
-from sqlalchemy import func, exists
+from sqlalchemy import func
 
 from app.core.config import settings
 from app.log.logging import logger
+from app.core.tracing import traced_service
 from app.models.user import User
 from app.models.plan import UsedTrialCardFingerprint, Subscription
 from app.models.processed_event import ProcessedStripeEvent
 from app.models.credit import UserCredit, CreditTransaction, TransactionType # New imports
 from app.core.db_utils import get_or_create_subscription # Helper for subscription
+from app.core.hot_queries import get_user_id_by_stripe_customer_id, is_stripe_event_processed
 # from app.services.user_service import UserService # To update user status
 # from app.services.credit_service import CreditService # To grant credits
 from app.services.internal_event_publisher import InternalEventPublisher # To publish events
@@ -21,6 +23,7 @@ from datetime import datetime, timezone # For trial_end_date
 stripe.api_key = settings.STRIPE_SECRET_KEY
 
 
+@traced_service("WebhookService")
 class WebhookService:
     def __init__(self, db_session: AsyncSession):
         self.db = db_session
@@ -31,11 +34,7 @@ class WebhookService:
     async def is_event_processed(self, event_id: str) -> bool:
         """Checks if a Stripe event has already been processed."""
         try:
-            # Use exists() for a simple boolean check without fetching the entire object
-            stmt = select(exists().where(ProcessedStripeEvent.stripe_event_id == event_id))
-            result = await self.db.execute(stmt)
-            # scalar() returns the first column of the first row directly
-            return result.scalar()
+            return await is_stripe_event_processed(self.db, event_id)
         except Exception as e:
             logger.error(f"Error checking if event {event_id} was processed: {e}", event_id=event_id, exc_info=True)
             # In case of error, assume event was not processed to allow retry
@@ -248,9 +247,7 @@ class WebhookService:
         # Attempt to get user_id from metadata, or map from stripe_customer_id
         user_id = subscription_data.metadata.get("user_id")
         if not user_id:
-            user_stmt = select(User.id).where(User.stripe_customer_id == stripe_customer_id)
-            user_id_result = await self.db.execute(user_stmt)
-            user_id = user_id_result.scalars().first()
+            user_id = await get_user_id_by_stripe_customer_id(self.db, stripe_customer_id)
         
         if not user_id:
             logger.error(f"User ID not found for customer.subscription.created: {event_id}, Stripe Customer: {stripe_customer_id}", event_id=event_id, stripe_customer_id=stripe_customer_id)
@@ -434,9 +431,7 @@ class WebhookService:
         # Attempt to get user_id from metadata, or map from stripe_customer_id
         user_id = subscription_data.metadata.get("user_id")
         if not user_id and stripe_customer_id: # Ensure stripe_customer_id exists before querying
-            user_stmt = select(User.id).where(User.stripe_customer_id == stripe_customer_id)
-            user_id_result = await self.db.execute(user_stmt)
-            user_id = user_id_result.scalars().first()
+            user_id = await get_user_id_by_stripe_customer_id(self.db, stripe_customer_id)
 
         if not user_id:
             logger.error(f"User ID not found for customer.subscription.updated: {event_id}, Stripe Customer: {stripe_customer_id}", event_id=event_id, stripe_customer_id=stripe_customer_id)
@@ -569,9 +564,7 @@ class WebhookService:
         if hasattr(invoice_data, 'customer_details') and invoice_data.customer_details is not None:
             user_id = invoice_data.customer_details.get("metadata", {}).get("user_id")
         if not user_id and stripe_customer_id: # Fallback: try to get from our User table
-            user_stmt = select(User.id).where(User.stripe_customer_id == stripe_customer_id)
-            user_id_result = await self.db.execute(user_stmt)
-            user_id = user_id_result.scalars().first()
+            user_id = await get_user_id_by_stripe_customer_id(self.db, stripe_customer_id)
         
         if not user_id:
             logger.error(f"User ID not found for invoice.payment_succeeded: {event_id}, Stripe Customer: {stripe_customer_id}", event_id=event_id, stripe_customer_id=stripe_customer_id)
@@ -657,9 +650,7 @@ class WebhookService:
 
         user_id = invoice_data.customer_details.get("metadata", {}).get("user_id")
         if not user_id and stripe_customer_id:
-            user_stmt = select(User.id).where(User.stripe_customer_id == stripe_customer_id)
-            user_id_result = await self.db.execute(user_stmt)
-            user_id = user_id_result.scalars().first()
+            user_id = await get_user_id_by_stripe_customer_id(self.db, stripe_customer_id)
 
         if not user_id:
             logger.error(f"User ID not found for invoice.payment_failed: {event_id}, Stripe Customer: {stripe_customer_id}", event_id=event_id, stripe_customer_id=stripe_customer_id)
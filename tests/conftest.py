@@ -13,6 +13,7 @@ import logging
 from app.log.logging import logger # Import logger
 
 from app.core.database import get_db
+from app.core.sql_instrumentation import instrument_engine
 # Import app directly from app.main to ensure we're using the same instance
 from app.main import app as app_instance
 import app.models # Import all models to ensure they are registered with Base.metadata
@@ -32,6 +33,8 @@ engine = create_async_engine(
     # poolclass=None, # Let SQLAlchemy manage pooling, default is QueuePool
     echo=False # Set to True for debugging SQL
 )
+# Feed statement timings into per-request stats, as the production engine does
+instrument_engine(engine)
 
 # Create sessionmaker once
 AsyncTestingSessionLocal = sessionmaker(
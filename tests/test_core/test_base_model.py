@@ -0,0 +1,64 @@
+"""Tests for the declarative base: new rows are complete without a refresh()."""
+
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import inspect
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.core.base_model import Base
+from app.core.sql_instrumentation import count_queries
+from app.models.credit import UserCredit
+from app.models.user import User
+from app.services.user_service import UserService
+
+
+@pytest.fixture
+async def engine():
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield engine
+    await engine.dispose()
+
+
+class TestInsertedRows:
+    """After commit, every column of a new row is loaded and readable without a SELECT."""
+
+    @pytest.mark.asyncio
+    async def test_unset_columns_are_loaded_as_null(self, engine):
+        async with AsyncSession(engine, expire_on_commit=False) as db:
+            user = User(email="complete@example.com", hashed_password="x")
+            db.add(user)
+            await db.commit()
+
+            with count_queries(engine) as queries:
+                assert user.google_id is None
+                assert user.stripe_customer_id is None
+                assert user.id is not None and user.created_at is not None
+
+            column_keys = {prop.key for prop in inspect(User).column_attrs}
+            assert not column_keys & inspect(user).unloaded
+            assert queries.count == 0
+
+    @pytest.mark.asyncio
+    async def test_python_defaults_are_loaded(self, engine):
+        async with AsyncSession(engine, expire_on_commit=False) as db:
+            user = User(email="defaults@example.com", hashed_password="x")
+            db.add(user)
+            await db.flush()
+            credit = UserCredit(user_id=user.id, balance=Decimal("1.00"))
+            db.add(credit)
+            await db.commit()
+
+            assert credit.transaction_count == 0
+            assert credit.updated_at is not None
+
+    @pytest.mark.asyncio
+    async def test_create_user_is_a_single_insert(self, engine):
+        async with AsyncSession(engine, expire_on_commit=False) as db:
+            with count_queries(engine) as queries:
+                user = await UserService(db).create_user("single@example.com", "Password-123")
+
+            assert [statement.split()[0] for statement in queries.statements] == ["INSERT"]
+            assert user.google_id is None and user.is_verified is False
@@ -0,0 +1,163 @@
+"""Tests for the database circuit breaker."""
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.core import database
+from app.core.circuit_breaker import CircuitBreaker, CircuitState
+from app.core.database import InstrumentedAsyncQueuePool
+from app.core.db_exceptions import DatabaseUnavailableError
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def breaker(clock):
+    return CircuitBreaker("test", failure_threshold=3, recovery_timeout=10.0, clock=clock)
+
+
+def _open(breaker):
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure(ConnectionRefusedError("refused"))
+
+
+class TestCircuitBreaker:
+    """State machine tests."""
+
+    def test_starts_closed(self, breaker):
+        assert breaker.state == CircuitState.CLOSED
+        assert breaker.allow() is False
+
+    def test_opens_after_consecutive_failures(self, breaker):
+        breaker.record_failure()
+        breaker.record_failure()
+        assert breaker.state == CircuitState.CLOSED
+        breaker.record_failure()
+        assert breaker.state == CircuitState.OPEN
+
+    def test_success_resets_failure_count(self, breaker):
+        breaker.record_failure()
+        breaker.record_failure()
+        breaker.record_success()
+        breaker.record_failure()
+        assert breaker.state == CircuitState.CLOSED
+
+    def test_open_rejects_with_retry_after(self, breaker, clock):
+        _open(breaker)
+        clock.now += 3.5
+
+        with pytest.raises(DatabaseUnavailableError) as exc_info:
+            breaker.allow()
+
+        assert exc_info.value.status_code == 503
+        assert exc_info.value.headers["Retry-After"] == "7"
+
+    def test_half_open_lets_one_probe_through(self, breaker, clock):
+        _open(breaker)
+        clock.now += 10
+
+        assert breaker.state == CircuitState.HALF_OPEN
+        assert breaker.allow() is True
+        with pytest.raises(DatabaseUnavailableError):
+            breaker.allow()
+
+    def test_probe_success_closes(self, breaker, clock):
+        _open(breaker)
+        clock.now += 10
+        breaker.allow()
+
+        breaker.record_success()
+
+        assert breaker.state == CircuitState.CLOSED
+        assert breaker.allow() is False
+
+    def test_probe_failure_reopens(self, breaker, clock):
+        _open(breaker)
+        clock.now += 10
+        breaker.allow()
+
+        breaker.record_failure(ConnectionRefusedError("still down"))
+
+        assert breaker.state == CircuitState.OPEN
+        assert breaker.snapshot()["last_error"] == "ConnectionRefusedError: still down"
+        clock.now += 9
+        with pytest.raises(DatabaseUnavailableError):
+            breaker.allow()
+
+    def test_unreported_probe_reopens(self, breaker, clock):
+        _open(breaker)
+        clock.now += 10
+        breaker.allow()
+
+        breaker.end_probe()
+
+        assert breaker.state == CircuitState.OPEN
+
+
+class TestPoolIntegration:
+    """The instrumented pool reports checkout outcomes."""
+
+    @pytest.mark.asyncio
+    async def test_connect_failures_open_the_circuit(self, breaker):
+        engine = create_async_engine(
+            "sqlite+aiosqlite:////nonexistent-dir/db.sqlite",
+            poolclass=InstrumentedAsyncQueuePool,
+        )
+        engine.pool.circuit_breaker = breaker
+
+        for _ in range(3):
+            with pytest.raises(Exception):
+                async with engine.connect():
+                    pass
+
+        assert breaker.state == CircuitState.OPEN
+        await engine.dispose()
+        assert engine.pool.circuit_breaker is breaker
+
+    @pytest.mark.asyncio
+    async def test_successful_checkout_closes_half_open(self, breaker, clock):
+        engine = create_async_engine("sqlite+aiosqlite://", poolclass=InstrumentedAsyncQueuePool)
+        engine.pool.circuit_breaker = breaker
+        _open(breaker)
+        clock.now += 10
+        assert breaker.allow() is True
+
+        async with AsyncSession(engine) as session:
+            await session.execute(text("SELECT 1"))
+
+        assert breaker.state == CircuitState.CLOSED
+        await engine.dispose()
+
+
+class TestGetDb:
+    """get_db fails fast while the circuit is open."""
+
+    @pytest.mark.asyncio
+    async def test_open_circuit_rejects_without_session(self, breaker, monkeypatch):
+        monkeypatch.setattr(database, "db_circuit_breaker", breaker)
+        _open(breaker)
+
+        with pytest.raises(DatabaseUnavailableError):
+            await database.get_db().__anext__()
+
+    @pytest.mark.asyncio
+    async def test_check_db_health_reports_open_circuit(self, breaker, monkeypatch):
+        monkeypatch.setattr(database, "db_circuit_breaker", breaker)
+        _open(breaker)
+
+        health = await database.check_db_health()
+
+        assert health["status"] == "unhealthy"
+        assert health["circuit_breaker"]["state"] == CircuitState.OPEN
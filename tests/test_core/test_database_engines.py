@@ -0,0 +1,146 @@
+"""Tests for the shared database engine registry."""
+
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.core import database
+from app.routers.healthchecks.fastapi_healthcheck.enum import HealthCheckStatusEnum
+from app.routers.healthchecks.fastapi_healthcheck_sqlalchemy import HealthCheckSQLAlchemy
+
+
+class TestEngineRegistry:
+    """Tests for register_engine / get_engine / dispose_engines."""
+
+    def test_primary_engine_is_registered(self):
+        assert database.get_engine() is database.engine
+        assert database.AsyncSessionLocal.kw["bind"] is database.engine
+
+    @pytest.mark.asyncio
+    async def test_dispose_engines_closes_registered_pools(self, monkeypatch):
+        extra = create_async_engine("sqlite+aiosqlite://")
+        monkeypatch.setattr(database, "_engines", {"extra": extra})
+        async with extra.connect():
+            pass
+        original_pool = extra.pool
+
+        await database.dispose_engines()
+
+        # dispose() closes the pooled connections and swaps in a fresh pool
+        assert extra.pool is not original_pool
+
+    @pytest.mark.asyncio
+    async def test_dispose_errors_are_logged_not_raised(self, monkeypatch):
+        class BrokenEngine:
+            async def dispose(self):
+                raise RuntimeError("boom")
+
+        monkeypatch.setattr(database, "_engines", {"broken": BrokenEngine()})
+        await database.dispose_engines()
+
+
+class TestSQLAlchemyHealthCheck:
+    """The health check borrows a connection from the engine it is given."""
+
+    @pytest.mark.asyncio
+    async def test_uses_given_engine(self):
+        shared = create_async_engine("sqlite+aiosqlite://")
+        check = HealthCheckSQLAlchemy(engine=shared, alias="db", tags=["db"])
+
+        assert await check.__checkHealth__() == HealthCheckStatusEnum.HEALTHY
+        assert check._engine is shared
+        await shared.dispose()
+
+
+class TestBulkheads:
+    """Each traffic class gets its own pool, selected in get_db."""
+
+    def test_classes_have_separate_registered_pools(self):
+        interactive = database.engine_for(database.TrafficClass.INTERACTIVE)
+        webhooks = database.engine_for(database.TrafficClass.WEBHOOKS)
+        internal = database.engine_for(database.TrafficClass.INTERNAL)
+
+        assert interactive is database.engine
+        assert len({id(interactive), id(webhooks), id(internal)}) == 3
+        assert database.get_engine("webhooks") is webhooks
+        assert webhooks.pool.size() == database.settings.DB_WEBHOOKS_POOL_SIZE
+
+    def test_pools_share_the_primary_circuit_breaker(self):
+        for traffic_class in database.TrafficClass:
+            assert database.engine_for(traffic_class).pool.circuit_breaker is database.db_circuit_breaker
+
+    def test_zero_size_shares_the_interactive_pool(self, monkeypatch):
+        monkeypatch.setattr(database, "_engines", {})
+        monkeypatch.setattr(database.settings, "DB_WEBHOOKS_POOL_SIZE", 0)
+
+        engines = database._create_bulkheads()
+
+        assert engines[database.TrafficClass.WEBHOOKS] is database.engine
+        assert "webhooks" not in database._engines
+        assert engines[database.TrafficClass.INTERNAL] is not database.engine
+
+    def test_declared_class_selects_the_pool(self):
+        app = FastAPI()
+
+        @app.get("/webhook", dependencies=[Depends(database.traffic_class(database.TrafficClass.WEBHOOKS))])
+        async def webhook(db: AsyncSession = Depends(database.get_db)):
+            return {"pool": db.bind.pool.metrics_name}
+
+        @app.get("/login")
+        async def login(db: AsyncSession = Depends(database.get_db)):
+            return {"pool": db.bind.pool.metrics_name}
+
+        client = TestClient(app)
+        assert client.get("/webhook").json() == {"pool": "webhooks"}
+        assert client.get("/login").json() == {"pool": "primary"}
+
+    def test_jobs_declare_a_class(self):
+        assert database.current_traffic_class() is database.TrafficClass.INTERACTIVE
+        with database.use_traffic_class(database.TrafficClass.INTERNAL):
+            assert database.current_traffic_class() is database.TrafficClass.INTERNAL
+            assert database.session_factory(database.current_traffic_class()).kw["bind"] is \
+                database.engine_for(database.TrafficClass.INTERNAL)
+        assert database.current_traffic_class() is database.TrafficClass.INTERACTIVE
+
+
+class TestPgBouncerMode:
+    """Engines behind PgBouncer in transaction mode keep no per-connection server state."""
+
+    @pytest.fixture
+    def captured(self, monkeypatch):
+        captured = {}
+        create = database.create_async_engine
+
+        def capture(url, **kwargs):
+            captured.update(kwargs)
+            return create(url, **kwargs)
+
+        monkeypatch.setattr(database, "create_async_engine", capture)
+        monkeypatch.setattr(database, "_engines", {})
+        monkeypatch.setattr(database.settings, "DB_PGBOUNCER_MODE", True)
+        return captured
+
+    def test_prepared_statements_are_not_cached(self, captured):
+        database.create_pooled_engine("postgresql+asyncpg://u:p@localhost/db", "pgbouncer_test")
+
+        connect_args = captured["connect_args"]
+        assert connect_args["statement_cache_size"] == 0
+        assert connect_args["prepared_statement_cache_size"] == 0
+        names = {connect_args["prepared_statement_name_func"]() for _ in range(3)}
+        assert len(names) == 3
+
+    def test_null_pool_by_default(self, captured):
+        pooled = database.create_pooled_engine("postgresql+asyncpg://u:p@localhost/db", "pgbouncer_test")
+
+        assert isinstance(pooled.pool, database.InstrumentedNullPool)
+        assert "pool_pre_ping" not in captured
+        assert pooled.pool.circuit_breaker is not None
+
+    def test_queue_pool_when_configured(self, captured, monkeypatch):
+        monkeypatch.setattr(database.settings, "DB_PGBOUNCER_POOL", "queue")
+
+        pooled = database.create_pooled_engine("postgresql+asyncpg://u:p@localhost/db", "pgbouncer_test")
+
+        assert isinstance(pooled.pool, database.InstrumentedAsyncQueuePool)
+        assert captured["connect_args"]["statement_cache_size"] == 0
@@ -0,0 +1,179 @@
+"""Tests for the prebuilt Core fast path for hot read-only queries."""
+
+from datetime import datetime, timedelta, UTC
+from decimal import Decimal
+
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.core import database, hot_queries
+from app.core.base_model import Base
+from app.models.credit import UserCredit
+from app.models.plan import Plan, Subscription
+from app.models.processed_event import ProcessedStripeEvent
+from app.models.user import User
+from app.services.credit.stripe_integration import StripeIntegrationService
+
+
+@pytest.fixture
+async def session():
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        user = User(email="hot@example.com", hashed_password="x", is_verified=True, stripe_customer_id="cus_hot")
+        plan = Plan(name="Hot", credit_amount=Decimal("100"), price=Decimal("10"))
+        session.add_all([user, plan])
+        await session.flush()
+        now = datetime.now(UTC)
+        session.add_all([
+            UserCredit(user_id=user.id, balance=Decimal("12.50")),
+            Subscription(user_id=user.id, plan_id=plan.id, renewal_date=now + timedelta(days=5), status="active"),
+            Subscription(user_id=user.id, plan_id=plan.id, renewal_date=now + timedelta(days=9), status="old",
+                         is_active=False),
+            ProcessedStripeEvent(stripe_event_id="evt_hot", event_type="test"),
+        ])
+        await session.commit()
+        session.expunge_all()
+        yield session, user.id
+    await engine.dispose()
+
+
+class TestHotQueries:
+    """Each lookup returns plain rows and matches the ORM query it replaces."""
+
+    @pytest.mark.asyncio
+    async def test_user_lookups(self, session):
+        db, user_id = session
+
+        by_email = await hot_queries.get_user_row_by_email(db, "hot@example.com")
+        by_id = await hot_queries.get_user_row_by_id(db, user_id)
+
+        assert isinstance(by_email, hot_queries.UserRow)
+        assert by_email == by_id
+        assert (by_email.id, by_email.is_verified, by_email.stripe_customer_id) == (user_id, True, "cus_hot")
+        assert await hot_queries.get_user_row_by_email(db, "missing@example.com") is None
+        assert await hot_queries.get_user_row_by_id(db, user_id + 100) is None
+
+    @pytest.mark.asyncio
+    async def test_user_id_by_stripe_customer_id(self, session):
+        db, user_id = session
+        assert await hot_queries.get_user_id_by_stripe_customer_id(db, "cus_hot") == user_id
+        assert await hot_queries.get_user_id_by_stripe_customer_id(db, "cus_other") is None
+
+    @pytest.mark.asyncio
+    async def test_credit_balance(self, session):
+        db, user_id = session
+        credit = await hot_queries.get_credit_balance_row(db, user_id)
+        assert credit.balance == Decimal("12.50")
+        assert await hot_queries.get_credit_balance_row(db, user_id + 100) is None
+
+    @pytest.mark.asyncio
+    async def test_active_subscription_ignores_inactive(self, session):
+        db, user_id = session
+        subscription = await hot_queries.get_active_subscription_row(db, user_id)
+        assert subscription.status == "active"
+        assert await hot_queries.get_active_subscription_row(db, user_id + 100) is None
+
+    @pytest.mark.asyncio
+    async def test_stripe_event_processed(self, session):
+        db, _ = session
+        assert await hot_queries.is_stripe_event_processed(db, "evt_hot") is True
+        assert await hot_queries.is_stripe_event_processed(db, "evt_new") is False
+
+    @pytest.mark.asyncio
+    async def test_identity_map_untouched(self, session):
+        db, user_id = session
+        await hot_queries.get_user_row_by_id(db, user_id)
+        await hot_queries.get_credit_balance_row(db, user_id)
+        assert len(db.identity_map) == 0
+
+    @pytest.mark.asyncio
+    async def test_sees_pending_changes(self, session):
+        db, user_id = session
+        db.add(ProcessedStripeEvent(stripe_event_id="evt_pending", event_type="test"))
+        assert await hot_queries.is_stripe_event_processed(db, "evt_pending") is True
+
+
+class TestActiveSubscriptionCheck:
+    """check_active_subscription reads the subscription through the fast path."""
+
+    @staticmethod
+    def _service(db):
+        service = StripeIntegrationService()
+        service.db = db
+        return service
+
+    @pytest.fixture
+    async def linked(self, session):
+        db, user_id = session
+        await db.execute(
+            update(Subscription).where(Subscription.is_active.is_(True)).values(stripe_subscription_id="sub_hot")
+        )
+        await db.commit()
+        return db, user_id
+
+    @pytest.mark.asyncio
+    async def test_active_in_stripe(self, linked):
+        db, user_id = linked
+        stripe_sub = MagicMock(status="active", current_period_end=1_900_000_000)
+        stripe_sub.to_dict.return_value = {}
+
+        with patch("app.services.stripe_async.Subscription.retrieve", new=AsyncMock(return_value=stripe_sub)) as retrieve:
+            result = await self._service(db).check_active_subscription(user_id)
+
+        retrieve.assert_awaited_once_with("sub_hot")
+        assert (result["stripe_subscription_id"], result["status"]) == ("sub_hot", "active")
+        assert len(db.identity_map) == 0
+
+    @pytest.mark.asyncio
+    async def test_inactive_in_stripe_deactivates_local_row(self, linked):
+        db, user_id = linked
+        stripe_sub = MagicMock(status="canceled")
+
+        with patch("app.services.stripe_async.Subscription.retrieve", new=AsyncMock(return_value=stripe_sub)):
+            assert await self._service(db).check_active_subscription(user_id) is None
+
+        assert await hot_queries.get_active_subscription_row(db, user_id) is None
+        status = await db.scalar(select(Subscription.status).where(Subscription.stripe_subscription_id == "sub_hot"))
+        assert status == "canceled"
+
+
+class TestEngineCaches:
+    """Pooled engines get the configured statement caches."""
+
+    def test_asyncpg_prepared_statement_cache(self, monkeypatch):
+        captured = {}
+        create = database.create_async_engine
+
+        def capture(url, **kwargs):
+            captured.update(kwargs)
+            return create(url, **kwargs)
+
+        monkeypatch.setattr(database, "create_async_engine", capture)
+        monkeypatch.setattr(database, "_engines", {})
+        monkeypatch.setattr(database.settings, "DB_PREPARED_STATEMENT_CACHE_SIZE", 321)
+
+        pooled = database.create_pooled_engine("postgresql+asyncpg://u:p@localhost/db", "hot_queries_test")
+
+        assert captured["connect_args"] == {"prepared_statement_cache_size": 321}
+        assert captured["query_cache_size"] == database.settings.DB_QUERY_CACHE_SIZE
+        assert database.get_engine("hot_queries_test") is pooled
+
+    def test_other_drivers_get_no_asyncpg_args(self, monkeypatch):
+        captured = {}
+        create = database.create_async_engine
+
+        def capture(url, **kwargs):
+            captured.update(kwargs)
+            return create(url, **kwargs)
+
+        monkeypatch.setattr(database, "create_async_engine", capture)
+        monkeypatch.setattr(database, "_engines", {})
+
+        database.create_pooled_engine("sqlite+aiosqlite:///hot-queries-unused.db", "hot_queries_sqlite")
+
+        assert captured["connect_args"] == {}
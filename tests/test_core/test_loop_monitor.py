@@ -0,0 +1,62 @@
+"""Tests for the event-loop lag monitor and blocking-call detector."""
+
+import asyncio
+import time
+from unittest.mock import patch
+
+import pytest
+
+from app.core.loop_monitor import EVENT_LOOP_BLOCKED, EVENT_LOOP_LAG_HISTOGRAM, LoopMonitor
+
+
+def _blocked_total() -> float:
+    return EVENT_LOOP_BLOCKED.snapshot()["samples"][0][1]
+
+
+def _lag_samples() -> int:
+    _, bucket_counts, _ = EVENT_LOOP_LAG_HISTOGRAM.snapshot()["samples"][0]
+    return sum(bucket_counts)
+
+
+def _blocking_call(seconds: float) -> None:
+    time.sleep(seconds)
+
+
+class TestLoopMonitor:
+    """Tests for LoopMonitor."""
+
+    @pytest.fixture
+    async def monitor(self):
+        monitor = LoopMonitor(interval=0.01, block_threshold=0.1)
+        monitor.start()
+        yield monitor
+        await monitor.stop()
+
+    async def test_lag_is_sampled(self, monitor):
+        """The probe should keep recording lag samples while the loop is idle."""
+        before = _lag_samples()
+
+        await asyncio.sleep(0.1)
+
+        assert _lag_samples() > before
+
+    async def test_blocking_call_is_reported_with_stack(self, monitor):
+        """A callback blocking the loop should be reported once, with its stack."""
+        before = _blocked_total()
+
+        with patch("app.core.loop_monitor.logger") as mock_logger:
+            await asyncio.sleep(0.05)
+            _blocking_call(0.4)
+            await asyncio.sleep(0.05)
+
+        assert _blocked_total() == before + 1
+        mock_logger.warning.assert_called_once()
+        kwargs = mock_logger.warning.call_args.kwargs
+        assert kwargs["event_type"] == "event_loop_blocked"
+        assert "_blocking_call" in kwargs["stack"]
+
+    async def test_stop_is_clean(self, monitor):
+        """Stopping should end both the probe task and the watchdog thread."""
+        await monitor.stop()
+
+        assert not monitor.running
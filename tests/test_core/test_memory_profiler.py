@@ -0,0 +1,113 @@
+"""Tests for memory sampling, tracemalloc diffs and the memory diagnostics endpoints."""
+
+import tracemalloc
+from unittest.mock import patch
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core.memory_profiler import (
+    PROCESS_RESIDENT_MEMORY,
+    PYTHON_GC_OBJECTS,
+    MemoryTracker,
+    get_rss_bytes,
+    sample_memory,
+)
+from app.routers.diagnostics_router import router as diagnostics_router
+
+_retained = []
+
+
+def _gauge_value(gauge) -> float:
+    return gauge.snapshot()["samples"][0][1]
+
+
+class TestMemorySampling:
+    """Tests for the RSS / object-count sampler."""
+
+    def test_rss_is_positive(self):
+        """RSS should be readable on the test platform."""
+        assert get_rss_bytes() > 0
+
+    def test_sample_updates_gauges(self):
+        """Sampling should publish RSS and the number of GC-tracked objects."""
+        values = sample_memory()
+
+        assert _gauge_value(PROCESS_RESIDENT_MEMORY) == values["rss_bytes"]
+        assert _gauge_value(PYTHON_GC_OBJECTS) == values["gc_objects"] > 0
+
+
+class TestMemoryTracker:
+    """Tests for MemoryTracker."""
+
+    @pytest.fixture
+    def tracker(self):
+        tracker = MemoryTracker()
+        tracker.start(frames=25)
+        yield tracker
+        tracker.stop()
+        _retained.clear()
+
+    def test_diff_reports_growing_line(self, tracker):
+        """Retained allocations should appear as growth at their line."""
+        _retained.extend(bytearray(1024) for _ in range(500))
+
+        entries = tracker.diff(limit=5)
+
+        assert any(__file__ in entry["site"] and entry["size_diff"] > 400_000 for entry in entries)
+
+    def test_diff_requires_tracing(self):
+        """Diffing without a baseline is an error."""
+        with pytest.raises(RuntimeError):
+            MemoryTracker().diff()
+
+    def test_stop_disables_tracemalloc(self, tracker):
+        """Stopping should turn tracemalloc off."""
+        tracker.stop()
+
+        assert not tracker.tracing
+        assert not tracemalloc.is_tracing()
+
+
+class TestMemoryEndpoints:
+    """Tests for the /internal/diagnostics/memory endpoints."""
+
+    @pytest.fixture
+    def client(self):
+        app = FastAPI()
+        app.include_router(diagnostics_router)
+
+        @app.get("/leaky")
+        def leaky():
+            _retained.extend(bytearray(1024) for _ in range(500))
+            return {}
+
+        with patch("app.core.auth.settings.INTERNAL_API_KEY", "test-key"):
+            yield TestClient(app)
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+        _retained.clear()
+
+    def test_diff_without_tracing_conflicts(self, client):
+        """Asking for a diff before starting should return 409."""
+        response = client.get("/internal/diagnostics/memory/diff", headers={"api-key": "test-key"})
+
+        assert response.status_code == 409
+
+    def test_growth_attributed_to_route(self, client):
+        """Allocations retained by a handler should be grouped under its route."""
+        headers = {"api-key": "test-key"}
+        assert client.post("/internal/diagnostics/memory/start", headers=headers).json()["tracing"] is True
+
+        client.get("/leaky")
+        response = client.get(
+            "/internal/diagnostics/memory/diff", params={"group_by": "route"}, headers=headers
+        )
+
+        assert response.status_code == 200
+        routes = {entry["route"]: entry for entry in response.json()["entries"]}
+        assert routes["GET /leaky"]["size_diff"] > 400_000
+
+        stopped = client.post("/internal/diagnostics/memory/stop", headers=headers).json()
+        assert stopped["tracing"] is False
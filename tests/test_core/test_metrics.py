@@ -0,0 +1,168 @@
+"""Tests for the Prometheus metrics registry."""
+
+import json
+import os
+import time
+
+import pytest
+
+from app.core.metrics import (
+    MetricsRegistry,
+    MultiprocessCollector,
+    merge_snapshots,
+    render_snapshot,
+    register_pool_metrics,
+    DB_POOL_CHECKED_OUT,
+)
+
+
+class TestMetricsRegistry:
+    """Tests for counters, gauges and histograms."""
+
+    @pytest.fixture
+    def registry(self):
+        return MetricsRegistry()
+
+    def test_counter_renders_labels(self, registry):
+        """Counters should render one sample per label set."""
+        counter = registry.counter("requests_total", "Requests.", ("route", "status"))
+        counter.labels("/a", "200").inc()
+        counter.labels("/a", "200").inc(2)
+        counter.labels("/b", "500").inc()
+
+        output = registry.render()
+
+        assert "# TYPE requests_total counter" in output
+        assert 'requests_total{route="/a",status="200"} 3' in output
+        assert 'requests_total{route="/b",status="500"} 1' in output
+
+    def test_labels_are_cached(self, registry):
+        """The same label values should return the same child."""
+        counter = registry.counter("c_total", "C.", ("x",))
+        assert counter.labels("1") is counter.labels("1")
+
+    def test_wrong_label_count_rejected(self, registry):
+        """Passing the wrong number of label values should fail loudly."""
+        counter = registry.counter("c_total", "C.", ("x", "y"))
+        with pytest.raises(ValueError):
+            counter.labels("only-one")
+
+    def test_histogram_buckets_are_cumulative(self, registry):
+        """Histogram buckets should be rendered cumulatively with +Inf."""
+        histogram = registry.histogram("latency_seconds", "Latency.", buckets=(0.1, 1.0))
+        histogram.observe(0.05)
+        histogram.observe(0.5)
+        histogram.observe(5)
+
+        output = registry.render()
+
+        assert 'latency_seconds_bucket{le="0.1"} 1' in output
+        assert 'latency_seconds_bucket{le="1"} 2' in output
+        assert 'latency_seconds_bucket{le="+Inf"} 3' in output
+        assert "latency_seconds_count 3" in output
+        assert "latency_seconds_sum 5.55" in output
+
+    def test_gauge_callback(self, registry):
+        """Callback gauges should be evaluated at render time."""
+        values = {"primary": 2}
+        registry.gauge(
+            "pool_checked_out", "Checked out.", ("pool",),
+            callback=lambda: [((name,), value) for name, value in values.items()]
+        )
+        assert 'pool_checked_out{pool="primary"} 2' in registry.render()
+        values["primary"] = 4
+        assert 'pool_checked_out{pool="primary"} 4' in registry.render()
+
+    def test_label_values_are_escaped(self, registry):
+        """Quotes and backslashes in label values should be escaped."""
+        counter = registry.counter("c_total", "C.", ("x",))
+        counter.labels('a"b\\c').inc()
+        assert 'c_total{x="a\\"b\\\\c"} 1' in registry.render()
+
+    def test_pool_gauges_read_from_pool(self):
+        """Registered pools should be exposed through the pool gauges."""
+        class FakePool:
+            def checkedout(self):
+                return 3
+
+            def checkedin(self):
+                return 1
+
+            def overflow(self):
+                return 0
+
+            def size(self):
+                return 5
+
+        register_pool_metrics("test_pool", FakePool())
+        samples = {
+            tuple(labels): value for labels, value in DB_POOL_CHECKED_OUT.snapshot()["samples"]
+        }
+        assert samples[("test_pool",)] == 3
+
+
+class TestMultiprocessAggregation:
+    """Tests for aggregating snapshots across worker processes."""
+
+    def test_counters_and_histograms_are_summed(self):
+        """Counters and histogram buckets should be summed across workers."""
+        first = MetricsRegistry()
+        second = MetricsRegistry()
+        for registry, amount in ((first, 1), (second, 2)):
+            registry.counter("jobs_total", "Jobs.", ("kind",)).labels("a").inc(amount)
+            registry.histogram("t_seconds", "T.", buckets=(1.0,)).observe(0.5 * amount)
+
+        merged = merge_snapshots({os.getpid(): first.snapshot(), os.getpid() + 1: second.snapshot()})
+        output = render_snapshot(merged)
+
+        assert 'jobs_total{kind="a"} 3' in output
+        assert 't_seconds_bucket{le="1"} 2' in output
+        assert "t_seconds_count 2" in output
+
+    def test_gauges_of_dead_workers_are_dropped(self):
+        """Gauges only make sense for live processes."""
+        live = MetricsRegistry()
+        live.gauge("in_progress", "In progress.").set(2)
+        dead = MetricsRegistry()
+        dead.gauge("in_progress", "In progress.").set(7)
+
+        # PID 2**22 + 1 is above the default pid_max, so it cannot be alive
+        merged = merge_snapshots({os.getpid(): live.snapshot(), 2 ** 22 + 1: dead.snapshot()})
+
+        assert "in_progress 2" in render_snapshot(merged)
+
+    def test_collector_writes_and_reads_snapshots(self, tmp_path):
+        """The collector should flush its own snapshot and include others."""
+        registry = MetricsRegistry()
+        registry.counter("jobs_total", "Jobs.").inc(4)
+        collector = MultiprocessCollector(registry, str(tmp_path))
+
+        other = MetricsRegistry()
+        other.counter("jobs_total", "Jobs.").inc(6)
+        with open(tmp_path / "metrics_1.json", "w") as fh:
+            json.dump({"pid": 1, "written_at": time.time(), "metrics": other.snapshot()}, fh)
+
+        output = render_snapshot(collector.collect())
+
+        assert os.path.exists(collector.path)
+        assert "jobs_total 10" in output
+
+
+class TestInstrumentationOverhead:
+    """Guard against instrumentation creeping into the request budget."""
+
+    def test_recording_costs_microseconds(self):
+        """Recording a counter and a histogram sample should stay in the low microseconds."""
+        registry = MetricsRegistry()
+        counter = registry.counter("c_total", "C.", ("method", "route", "status"))
+        histogram = registry.histogram("h_seconds", "H.", ("method", "route"))
+        iterations = 20000
+
+        start = time.perf_counter()
+        for i in range(iterations):
+            counter.labels("GET", "/credits/balance", "200").inc()
+            histogram.labels("GET", "/credits/balance").observe(0.004)
+        per_record_us = (time.perf_counter() - start) / iterations * 1e6
+
+        # Typically ~1µs; the bound is loose so slow CI machines do not flake
+        assert per_record_us < 25
@@ -0,0 +1,71 @@
+"""Tests for monthly partition bookkeeping of credit_transactions."""
+
+from datetime import datetime, timezone, timedelta, UTC
+
+import pytest
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.core import partitions
+
+
+class TestMonthMath:
+    """Month boundaries are computed in UTC and roll over years."""
+
+    def test_month_start_normalises_to_utc(self):
+        moment = datetime(2026, 11, 1, 0, 30, tzinfo=timezone(timedelta(hours=2)))
+        assert partitions.month_start(moment) == datetime(2026, 10, 1, tzinfo=UTC)
+
+    def test_add_months_crosses_years(self):
+        november = datetime(2026, 11, 1, tzinfo=UTC)
+        assert partitions.add_months(november, 2) == datetime(2027, 1, 1, tzinfo=UTC)
+        assert partitions.add_months(november, -11) == datetime(2025, 12, 1, tzinfo=UTC)
+
+    def test_partition_name(self):
+        assert partitions.partition_name("credit_transactions", datetime(2027, 3, 1, tzinfo=UTC)) == \
+            "credit_transactions_p2027_03"
+
+
+class TestPartitionBounds:
+    """Bounds reported by pg_get_expr are parsed into datetimes."""
+
+    def test_parse_range_bound(self):
+        lower, upper = partitions.parse_partition_bound(
+            "FOR VALUES FROM ('2026-11-01 00:00:00+00') TO ('2026-12-01 00:00:00+00')"
+        )
+        assert lower == datetime(2026, 11, 1, tzinfo=UTC)
+        assert upper == datetime(2026, 12, 1, tzinfo=UTC)
+
+    def test_parse_minvalue_bound(self):
+        lower, upper = partitions.parse_partition_bound(
+            "FOR VALUES FROM (MINVALUE) TO ('2026-11-01 00:00:00+00')"
+        )
+        assert lower is None
+        assert upper == datetime(2026, 11, 1, tzinfo=UTC)
+
+    def test_overlaps(self):
+        legacy = partitions.Partition("credit_transactions_legacy", None, datetime(2026, 11, 1, tzinfo=UTC))
+        assert legacy.overlaps(datetime(2026, 10, 1, tzinfo=UTC), datetime(2026, 11, 1, tzinfo=UTC))
+        assert not legacy.overlaps(datetime(2026, 11, 1, tzinfo=UTC), datetime(2026, 12, 1, tzinfo=UTC))
+
+
+class TestNonPostgres:
+    """Databases without declarative partitioning are left alone."""
+
+    @pytest.mark.asyncio
+    async def test_maintenance_is_a_no_op_on_sqlite(self):
+        engine = create_async_engine("sqlite+aiosqlite://")
+        try:
+            async with engine.begin() as conn:
+                assert await partitions.ensure_future_partitions(conn) == []
+            assert await partitions.archive_expired_partitions(engine, retention_months=12) == []
+        finally:
+            await engine.dispose()
+
+    @pytest.mark.asyncio
+    async def test_retention_must_be_positive(self):
+        engine = create_async_engine("sqlite+aiosqlite://")
+        try:
+            with pytest.raises(ValueError):
+                await partitions.archive_expired_partitions(engine, retention_months=0)
+        finally:
+            await engine.dispose()
@@ -0,0 +1,115 @@
+"""Tests for the sampling profiler and the diagnostics profile endpoint."""
+
+import asyncio
+import time
+from unittest.mock import patch
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core.profiler import SamplingProfiler
+from app.routers.diagnostics_router import router as diagnostics_router
+
+
+def _busy_loop(seconds: float) -> None:
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+async def _waiting_handler(event: asyncio.Event) -> None:
+    await event.wait()
+
+
+class TestSamplingProfiler:
+    """Tests for SamplingProfiler."""
+
+    async def test_cpu_mode_samples_loop_thread(self):
+        """CPU-bound work on the loop should show up in the sampled stacks."""
+        profiler = SamplingProfiler(interval=0.002, mode="cpu")
+
+        async def burn():
+            await asyncio.sleep(0.01)
+            _busy_loop(0.15)
+
+        result, _ = await asyncio.gather(profiler.profile(0.3), burn())
+
+        busy = result.filter("_busy_loop")
+        assert busy.sample_count > 0
+        assert "_busy_loop (" in busy.to_collapsed()
+
+    async def test_tasks_mode_samples_await_chain(self):
+        """Suspended tasks should be sampled through their full await chain."""
+        event = asyncio.Event()
+        task = asyncio.create_task(_waiting_handler(event))
+        await asyncio.sleep(0)
+
+        result = await SamplingProfiler(interval=0.01, mode="tasks").profile(0.05)
+        event.set()
+        await task
+
+        collapsed = result.filter("_waiting_handler").to_collapsed()
+        assert "_waiting_handler (" in collapsed
+        assert ";wait (" in collapsed
+
+    async def test_speedscope_output(self):
+        """Speedscope output should reference frames by index with weights."""
+        event = asyncio.Event()
+        task = asyncio.create_task(_waiting_handler(event))
+        await asyncio.sleep(0)
+
+        result = await SamplingProfiler(interval=0.01, mode="tasks").profile(0.03)
+        event.set()
+        await task
+
+        document = result.to_speedscope()
+        profile = document["profiles"][0]
+        frames = document["shared"]["frames"]
+        assert profile["type"] == "sampled"
+        assert len(profile["samples"]) == len(profile["weights"])
+        assert all(index < len(frames) for sample in profile["samples"] for index in sample)
+
+    def test_unknown_mode_rejected(self):
+        """Only cpu and tasks modes are supported."""
+        with pytest.raises(ValueError):
+            SamplingProfiler(mode="memory")
+
+
+class TestProfileEndpoint:
+    """Tests for GET /internal/diagnostics/profile."""
+
+    @pytest.fixture
+    def client(self):
+        app = FastAPI()
+        app.include_router(diagnostics_router)
+        with patch("app.core.auth.settings.INTERNAL_API_KEY", "test-key"):
+            yield TestClient(app)
+
+    def test_requires_api_key(self, client):
+        """The endpoint is internal-only."""
+        response = client.get("/internal/diagnostics/profile", headers={"api-key": "wrong"})
+
+        assert response.status_code == 403
+
+    def test_returns_collapsed_stacks(self, client):
+        """A valid request should return collapsed stacks as text."""
+        response = client.get(
+            "/internal/diagnostics/profile",
+            params={"seconds": 0.05, "interval_ms": 1},
+            headers={"api-key": "test-key"},
+        )
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        assert "x-profile-samples" in response.headers
+
+    def test_rejects_long_profiles(self, client):
+        """Profiles must finish before the request timeout."""
+        response = client.get(
+            "/internal/diagnostics/profile",
+            params={"seconds": 120},
+            headers={"api-key": "test-key"},
+        )
+
+        assert response.status_code == 422
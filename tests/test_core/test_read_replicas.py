@@ -0,0 +1,192 @@
+"""Tests for read-replica routing and the read-your-writes window.
+
+Two SQLite files stand in for the primary and a replica; each holds a row
+saying which database it is, so a read shows where it was routed. Point
+``DATABASE_URL`` and ``DATABASE_REPLICA_URLS`` at two local Postgres
+instances to exercise the same routing against real servers.
+"""
+
+import pytest
+from sqlalchemy import Column, Integer, String, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import declarative_base
+
+from app.core import database
+from app.core.circuit_breaker import CircuitBreaker
+from app.core.read_replicas import RecentWrites, Replica, ReplicaSet
+
+ProbeBase = declarative_base()
+
+
+class ReplicaProbe(ProbeBase):
+    __tablename__ = "replica_probe"
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer)
+    source = Column(String)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+async def _make_database(path, source):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    async with engine.begin() as conn:
+        await conn.run_sync(ProbeBase.metadata.create_all)
+    async with AsyncSession(engine) as session:
+        session.add(ReplicaProbe(id=1, user_id=7, source=source))
+        await session.commit()
+    return engine
+
+
+@pytest.fixture
+async def routing(tmp_path, monkeypatch):
+    primary = await _make_database(tmp_path / "primary.db", "primary")
+    replica_engine = await _make_database(tmp_path / "replica.db", "replica")
+    replica = Replica("replica1", replica_engine)
+    replicas = ReplicaSet([replica], max_lag=5.0)
+    await replicas.check_lag()
+    monkeypatch.setattr(database, "replica_set", replicas)
+    monkeypatch.setattr(database, "recent_writes", RecentWrites(window=10.0))
+
+    factory = async_sessionmaker(
+        bind=primary, sync_session_class=database.RoutingSession, expire_on_commit=False
+    )
+
+    def open_session(subjects=()):
+        session = factory()
+        session.info[database._READ_INTENT_KEY] = True
+        session.info[database._READ_SUBJECTS_KEY] = set(subjects)
+        return session
+
+    yield open_session, replica
+    await primary.dispose()
+    await replica_engine.dispose()
+
+
+async def _source(session):
+    return (await session.execute(select(ReplicaProbe.source).where(ReplicaProbe.id == 1))).scalar_one()
+
+
+class TestRecentWrites:
+    """Tests for the read-your-writes markers."""
+
+    def test_marker_expires(self):
+        clock = FakeClock()
+        writes = RecentWrites(window=10.0, clock=clock)
+        writes.mark(1)
+        assert writes.wrote_recently(1)
+        assert not writes.wrote_recently(2)
+        clock.now += 10
+        assert not writes.wrote_recently(1)
+
+    def test_bounded(self):
+        writes = RecentWrites(window=10.0, max_entries=2, clock=FakeClock())
+        for user_id in (1, 2, 3):
+            writes.mark(user_id)
+        assert len(writes) == 2
+        assert not writes.wrote_recently(1)
+
+    def test_zero_window_disables(self):
+        writes = RecentWrites(window=0)
+        writes.mark(1)
+        assert not writes.wrote_recently(1)
+
+
+class TestReplicaSet:
+    """Tests for replica selection."""
+
+    def _replica(self, name, lag):
+        replica = Replica(name, create_async_engine("sqlite+aiosqlite://"))
+        replica.lag = lag
+        return replica
+
+    def test_round_robin_over_available(self):
+        replicas = ReplicaSet([self._replica("a", 0.0), self._replica("b", 1.0)], max_lag=5.0)
+        assert {replicas.choose().name, replicas.choose().name} == {"a", "b"}
+
+    def test_skips_lagging_and_unmeasured(self):
+        replicas = ReplicaSet(
+            [self._replica("lagging", 30.0), self._replica("unmeasured", None), self._replica("ok", 0.5)],
+            max_lag=5.0,
+        )
+        assert [replicas.choose().name for _ in range(3)] == ["ok", "ok", "ok"]
+
+    def test_skips_open_circuit(self):
+        replica = self._replica("a", 0.0)
+        breaker = CircuitBreaker("a", failure_threshold=1)
+        replica.engine.pool.circuit_breaker = breaker
+        breaker.record_failure()
+        assert ReplicaSet([replica]).choose() is None
+
+    def test_no_replicas(self):
+        replicas = ReplicaSet([])
+        assert not replicas
+        assert replicas.choose() is None
+
+    @pytest.mark.asyncio
+    async def test_check_lag_failure_marks_unavailable(self):
+        replica = Replica("down", create_async_engine("sqlite+aiosqlite:////nonexistent-dir/db.sqlite"))
+        replicas = ReplicaSet([replica])
+        await replicas.check_lag()
+        assert replica.lag is None
+        assert replica.last_error
+        assert replicas.choose() is None
+
+
+class TestRoutingSession:
+    """Read-intent sessions route SELECTs to a replica."""
+
+    @pytest.mark.asyncio
+    async def test_reads_go_to_replica(self, routing):
+        open_session, _ = routing
+        async with open_session() as session:
+            assert await _source(session) == "replica"
+
+    @pytest.mark.asyncio
+    async def test_lagging_replica_falls_back_to_primary(self, routing):
+        open_session, replica = routing
+        replica.lag = 60.0
+        async with open_session() as session:
+            assert await _source(session) == "primary"
+
+    @pytest.mark.asyncio
+    async def test_writes_go_to_primary_and_pin_the_session(self, routing):
+        open_session, _ = routing
+        async with open_session() as session:
+            session.add(ReplicaProbe(id=2, user_id=8, source="written"))
+            await session.flush()
+            # Read-your-own-writes inside the session
+            assert await _source(session) == "primary"
+            await session.commit()
+
+    @pytest.mark.asyncio
+    async def test_recent_writer_reads_from_primary(self, routing):
+        open_session, _ = routing
+        async with open_session() as session:
+            session.add(ReplicaProbe(id=3, user_id=9, source="written"))
+            await session.commit()
+
+        async with open_session(subjects={9}) as session:
+            assert await _source(session) == "primary"
+        async with open_session(subjects={10}) as session:
+            assert await _source(session) == "replica"
+
+    @pytest.mark.asyncio
+    async def test_for_update_goes_to_primary(self, routing):
+        open_session, _ = routing
+        async with open_session() as session:
+            result = await session.execute(select(ReplicaProbe.source).with_for_update())
+            assert result.scalars().first() == "primary"
+
+    @pytest.mark.asyncio
+    async def test_without_read_intent_uses_primary(self, routing):
+        open_session, _ = routing
+        async with open_session() as session:
+            session.info[database._READ_INTENT_KEY] = False
+            assert await _source(session) == "primary"
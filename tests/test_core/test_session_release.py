@@ -0,0 +1,103 @@
+"""Tests for releasing a request session's connection before outbound calls."""
+
+import pytest
+from sqlalchemy import Column, Integer, MetaData, Table, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from app.core import database
+from app.core.database import has_pending_writes, release_connection
+from app.services.stripe_async import run_stripe_async
+
+metadata = MetaData()
+items = Table("release_items", metadata, Column("id", Integer, primary_key=True))
+
+
+@pytest.fixture
+async def session():
+    engine = create_async_engine(
+        "sqlite+aiosqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    async with engine.begin() as conn:
+        await conn.run_sync(metadata.create_all)
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        yield session
+    await engine.dispose()
+
+
+class TestReleaseConnection:
+    """Tests for release_connection."""
+
+    @pytest.mark.asyncio
+    async def test_no_transaction_is_noop(self, session):
+        assert await release_connection(session) is False
+
+    @pytest.mark.asyncio
+    async def test_read_only_transaction_is_released(self, session):
+        await session.execute(select(items))
+        assert session.in_transaction()
+
+        assert await release_connection(session) is True
+        assert not session.in_transaction()
+
+        # The session checks out a connection again on next use
+        await session.execute(select(items))
+        assert session.in_transaction()
+
+    @pytest.mark.asyncio
+    async def test_transaction_with_writes_is_kept_open(self, session):
+        await session.execute(insert(items).values(id=1))
+        assert has_pending_writes(session)
+
+        assert await release_connection(session) is False
+        assert session.in_transaction()
+
+    @pytest.mark.asyncio
+    async def test_commit_writes(self, session):
+        await session.execute(insert(items).values(id=2))
+
+        assert await release_connection(session, commit_writes=True) is True
+        assert not has_pending_writes(session)
+        assert (await session.execute(select(items.c.id))).scalars().all() == [2]
+
+    @pytest.mark.asyncio
+    async def test_savepoints_are_left_to_the_caller(self, session):
+        await session.begin_nested()
+        await session.execute(select(items))
+
+        assert await release_connection(session) is False
+        assert session.in_nested_transaction()
+
+    @pytest.mark.asyncio
+    async def test_defaults_to_current_request_session(self, session):
+        await session.execute(select(items))
+        token = database._current_session.set(session)
+        try:
+            assert await release_connection() is True
+        finally:
+            database._current_session.reset(token)
+
+
+class TestReleaseBeforeStripe:
+    """run_stripe_async leaves the request's transaction to its caller."""
+
+    @pytest.mark.asyncio
+    async def test_locking_transaction_kept_across_call(self, session):
+        await session.execute(select(items).with_for_update())
+        token = database._current_session.set(session)
+        try:
+            in_transaction = await run_stripe_async(lambda: session.in_transaction())
+        finally:
+            database._current_session.reset(token)
+
+        assert in_transaction is True
+
+    @pytest.mark.asyncio
+    async def test_release_can_be_turned_off(self, session, monkeypatch):
+        monkeypatch.setattr(database.settings, "DB_RELEASE_BEFORE_OUTBOUND", False)
+        await session.execute(select(items))
+
+        assert await release_connection(session) is False
+        assert session.in_transaction()
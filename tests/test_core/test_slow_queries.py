@@ -0,0 +1,84 @@
+"""Tests for the slow-query log and EXPLAIN capture."""
+
+import os
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.core.slow_queries import SlowQueryLog, parameter_shape
+from app.core.sql_instrumentation import instrument_engine
+
+_TESTS_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__))) + os.sep
+
+
+class TestParameterShape:
+    """Tests for parameter_shape."""
+
+    def test_values_are_reduced_to_types(self):
+        """Only parameter types should be kept, never values."""
+        assert parameter_shape({"user_id": 1, "email": "a@b.c"}) == {"user_id": "int", "email": "str"}
+        assert parameter_shape((1, "x", None)) == ["int", "str", "NoneType"]
+
+    def test_executemany_is_summarized(self):
+        """executemany parameter lists should report count and first shape."""
+        assert parameter_shape([(1, "a"), (2, "b")]) == {"executemany": 2, "shape": ["int", "str"]}
+
+
+class TestSlowQueryLog:
+    """Tests for SlowQueryLog wired into the SQL hooks."""
+
+    @pytest.fixture
+    async def engine(self):
+        engine = create_async_engine("sqlite+aiosqlite://")
+        instrument_engine(engine)
+        async with engine.begin() as conn:
+            await conn.execute(text("CREATE TABLE items (id INTEGER PRIMARY KEY, owner INTEGER)"))
+        yield engine
+        await engine.dispose()
+
+    @pytest.fixture
+    def log(self, monkeypatch):
+        log = SlowQueryLog(threshold=0.0, capacity=2, explain=True)
+        monkeypatch.setattr("app.core.sql_instrumentation.slow_query_log", log)
+        # Treat this test module as application code for call-site detection
+        monkeypatch.setattr("app.core.slow_queries._APP_ROOT", _TESTS_ROOT)
+        return log
+
+    async def _owned_items(self, engine, owner: int):
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT id FROM items WHERE owner = :owner"), {"owner": owner})
+
+    async def test_statements_aggregate_by_fingerprint(self, engine, log):
+        """Executions with different values should share one entry."""
+        await self._owned_items(engine, 1)
+        await self._owned_items(engine, 2)
+        await log.wait_for_explains()
+
+        entry = [e for e in log.entries() if "FROM items" in e.sql][0]
+        assert entry.count == 2
+        assert entry.sql == "SELECT id FROM items WHERE owner = ?"
+        assert entry.parameter_shape == ["int"]
+        assert any("_owned_items" in site for site in entry.call_sites)
+
+    async def test_explain_captured_once(self, engine, log):
+        """An EXPLAIN should be captured for the fingerprint without being logged itself."""
+        await self._owned_items(engine, 1)
+        await log.wait_for_explains()
+        await self._owned_items(engine, 2)
+        await log.wait_for_explains()
+
+        entry = [e for e in log.entries() if "FROM items" in e.sql][0]
+        assert entry.explain is not None and "items" in entry.explain
+        assert not any(e.sql.upper().startswith("EXPLAIN") for e in log.entries())
+
+    async def test_capacity_evicts_least_recent(self, engine, log):
+        """Only ``capacity`` fingerprints should be kept."""
+        async with engine.connect() as conn:
+            for column in ("id", "owner", "id, owner"):
+                await conn.execute(text(f"SELECT {column} FROM items"))
+        await log.wait_for_explains()
+
+        assert [e.sql for e in log.entries("recent")] == [
+            "SELECT id, owner FROM items", "SELECT owner FROM items"
+        ]
@@ -0,0 +1,62 @@
+"""Tests for the slow-request log."""
+
+from app.core.request_stats import RequestStats
+from app.core.slow_requests import SlowRequestLog
+
+
+def _record(log: SlowRequestLog, route: str, duration: float):
+    return log.record("GET", route, 200, duration, RequestStats())
+
+
+class TestSlowRequestLog:
+    """Tests for SlowRequestLog."""
+
+    def test_fast_requests_are_ignored(self):
+        """Requests under the threshold should not be stored."""
+        log = SlowRequestLog(capacity=3, threshold=0.5)
+
+        assert _record(log, "/fast", 0.1) is None
+        assert log.recent() == []
+        assert log.slowest() == []
+
+    def test_recent_ring_keeps_last_entries(self):
+        """The ring should wrap around and return the newest entries first."""
+        log = SlowRequestLog(capacity=3, threshold=0.5)
+
+        for i in range(5):
+            _record(log, f"/r{i}", 1.0)
+
+        assert [entry.route for entry in log.recent()] == ["/r4", "/r3", "/r2"]
+
+    def test_slowest_keeps_top_entries(self):
+        """The heap should keep only the slowest entries, slowest first."""
+        log = SlowRequestLog(capacity=2, threshold=0.5)
+
+        for route, duration in [("/a", 1.0), ("/b", 3.0), ("/c", 0.6), ("/d", 2.0)]:
+            _record(log, route, duration)
+
+        assert [entry.route for entry in log.slowest()] == ["/b", "/d"]
+
+    def test_entry_carries_request_stats(self):
+        """Entries should copy the db and outbound breakdown."""
+        log = SlowRequestLog(capacity=2, threshold=0.0)
+        stats = RequestStats()
+        stats.record_statement("fp", "SELECT ?", 0.2)
+        stats.record_outbound("stripe", 0.3)
+
+        entry = log.record("POST", "/credits/use", 201, 0.6, stats, request_id="req-1", trace_id="abc")
+
+        data = entry.to_dict()
+        assert data["db_ms"] == 200.0
+        assert data["db_statements"] == 1
+        assert data["outbound_ms"] == {"stripe": 300.0}
+        assert (data["request_id"], data["trace_id"]) == ("req-1", "abc")
+
+    def test_clear(self):
+        """Clearing should empty both views."""
+        log = SlowRequestLog(capacity=2, threshold=0.0)
+        _record(log, "/a", 1.0)
+
+        log.clear()
+
+        assert log.recent() == [] and log.slowest() == []
@@ -0,0 +1,79 @@
+"""Tests for SQL statement fingerprinting and query budgets."""
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from app.core.request_stats import get_request_stats, reset_request_stats, start_request_stats
+from app.core.sql_instrumentation import (
+    assert_max_queries,
+    count_queries,
+    fingerprint_statement,
+    instrument_engine,
+    normalize_statement,
+)
+
+
+class TestNormalizeStatement:
+    """Tests for normalize_statement."""
+
+    def test_parameters_and_literals_are_replaced(self):
+        """Different parameter values should produce the same shape."""
+        a = normalize_statement("SELECT * FROM users WHERE id = 1 AND email = 'a@b.c'")
+        b = normalize_statement("SELECT * FROM users WHERE id = 42 AND email = 'x@y.z'")
+        assert a == b == "SELECT * FROM users WHERE id = ? AND email = ?"
+
+    def test_driver_placeholders_are_normalized(self):
+        """asyncpg, pyformat and qmark placeholders should all map to ``?``."""
+        assert normalize_statement("SELECT 1 FROM t WHERE a = $1") == normalize_statement("SELECT 1 FROM t WHERE a = ?")
+        assert normalize_statement("SELECT 1 FROM t WHERE a = %(a_1)s") == "SELECT ? FROM t WHERE a = ?"
+
+    def test_in_lists_collapse(self):
+        """IN lists of any length should share one fingerprint."""
+        short, _ = fingerprint_statement("SELECT * FROM plans WHERE id IN (?, ?)")
+        long, _ = fingerprint_statement("SELECT * FROM plans WHERE id IN (?, ?, ?, ?, ?)")
+        assert short == long
+
+
+class TestQueryBudget:
+    """Tests for count_queries / assert_max_queries and request stats."""
+
+    @pytest.fixture
+    def engine(self):
+        engine = create_engine("sqlite://")
+        instrument_engine(engine)
+        yield engine
+        engine.dispose()
+
+    def test_count_queries(self, engine):
+        """Every executed statement should be captured."""
+        with engine.connect() as conn:
+            with count_queries(engine) as queries:
+                for i in range(3):
+                    conn.execute(text("SELECT :value"), {"value": i})
+
+        assert queries.count == 3
+        assert queries.fingerprints() == {"SELECT ?": 3}
+
+    def test_budget_exceeded_raises(self, engine):
+        """Exceeding the budget should fail with the offending statements listed."""
+        with engine.connect() as conn:
+            with pytest.raises(AssertionError, match="Query budget exceeded: 2 statements"):
+                with assert_max_queries(engine, 1):
+                    conn.execute(text("SELECT 1"))
+                    conn.execute(text("SELECT 2"))
+
+    def test_statements_recorded_in_request_stats(self, engine):
+        """Statements run inside a request should be counted per fingerprint."""
+        token = start_request_stats()
+        try:
+            with engine.connect() as conn:
+                for i in range(4):
+                    conn.execute(text("SELECT :value"), {"value": i})
+            stats = get_request_stats()
+        finally:
+            reset_request_stats(token)
+
+        assert stats.db_statements == 4
+        assert stats.db_time > 0
+        assert list(stats.repeated_fingerprints(4).values()) == [4]
+        assert get_request_stats() is None
@@ -0,0 +1,197 @@
+"""Tests for trace context propagation, spans and the batch exporter."""
+
+import json
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from app.core.sql_instrumentation import instrument_engine
+from app.core.tracing import (
+    BatchSpanProcessor,
+    FileSpanExporter,
+    SpanKind,
+    StatusCode,
+    Tracer,
+    current_span,
+    format_traceparent,
+    parse_traceparent,
+    traced_service,
+)
+
+
+class _CollectingProcessor:
+    def __init__(self):
+        self.spans = []
+
+    def on_end(self, span):
+        self.spans.append(span)
+
+
+@pytest.fixture
+def collected():
+    return _CollectingProcessor()
+
+
+@pytest.fixture
+def test_tracer(collected):
+    return Tracer(processor=collected)
+
+
+class TestTraceparent:
+    """Tests for W3C traceparent parsing and formatting."""
+
+    def test_round_trip(self):
+        """A formatted header should parse back to the same context."""
+        header = format_traceparent("4bf92f3577b34da6a3ce929d0e0e4736", "00f067aa0ba902b7", True)
+        context = parse_traceparent(header)
+
+        assert header == "00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-01"
+        assert (context.trace_id, context.span_id, context.sampled) == (
+            "4bf92f3577b34da6a3ce929d0e0e4736", "00f067aa0ba902b7", True
+        )
+
+    @pytest.mark.parametrize("header", [
+        None,
+        "garbage",
+        "00-00000000000000000000000000000000-00f067aa0ba902b7-01",
+        "00-4bf92f3577b34da6a3ce929d0e0e4736-0000000000000000-01",
+        "ff-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-01",
+    ])
+    def test_invalid_headers_are_ignored(self, header):
+        """Invalid or missing headers should start a new trace."""
+        assert parse_traceparent(header) is None
+
+
+class TestTracer:
+    """Tests for Tracer."""
+
+    def test_child_spans_share_trace(self, test_tracer, collected):
+        """Nested spans should form a parent/child chain within one trace."""
+        with test_tracer.span("outer") as outer:
+            with test_tracer.span("inner") as inner:
+                assert current_span() is inner
+            assert current_span() is outer
+        assert current_span() is None
+
+        assert [span.name for span in collected.spans] == ["inner", "outer"]
+        assert inner.trace_id == outer.trace_id
+        assert inner.parent_span_id == outer.span_id
+        assert outer.parent_span_id is None
+
+    def test_continues_remote_parent(self, test_tracer):
+        """A remote parent's trace id and sampled flag should be honoured."""
+        remote = parse_traceparent("00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-00")
+
+        with test_tracer.span("server", kind=SpanKind.SERVER, parent=remote) as span:
+            pass
+
+        assert span.trace_id == remote.trace_id
+        assert span.parent_span_id == remote.span_id
+        assert span.sampled is False
+
+    def test_sample_ratio_zero_records_nothing(self, collected):
+        """Unsampled root traces should not be exported."""
+        tracer = Tracer(sample_ratio=0.0, processor=collected)
+
+        with tracer.span("root") as span:
+            span.set_attribute("ignored", True)
+
+        assert collected.spans == []
+        assert span.attributes == {}
+
+    def test_exception_marks_span_failed(self, test_tracer, collected):
+        """Exceptions escaping a span should set an error status."""
+        with pytest.raises(ValueError):
+            with test_tracer.span("failing"):
+                raise ValueError("boom")
+
+        assert collected.spans[0].status_code == StatusCode.ERROR
+        assert "ValueError" in collected.spans[0].status_message
+
+    def test_disabled_tracer_is_noop(self, collected):
+        """A disabled tracer should neither create current spans nor export."""
+        tracer = Tracer(processor=collected, enabled=False)
+
+        with tracer.span("ignored"):
+            assert current_span() is None
+
+        assert collected.spans == []
+
+
+class TestTracedService:
+    """Tests for the traced_service class decorator."""
+
+    async def test_public_coroutines_get_spans(self, test_tracer, collected, monkeypatch):
+        """Public async methods should run inside a span named after the service."""
+        monkeypatch.setattr("app.core.tracing.tracer", test_tracer)
+
+        @traced_service("DemoService")
+        class DemoService:
+            async def do_work(self):
+                return current_span().name
+
+            async def _private(self):
+                return current_span()
+
+        with test_tracer.span("request"):
+            name = await DemoService().do_work()
+            private_span = await DemoService()._private()
+
+        assert name == "DemoService.do_work"
+        assert private_span.name == "request"
+
+
+class TestSqlSpans:
+    """Tests for SQL statement spans."""
+
+    def test_statements_get_client_spans(self, test_tracer, collected, monkeypatch):
+        """Statements inside a sampled trace should produce db spans."""
+        monkeypatch.setattr("app.core.sql_instrumentation.tracer", test_tracer)
+        engine = create_engine("sqlite://")
+        instrument_engine(engine)
+
+        with test_tracer.span("request") as request_span:
+            with engine.connect() as conn:
+                conn.execute(text("SELECT :value"), {"value": 1})
+        engine.dispose()
+
+        db_spans = [span for span in collected.spans if span.name.startswith("db ")]
+        assert len(db_spans) == 1
+        assert db_spans[0].kind == SpanKind.CLIENT
+        assert db_spans[0].parent_span_id == request_span.span_id
+        assert db_spans[0].attributes["db.statement"] == "SELECT ?"
+
+
+class TestBatchSpanProcessor:
+    """Tests for BatchSpanProcessor with the file exporter."""
+
+    async def test_flush_writes_otlp_json(self, tmp_path):
+        """Flushed spans should be written as OTLP/JSON lines."""
+        path = tmp_path / "traces.jsonl"
+        processor = BatchSpanProcessor(FileSpanExporter(str(path)), "auth-service", max_batch_size=2)
+        tracer = Tracer(processor=processor)
+
+        for name in ("a", "b", "c"):
+            with tracer.span(name):
+                pass
+        await processor.flush()
+
+        batches = [json.loads(line) for line in path.read_text().splitlines()]
+        assert len(batches) == 2
+        spans = [
+            span["name"]
+            for batch in batches
+            for span in batch["resourceSpans"][0]["scopeSpans"][0]["spans"]
+        ]
+        assert spans == ["a", "b", "c"]
+
+    def test_full_queue_drops_spans(self):
+        """Spans beyond the queue size should be dropped, not block."""
+        processor = BatchSpanProcessor(FileSpanExporter("/dev/null"), "auth-service", max_queue_size=1)
+        tracer = Tracer(processor=processor)
+
+        for name in ("kept", "dropped"):
+            with tracer.span(name):
+                pass
+
+        assert [span.name for span in processor._queue] == ["kept"]
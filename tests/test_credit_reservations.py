@@ -0,0 +1,219 @@
+"""Tests for credit reservations (hold, capture, release, expiry sweep)."""
+
+import secrets
+from datetime import datetime, timedelta, UTC
+from decimal import Decimal
+
+import pytest
+import pytest_asyncio
+from fastapi import HTTPException
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.core.base_model import Base
+from app.models.credit import CreditReservation, CreditTransaction, ReservationStatus, TransactionType, UserCredit
+from app.models.user import User
+from app.services.credit import CreditService, InsufficientCreditsError
+from app.services.credit.reservations import sweep_expired_reservations
+
+
+@pytest_asyncio.fixture
+async def funded_user(db: AsyncSession) -> User:
+    """A user with 100 credits."""
+    user = User(email=f"reserve_{secrets.token_hex(4)}@example.com", hashed_password="x", is_verified=True)
+    db.add(user)
+    await db.commit()
+    await CreditService(db).add_credits(user_id=user.id, amount=Decimal("100.00"))
+    return user
+
+
+@pytest_asyncio.fixture
+async def credit_service(db: AsyncSession) -> CreditService:
+    return CreditService(db)
+
+
+async def _balances(db: AsyncSession, user_id: int):
+    return (await db.execute(
+        select(UserCredit.balance, UserCredit.reserved_balance).where(UserCredit.user_id == user_id)
+    )).one()
+
+
+@pytest.mark.asyncio
+async def test_hold_reduces_spendable_balance(credit_service: CreditService, funded_user: User, db: AsyncSession):
+    """A hold is not spent yet, but debits and other holds cannot use it."""
+    user_id = funded_user.id  # the failed debit rolls back, which expires funded_user
+    reservation = await credit_service.hold_credits(user_id=user_id, amount=Decimal("70.00"), reference_id="job-1")
+
+    assert reservation.status == ReservationStatus.HELD
+    assert reservation.available_balance == Decimal("30.00")
+    assert await _balances(db, user_id) == (Decimal("100.00"), Decimal("70.00"))
+
+    with pytest.raises(InsufficientCreditsError, match="Available: 30.00"):
+        await credit_service.hold_credits(user_id=user_id, amount=Decimal("31.00"))
+    with pytest.raises(Exception, match="Available: 30.00"):
+        await credit_service.use_credits(user_id=user_id, amount=Decimal("31.00"))
+
+    balance = await credit_service.get_balance(user_id)
+    assert balance.reserved_balance == Decimal("70.00")
+
+
+@pytest.mark.asyncio
+async def test_partial_capture_spends_and_releases_the_rest(credit_service: CreditService, funded_user: User, db: AsyncSession):
+    """Capturing writes one ledger entry for the captured part only."""
+    user_id = funded_user.id
+    held = await credit_service.hold_credits(user_id=user_id, amount=Decimal("40.00"), reference_id="job-2")
+
+    captured = await credit_service.capture_reservation(user_id=user_id, reservation_id=held.id, amount=Decimal("25.00"))
+
+    assert captured.status == ReservationStatus.CAPTURED
+    assert captured.captured_amount == Decimal("25.00")
+    assert captured.available_balance == Decimal("75.00")
+    assert await _balances(db, user_id) == (Decimal("75.00"), Decimal("0.00"))
+    entry = (await db.execute(select(CreditTransaction).where(CreditTransaction.id == captured.transaction_id))).scalar_one()
+    assert (entry.amount, entry.transaction_type, entry.reference_id) == (Decimal("25.00"), TransactionType.CREDIT_USED, "job-2")
+    count = (await db.execute(select(UserCredit.transaction_count).where(UserCredit.user_id == user_id))).scalar_one()
+    assert count == 2
+
+
+@pytest.mark.asyncio
+async def test_capture_defaults_to_whole_hold(credit_service: CreditService, funded_user: User):
+    held = await credit_service.hold_credits(user_id=funded_user.id, amount=Decimal("10.00"))
+
+    captured = await credit_service.capture_reservation(user_id=funded_user.id, reservation_id=held.id)
+
+    assert captured.captured_amount == Decimal("10.00")
+    assert captured.available_balance == Decimal("90.00")
+
+
+@pytest.mark.asyncio
+async def test_release_restores_spendable_balance(credit_service: CreditService, funded_user: User, db: AsyncSession):
+    held = await credit_service.hold_credits(user_id=funded_user.id, amount=Decimal("60.00"))
+
+    released = await credit_service.release_reservation(user_id=funded_user.id, reservation_id=held.id)
+
+    assert released.status == ReservationStatus.RELEASED
+    assert released.available_balance == Decimal("100.00")
+    assert await _balances(db, funded_user.id) == (Decimal("100.00"), Decimal("0.00"))
+
+
+@pytest.mark.asyncio
+async def test_settled_reservation_cannot_be_settled_again(credit_service: CreditService, funded_user: User):
+    user_id = funded_user.id
+    held = await credit_service.hold_credits(user_id=user_id, amount=Decimal("5.00"))
+    await credit_service.capture_reservation(user_id=user_id, reservation_id=held.id)
+
+    for settle in (credit_service.capture_reservation, credit_service.release_reservation):
+        with pytest.raises(HTTPException) as excinfo:
+            await settle(user_id=user_id, reservation_id=held.id)
+        assert excinfo.value.status_code == 409
+
+
+@pytest.mark.asyncio
+async def test_capture_errors(credit_service: CreditService, funded_user: User, db: AsyncSession):
+    """Over-capture, other users' and expired reservations are refused without side effects."""
+    user_id = funded_user.id
+    held = await credit_service.hold_credits(user_id=user_id, amount=Decimal("5.00"))
+
+    with pytest.raises(HTTPException) as excinfo:
+        await credit_service.capture_reservation(user_id=user_id, reservation_id=held.id, amount=Decimal("5.01"))
+    assert excinfo.value.status_code == 400
+    with pytest.raises(HTTPException) as excinfo:
+        await credit_service.capture_reservation(user_id=user_id + 1000, reservation_id=held.id)
+    assert excinfo.value.status_code == 404
+
+    expiring = await credit_service.hold_credits(user_id=user_id, amount=Decimal("5.00"), ttl_seconds=1)
+    await db.execute(
+        CreditReservation.__table__.update()
+        .where(CreditReservation.id == expiring.id)
+        .values(expires_at=datetime.now(UTC) - timedelta(seconds=1))
+    )
+    with pytest.raises(HTTPException) as excinfo:
+        await credit_service.capture_reservation(user_id=user_id, reservation_id=expiring.id)
+    assert excinfo.value.status_code == 409
+    assert await _balances(db, user_id) == (Decimal("100.00"), Decimal("10.00"))
+
+
+@pytest.mark.asyncio
+async def test_database_error_rolls_back_capture(credit_service: CreditService, funded_user: User, db: AsyncSession, monkeypatch):
+    """A failure after the reservation is marked captured rolls it back and surfaces as a 500."""
+    user_id = funded_user.id
+    held = await credit_service.hold_credits(user_id=user_id, amount=Decimal("5.00"))
+
+    async def broken_ledger(*args, **kwargs):
+        raise RuntimeError("connection lost")
+    monkeypatch.setattr("app.services.credit.reservations.apply_balance_change", broken_ledger)
+
+    with pytest.raises(HTTPException) as excinfo:
+        await credit_service.capture_reservation(user_id=user_id, reservation_id=held.id)
+    assert excinfo.value.status_code == 500
+    assert (await credit_service.get_reservation(user_id=user_id, reservation_id=held.id)).status == ReservationStatus.HELD
+    assert await _balances(db, user_id) == (Decimal("100.00"), Decimal("5.00"))
+
+
+@pytest.mark.asyncio
+async def test_ttl_above_maximum_is_rejected(credit_service: CreditService, funded_user: User, monkeypatch):
+    from app.core.config import settings
+    monkeypatch.setattr(settings, "CREDIT_RESERVATION_MAX_TTL_SECONDS", 60)
+
+    with pytest.raises(HTTPException) as excinfo:
+        await credit_service.hold_credits(user_id=funded_user.id, amount=Decimal("1.00"), ttl_seconds=61)
+    assert excinfo.value.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_user_endpoints(client, db: AsyncSession, auth_user_and_header):
+    """Users hold, read and release their own reservations."""
+    user, auth_header = auth_user_and_header
+    await CreditService(db).add_credits(user_id=user.id, amount=Decimal("20.00"))
+
+    response = await client.post("/credits/user/reservations", json={"amount": "15.00"}, headers=auth_header)
+    assert response.status_code == 201, response.text
+    reservation_id = response.json()["id"]
+
+    response = await client.post("/credits/user/reservations", json={"amount": "15.00"}, headers=auth_header)
+    assert response.status_code == 400
+
+    response = await client.get(f"/credits/user/reservations/{reservation_id}", headers=auth_header)
+    assert response.json()["status"] == "held"
+
+    response = await client.post(f"/credits/user/reservations/{reservation_id}/release", headers=auth_header)
+    assert response.status_code == 200
+    assert Decimal(response.json()["available_balance"]) == Decimal("20.00")
+
+
+class TestSweep:
+    """Expired holds are released in bulk."""
+
+    @pytest.fixture
+    async def engine(self):
+        engine = create_async_engine("sqlite+aiosqlite://")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        yield engine
+        await engine.dispose()
+
+    @pytest.mark.asyncio
+    async def test_sweep_releases_only_expired_holds(self, engine):
+        async with AsyncSession(engine, expire_on_commit=False) as db:
+            users = [User(email=f"sweep{i}@example.com", hashed_password="x") for i in range(3)]
+            db.add_all(users)
+            await db.commit()
+            service = CreditService(db)
+            for user in users:
+                await service.add_credits(user_id=user.id, amount=Decimal("50.00"))
+                for _ in range(4):
+                    await service.hold_credits(user_id=user.id, amount=Decimal("5.00"), ttl_seconds=60)
+            kept = await service.hold_credits(user_id=users[0].id, amount=Decimal("1.00"), ttl_seconds=600)
+
+        expired = await sweep_expired_reservations(engine, batch_size=5, now=datetime.now(UTC) + timedelta(seconds=120))
+
+        assert expired == 12
+        async with AsyncSession(engine) as db:
+            reserved = dict((await db.execute(select(UserCredit.user_id, UserCredit.reserved_balance))).all())
+            held = await db.scalar(
+                select(func.count()).select_from(CreditReservation).where(CreditReservation.status == ReservationStatus.HELD)
+            )
+        assert reserved == {users[0].id: Decimal("1.00"), users[1].id: Decimal("0.00"), users[2].id: Decimal("0.00")}
+        assert held == 1
+        assert await sweep_expired_reservations(engine, now=datetime.now(UTC) + timedelta(seconds=120)) == 0
+        assert kept.status == ReservationStatus.HELD
@@ -7,12 +7,14 @@ from decimal import Decimal
 from datetime import datetime, UTC, timedelta
 from unittest.mock import patch, MagicMock, AsyncMock
 
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import BackgroundTasks, HTTPException
 
 from app.models.user import User
 from app.models.plan import Plan, Subscription
 from app.models.credit import UserCredit, CreditTransaction, TransactionType
+from app.core.sql_instrumentation import assert_max_queries, count_queries
 from app.services.credit import CreditService, InsufficientCreditsError
 from app.schemas import credit_schemas
 
@@ -201,6 +203,145 @@ async def test_get_transaction_history(credit_service: CreditService, test_user:
     for tx in history.transactions:
         assert tx.new_balance == final_balance
 
+@pytest.mark.asyncio
+async def test_get_transaction_history_keyset_pages(credit_service: CreditService, test_user: User):
+    """Cursor pages walk the whole history newest-first without gaps or repeats."""
+    for n in range(5):
+        await credit_service.add_credits(user_id=test_user.id, amount=Decimal("1.00"), description=f"Tx {n}")
+
+    seen, cursor = [], None
+    while True:
+        page = await credit_service.get_transaction_history(user_id=test_user.id, limit=2, cursor=cursor)
+        assert page.total_count == 5
+        seen.extend(tx.description for tx in page.transactions)
+        cursor = page.next_cursor
+        if cursor is None:
+            break
+
+    assert seen == ["Tx 4", "Tx 3", "Tx 2", "Tx 1", "Tx 0"]
+
+    # Offset paging keeps working for older clients
+    offset_page = await credit_service.get_transaction_history(user_id=test_user.id, skip=2, limit=2)
+    assert [tx.description for tx in offset_page.transactions] == ["Tx 2", "Tx 1"]
+    assert offset_page.next_cursor is not None
+
+@pytest.mark.asyncio
+async def test_transaction_count_maintained_on_insert(credit_service: CreditService, test_user: User, db: AsyncSession):
+    """The per-user counter follows inserted ledger rows."""
+    await credit_service.add_credits(user_id=test_user.id, amount=Decimal("3.00"))
+    await credit_service.use_credits(user_id=test_user.id, amount=Decimal("1.00"))
+
+    count = (await db.execute(
+        select(UserCredit.transaction_count).where(UserCredit.user_id == test_user.id)
+    )).scalar_one()
+    assert count == 2
+
+@pytest.mark.asyncio
+async def test_use_credits_insufficient_writes_nothing(credit_service: CreditService, test_user: User, db: AsyncSession):
+    """A refused debit leaves the balance, the counter and the ledger as they were."""
+    user_id = test_user.id  # the failed call rolls back, which expires test_user
+    await credit_service.add_credits(user_id=user_id, amount=Decimal("5.00"))
+
+    with pytest.raises(Exception, match="Available: 5.00"):
+        await credit_service.use_credits(user_id=user_id, amount=Decimal("5.01"))
+
+    balance, count = (await db.execute(
+        select(UserCredit.balance, UserCredit.transaction_count).where(UserCredit.user_id == user_id)
+    )).one()
+    assert balance == Decimal("5.00")
+    assert count == 1
+
+@pytest.mark.asyncio
+async def test_credit_writes_update_loaded_credit(credit_service: CreditService, test_user: User):
+    """A UserCredit already in the session reflects the statement-level balance change."""
+    credit = await credit_service.get_user_credit(test_user.id)
+
+    await credit_service.add_credits(user_id=test_user.id, amount=Decimal("8.00"))
+    await credit_service.use_credits(user_id=test_user.id, amount=Decimal("3.00"))
+
+    assert credit.balance == Decimal("5.00")
+    assert credit.transaction_count == 2
+
+@pytest.mark.asyncio
+async def test_credit_writes_issue_no_follow_up_select(credit_service: CreditService, test_user: User, db: AsyncSession):
+    """add_credits/use_credits return complete results without re-reading what they wrote."""
+    await credit_service.add_credits(user_id=test_user.id, amount=Decimal("10.00"))
+
+    for operation in (credit_service.add_credits, credit_service.use_credits):
+        with count_queries(db.bind) as queries:
+            response = await operation(user_id=test_user.id, amount=Decimal("1.00"))
+        kinds = [statement.split()[0] for statement in queries.statements]
+        # Conditional UPDATE ... RETURNING and the ledger INSERT; no read
+        assert kinds == ["UPDATE", "INSERT"], kinds
+        assert response.id is not None and response.created_at is not None
+
+@pytest.mark.asyncio
+async def test_get_transaction_history_query_budget(
+    credit_service: CreditService, test_user: User, test_plan: Plan, db: AsyncSession
+):
+    """Plan prices and subscription states are fetched with the page, not per row."""
+    await credit_service.add_credits(user_id=test_user.id, amount=Decimal("1.00"))
+    credit = (await db.execute(select(UserCredit).where(UserCredit.user_id == test_user.id))).scalar_one()
+    subscription = Subscription(
+        user_id=test_user.id, plan_id=test_plan.id, renewal_date=datetime.now(UTC) + timedelta(days=30)
+    )
+    db.add(subscription)
+    await db.flush()
+    for n in range(10):
+        db.add(CreditTransaction(
+            user_id=test_user.id,
+            user_credit_id=credit.id,
+            amount=Decimal("100.00"),
+            transaction_type=TransactionType.PLAN_RENEWAL,
+            plan_id=test_plan.id,
+            subscription_id=subscription.id,
+            description=f"Renewal {n}",
+        ))
+    await db.commit()
+
+    with assert_max_queries(db.bind, 2):
+        history = await credit_service.get_transaction_history(user_id=test_user.id, limit=20)
+
+    renewals = [tx for tx in history.transactions if tx.plan_id]
+    assert len(renewals) == 10
+    assert all(tx.monetary_amount == test_plan.price for tx in renewals)
+    assert all(tx.is_subscription_active is True for tx in renewals)
+
+@pytest.mark.asyncio
+async def test_get_transaction_history_invalid_cursor(credit_service: CreditService, test_user: User):
+    """A malformed cursor is a client error."""
+    with pytest.raises(HTTPException) as excinfo:
+        await credit_service.get_transaction_history(user_id=test_user.id, cursor="not-a-cursor")
+    assert excinfo.value.status_code == 400
+
+@pytest.mark.asyncio
+async def test_get_transaction_history_date_range(credit_service: CreditService, test_user: User, db: AsyncSession):
+    """A created_at range narrows both the page and the total."""
+    for n in range(3):
+        await credit_service.add_credits(user_id=test_user.id, amount=Decimal("1.00"), description=f"Tx {n}")
+    transactions = (await db.execute(
+        select(CreditTransaction).where(CreditTransaction.user_id == test_user.id).order_by(CreditTransaction.id)
+    )).scalars().all()
+    for tx, month in zip(transactions, (8, 9, 10)):
+        tx.created_at = datetime(2026, month, 15, tzinfo=UTC)
+    await db.commit()
+
+    history = await credit_service.get_transaction_history(
+        user_id=test_user.id,
+        start_date=datetime(2026, 9, 1, tzinfo=UTC),
+        end_date=datetime(2026, 11, 1, tzinfo=UTC)
+    )
+    assert [tx.description for tx in history.transactions] == ["Tx 2", "Tx 1"]
+    assert history.total_count == 2
+
+    with pytest.raises(HTTPException) as excinfo:
+        await credit_service.get_transaction_history(
+            user_id=test_user.id,
+            start_date=datetime(2026, 10, 1, tzinfo=UTC),
+            end_date=datetime(2026, 9, 1, tzinfo=UTC)
+        )
+    assert excinfo.value.status_code == 400
+
 @pytest.mark.asyncio
 async def test_purchase_plan(credit_service: CreditService, test_user: User, test_plan: Plan, db: AsyncSession):
     """Test purchasing a plan."""
@@ -0,0 +1,133 @@
+"""Tests for sharded balances of hot accounts."""
+
+import secrets
+from decimal import Decimal
+
+import pytest
+import pytest_asyncio
+from fastapi import HTTPException
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.credit import CreditTransaction, UserCredit, UserCreditShard
+from app.models.user import User
+from app.services.credit import CreditService
+from app.services.credit.shards import rebalance_shards
+
+
+@pytest_asyncio.fixture
+async def funded_user(db: AsyncSession) -> User:
+    """A user with 100 credits."""
+    user = User(email=f"shards_{secrets.token_hex(4)}@example.com", hashed_password="x", is_verified=True)
+    db.add(user)
+    await db.commit()
+    await CreditService(db).add_credits(user_id=user.id, amount=Decimal("100.00"))
+    return user
+
+
+@pytest_asyncio.fixture
+async def credit_service(db: AsyncSession) -> CreditService:
+    return CreditService(db)
+
+
+async def _canonical_balance(db: AsyncSession, user_id: int) -> Decimal:
+    return (await db.execute(select(UserCredit.balance).where(UserCredit.user_id == user_id))).scalar_one()
+
+
+async def _shard_balances(db: AsyncSession, user_id: int) -> list:
+    return list((await db.execute(
+        select(UserCreditShard.balance).where(UserCreditShard.user_id == user_id).order_by(UserCreditShard.shard_no)
+    )).scalars())
+
+
+@pytest.mark.asyncio
+async def test_enabling_shards_splits_the_balance(credit_service: CreditService, funded_user: User, db: AsyncSession):
+    """The spendable balance is spread evenly; the remainder stays on user_credits."""
+    user_id = funded_user.id
+    balance = await credit_service.set_shard_count(user_id=user_id, shard_count=3)
+
+    assert balance.balance == Decimal("100.00")
+    assert balance.shard_count == 3
+    assert await _shard_balances(db, user_id) == [Decimal("33.33")] * 3
+    assert await _canonical_balance(db, user_id) == Decimal("0.01")
+
+
+@pytest.mark.asyncio
+async def test_debit_takes_from_one_shard(credit_service: CreditService, funded_user: User, db: AsyncSession):
+    """A debit of a sharded account leaves the user_credits row alone and reports the total."""
+    user_id = funded_user.id
+    await credit_service.set_shard_count(user_id=user_id, shard_count=4)
+
+    transaction = await credit_service.use_credits(user_id=user_id, amount=Decimal("5.00"))
+
+    assert transaction.new_balance == Decimal("95.00")
+    assert await _canonical_balance(db, user_id) == Decimal("0.00")
+    assert sorted(await _shard_balances(db, user_id)) == [Decimal("20.00")] + [Decimal("25.00")] * 3
+    balance = await credit_service.get_balance(user_id)
+    assert balance.balance == Decimal("95.00")
+
+
+@pytest.mark.asyncio
+async def test_short_shard_falls_back_to_rebalance(credit_service: CreditService, funded_user: User, db: AsyncSession):
+    """The whole total stays spendable however it is spread, and is never overdrawn."""
+    user_id = funded_user.id
+    await credit_service.set_shard_count(user_id=user_id, shard_count=4)
+
+    # More than any single shard holds
+    transaction = await credit_service.use_credits(user_id=user_id, amount=Decimal("60.00"))
+    assert transaction.new_balance == Decimal("40.00")
+
+    for _ in range(4):
+        await credit_service.use_credits(user_id=user_id, amount=Decimal("10.00"))
+    assert (await credit_service.get_balance(user_id)).balance == Decimal("0.00")
+
+    with pytest.raises(Exception, match="Available: 0.00"):
+        await credit_service.use_credits(user_id=user_id, amount=Decimal("0.01"))
+    assert await db.scalar(
+        select(func.count()).select_from(CreditTransaction).where(CreditTransaction.user_id == user_id)
+    ) == 6
+
+
+@pytest.mark.asyncio
+async def test_hold_on_sharded_account(credit_service: CreditService, funded_user: User, db: AsyncSession):
+    """Holds pull their amount back from the shards and stay on user_credits."""
+    user_id = funded_user.id
+    await credit_service.set_shard_count(user_id=user_id, shard_count=4)
+
+    reservation = await credit_service.hold_credits(user_id=user_id, amount=Decimal("30.00"))
+    assert reservation.available_balance == Decimal("70.00")
+
+    await rebalance_shards(db, user_id)
+    await db.commit()
+    assert await _shard_balances(db, user_id) == [Decimal("17.50")] * 4
+
+    captured = await credit_service.capture_reservation(user_id=user_id, reservation_id=reservation.id)
+    assert captured.available_balance == Decimal("70.00")
+    assert (await credit_service.get_balance(user_id)).balance == Decimal("70.00")
+
+
+@pytest.mark.asyncio
+async def test_zero_shards_folds_back(credit_service: CreditService, funded_user: User, db: AsyncSession):
+    """Turning sharding off moves everything back onto user_credits and keeps the ledger count."""
+    user_id = funded_user.id
+    await credit_service.set_shard_count(user_id=user_id, shard_count=2)
+    await credit_service.use_credits(user_id=user_id, amount=Decimal("1.00"))
+    await credit_service.use_credits(user_id=user_id, amount=Decimal("2.00"))
+
+    balance = await credit_service.set_shard_count(user_id=user_id, shard_count=0)
+
+    assert balance.balance == Decimal("97.00")
+    assert balance.shard_count == 0
+    assert await _shard_balances(db, user_id) == []
+    credit = (await db.execute(
+        select(UserCredit.balance, UserCredit.transaction_count).where(UserCredit.user_id == user_id)
+    )).one()
+    assert credit == (Decimal("97.00"), 3)
+
+
+@pytest.mark.asyncio
+async def test_shard_count_is_capped(credit_service: CreditService, funded_user: User, monkeypatch):
+    monkeypatch.setattr("app.services.credit.base.settings.CREDIT_MAX_SHARDS", 8)
+    with pytest.raises(HTTPException) as exc_info:
+        await credit_service.set_shard_count(user_id=funded_user.id, shard_count=9)
+    assert exc_info.value.status_code == 400
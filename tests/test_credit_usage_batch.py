@@ -0,0 +1,188 @@
+"""Tests for batch usage ingestion."""
+
+import json
+import secrets
+from decimal import Decimal
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.auth import get_internal_service
+from app.main import app as app_instance
+from app.models.credit import CreditTransaction, TransactionType, UserCredit
+from app.models.user import User
+from app.schemas.credit_schemas import UsageStatus
+from app.services.credit import CreditService
+
+
+async def _user(db: AsyncSession, balance: str = None) -> int:
+    user = User(email=f"usage_{secrets.token_hex(4)}@example.com", hashed_password="x", is_verified=True)
+    db.add(user)
+    await db.commit()
+    if balance is not None:
+        await CreditService(db).add_credits(user_id=user.id, amount=Decimal(balance))
+    return user.id
+
+
+@pytest_asyncio.fixture
+async def credit_service(db: AsyncSession) -> CreditService:
+    return CreditService(db)
+
+
+async def _ledger(db: AsyncSession, user_id: int) -> list:
+    return list((await db.execute(
+        select(CreditTransaction.amount, CreditTransaction.reference_id)
+        .where(CreditTransaction.user_id == user_id, CreditTransaction.transaction_type == TransactionType.CREDIT_USED)
+        .order_by(CreditTransaction.id)
+    )).all())
+
+
+@pytest.mark.asyncio
+async def test_batch_debits_every_user_once(credit_service: CreditService, db: AsyncSession):
+    """Records are summed per user; every record gets its own ledger row."""
+    alice, bob = await _user(db, "10.00"), await _user(db, "5.00")
+
+    response = await credit_service.ingest_usage([
+        {"user_id": alice, "amount": "1.50", "reference_id": "op-1"},
+        {"user_id": bob, "amount": "2.00", "reference_id": "op-2"},
+        {"user_id": alice, "amount": "0.50", "reference_id": "op-3", "description": "render"},
+    ])
+
+    assert (response.applied, response.rejected) == (3, 0)
+    assert response.balances == {alice: Decimal("8.00"), bob: Decimal("3.00")}
+    assert [result.index for result in response.results] == [0, 1, 2]
+    assert all(result.transaction_id for result in response.results)
+    assert await _ledger(db, alice) == [(Decimal("1.50"), "op-1"), (Decimal("0.50"), "op-3")]
+    credit = (await db.execute(
+        select(UserCredit.balance, UserCredit.transaction_count).where(UserCredit.user_id == alice)
+    )).one()
+    assert credit == (Decimal("8.00"), 3)
+
+
+@pytest.mark.asyncio
+async def test_records_over_the_balance_are_rejected(credit_service: CreditService, db: AsyncSession):
+    """Allocation is greedy in request order; a later, smaller record can still fit."""
+    user_id = await _user(db, "10.00")
+    no_record = await _user(db)
+
+    response = await credit_service.ingest_usage([
+        {"user_id": user_id, "amount": "6.00"},
+        {"user_id": user_id, "amount": "5.00"},
+        {"user_id": user_id, "amount": "4.00"},
+        {"user_id": no_record, "amount": "1.00"},
+    ])
+
+    assert [result.status for result in response.results] == [
+        UsageStatus.APPLIED, UsageStatus.INSUFFICIENT_CREDITS, UsageStatus.APPLIED, UsageStatus.INSUFFICIENT_CREDITS
+    ]
+    assert "Available: 4.00" in response.results[1].detail
+    assert response.results[1].transaction_id is None
+    assert response.balances == {user_id: Decimal("0.00")}
+
+
+@pytest.mark.asyncio
+async def test_duplicate_references_are_rejected(credit_service: CreditService, db: AsyncSession):
+    """A reference already in the ledger, or repeated in the batch, is not charged twice."""
+    user_id = await _user(db, "10.00")
+    other = await _user(db, "10.00")
+    await credit_service.use_credits(user_id=user_id, amount=Decimal("1.00"), reference_id="op-1")
+
+    response = await credit_service.ingest_usage([
+        {"user_id": user_id, "amount": "1.00", "reference_id": "op-1"},
+        {"user_id": user_id, "amount": "1.00", "reference_id": "op-2"},
+        {"user_id": user_id, "amount": "1.00", "reference_id": "op-2"},
+        {"user_id": other, "amount": "1.00", "reference_id": "op-1"},
+    ])
+
+    assert [result.status for result in response.results] == [
+        UsageStatus.DUPLICATE_REFERENCE, UsageStatus.APPLIED, UsageStatus.DUPLICATE_REFERENCE, UsageStatus.APPLIED
+    ]
+    assert response.balances == {user_id: Decimal("8.00"), other: Decimal("9.00")}
+
+
+@pytest.mark.asyncio
+async def test_invalid_records_do_not_stop_the_batch(credit_service: CreditService, db: AsyncSession):
+    user_id = await _user(db, "10.00")
+
+    response = await credit_service.ingest_usage([
+        {"user_id": user_id, "amount": "-1"},
+        {"amount": "1.00"},
+        "not json",
+        {"user_id": "abc", "amount": "1.00"},
+        {"user_id": user_id, "amount": "1.00"},
+    ])
+
+    assert [result.status for result in response.results] == [UsageStatus.INVALID] * 4 + [UsageStatus.APPLIED]
+    assert response.results[3].user_id is None
+    assert "user_id" in response.results[3].detail
+    assert response.results[0].user_id == user_id
+    assert "amount" in response.results[0].detail
+    assert response.balances == {user_id: Decimal("9.00")}
+
+
+@pytest.mark.asyncio
+async def test_nothing_applied_writes_nothing(credit_service: CreditService, db: AsyncSession):
+    user_id = await _user(db, "1.00")
+
+    response = await credit_service.ingest_usage([{"user_id": user_id, "amount": "2.00"}])
+
+    assert (response.applied, response.rejected, response.balances) == (0, 1, {})
+    assert await _ledger(db, user_id) == []
+
+
+@pytest.mark.asyncio
+async def test_sharded_account_spends_its_whole_balance(credit_service: CreditService, db: AsyncSession):
+    user_id = await _user(db, "10.00")
+    await credit_service.set_shard_count(user_id=user_id, shard_count=4)
+
+    response = await credit_service.ingest_usage([{"user_id": user_id, "amount": "7.00"}] + [
+        {"user_id": user_id, "amount": "1.00"} for _ in range(4)
+    ])
+
+    assert (response.applied, response.rejected) == (4, 1)
+    assert response.balances == {user_id: Decimal("0.00")}
+    assert (await credit_service.get_balance(user_id)).balance == Decimal("0.00")
+
+
+@pytest_asyncio.fixture
+async def internal_client(client):
+    app_instance.dependency_overrides[get_internal_service] = lambda: "test-service"
+    yield client
+    app_instance.dependency_overrides.pop(get_internal_service, None)
+
+
+@pytest.mark.asyncio
+async def test_endpoint_accepts_json_and_ndjson(internal_client, db: AsyncSession):
+    user_id = await _user(db, "10.00")
+
+    array = await internal_client.post("/credits/usage/batch", json=[{"user_id": user_id, "amount": 0.1}])
+    ndjson = await internal_client.post(
+        "/v1/credits/credits/usage/batch",
+        content="\n".join([
+            json.dumps({"user_id": user_id, "amount": "1.00", "reference_id": "op-1"}),
+            "",
+            "{broken",
+            json.dumps({"user_id": user_id, "amount": "1.00", "reference_id": "op-1"}),
+        ]) + "\n",
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+
+    assert array.status_code == 200
+    assert Decimal(str(array.json()["balances"][str(user_id)])) == Decimal("9.90")
+    assert ndjson.status_code == 200
+    assert [result["status"] for result in ndjson.json()["results"]] == [
+        "applied", "invalid", "duplicate_reference"
+    ]
+
+
+@pytest.mark.asyncio
+async def test_endpoint_rejects_oversized_and_malformed_batches(internal_client, monkeypatch):
+    monkeypatch.setattr("app.routers.credit_router.settings.CREDIT_USAGE_BATCH_MAX_RECORDS", 2)
+
+    too_many = await internal_client.post("/credits/usage/batch", json=[{}, {}, {}])
+    not_array = await internal_client.post("/credits/usage/batch", json={"user_id": 1})
+
+    assert too_many.status_code == 413
+    assert not_array.status_code == 400
@@ -0,0 +1,137 @@
+"""Concurrent debits and holds against one balance.
+
+Many sessions spend from (or hold) the same balance at once; the
+conditional UPDATE must let exactly as many through as the balance covers,
+with one ledger row per debit. Runs against a SQLite file (writers are serialised, but reads are
+not, so a read-check-write debit loses updates here too). Set
+``CONCURRENCY_DATABASE_URL`` to a scratch Postgres database
+(``postgresql+asyncpg://...``) to run it there as well; its tables are
+dropped and recreated.
+"""
+
+import asyncio
+import os
+from decimal import Decimal
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.core.base_model import Base
+from app.models.credit import CreditTransaction, TransactionType, UserCredit
+from app.models.user import User
+from app.services.credit import CreditService, InsufficientCreditsError
+
+STARTING_BALANCE = Decimal("10.00")
+DEBITS = 25
+
+
+@pytest.fixture(params=["sqlite", "postgresql"])
+async def engine(request, tmp_path):
+    if request.param == "sqlite":
+        url = f"sqlite+aiosqlite:///{tmp_path / 'concurrency.db'}"
+    else:
+        url = os.getenv("CONCURRENCY_DATABASE_URL")
+        if not url:
+            pytest.skip("CONCURRENCY_DATABASE_URL not set")
+    engine = create_async_engine(url, connect_args={"timeout": 30} if request.param == "sqlite" else {})
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    yield engine
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+    await engine.dispose()
+
+
+class TestConcurrentDebits:
+    """The balance never goes negative and the ledger matches it."""
+
+    @pytest.mark.asyncio
+    async def test_debits_do_not_overdraw(self, engine):
+        async with AsyncSession(engine, expire_on_commit=False) as db:
+            user = User(email="concurrent@example.com", hashed_password="x")
+            db.add(user)
+            await db.commit()
+            await CreditService(db).add_credits(user_id=user.id, amount=STARTING_BALANCE)
+
+        async def debit():
+            async with AsyncSession(engine, expire_on_commit=False, autoflush=False) as db:
+                try:
+                    await CreditService(db).use_credits(user_id=user.id, amount=Decimal("1.00"))
+                    return True
+                except HTTPException as e:
+                    assert "Insufficient credits" in e.detail
+                    return False
+
+        results = await asyncio.gather(*(debit() for _ in range(DEBITS)))
+
+        assert sum(results) == int(STARTING_BALANCE)
+        async with AsyncSession(engine) as db:
+            credit = (await db.execute(select(UserCredit).where(UserCredit.user_id == user.id))).scalar_one()
+            debits = await db.scalar(
+                select(func.count()).select_from(CreditTransaction).where(
+                    CreditTransaction.user_id == user.id,
+                    CreditTransaction.transaction_type == TransactionType.CREDIT_USED,
+                )
+            )
+        assert credit.balance == Decimal("0.00")
+        assert debits == int(STARTING_BALANCE)
+        assert credit.transaction_count == debits + 1
+
+    @pytest.mark.asyncio
+    async def test_holds_and_debits_do_not_overcommit(self, engine):
+        async with AsyncSession(engine, expire_on_commit=False) as db:
+            user = User(email="holds@example.com", hashed_password="x")
+            db.add(user)
+            await db.commit()
+            await CreditService(db).add_credits(user_id=user.id, amount=STARTING_BALANCE)
+
+        async def hold_or_debit(n):
+            async with AsyncSession(engine, expire_on_commit=False, autoflush=False) as db:
+                service = CreditService(db)
+                try:
+                    if n % 2:
+                        await service.hold_credits(user_id=user.id, amount=Decimal("1.00"))
+                    else:
+                        await service.use_credits(user_id=user.id, amount=Decimal("1.00"))
+                    return True
+                except InsufficientCreditsError:
+                    return False
+                except HTTPException as e:
+                    assert "Insufficient credits" in e.detail
+                    return False
+
+        results = await asyncio.gather(*(hold_or_debit(n) for n in range(DEBITS)))
+
+        assert sum(results) == int(STARTING_BALANCE)
+        async with AsyncSession(engine) as db:
+            credit = (await db.execute(select(UserCredit).where(UserCredit.user_id == user.id))).scalar_one()
+        assert credit.balance - credit.reserved_balance == Decimal("0.00")
+
+    @pytest.mark.asyncio
+    async def test_sharded_debits_do_not_overdraw(self, engine):
+        async with AsyncSession(engine, expire_on_commit=False) as db:
+            user = User(email="sharded@example.com", hashed_password="x")
+            db.add(user)
+            await db.commit()
+            await CreditService(db).add_credits(user_id=user.id, amount=STARTING_BALANCE)
+            await CreditService(db).set_shard_count(user_id=user.id, shard_count=4)
+
+        async def debit():
+            async with AsyncSession(engine, expire_on_commit=False, autoflush=False) as db:
+                try:
+                    await CreditService(db).use_credits(user_id=user.id, amount=Decimal("1.00"))
+                    return True
+                except HTTPException as e:
+                    assert "Insufficient credits" in e.detail
+                    return False
+
+        results = await asyncio.gather(*(debit() for _ in range(DEBITS)))
+
+        # Shards left short fall back to a rebalance, so the whole balance is spendable
+        assert sum(results) == int(STARTING_BALANCE)
+        async with AsyncSession(engine) as db:
+            balance = await CreditService(db).get_balance(user.id)
+        assert balance.balance == Decimal("0.00")
@@ -0,0 +1,56 @@
+"""Smoke test of the PgBouncer compatibility mode against a real PgBouncer.
+
+Set ``PGBOUNCER_DATABASE_URL`` to a ``postgresql+asyncpg://`` URL of a
+PgBouncer in ``pool_mode = transaction`` (see docs/pgbouncer.md). Many
+concurrent transactions run parameterised statements; with asyncpg's default
+named, cached prepared statements they fail as soon as two transactions land
+on the same server connection ("prepared statement ... already exists" or
+"does not exist").
+"""
+
+import asyncio
+import os
+
+import pytest
+from sqlalchemy import bindparam, column, func, select, table
+
+from app.core import database
+
+pytestmark = pytest.mark.skipif(
+    not os.getenv("PGBOUNCER_DATABASE_URL"),
+    reason="PGBOUNCER_DATABASE_URL not set",
+)
+
+TASKS = 20
+TRANSACTIONS_PER_TASK = 25
+
+PG_CLASS = table("pg_class", column("relname"), column("relkind"))
+STATEMENTS = [
+    select(func.count()).select_from(PG_CLASS).where(PG_CLASS.c.relkind == bindparam("relkind")),
+    select(PG_CLASS.c.relname).where(PG_CLASS.c.relname == bindparam("relname")).limit(1),
+]
+
+
+@pytest.fixture(params=["null", "queue"])
+async def pgbouncer_engine(request, monkeypatch):
+    monkeypatch.setattr(database, "_engines", {})
+    monkeypatch.setattr(database.settings, "DB_PGBOUNCER_MODE", True)
+    monkeypatch.setattr(database.settings, "DB_PGBOUNCER_POOL", request.param)
+    engine = database.create_pooled_engine(os.environ["PGBOUNCER_DATABASE_URL"], "pgbouncer_smoke")
+    yield engine
+    await engine.dispose()
+
+
+class TestPgBouncerTransactionMode:
+    """Statements keep working while transactions move between server connections."""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_parameterised_statements(self, pgbouncer_engine):
+        async def worker(n):
+            for i in range(TRANSACTIONS_PER_TASK):
+                async with pgbouncer_engine.begin() as conn:
+                    count = (await conn.execute(STATEMENTS[0], {"relkind": "r"})).scalar()
+                    assert count > 0
+                    await conn.execute(STATEMENTS[1], {"relname": f"missing_{n}_{i}"})
+
+        await asyncio.gather(*(worker(n) for n in range(TASKS)))
@@ -0,0 +1,266 @@
+"""Query-plan regression tests for the hot lookups.
+
+Seeds a few thousand users with transactions and subscriptions, runs
+``ANALYZE`` and checks that the planner answers each hot query from its
+index rather than a full scan, so a schema or query change cannot silently
+fall back to sequential scans.
+
+Always runs against SQLite (``EXPLAIN QUERY PLAN``). Set
+``QUERY_PLAN_DATABASE_URL`` to a Postgres URL (``postgresql+asyncpg://...``)
+to also check the Postgres plans; the tests work in a throwaway schema and
+drop it afterwards.
+"""
+
+import asyncio
+import json
+import os
+import uuid
+from datetime import datetime, timedelta, UTC
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import desc, insert, select, text, tuple_
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.core import hot_queries
+from app.core.base_model import Base
+from app.models.credit import CreditTransaction, UserCredit
+from app.models.plan import Plan, Subscription
+from app.models.user import User
+
+USERS = 2000
+TRANSACTIONS_PER_USER = 25
+
+# name -> (statement, table, index the planner must use)
+HOT_QUERIES = {
+    "user_by_stripe_customer_id": (
+        hot_queries.USER_ID_BY_STRIPE_CUSTOMER.params(stripe_customer_id="cus_1234"),
+        "users",
+        "ix_users_stripe_customer_id",
+    ),
+    "user_by_email": (
+        hot_queries.USER_BY_EMAIL.params(email="user1234@example.com"),
+        "users",
+        "ix_users_email",
+    ),
+    "transaction_history": (
+        select(CreditTransaction)
+        .where(CreditTransaction.user_id == 1234)
+        .order_by(desc(CreditTransaction.created_at), desc(CreditTransaction.id))
+        .limit(51),
+        "credit_transactions",
+        "ix_credit_transactions_user_id_created_at_id",
+    ),
+    "transaction_history_keyset_page": (
+        select(CreditTransaction)
+        .where(
+            CreditTransaction.user_id == 1234,
+            tuple_(CreditTransaction.created_at, CreditTransaction.id) < tuple_(datetime(2024, 1, 1), 10_000),
+        )
+        .order_by(desc(CreditTransaction.created_at), desc(CreditTransaction.id))
+        .limit(51),
+        "credit_transactions",
+        "ix_credit_transactions_user_id_created_at_id",
+    ),
+    "transaction_history_date_range": (
+        select(CreditTransaction)
+        .where(
+            CreditTransaction.user_id == 1234,
+            CreditTransaction.created_at >= datetime(2024, 1, 1),
+            CreditTransaction.created_at < datetime(2024, 2, 1),
+        )
+        .order_by(desc(CreditTransaction.created_at), desc(CreditTransaction.id))
+        .limit(51),
+        "credit_transactions",
+        "ix_credit_transactions_user_id_created_at_id",
+    ),
+    "transaction_by_reference_id": (
+        select(CreditTransaction).where(CreditTransaction.reference_id == "pi_1234_3"),
+        "credit_transactions",
+        "ix_credit_transactions_reference_id",
+    ),
+    "subscriptions_by_user_and_status": (
+        select(Subscription).where(Subscription.user_id == 1234, Subscription.status == "active"),
+        "subscriptions",
+        "ix_subscriptions_user_id_status",
+    ),
+    "subscription_by_stripe_id": (
+        select(Subscription).where(Subscription.stripe_subscription_id == "sub_1234"),
+        "subscriptions",
+        "ix_subscriptions_stripe_subscription_id",
+    ),
+}
+
+
+def _seed_rows():
+    now = datetime.now(UTC)
+    users, credits, transactions, subscriptions = [], [], [], []
+    for user_id in range(1, USERS + 1):
+        users.append({
+            "id": user_id,
+            "email": f"user{user_id}@example.com",
+            "hashed_password": "x",
+            "auth_type": "password",
+            "is_admin": False,
+            "is_verified": True,
+            # About a third of the users never paid and have no Stripe customer
+            "stripe_customer_id": f"cus_{user_id}" if user_id % 3 else None,
+            "created_at": now,
+            "updated_at": now,
+            "account_status": "active",
+            "has_consumed_initial_trial": True,
+        })
+        credits.append({
+            "id": user_id, "user_id": user_id, "balance": Decimal("10.00"), "created_at": now, "updated_at": now,
+        })
+        for n in range(TRANSACTIONS_PER_USER):
+            transactions.append({
+                "user_id": user_id,
+                "user_credit_id": user_id,
+                "amount": Decimal("1.00"),
+                "transaction_type": "credit_used" if n % 5 else "credit_added",
+                # Only purchases carry a Stripe reference
+                "reference_id": None if n % 5 else f"pi_{user_id}_{n}",
+                "created_at": now - timedelta(hours=user_id + n * USERS),
+            })
+        subscriptions.append({
+            "user_id": user_id,
+            "plan_id": 1,
+            "start_date": now,
+            "renewal_date": now + timedelta(days=30),
+            "is_active": user_id % 4 != 0,
+            "auto_renew": True,
+            "status": "active" if user_id % 4 else "canceled",
+            "created_at": now,
+            "updated_at": now,
+            "stripe_subscription_id": f"sub_{user_id}",
+            "cancel_at_period_end": False,
+        })
+    return users, credits, transactions, subscriptions
+
+
+async def _seed(url: str, schema: str = None) -> None:
+    engine = _engine(url, schema)
+    if schema:
+        async with engine.begin() as conn:
+            await conn.execute(text(f'CREATE SCHEMA "{schema}"'))
+    users, credits, transactions, subscriptions = _seed_rows()
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        now = datetime.now(UTC)
+        await conn.execute(insert(Plan.__table__), [{
+            "id": 1, "name": "Basic", "credit_amount": Decimal("100"), "price": Decimal("10"), "is_active": True,
+            "created_at": now, "updated_at": now, "is_limited_free": False, "is_trial_eligible": False,
+            "is_public": True,
+        }])
+        await conn.execute(insert(User.__table__), users)
+        await conn.execute(insert(UserCredit.__table__), credits)
+        await conn.execute(insert(CreditTransaction.__table__), transactions)
+        await conn.execute(insert(Subscription.__table__), subscriptions)
+        await conn.execute(text("ANALYZE"))
+    await engine.dispose()
+
+
+def _engine(url: str, schema: str = None):
+    if schema:
+        return create_async_engine(url, connect_args={"server_settings": {"search_path": schema}})
+    return create_async_engine(url)
+
+
+def _walk(node):
+    yield node
+    for child in node.get("Plans", []):
+        yield from _walk(child)
+
+
+async def _plan(url: str, schema: str, statement):
+    """Return (index names used, tables fully scanned, sorted) for ``statement``."""
+    engine = _engine(url, schema)
+    sql = str(statement.compile(dialect=engine.dialect, compile_kwargs={"literal_binds": True}))
+    try:
+        async with engine.connect() as conn:
+            if engine.dialect.name == "postgresql":
+                raw = (await conn.execute(text(f"EXPLAIN (FORMAT JSON) {sql}"))).scalar()
+                plan = raw if isinstance(raw, list) else json.loads(raw)
+                nodes = list(_walk(plan[0]["Plan"]))
+                indexes = {node["Index Name"] for node in nodes if "Index Name" in node}
+                scanned = {node["Relation Name"] for node in nodes if node["Node Type"] == "Seq Scan"}
+                sorted_ = any(node["Node Type"] in ("Sort", "Incremental Sort") for node in nodes)
+            else:
+                details = [row[-1] for row in (await conn.execute(text(f"EXPLAIN QUERY PLAN {sql}"))).all()]
+                indexes = {
+                    detail.split(" INDEX ", 1)[1].split(" ")[0]
+                    for detail in details
+                    if " INDEX " in detail
+                }
+                scanned = {
+                    detail.split(" ")[1]
+                    for detail in details
+                    if detail.startswith("SCAN ") and " INDEX " not in detail
+                }
+                sorted_ = any("TEMP B-TREE" in detail for detail in details)
+    finally:
+        await engine.dispose()
+    return indexes, scanned, sorted_
+
+
+def _targets():
+    targets = [pytest.param("sqlite", id="sqlite")]
+    targets.append(pytest.param(
+        "postgresql",
+        id="postgresql",
+        marks=pytest.mark.skipif(
+            not os.getenv("QUERY_PLAN_DATABASE_URL"),
+            reason="QUERY_PLAN_DATABASE_URL not set",
+        ),
+    ))
+    return targets
+
+
+@pytest.fixture(scope="module", params=_targets())
+def seeded(request, tmp_path_factory):
+    if request.param == "sqlite":
+        url = f"sqlite+aiosqlite:///{tmp_path_factory.mktemp('query_plans') / 'plans.db'}"
+        asyncio.run(_seed(url))
+        yield url, None
+        return
+
+    url = os.environ["QUERY_PLAN_DATABASE_URL"]
+    schema = f"query_plans_{uuid.uuid4().hex[:8]}"
+    try:
+        asyncio.run(_seed(url, schema))
+        yield url, schema
+    finally:
+        async def drop():
+            engine = create_async_engine(url)
+            async with engine.begin() as conn:
+                await conn.execute(text(f'DROP SCHEMA IF EXISTS "{schema}" CASCADE'))
+            await engine.dispose()
+        asyncio.run(drop())
+
+
+class TestHotQueryPlans:
+    """Every hot lookup is answered from its index."""
+
+    @pytest.mark.parametrize("name", list(HOT_QUERIES))
+    @pytest.mark.asyncio
+    async def test_uses_index(self, seeded, name):
+        url, schema = seeded
+        statement, table, index = HOT_QUERIES[name]
+
+        indexes, scanned, _ = await _plan(url, schema, statement)
+
+        assert table not in scanned, f"{name}: sequential scan on {table}"
+        assert index in indexes, f"{name}: expected {index}, plan used {sorted(indexes) or 'no index'}"
+
+    @pytest.mark.parametrize(
+        "name", ["transaction_history", "transaction_history_keyset_page", "transaction_history_date_range"]
+    )
+    @pytest.mark.asyncio
+    async def test_history_is_read_in_index_order(self, seeded, name):
+        url, schema = seeded
+        statement, _, _ = HOT_QUERIES[name]
+
+        _, _, sorted_ = await _plan(url, schema, statement)
+
+        assert not sorted_, f"{name}: sorts instead of reading the index newest-first"
@@ -0,0 +1,222 @@
+"""Tests for the Idempotency-Key middleware."""
+
+import asyncio
+from datetime import datetime, timedelta, UTC
+
+import httpx
+import pytest
+from fastapi import FastAPI, HTTPException, Request
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.core.idempotency import IdempotencyStore, purge_expired_idempotency_keys
+from app.core.security import create_access_token
+from app.middleware.idempotency import IdempotencyMiddleware
+from app.models.idempotency import IdempotencyKey
+
+
+class TestIdempotencyMiddleware:
+    """Tests for IdempotencyMiddleware."""
+
+    @pytest.fixture
+    async def engine(self, tmp_path):
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'idempotency.db'}")
+        async with engine.begin() as conn:
+            await conn.run_sync(IdempotencyKey.__table__.create)
+        yield engine
+        await engine.dispose()
+
+    @pytest.fixture
+    def calls(self):
+        return []
+
+    @pytest.fixture
+    def app(self, engine, calls):
+        app = FastAPI()
+        app.add_middleware(IdempotencyMiddleware, store=IdempotencyStore(engine), wait_seconds=2)
+        release = asyncio.Event()
+        app.state.release = release
+
+        @app.post("/credits/use")
+        async def use(payload: dict, request: Request):
+            if payload.get("auth") and request.headers.get("authorization") != "Bearer valid":
+                raise HTTPException(status_code=401, detail="Session expired. Please log in again.")
+            calls.append(payload)
+            if payload.get("slow"):
+                await release.wait()
+            if payload.get("fail"):
+                raise HTTPException(status_code=503, detail="unavailable")
+            return {"call": len(calls)}
+
+        @app.post("/credits/balance-check")
+        async def other(payload: dict):
+            calls.append(payload)
+            return {"call": len(calls)}
+
+        return app
+
+    def _client(self, app) -> httpx.AsyncClient:
+        return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+    async def test_retry_replays_first_response(self, app, calls):
+        async with self._client(app) as client:
+            first = await client.post("/credits/use", json={"amount": 1}, headers={"Idempotency-Key": "k1"})
+            retry = await client.post("/credits/use", json={"amount": 1}, headers={"Idempotency-Key": "k1"})
+
+        assert first.json() == retry.json() == {"call": 1}
+        assert retry.status_code == 200
+        assert retry.headers["idempotent-replayed"] == "true"
+        assert "idempotent-replayed" not in first.headers
+        assert len(calls) == 1
+
+    async def test_versioned_path_shares_keys(self, app, calls):
+        app.add_api_route("/v1/credits/credits/use", app.router.routes[-2].endpoint, methods=["POST"])
+        async with self._client(app) as client:
+            await client.post("/credits/use", json={"amount": 1}, headers={"Idempotency-Key": "k1"})
+            retry = await client.post(
+                "/v1/credits/credits/use", json={"amount": 1}, headers={"Idempotency-Key": "k1"}
+            )
+
+        assert retry.headers["idempotent-replayed"] == "true"
+        assert len(calls) == 1
+
+    async def test_without_key_or_on_other_paths_runs_every_time(self, app, calls):
+        async with self._client(app) as client:
+            await client.post("/credits/use", json={"amount": 1})
+            await client.post("/credits/use", json={"amount": 1})
+            await client.post("/credits/balance-check", json={}, headers={"Idempotency-Key": "k1"})
+            await client.post("/credits/balance-check", json={}, headers={"Idempotency-Key": "k1"})
+
+        assert len(calls) == 4
+
+    async def test_key_reused_with_different_body_is_rejected(self, app, calls):
+        async with self._client(app) as client:
+            await client.post("/credits/use", json={"amount": 1}, headers={"Idempotency-Key": "k1"})
+            reused = await client.post("/credits/use", json={"amount": 2}, headers={"Idempotency-Key": "k1"})
+
+        assert reused.status_code == 422
+        assert len(calls) == 1
+
+    async def test_keys_are_scoped_to_the_caller(self, app, calls):
+        alice = {"Authorization": f"Bearer {create_access_token({'sub': 'alice@example.com'})}"}
+        bob = {"Authorization": f"Bearer {create_access_token({'sub': 'bob@example.com'})}"}
+        async with self._client(app) as client:
+            first = await client.post("/credits/use", json={"amount": 1}, headers={"Idempotency-Key": "1", **alice})
+            other_user = await client.post(
+                "/credits/use", json={"amount": 2}, headers={"Idempotency-Key": "1", **bob}
+            )
+            other_service = await client.post(
+                "/credits/use", json={"amount": 1}, headers={"Idempotency-Key": "1", "api-key": "other"}
+            )
+
+        assert [first.json(), other_user.json(), other_service.json()] == [{"call": 1}, {"call": 2}, {"call": 3}]
+        assert "idempotent-replayed" not in other_user.headers
+
+    async def test_refreshed_token_of_same_user_replays(self, app, calls):
+        old = create_access_token({"sub": "alice@example.com"}, timedelta(minutes=1))
+        new = create_access_token({"sub": "alice@example.com"}, timedelta(minutes=30))
+        async with self._client(app) as client:
+            await client.post(
+                "/credits/use", json={"amount": 1}, headers={"Idempotency-Key": "k1", "Authorization": f"Bearer {old}"}
+            )
+            retry = await client.post(
+                "/credits/use", json={"amount": 1}, headers={"Idempotency-Key": "k1", "Authorization": f"Bearer {new}"}
+            )
+
+        assert retry.json() == {"call": 1}
+        assert retry.headers["idempotent-replayed"] == "true"
+
+    async def test_server_errors_are_not_stored(self, app, calls):
+        async with self._client(app) as client:
+            failed = await client.post("/credits/use", json={"fail": True}, headers={"Idempotency-Key": "k1"})
+            retried = await client.post("/credits/use", json={"fail": True}, headers={"Idempotency-Key": "k1"})
+
+        assert failed.status_code == retried.status_code == 503
+        assert "idempotent-replayed" not in retried.headers
+        assert len(calls) == 2
+
+    async def test_auth_failures_are_not_stored(self, app, calls):
+        async with self._client(app) as client:
+            expired = await client.post(
+                "/credits/use", json={"auth": True}, headers={"Idempotency-Key": "k1", "Authorization": "Bearer old"}
+            )
+            retried = await client.post(
+                "/credits/use", json={"auth": True}, headers={"Idempotency-Key": "k1", "Authorization": "Bearer valid"}
+            )
+
+        assert expired.status_code == 401
+        assert retried.status_code == 200
+        assert retried.json() == {"call": 1}
+        assert "idempotent-replayed" not in retried.headers
+
+    async def test_concurrent_duplicate_waits_for_first(self, app, calls):
+        async with self._client(app) as client:
+            first = asyncio.create_task(
+                client.post("/credits/use", json={"slow": True}, headers={"Idempotency-Key": "k1"})
+            )
+            while not calls:
+                await asyncio.sleep(0.01)
+            duplicate = asyncio.create_task(
+                client.post("/credits/use", json={"slow": True}, headers={"Idempotency-Key": "k1"})
+            )
+            await asyncio.sleep(0.1)
+            assert not duplicate.done()
+            app.state.release.set()
+            first, duplicate = await first, await duplicate
+
+        assert first.json() == duplicate.json() == {"call": 1}
+        assert duplicate.headers["idempotent-replayed"] == "true"
+        assert len(calls) == 1
+
+    async def test_duplicate_gives_up_after_wait(self, app, calls):
+        app.user_middleware[0].kwargs["wait_seconds"] = 0.1
+        app.middleware_stack = app.build_middleware_stack()
+        async with self._client(app) as client:
+            first = asyncio.create_task(
+                client.post("/credits/use", json={"slow": True}, headers={"Idempotency-Key": "k1"})
+            )
+            while not calls:
+                await asyncio.sleep(0.01)
+            duplicate = await client.post("/credits/use", json={"slow": True}, headers={"Idempotency-Key": "k1"})
+            app.state.release.set()
+            await first
+
+        assert duplicate.status_code == 409
+        assert duplicate.headers["retry-after"] == "1"
+        assert len(calls) == 1
+
+    async def test_expired_claim_cannot_settle_the_retry(self, engine, monkeypatch):
+        monkeypatch.setattr("app.core.idempotency.settings.IDEMPOTENCY_IN_FLIGHT_TIMEOUT_SECONDS", 0)
+        store = IdempotencyStore(engine)
+        assert await store.claim("/credits/use", "caller", "k1", "hash", "first") is None
+        # The first request outlived its claim; its retry takes the key over
+        assert await store.claim("/credits/use", "caller", "k1", "hash", "retry") is None
+
+        await store.release("/credits/use", "caller", "k1", "first")
+        await store.complete("/credits/use", "caller", "k1", "first", 200, "application/json", b'{"call": 1}')
+        assert ("/credits/use", "caller", "k1") in store._in_flight
+        await store.complete("/credits/use", "caller", "k1", "retry", 201, "application/json", b'{"call": 2}')
+
+        stored = await store.wait("/credits/use", "caller", "k1", 0)
+        assert (stored.status_code, stored.response_body) == (201, b'{"call": 2}')
+
+    async def test_overlong_key_is_rejected(self, app, calls):
+        async with self._client(app) as client:
+            response = await client.post("/credits/use", json={}, headers={"Idempotency-Key": "k" * 256})
+
+        assert response.status_code == 400
+        assert calls == []
+
+    async def test_expired_keys_run_again_and_are_purged(self, app, engine, calls):
+        async with self._client(app) as client:
+            await client.post("/credits/use", json={"amount": 1}, headers={"Idempotency-Key": "k1"})
+            later = datetime.now(UTC) + timedelta(days=2)
+
+            assert await purge_expired_idempotency_keys(engine, batch_size=1, now=later) == 1
+            async with engine.connect() as conn:
+                assert await conn.scalar(select(func.count()).select_from(IdempotencyKey)) == 0
+
+            retry = await client.post("/credits/use", json={"amount": 1}, headers={"Idempotency-Key": "k1"})
+
+        assert retry.json() == {"call": 2}
+        assert "idempotent-replayed" not in retry.headers
@@ -0,0 +1,104 @@
+"""Tests for the request metrics middleware and /metrics endpoint."""
+
+from unittest.mock import patch
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core.metrics import HTTP_REQUESTS_TOTAL, HTTP_REQUEST_DURATION
+from app.middleware.metrics import MetricsMiddleware, UNMATCHED_ROUTE
+
+
+def _count(method: str, route: str, status: str) -> float:
+    for labels, value in HTTP_REQUESTS_TOTAL.snapshot()["samples"]:
+        if labels == [method, route, status]:
+            return value
+    return 0
+
+
+class TestMetricsMiddleware:
+    """Tests for MetricsMiddleware."""
+
+    @pytest.fixture
+    def client(self):
+        app = FastAPI()
+        app.add_middleware(MetricsMiddleware)
+
+        @app.get("/items/{item_id}")
+        async def get_item(item_id: int):
+            return {"id": item_id}
+
+        @app.get("/boom")
+        async def boom():
+            raise RuntimeError("boom")
+
+        return TestClient(app, raise_server_exceptions=False)
+
+    def test_uses_route_template_as_label(self, client):
+        """Path parameters should not create one series per value."""
+        before = _count("GET", "/items/{item_id}", "200")
+
+        client.get("/items/1")
+        client.get("/items/2")
+
+        assert _count("GET", "/items/{item_id}", "200") == before + 2
+
+    def test_unmatched_paths_share_one_label(self, client):
+        """Unknown paths should be grouped under a single label."""
+        before = _count("GET", UNMATCHED_ROUTE, "404")
+
+        client.get("/does-not-exist-1")
+        client.get("/does-not-exist-2")
+
+        assert _count("GET", UNMATCHED_ROUTE, "404") == before + 2
+
+    def test_records_server_errors(self, client):
+        """Unhandled exceptions should be counted as 500s."""
+        before = _count("GET", "/boom", "500")
+
+        response = client.get("/boom")
+
+        assert response.status_code == 500
+        assert _count("GET", "/boom", "500") == before + 1
+
+    def test_records_latency(self, client):
+        """A latency observation should be recorded per request."""
+        client.get("/items/3")
+
+        samples = {
+            tuple(labels): counts for labels, counts, _ in HTTP_REQUEST_DURATION.snapshot()["samples"]
+        }
+        assert sum(samples[("GET", "/items/{item_id}")]) >= 1
+
+
+class TestMetricsEndpoint:
+    """Tests for the /metrics endpoint on the real application."""
+
+    def test_exposes_prometheus_text(self):
+        """The endpoint should return the text exposition format."""
+        from app.main import app
+
+        client = TestClient(app)
+        client.get("/")
+        with patch("app.core.auth.settings.INTERNAL_API_KEY", "test-key"):
+            response = client.get("/metrics", headers={"api-key": "test-key"})
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+        assert "# TYPE http_requests_total counter" in response.text
+        assert 'http_requests_total{method="GET",route="/",status="200"}' in response.text
+        assert "db_pool_size" in response.text
+
+    def test_rejects_callers_without_the_internal_key(self):
+        """The endpoint is internal: anonymous or wrong-key scrapes get nothing."""
+        from app.main import app
+
+        client = TestClient(app)
+        with patch("app.core.auth.settings.INTERNAL_API_KEY", "test-key"):
+            anonymous = client.get("/metrics")
+            wrong_key = client.get("/metrics", headers={"api-key": "other"})
+
+        assert anonymous.status_code == 422
+        assert wrong_key.status_code == 403
+        assert "http_requests_total" not in anonymous.text + wrong_key.text
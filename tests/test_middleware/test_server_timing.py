@@ -0,0 +1,97 @@
+"""Tests for the server timing middleware."""
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import StaticPool
+
+from app.core.metrics import record_outbound_call
+from app.core.slow_requests import SlowRequestLog
+from app.core.sql_instrumentation import instrument_engine
+from app.middleware.server_timing import SQL_REPEATED_STATEMENT_WARNINGS, ServerTimingMiddleware
+
+
+def _warnings(route: str) -> float:
+    for labels, value in SQL_REPEATED_STATEMENT_WARNINGS.snapshot()["samples"]:
+        if labels == [route]:
+            return value
+    return 0
+
+
+class TestServerTimingMiddleware:
+    """Tests for ServerTimingMiddleware."""
+
+    @pytest.fixture
+    def engine(self):
+        engine = create_engine(
+            "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+        )
+        instrument_engine(engine)
+        yield engine
+        engine.dispose()
+
+    def _client(self, engine, emit_header: bool, slow_requests: SlowRequestLog = None) -> TestClient:
+        app = FastAPI()
+        app.add_middleware(
+            ServerTimingMiddleware,
+            emit_header=emit_header,
+            n_plus_one_threshold=3,
+            slow_requests=slow_requests or SlowRequestLog(capacity=10, threshold=60),
+        )
+
+        @app.get("/loop/{n}")
+        def loop(n: int):
+            with engine.connect() as conn:
+                for i in range(n):
+                    conn.execute(text("SELECT :value"), {"value": i})
+            return {"n": n}
+
+        @app.get("/outbound")
+        async def outbound():
+            record_outbound_call("stripe", "Customer.retrieve", 0.25)
+            return {}
+
+        return TestClient(app)
+
+    def test_header_reports_db_time(self, engine):
+        """The header should include query count and total time."""
+        response = self._client(engine, emit_header=True).get("/loop/2")
+
+        header = response.headers["server-timing"]
+        assert 'desc="2 queries"' in header
+        assert "total;dur=" in header
+
+    def test_header_reports_outbound_time(self, engine):
+        """Time spent on external services should get its own entry."""
+        response = self._client(engine, emit_header=True).get("/outbound")
+
+        assert "stripe;dur=250.0" in response.headers["server-timing"]
+
+    def test_header_disabled_by_default(self, engine):
+        """No header should be emitted unless enabled."""
+        response = self._client(engine, emit_header=False).get("/loop/1")
+
+        assert "server-timing" not in response.headers
+
+    def test_repeated_statements_flagged(self, engine):
+        """Running the same statement past the threshold should be counted as a warning."""
+        client = self._client(engine, emit_header=False)
+        before = _warnings("/loop/{n}")
+
+        client.get("/loop/2")
+        assert _warnings("/loop/{n}") == before
+
+        client.get("/loop/5")
+        assert _warnings("/loop/{n}") == before + 1
+
+    def test_slow_requests_are_logged(self, engine):
+        """Requests over the threshold should be kept with their breakdown."""
+        slow_requests = SlowRequestLog(capacity=10, threshold=0)
+        client = self._client(engine, emit_header=False, slow_requests=slow_requests)
+
+        client.get("/loop/2")
+
+        entry = slow_requests.recent()[0]
+        assert (entry.method, entry.route, entry.status) == ("GET", "/loop/{n}", 200)
+        assert entry.db_statements == 2
@@ -0,0 +1,58 @@
+"""Tests for the tracing middleware."""
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core.tracing import SpanKind, Tracer, parse_traceparent
+from app.middleware.tracing import TracingMiddleware
+
+
+class _CollectingProcessor:
+    def __init__(self):
+        self.spans = []
+
+    def on_end(self, span):
+        self.spans.append(span)
+
+
+class TestTracingMiddleware:
+    """Tests for TracingMiddleware."""
+
+    @pytest.fixture
+    def collected(self):
+        return _CollectingProcessor()
+
+    @pytest.fixture
+    def client(self, collected):
+        tracer = Tracer(processor=collected)
+        app = FastAPI()
+        app.add_middleware(TracingMiddleware, tracer=tracer)
+
+        @app.get("/items/{item_id}")
+        async def get_item(item_id: int):
+            with tracer.span("lookup"):
+                return {"id": item_id}
+
+        return TestClient(app)
+
+    def test_server_span_named_after_route(self, client, collected):
+        """The server span should use the route template, not the raw path."""
+        client.get("/items/7")
+
+        server = [span for span in collected.spans if span.kind == SpanKind.SERVER][0]
+        assert server.name == "GET /items/{item_id}"
+        assert server.attributes["http.response.status_code"] == 200
+
+    def test_continues_incoming_trace(self, client, collected):
+        """An incoming traceparent should become the parent of the server span."""
+        incoming = "00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-01"
+
+        response = client.get("/items/1", headers={"traceparent": incoming})
+
+        server = [span for span in collected.spans if span.kind == SpanKind.SERVER][0]
+        child = [span for span in collected.spans if span.name == "lookup"][0]
+        assert server.trace_id == "4bf92f3577b34da6a3ce929d0e0e4736"
+        assert server.parent_span_id == "00f067aa0ba902b7"
+        assert child.parent_span_id == server.span_id
+        assert parse_traceparent(response.headers["traceresponse"]).span_id == server.span_id
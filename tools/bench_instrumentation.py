@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Benchmark the per-request overhead of the service's instrumentation.
+
+Calls a trivial ASGI app directly (no network, no HTTP parsing) with and
+without the instrumentation middleware and reports the difference per
+request in microseconds.
+
+Usage (from the repository root):
+    python tools/bench_instrumentation.py --requests 50000
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.middleware.metrics import MetricsMiddleware  # noqa: E402
+
+
+class _Route:
+    path = "/credits/balance"
+
+
+async def _endpoint(scope, receive, send):
+    scope["route"] = _Route
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"{}"})
+
+
+async def _receive():
+    return {"type": "http.request", "body": b"", "more_body": False}
+
+
+async def _send(message):
+    return None
+
+
+async def _run(app, requests: int) -> float:
+    scope = {"type": "http", "method": "GET", "path": "/credits/balance", "headers": []}
+    start = time.perf_counter()
+    for _ in range(requests):
+        await app(dict(scope), _receive, _send)
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=50000, help="Requests per run (default: 50000)")
+    args = parser.parse_args()
+
+    variants = {
+        "baseline": _endpoint,
+        "metrics": MetricsMiddleware(_endpoint),
+    }
+
+    results = {}
+    for name, app in variants.items():
+        asyncio.run(_run(app, 1000))  # warm-up
+        results[name] = asyncio.run(_run(app, args.requests))
+
+    baseline = results["baseline"]
+    for name, elapsed in results.items():
+        per_request = elapsed / args.requests * 1e6
+        overhead = (elapsed - baseline) / args.requests * 1e6
+        print(f"{name:<10} {per_request:8.2f} µs/request  (+{overhead:.2f} µs)")
+
+
+if __name__ == "__main__":
+    main()